@@ -7,6 +7,7 @@ from . import cli_tac_interpolation
 from . import cli_preproc
 from . import cli_plot_tacs
 from . import cli_stats
+from . import cli_warmup
 
 def main():
     print("PETPAL - Positron Emission Tomography Processing and Analysis Library)")
@@ -30,12 +30,17 @@ import argparse
 from ..kinetic_modeling import graphical_analysis as pet_ga
 
 
-def _add_common_args(parser: argparse.ArgumentParser) -> None:
+def _add_common_args(parser: argparse.ArgumentParser, threshold_required: bool = True) -> None:
     parser.add_argument("-i", "--input-tac-path", required=True, help="Path to the input TAC file.")
     parser.add_argument("-o", "--output-directory", required=True, help="Path to the output directory.")
     parser.add_argument("-p", "--output-filename-prefix", required=True, help="Prefix for the output filenames.")
-    parser.add_argument("-t", "--threshold-in-mins", required=True, type=float,
-                           help="Threshold in minutes for the analysis.")
+    if threshold_required:
+        parser.add_argument("-t", "--threshold-in-mins", required=True, type=float,
+                            help="Threshold in minutes for the analysis.")
+    else:
+        parser.add_argument("-t", "--threshold-in-mins", required=False, type=float, default=None,
+                            help="Threshold in minutes for the analysis. If not provided, the "
+                                 "threshold is chosen automatically for each region.")
     parser.add_argument("-m", "--method-name", required=True, choices=['patlak', 'logan', 'alt-logan', 'logan-ref'],
                            help="Analysis method to be used.")
     parser.add_argument("-k","--k2-prime",required=False,help="k2-prime value used for logan-ref only",type=float)
@@ -57,8 +62,16 @@ def main():
     parser_single_roi.add_argument("-r", "--roi-tac-path", required=True, help="Path to the ROI TAC file.")
 
     parser_multitac = subparsers.add_parser('graphical-analysis-multitac')
-    _add_common_args(parser_multitac)
+    _add_common_args(parser_multitac, threshold_required=False)
     parser_multitac.add_argument("-r", "--roi-tacs-dir", required=True, help="Path to directory containing ROI TTACs")
+    parser_multitac.add_argument("--bootstrap-resamples", required=False, type=int, default=0,
+                                 help="Number of residual bootstrap resamples used to compute "
+                                      "confidence intervals for the slope and intercept. Default 0 "
+                                      "skips the bootstrap.")
+    parser_multitac.add_argument("--bootstrap-confidence", required=False, type=float, default=0.95,
+                                 help="Confidence level of the bootstrap intervals.")
+    parser_multitac.add_argument("--bootstrap-seed", required=False, type=int, default=None,
+                                 help="Seed for the bootstrap random number generator.")
 
     args = parser.parse_args()
     command = str(args.command).replace('-','_')
@@ -88,7 +101,10 @@ def main():
                                                               output_directory=args.output_directory,
                                                               output_filename_prefix=args.output_filename_prefix,
                                                               method=method,
-                                                              fit_thresh_in_mins=args.threshold_in_mins)
+                                                              fit_thresh_in_mins=args.threshold_in_mins,
+                                                              num_bootstrap_resamples=args.bootstrap_resamples,
+                                                              bootstrap_confidence=args.bootstrap_confidence,
+                                                              bootstrap_seed=args.bootstrap_seed)
         graphical_analysis(output_as_tsv=True, output_as_json=False, **run_kwargs)
 
     if args.print:
@@ -217,6 +217,9 @@ def _generate_args() -> argparse.ArgumentParser:
     _add_common_args(parser_crop)
     parser_crop.add_argument('-t','--thresh-val', required=True,default=0.01,
                             help='Fractional threshold to crop image projections.',type=float)
+    parser_crop.add_argument('--downsample-factor', required=False, default=1,
+                            help='Find the crop box on every n-th voxel along each axis. '
+                                 'Default 1 uses every voxel.',type=int)
 
     parser_tac = subparsers.add_parser('write-tacs',
                                        help='Write ROI TACs from 4D PET using segmentation masks.')
@@ -306,6 +309,12 @@ def _generate_args() -> argparse.ArgumentParser:
                              '--blur-size-mm',
                              help='Size of gaussian kernal with which to blur image.',
                              type=float)
+    parser_blur.add_argument('-n',
+                             '--num-workers',
+                             required=False,
+                             default=1,
+                             help='Number of frames blurred at the same time. Default 1.',
+                             type=int)
 
     parser_rescale = subparsers.add_parser('rescale-image',help='Divide an image by a scalar.')
     _add_common_args(parser_rescale)
@@ -426,7 +435,8 @@ def main():
             image_operations_4d.SimpleAutoImageCropper(input_image_path=args.input_img,
                                                     out_image_path=args.out_img,
                                                     thresh_val=args.thresh_val,
-                                                    verbose=True)
+                                                    verbose=True,
+                                                    downsample_factor=args.downsample_factor)
         case 'register_pet':
             register.register_pet(input_reg_image_path=args.input_img,
                                 out_image_path=args.out_img,
@@ -457,7 +467,8 @@ def main():
                                         blur_size_mm=args.blur_size_mm,
                                         out_image_path=args.out_img,
                                         verbose=True,
-                                        use_fwhm=True)
+                                        use_fwhm=True,
+                                        num_workers=args.num_workers)
         case 'suvr':
             standard_uptake_value.suvr(input_image_path=args.input_img,
                                        output_image_path=args.out_img,
@@ -1,23 +1,31 @@
 """
 Command-line interface (CLI) for Partial Volume Correction (PVC) using the Symmetric Geometric Transfer Matrix (sGTM)
-method. It uses argparse to handle command-line arguments and chooses the appropriate method based on the provided input.
+method or the PETPVC methods GTM, RBV, Iterative Yang (IY) and Van Cittert (VC). It uses argparse to handle
+command-line arguments and chooses the appropriate method based on the provided input.
 The user must provide:
     * PET image file path
-    * Segmentation image file path
+    * Segmentation image file path (not needed for VC)
     * FWHM for Gaussian blurring
     * (Optional) Segmentation label map table path.
+    * (Optional) PVC method, and backend for the PETPVC methods: ``native`` (in-process, default) or
+      ``docker`` (PETPVC Docker image).
 Example usage:
     Using SGTM method:
         .. code-block:: bash
-            pet-cli-pvc --method SGTM --pet-path /path/to/pet_image.nii --roi-path /path/to/roi_image.nii --fwhm (8.0, 7.0, 7.0)
+            petpal-pvc --method SGTM --input-image /path/to/pet_image.nii --segmentation_image /path/to/roi_image.nii --fwhm 8.0 -o /path/to/out.tsv
+    Using the native RBV method on 4 worker processes:
+        .. code-block:: bash
+            petpal-pvc --method RBV --input-image /path/to/pet_image.nii --segmentation_image /path/to/roi_image.nii --fwhm 8.0 -o /path/to/pet_pvc.nii.gz --num-workers 4
 See Also:
     SGTM and PETPVC methods implementation modules.
-    :mod:`SGTM <pet_cli.symmetric_geometric_transfer_matrix>` - module for performing Symmetric Geometric Transfer Matrix PVC.
+    :mod:`SGTM <petpal.preproc.symmetric_geometric_transfer_matrix>` - module for performing Symmetric Geometric Transfer Matrix PVC.
+    :mod:`Native PVC <petpal.preproc.native_partial_volume_corrections>` - in-process PETPVC methods.
 """
 import argparse
 
 from ..utils.bids_utils import parse_path_to_get_subject_and_session_id
 from ..preproc.symmetric_geometric_transfer_matrix import Sgtm
+from ..preproc.native_partial_volume_corrections import NativePvc, NATIVE_PVC_METHODS
 
 
 def sgtm_cli_run(input_image_path: str,
@@ -35,6 +43,41 @@ def sgtm_cli_run(input_image_path: str,
     sub_id, ses_id = parse_path_to_get_subject_and_session_id(path=input_image_path)
     sgtm_obj(output_path=output_path, out_tac_prefix=f'sub-{sub_id}_ses-{ses_id}')
 
+
+def petpvc_cli_run(input_image_path: str,
+                   segmentation_image_path: str | None,
+                   fwhm: float,
+                   output_path: str,
+                   pvc_method: str,
+                   backend: str = 'native',
+                   num_workers: int = 1,
+                   num_iterations: int | None = None):
+    """
+    Apply one of the PETPVC methods, in-process or with the PETPVC Docker image.
+    """
+    if backend == 'docker':
+        # Imported here so that the native backend does not need the Docker client.
+        from ..preproc.partial_volume_corrections import PetPvc
+        PetPvc().run_petpvc(pet_4d_filepath=input_image_path,
+                            output_filepath=output_path,
+                            pvc_method=pvc_method,
+                            psf_dimensions=fwhm,
+                            mask_filepath=segmentation_image_path,
+                            verbose=True)
+        return
+    method_kwargs = {}
+    if num_iterations is not None and pvc_method in ('IY', 'VC'):
+        method_kwargs['num_iterations'] = num_iterations
+    NativePvc().run_pvc(pet_4d_filepath=input_image_path,
+                        output_filepath=output_path,
+                        pvc_method=pvc_method,
+                        psf_dimensions=fwhm,
+                        mask_filepath=segmentation_image_path,
+                        verbose=True,
+                        num_workers=num_workers,
+                        **method_kwargs)
+
+
 def main():
     """
     Main function to handle command-line arguments and apply the appropriate PVC method.
@@ -43,7 +86,9 @@ def main():
                                      description="Apply Partial Volume Correction (PVC) to PET"
                                                  " images using sGTM. Works on 3D or 4D PET. 3D "
                                                  "result is the corrected uptake in each region, "
-                                                 "4D result is the corrected TAC for each region.",
+                                                 "4D result is the corrected TAC for each region. "
+                                                 "The PETPVC methods GTM, RBV, IY and VC are also "
+                                                 "available, natively or through Docker.",
                                      epilog="Example of usage: pet-cli-pvc --pet-path"
                                             " /path/to/pet_image.nii --roi-path "
                                             "/path/to/roi_image.nii --fwhm 8.0")
@@ -53,8 +98,9 @@ def main():
                         help="Path to the PET image file. Can be 3D or 4D.")
     parser.add_argument("-s",
                         "--segmentation_image",
-                        required=True,
-                        help="Path to the Segmentation image file.")
+                        required=False, default=None,
+                        help="Path to the Segmentation image file. Required for every method "
+                             "except VC.")
     parser.add_argument("-f",
                         "--fwhm",
                         required=True,
@@ -68,11 +114,45 @@ def main():
     parser.add_argument("-o",
                         "--output",
                         required=True,
-                        help="Path to PVC result. If input image is 3D, writes to a TSV file. If "
-                             "input image is 4D, writes to a directory.")
+                        help="Path to PVC result. For SGTM, if input image is 3D, writes to a TSV "
+                             "file, and if input image is 4D, writes to a directory. For GTM, "
+                             "writes to a TSV file. For RBV, IY and VC, writes to a NIfTI image.")
+    parser.add_argument("-m",
+                        "--method",
+                        required=False, default='SGTM',
+                        type=str.upper,
+                        choices=['SGTM', *NATIVE_PVC_METHODS],
+                        help="PVC method. Default SGTM.")
+    parser.add_argument("--backend",
+                        required=False, default='native',
+                        choices=['native', 'docker'],
+                        help="Backend for the PETPVC methods: run in-process ('native') or with "
+                             "the PETPVC Docker image ('docker'). Default native.")
+    parser.add_argument("-n",
+                        "--num-workers",
+                        required=False, default=1, type=int,
+                        help="Number of worker processes correcting frames in parallel with the "
+                             "native backend. Default 1.")
+    parser.add_argument("--iterations",
+                        required=False, default=None, type=int,
+                        help="Number of iterations for IY and VC with the native backend.")
 
     args = parser.parse_args()
 
+    if args.segmentation_image is None and args.method != 'VC':
+        parser.error(f"--segmentation_image is required for method {args.method}.")
+
+    if args.method != 'SGTM':
+        petpvc_cli_run(input_image_path=args.input_image,
+                       segmentation_image_path=args.segmentation_image,
+                       fwhm=args.fwhm,
+                       output_path=args.output,
+                       pvc_method=args.method,
+                       backend=args.backend,
+                       num_workers=args.num_workers,
+                       num_iterations=args.iterations)
+        return
+
     sgtm_cli_run(input_image_path=args.input_image,
                  segmentation_image_path=args.segmentation_image,
                  fwhm=args.fwhm,
@@ -1,40 +1,91 @@
 """Run regional statistics on PET Images"""
 import argparse
-from ..utils.stats import RegionalStats
+from ..utils.stats import (RegionalStats,
+                           REGIONAL_STATISTICS,
+                           parse_percentile,
+                           batch_regional_stats)
 from ..utils.image_io import write_dict_to_json
 
+
+def statistic_name(statistic: str) -> str:
+    """Validate a statistic name given on the command line."""
+    statistic = statistic.lower()
+    try:
+        percentile = parse_percentile(statistic)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(str(err)) from err
+    if statistic not in REGIONAL_STATISTICS and percentile is None:
+        raise argparse.ArgumentTypeError(f"invalid statistic {statistic}, choose from "
+                                         f"{', '.join(REGIONAL_STATISTICS)} or p<percent>")
+    return statistic
+
 def main():
     """Run selected stats and write to file."""
-    prog_desc = "Run statistics on a PET image for each region and write results to JSON file."
+    prog_desc = "Run statistics on a PET image for each region and write results to JSON or TSV " \
+                "file."
     epilog = "petpal-pet-stats --input-image-path suvr.nii.gz --segmentation-path " \
-             "aparc+aseg.nii.gz --label-map freesurfer --statistic mean --out-path mean_suvr.json"
+             "aparc+aseg.nii.gz --label-map freesurfer --statistic mean std p95 --out-path " \
+             "suvr_stats.tsv\n" \
+             "petpal-pet-stats --manifest manifest.tsv --statistic mean nvox --num-workers 8 " \
+             "--out-path cohort_stats.tsv"
     parser = argparse.ArgumentParser(prog="STATS CLI", description=prog_desc, epilog=epilog)
     parser.add_argument("-i",
                         "--input-image-path",
-                        required=True,
+                        required=False,
                         help="Path to 3D PET parametric image, such as SUVR or Vt.")
     parser.add_argument("-s",
                         "--segmentation-path",
-                        required=True,
+                        required=False,
                         help="Path to 3D segmentation image, such as aparc+aseg.")
     parser.add_argument("-l",
                         "--label-map",
-                        required=True,
+                        required=False,
                         help="Label map for ROIs. Presets include freesurfer, "
                              "freesurfer_merge_lr, perlcyno, perlcyno_merge_lr.")
     parser.add_argument("-f",
                         "--statistic",
                         required=True,
-                        help="The statistic to calculate.",
-                        choices=['mean','std','median','max','min','nvox'])
+                        nargs='+',
+                        type=statistic_name,
+                        help="One or more statistics to calculate, computed in one pass. Choose "
+                             f"from {', '.join(REGIONAL_STATISTICS)}, or percentiles as "
+                             "p<percent>, e.g. p95.")
     parser.add_argument("-o",
                         "--out-path",
                         required=True,
-                        help="Path to save output as JSON file.")
+                        help="Path to save output. Writes a TSV file with one row per region "
+                             "if the path ends with .tsv, and a JSON file otherwise. With "
+                             "--manifest, always writes a long-format TSV file.")
+    parser.add_argument("-m",
+                        "--manifest",
+                        required=False,
+                        help="Batch mode: TSV file with columns image, segmentation and "
+                             "label_map, one row per image. Other columns, such as subject "
+                             "identifiers, are copied to the output. Replaces -i, -s and -l.")
+    parser.add_argument("-n",
+                        "--num-workers",
+                        required=False, default=1, type=int,
+                        help="Number of worker processes in batch mode. Default 1.")
     args = parser.parse_args()
 
+    if args.manifest is not None:
+        cohort_stats = batch_regional_stats(manifest=args.manifest,
+                                            statistics=args.statistic,
+                                            num_workers=args.num_workers)
+        cohort_stats.to_csv(args.out_path, sep='\t', index=False)
+        return
+    if None in (args.input_image_path, args.segmentation_path, args.label_map):
+        parser.error("--input-image-path, --segmentation-path and --label-map are required "
+                     "without --manifest.")
+
     stats_obj = RegionalStats(input_image_path=args.input_image_path,
                               segmentation_image_path=args.segmentation_path,
                               label_map_option=args.label_map)
-    stats_result = getattr(stats_obj, args.statistic.lower())
+    if args.out_path.endswith('.tsv'):
+        stats_table = stats_obj.get_multiple_stats_table(statistics=args.statistic)
+        stats_table.to_csv(args.out_path, sep='\t', index=False)
+        return
+    stats_result = stats_obj.get_multiple_stats(statistics=args.statistic)
+    if len(args.statistic) == 1:
+        stats_result = stats_result[args.statistic[0]]
     write_dict_to_json(meta_data_dict=stats_result, out_path=args.out_path)
@@ -0,0 +1,44 @@
+"""
+Command-line interface (CLI) for precompiling PETPAL's numba kernels.
+
+This module provides a CLI to fill numba's on-disk cache so that later PETPAL commands, such as
+``petpal-graph-analysis``, ``petpal-parametric-image`` and ``petpal-rtms``, do not spend time on
+JIT compilation. It is meant to be run once at install or container-build time.
+
+The cache is written next to the PETPAL source files. If those are not writable, set the
+``NUMBA_CACHE_DIR`` environment variable to a writable directory, and use the same value when
+running the other commands.
+
+Example usage:
+    .. code-block:: bash
+
+        petpal-warmup --verbose
+
+    .. code-block:: bash
+
+        NUMBA_CACHE_DIR=/opt/numba_cache petpal-warmup --groups graphical-analysis parametric-images
+
+See Also:
+    :mod:`petpal.kinetic_modeling.jit_warmup` - module that compiles the kernels.
+
+"""
+import argparse
+from ..kinetic_modeling import jit_warmup
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="petpal-warmup",
+                                     description="Precompile PETPAL numba kernels into the on-disk cache.",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("-g", "--groups", required=False, nargs='+', default=None,
+                        choices=list(jit_warmup.WARMUP_GROUPS),
+                        help="Groups of kernels to compile. Defaults to all groups.")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="Print the time taken to compile each group.")
+    args = parser.parse_args()
+
+    jit_warmup.warmup_numba_kernels(groups=args.groups, verbose=args.verbose)
+
+
+if __name__ == "__main__":
+    main()
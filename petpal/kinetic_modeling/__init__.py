@@ -7,6 +7,8 @@ from . import tcms_as_convolutions
 from . import fit_tac_with_rtms
 from . import rtm_analysis
 from . import tac_uncertainty
+from . import spectral_analysis
+from . import jit_warmup
 
 
 def main():
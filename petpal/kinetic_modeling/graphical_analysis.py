@@ -26,11 +26,12 @@ import json
 import numba
 import numpy as np
 import pandas as pd
+from scipy.integrate import cumulative_trapezoid
 from ..utils.time_activity_curve import MultiTACAnalysisMixin, safe_load_tac
 from ..utils.image_io import flatten_metadata
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def _line_fitting_make_rhs_matrix_from_xdata(xdata: np.ndarray) -> np.ndarray:
     """Generates the RHS matrix for linear least squares fitting
 
@@ -46,7 +47,7 @@ def _line_fitting_make_rhs_matrix_from_xdata(xdata: np.ndarray) -> np.ndarray:
     return out_matrix
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def fit_line_to_data_using_lls(xdata: np.ndarray, ydata: np.ndarray) -> np.ndarray:
     """Find the linear least squares solution given the x and y variables.
     
@@ -68,7 +69,7 @@ def fit_line_to_data_using_lls(xdata: np.ndarray, ydata: np.ndarray) -> np.ndarr
     return fit_ans
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def fit_line_to_data_using_lls_with_rsquared(xdata: np.ndarray,
                                              ydata: np.ndarray) -> Tuple[float, float, float]:
     """Fits a line to the data using least squares and explicitly computes the r-squared value.
@@ -91,7 +92,7 @@ def fit_line_to_data_using_lls_with_rsquared(xdata: np.ndarray,
     return fit_ans[0][0], fit_ans[0][1], r_squared
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def linear_least_squares_fit_with_stats(xdata: np.ndarray,
                                         ydata: np.ndarray) -> tuple[float, float, float, float, float]:
     """Fits a line to the data using least squares and explicitly computes:
@@ -135,7 +136,7 @@ def linear_least_squares_fit_with_stats(xdata: np.ndarray,
     se_slope = s*sum_square_xdiff**(-0.5)
     return fit_ans[0][0], fit_ans[0][1], r_squared, se_intercept, se_slope
 
-@numba.njit()
+@numba.njit(cache=True)
 def cumulative_trapezoidal_integral(xdata: np.ndarray,
                                     ydata: np.ndarray,
                                     initial: float = 0.0) -> np.ndarray:
@@ -160,7 +161,7 @@ def cumulative_trapezoidal_integral(xdata: np.ndarray,
     return cum_int
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def calculate_patlak_x(tac_times: np.ndarray, tac_vals: np.ndarray) -> np.ndarray:
     r"""Calculates the x-variable in Patlak analysis
     :math:`\left(\frac{\int_{0}^{T}f(t)\mathrm{d}t}{f(T)}\right)`.
@@ -190,7 +191,7 @@ def calculate_patlak_x(tac_times: np.ndarray, tac_vals: np.ndarray) -> np.ndarra
     return cumulative_integral / tac_vals
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def get_index_from_threshold(times_in_minutes: np.ndarray, t_thresh_in_minutes: float) -> int:
     """Get the index after which all times are greater than the threshold.
 
@@ -211,7 +212,7 @@ def get_index_from_threshold(times_in_minutes: np.ndarray, t_thresh_in_minutes:
         return np.argwhere(times_in_minutes >= t_thresh_in_minutes)[0, 0]
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def patlak_analysis(tac_times_in_minutes: np.ndarray,
                     input_tac_values: np.ndarray,
                     region_tac_values: np.ndarray,
@@ -253,7 +254,7 @@ def patlak_analysis(tac_times_in_minutes: np.ndarray,
     return patlak_values
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def patlak_analysis_with_rsquared(tac_times_in_minutes: np.ndarray,
                                   input_tac_values: np.ndarray,
                                   region_tac_values: np.ndarray,
@@ -293,7 +294,7 @@ def patlak_analysis_with_rsquared(tac_times_in_minutes: np.ndarray,
     return patlak_values
 
 
-@numba.njit
+@numba.njit(cache=True)
 def logan_analysis(tac_times_in_minutes: np.ndarray,
                    input_tac_values: np.ndarray,
                    region_tac_values: np.ndarray,
@@ -344,7 +345,7 @@ def logan_analysis(tac_times_in_minutes: np.ndarray,
     return fit_ans
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def logan_analysis_with_rsquared(tac_times_in_minutes: np.ndarray,
                                  input_tac_values: np.ndarray,
                                  region_tac_values: np.ndarray,
@@ -389,7 +390,7 @@ def logan_analysis_with_rsquared(tac_times_in_minutes: np.ndarray,
     return logan_values
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def logan_ref_region_analysis(tac_times_in_minutes: np.ndarray,
                               input_tac_values: np.ndarray,
                               region_tac_values: np.ndarray,
@@ -441,7 +442,7 @@ def logan_ref_region_analysis(tac_times_in_minutes: np.ndarray,
     return logan_values
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def logan_ref_region_analysis_with_rsquared(tac_times_in_minutes: np.ndarray,
                                             input_tac_values: np.ndarray,
                                             region_tac_values: np.ndarray,
@@ -492,7 +493,7 @@ def logan_ref_region_analysis_with_rsquared(tac_times_in_minutes: np.ndarray,
     return logan_values
 
 
-@numba.njit
+@numba.njit(cache=True)
 def alternative_logan_analysis(tac_times_in_minutes: np.ndarray,
                                input_tac_values: np.ndarray,
                                region_tac_values: np.ndarray,
@@ -546,7 +547,7 @@ def alternative_logan_analysis(tac_times_in_minutes: np.ndarray,
     return fit_ans
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def alternative_logan_analysis_with_rsquared(tac_times_in_minutes: np.ndarray,
                                              input_tac_values: np.ndarray,
                                              region_tac_values: np.ndarray,
@@ -755,6 +756,211 @@ def km_multifit_analysis_to_jsons(analysis_props: list[dict],
             json.dump(obj=fit_props, fp=f, indent=4)
 
 
+def get_graphical_analysis_xy(method_name: str,
+                              tac_times_in_minutes: np.ndarray,
+                              input_tac_values: np.ndarray,
+                              region_tacs_values: np.ndarray,
+                              k2_prime: float | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    r"""
+    Calculates the graphical analysis x and y variables for many region TACs at once.
+
+    The points follow the same conventions as the corresponding analysis functions (e.g.
+    :func:`patlak_analysis` or :func:`logan_analysis`): for Patlak and alternative Logan, the
+    times where the input TAC is zero are dropped; for Logan and Logan with a reference region,
+    points where a region TAC is zero are set to NaN.
+
+    Args:
+        method_name (str): One of 'patlak', 'logan', 'alt_logan' or 'logan_ref'.
+        tac_times_in_minutes (np.ndarray): Array of times in minutes.
+        input_tac_values (np.ndarray): Array of input TAC values.
+        region_tacs_values (np.ndarray): Array of ROI TAC values with shape
+            ``(num_regions, num_times)``.
+        k2_prime (float | None): Population averaged k2 value for the reference region. Only used
+            for 'logan_ref'.
+
+    Returns:
+        tuple: ``(times, x, y)`` where ``times`` are the times of the kept points and ``x`` and
+        ``y`` have shape ``(num_regions, len(times))``.
+
+    Raises:
+        ValueError: If `method_name` is not one of the supported graphical analysis methods.
+    """
+    region_tacs_values = np.atleast_2d(region_tacs_values)
+    num_regions = region_tacs_values.shape[0]
+    match method_name:
+        case "patlak":
+            non_zero = input_tac_values != 0.
+            times = tac_times_in_minutes[non_zero]
+            patlak_x = calculate_patlak_x(tac_times=times, tac_vals=input_tac_values[non_zero])
+            x_vals = np.broadcast_to(patlak_x, (num_regions, len(times))).copy()
+            y_vals = region_tacs_values[:, non_zero] / input_tac_values[non_zero]
+        case "alt_logan":
+            non_zero = input_tac_values != 0.
+            times = tac_times_in_minutes[non_zero]
+            input_int = cumulative_trapezoidal_integral(xdata=tac_times_in_minutes,
+                                                        ydata=input_tac_values)
+            region_int = cumulative_trapezoid(region_tacs_values, x=tac_times_in_minutes,
+                                              axis=1, initial=0.0)
+            alt_logan_x = input_int[non_zero] / input_tac_values[non_zero]
+            x_vals = np.broadcast_to(alt_logan_x, (num_regions, len(times))).copy()
+            y_vals = region_int[:, non_zero] / input_tac_values[non_zero]
+        case "logan" | "logan_ref":
+            times = tac_times_in_minutes
+            region_denom = np.where(region_tacs_values != 0., region_tacs_values, np.nan)
+            input_int = cumulative_trapezoidal_integral(xdata=tac_times_in_minutes,
+                                                        ydata=input_tac_values)
+            region_int = cumulative_trapezoid(region_tacs_values, x=tac_times_in_minutes,
+                                              axis=1, initial=0.0)
+            if method_name == "logan_ref":
+                input_int = input_int + input_tac_values / k2_prime
+            x_vals = input_int / region_denom
+            y_vals = region_int / region_denom
+        case _:
+            raise ValueError("Invalid method_name! Must be either 'patlak', 'logan', 'alt_logan',"
+                             f"'logan_ref'. Got {method_name}")
+    return times, x_vals, y_vals
+
+
+def _reverse_cumsum(vals: np.ndarray) -> np.ndarray:
+    """Cumulative sum along the last axis, starting from the end."""
+    return np.cumsum(vals[..., ::-1], axis=-1)[..., ::-1]
+
+
+def calculate_suffix_line_fits(xdata: np.ndarray,
+                               ydata: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    r"""
+    Calculates the least squares line through the points after every possible start index.
+
+    For each row and each start index :math:`s`, fits a line to all finite points with index
+    :math:`\geq s`. Uses suffix sums of :math:`1, x, y, x^2, xy` so that all the fits are
+    computed in :math:`\mathcal{O}(N)` per row.
+
+    Args:
+        xdata (np.ndarray): X-coordinates with shape ``(num_rows, num_points)``. NaNs are ignored.
+        ydata (np.ndarray): Y-coordinates with shape ``(num_rows, num_points)``. NaNs are ignored.
+
+    Returns:
+        tuple: ``(slopes, intercepts, num_points)`` each with shape ``(num_rows, num_points)``.
+        Fits with fewer than 2 points are NaN.
+    """
+    valid = np.isfinite(xdata) & np.isfinite(ydata)
+    x_vals = np.where(valid, xdata, 0.0)
+    y_vals = np.where(valid, ydata, 0.0)
+
+    num_points = _reverse_cumsum(valid.astype(float))
+    sum_x = _reverse_cumsum(x_vals)
+    sum_y = _reverse_cumsum(y_vals)
+    sum_xx = _reverse_cumsum(x_vals * x_vals)
+    sum_xy = _reverse_cumsum(x_vals * y_vals)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = (num_points * sum_xy - sum_x * sum_y) / (num_points * sum_xx - sum_x ** 2.)
+        intercepts = (sum_y - slopes * sum_x) / num_points
+    slopes[num_points < 2] = np.nan
+    intercepts[num_points < 2] = np.nan
+    return slopes, intercepts, num_points
+
+
+def find_graphical_analysis_start_indices(xdata: np.ndarray,
+                                          ydata: np.ndarray,
+                                          max_rel_error: float = 0.1,
+                                          min_num_points: int = 3) -> np.ndarray:
+    r"""
+    Automatically finds the start of the linear portion (:math:`t^{*}`) for graphical analysis.
+
+    For every candidate start index, the line through the remaining points is computed with
+    :func:`calculate_suffix_line_fits`. The chosen start is the earliest one for which the maximum
+    relative deviation of the fitted points from the line is at most ``max_rel_error``. If no
+    start satisfies the criterion, the start with the smallest maximum relative deviation is
+    chosen. Only starts with at least ``min_num_points`` points are considered.
+
+    Args:
+        xdata (np.ndarray): X-coordinates with shape ``(num_rows, num_points)``. NaNs are ignored.
+        ydata (np.ndarray): Y-coordinates with shape ``(num_rows, num_points)``. NaNs are ignored.
+        max_rel_error (float): Maximum allowed relative deviation from the line. Defaults to 0.1.
+        min_num_points (int): Minimum number of points in the fit. Defaults to 3.
+
+    Returns:
+        np.ndarray: The start index for each row.
+    """
+    slopes, intercepts, num_points = calculate_suffix_line_fits(xdata=xdata, ydata=ydata)
+    num_cols = xdata.shape[1]
+    in_suffix = np.arange(num_cols)[None, :] >= np.arange(num_cols)[:, None]
+
+    predicted = slopes[:, :, None] * xdata[:, None, :] + intercepts[:, :, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rel_err = np.abs(ydata[:, None, :] - predicted) / np.abs(ydata[:, None, :])
+    points_fit = in_suffix[None, :, :] & np.isfinite(xdata[:, None, :]) & np.isfinite(ydata[:, None, :])
+    rel_err = np.where(points_fit, rel_err, 0.0)
+    rel_err[~np.isfinite(rel_err)] = np.inf
+    max_rel_err = rel_err.max(axis=2)
+    max_rel_err[(num_points < min_num_points) | np.isnan(slopes)] = np.inf
+
+    acceptable = max_rel_err <= max_rel_error
+    return np.where(acceptable.any(axis=1),
+                    np.argmax(acceptable, axis=1),
+                    np.argmin(max_rel_err, axis=1))
+
+
+def bootstrap_line_fits(xdata: np.ndarray,
+                        ydata: np.ndarray,
+                        fit_mask: np.ndarray,
+                        num_resamples: int = 1000,
+                        seed: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    r"""
+    Residual bootstrap of least squares line fits, for all rows and resamples at once.
+
+    For each row, a line is fit to the points in ``fit_mask``. The residuals, scaled by
+    :math:`\sqrt{n/(n-2)}`, are resampled with replacement and added back to the fitted values,
+    and every resampled dataset is refit in closed form. Since the x-values are fixed, only
+    :math:`\sum y` and :math:`\sum xy` change between resamples.
+
+    Args:
+        xdata (np.ndarray): X-coordinates with shape ``(num_rows, num_points)``.
+        ydata (np.ndarray): Y-coordinates with shape ``(num_rows, num_points)``.
+        fit_mask (np.ndarray): Boolean array with shape ``(num_rows, num_points)`` selecting the
+            points used in each fit. Non-finite points are always excluded.
+        num_resamples (int): Number of bootstrap resamples. Defaults to 1000.
+        seed (int | None): Seed for the random number generator. Defaults to None.
+
+    Returns:
+        tuple: ``(slopes, intercepts)`` each with shape ``(num_rows, num_resamples)``. Rows with
+        fewer than 3 points are NaN.
+    """
+    rng = np.random.default_rng(seed)
+    valid = fit_mask & np.isfinite(xdata) & np.isfinite(ydata)
+    num_rows = valid.shape[0]
+    num_points = valid.sum(axis=1)
+    x_vals = np.where(valid, xdata, 0.0)
+    y_vals = np.where(valid, ydata, 0.0)
+
+    sum_x = x_vals.sum(axis=1)
+    sum_xx = (x_vals * x_vals).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        denom = num_points * sum_xx - sum_x ** 2.
+        slopes = (num_points * (x_vals * y_vals).sum(axis=1) - sum_x * y_vals.sum(axis=1)) / denom
+        intercepts = (y_vals.sum(axis=1) - slopes * sum_x) / num_points
+        fitted = slopes[:, None] * x_vals + intercepts[:, None]
+        resid_scale = np.sqrt(num_points / (num_points - 2.0))
+    residuals = np.where(valid, y_vals - fitted, 0.0) * np.nan_to_num(resid_scale)[:, None]
+
+    valid_positions = np.argsort(~valid, axis=1, kind='stable')
+    draws = np.floor(rng.random((num_rows, num_resamples, valid.shape[1]))
+                     * num_points[:, None, None]).astype(int)
+    row_ids = np.arange(num_rows)[:, None, None]
+    sampled_resid = residuals[row_ids, valid_positions[row_ids, draws]]
+    boot_y = np.where(valid[:, None, :], fitted[:, None, :] + sampled_resid, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        boot_sum_y = boot_y.sum(axis=2)
+        boot_sum_xy = (boot_y * x_vals[:, None, :]).sum(axis=2)
+        boot_slopes = (num_points[:, None] * boot_sum_xy - sum_x[:, None] * boot_sum_y) / denom[:, None]
+        boot_intercepts = (boot_sum_y - boot_slopes * sum_x[:, None]) / num_points[:, None]
+    boot_slopes[num_points < 3] = np.nan
+    boot_intercepts[num_points < 3] = np.nan
+    return boot_slopes, boot_intercepts
+
+
 class GraphicalAnalysis:
     """
     :class:`GraphicalAnalysis` to handle Graphical Analysis for time activity curve (TAC) data.
@@ -983,13 +1189,27 @@ class MultiTACGraphicalAnalysis(GraphicalAnalysis, MultiTACAnalysisMixin):
     """
     A class that performs graphical analysis on multiple tissue TACs (Time Activity Curves).
 
+    If ``fit_thresh_in_mins`` is None, the start of the linear portion, :math:`t^{*}`, is chosen
+    automatically for each region with :func:`find_graphical_analysis_start_indices`. If
+    ``num_bootstrap_resamples`` is larger than 0, percentile confidence intervals for the slope and
+    intercept of every region are computed with a residual bootstrap over the regression points
+    using :func:`bootstrap_line_fits`. All regions and resamples are processed as one array
+    operation.
+
     Attributes:
         input_tac_path (str): Path to the input TAC file.
         roi_tacs_dir (str): Directory containing region of interest TAC files.
         output_directory (str): Directory for saving analysis results.
         output_filename_prefix (str): Prefix for output filenames.
         method (str): Method used for analysis.
-        fit_thresh_in_mins (Optional[float]): Threshold in minutes for fit calculation.
+        fit_thresh_in_mins (Optional[float]): Threshold in minutes for fit calculation. If None,
+            the threshold is chosen automatically for each region.
+        region_fit_thresh_in_mins (np.ndarray): Threshold in minutes used for each region.
+        num_bootstrap_resamples (int): Number of bootstrap resamples. 0 disables the bootstrap.
+        bootstrap_confidence (float): Confidence level of the bootstrap intervals.
+        bootstrap_seed (Optional[int]): Seed for the bootstrap random number generator.
+        thresh_max_rel_error (float): Maximum relative deviation from the line used for the
+            automatic threshold selection.
     """
     def __init__(self,
                  input_tac_path: str,
@@ -997,7 +1217,11 @@ class MultiTACGraphicalAnalysis(GraphicalAnalysis, MultiTACAnalysisMixin):
                  output_directory: str,
                  output_filename_prefix: str,
                  method:str,
-                 fit_thresh_in_mins=None,):
+                 fit_thresh_in_mins=None,
+                 num_bootstrap_resamples: int = 0,
+                 bootstrap_confidence: float = 0.95,
+                 bootstrap_seed: int | None = None,
+                 thresh_max_rel_error: float = 0.1):
         """
         Initializes the MultiTACGraphicalAnalysis object with required paths, method, and threshold.
 
@@ -1008,7 +1232,16 @@ class MultiTACGraphicalAnalysis(GraphicalAnalysis, MultiTACAnalysisMixin):
             output_filename_prefix (str): Prefix for output filenames.
             method (str): Method used for analysis.
             fit_thresh_in_mins (Optional[float], optional): Threshold in minutes for fit
-                calculation. Defaults to None.
+                calculation. If None, the threshold is chosen automatically for each region.
+                Defaults to None.
+            num_bootstrap_resamples (int, optional): Number of residual bootstrap resamples used
+                to compute confidence intervals. Defaults to 0, which skips the bootstrap.
+            bootstrap_confidence (float, optional): Confidence level of the bootstrap intervals.
+                Defaults to 0.95.
+            bootstrap_seed (Optional[int], optional): Seed for the bootstrap random number
+                generator. Defaults to None.
+            thresh_max_rel_error (float, optional): Maximum relative deviation from the line used
+                for the automatic threshold selection. Defaults to 0.1.
         """
         MultiTACAnalysisMixin.__init__(self,
                                        input_tac_path=input_tac_path,
@@ -1021,6 +1254,11 @@ class MultiTACGraphicalAnalysis(GraphicalAnalysis, MultiTACAnalysisMixin):
                                    method=method,
                                    fit_thresh_in_mins=fit_thresh_in_mins
                                    )
+        self.num_bootstrap_resamples = num_bootstrap_resamples
+        self.bootstrap_confidence = bootstrap_confidence
+        self.bootstrap_seed = bootstrap_seed
+        self.thresh_max_rel_error = thresh_max_rel_error
+        self.region_fit_thresh_in_mins: np.ndarray | None = None
 
     def init_analysis_props(self):
         """
@@ -1042,17 +1280,37 @@ class MultiTACGraphicalAnalysis(GraphicalAnalysis, MultiTACAnalysisMixin):
         Calculates the fit for each TAC, updating the analysis properties with slope, intercept,
         and R-squared values. Overrides :meth:`GraphicalAnalysis.calculate_fit`.
 
+        If ``fit_thresh_in_mins`` is None, the threshold for each region is found first. If
+        ``num_bootstrap_resamples`` is larger than 0, the bootstrap confidence intervals are also
+        stored as 'SlopeLowerCI', 'SlopeUpperCI', 'InterceptLowerCI' and 'InterceptUpperCI'.
+
         Args:
             run_kwargs: Additional keyword arguments passed on to `analysis_func`.
         """
         p_tac_times, p_tac_vals = safe_load_tac(self.input_tac_path)
-        for tac_id, a_tac in enumerate(self.tacs_files_list):
-            _, t_tac_vals = safe_load_tac(a_tac)
+        t_tacs_vals = np.asarray([safe_load_tac(a_tac)[1] for a_tac in self.tacs_files_list])
+
+        need_xy = self.fit_thresh_in_mins is None or self.num_bootstrap_resamples > 0
+        if need_xy:
+            xy_times, x_vals, y_vals = get_graphical_analysis_xy(method_name=self.method,
+                                                                 tac_times_in_minutes=p_tac_times,
+                                                                 input_tac_values=p_tac_vals,
+                                                                 region_tacs_values=t_tacs_vals,
+                                                                 **run_kwargs)
+        if self.fit_thresh_in_mins is None:
+            start_ids = find_graphical_analysis_start_indices(xdata=x_vals,
+                                                              ydata=y_vals,
+                                                              max_rel_error=self.thresh_max_rel_error)
+            self.region_fit_thresh_in_mins = xy_times[start_ids]
+        else:
+            self.region_fit_thresh_in_mins = np.full(self.num_of_tacs, self.fit_thresh_in_mins, float)
+
+        for tac_id, t_tac_vals in enumerate(t_tacs_vals):
             try:
                 slope, intercept, rsquared = self.analysis_func(tac_times_in_minutes=p_tac_times,
                                                                 input_tac_values=p_tac_vals,
                                                                 region_tac_values=t_tac_vals,
-                                                                t_thresh_in_minutes=self.fit_thresh_in_mins,
+                                                                t_thresh_in_minutes=self.region_fit_thresh_in_mins[tac_id],
                                                                 **run_kwargs)
             except np.linalg.LinAlgError:
                 slope, intercept, rsquared = np.nan, np.nan, np.nan
@@ -1060,6 +1318,26 @@ class MultiTACGraphicalAnalysis(GraphicalAnalysis, MultiTACAnalysisMixin):
             self.analysis_props[tac_id]['Intercept'] = intercept
             self.analysis_props[tac_id]['RSquared'] = rsquared
 
+        if self.num_bootstrap_resamples > 0:
+            fit_mask = xy_times[None, :] >= self.region_fit_thresh_in_mins[:, None]
+            boot_slopes, boot_intercepts = bootstrap_line_fits(xdata=x_vals,
+                                                               ydata=y_vals,
+                                                               fit_mask=fit_mask,
+                                                               num_resamples=self.num_bootstrap_resamples,
+                                                               seed=self.bootstrap_seed)
+            alpha = 100.0 * (1.0 - self.bootstrap_confidence) / 2.0
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                slope_cis = np.nanpercentile(boot_slopes, [alpha, 100.0 - alpha], axis=1)
+                intercept_cis = np.nanpercentile(boot_intercepts, [alpha, 100.0 - alpha], axis=1)
+            for tac_id, a_prop_dict in enumerate(self.analysis_props):
+                a_prop_dict['SlopeLowerCI'] = float(slope_cis[0, tac_id])
+                a_prop_dict['SlopeUpperCI'] = float(slope_cis[1, tac_id])
+                a_prop_dict['InterceptLowerCI'] = float(intercept_cis[0, tac_id])
+                a_prop_dict['InterceptUpperCI'] = float(intercept_cis[1, tac_id])
+                a_prop_dict['BootstrapConfidence'] = self.bootstrap_confidence
+                a_prop_dict['NumberOfBootstrapResamples'] = self.num_bootstrap_resamples
+
     def calculate_fit_properties(self, **run_kwargs):
         """
         Calculates additional properties of the fit, such as threshold, method name,
@@ -1073,20 +1351,19 @@ class MultiTACGraphicalAnalysis(GraphicalAnalysis, MultiTACAnalysisMixin):
 
         """
         p_tac_times, _ = safe_load_tac(self.input_tac_path)
-        t_thresh_index = get_index_from_threshold(times_in_minutes=p_tac_times,
-                                                  t_thresh_in_minutes=self.fit_thresh_in_mins)
-        points_fit = len(p_tac_times[t_thresh_index:])
-        start_time=p_tac_times[t_thresh_index]
         end_time=p_tac_times[-1]
 
         for tac_id, _a_tac in enumerate(self.tacs_files_list):
-            self.analysis_props[tac_id]['ThresholdTime'] = self.fit_thresh_in_mins
+            fit_thresh_in_mins = float(self.region_fit_thresh_in_mins[tac_id])
+            t_thresh_index = get_index_from_threshold(times_in_minutes=p_tac_times,
+                                                      t_thresh_in_minutes=fit_thresh_in_mins)
+            self.analysis_props[tac_id]['ThresholdTime'] = fit_thresh_in_mins
             for analysis_parameter_key, analysis_parameter_val in run_kwargs.items():
                 self.analysis_props[tac_id][analysis_parameter_key] = analysis_parameter_val
             self.analysis_props[tac_id]['MethodName'] = self.method
-            self.analysis_props[tac_id]['StartFrameTime'] = start_time
+            self.analysis_props[tac_id]['StartFrameTime'] = p_tac_times[t_thresh_index]
             self.analysis_props[tac_id]['EndFrameTime'] = end_time
-            self.analysis_props[tac_id]['NumberOfPointsFit'] = points_fit
+            self.analysis_props[tac_id]['NumberOfPointsFit'] = len(p_tac_times[t_thresh_index:])
 
     def save_analysis(self, output_as_tsv: bool=True, output_as_json: bool=False):
         """
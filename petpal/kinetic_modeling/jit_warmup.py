@@ -0,0 +1,181 @@
+"""
+This module precompiles the numba kernels used by the kinetic modeling command-line tools.
+
+Every kernel in :mod:`petpal.kinetic_modeling` is decorated with ``cache=True``, so compiled
+machine code is stored on disk (next to the source in ``__pycache__``, or in ``NUMBA_CACHE_DIR``
+if it is set) and is reused by every later process. Running :func:`warmup_numba_kernels` once, for
+example at install or container-build time with ``petpal-warmup``, fills the cache so that short
+CLI jobs do not pay the JIT compilation cost.
+
+Each warm-up function calls the kernels with small synthetic data that has the same argument
+types as the real pipelines:
+
+    * TACs are C-contiguous ``float64`` arrays, as returned by :func:`safe_load_tac` and
+      :class:`TimeActivityCurve`.
+    * 4D-PET images are Fortran-ordered ``float32`` arrays, as returned by
+      :meth:`ants.ANTsImage.numpy`.
+    * Thresholds, rate constants and :math:`k_2'` are Python floats.
+
+The kernels keep lazy compilation, so calls with other argument types still work but are
+compiled (and cached) on first use.
+
+"""
+import time
+import warnings
+from collections.abc import Callable
+import numpy as np
+import lmfit
+
+from . import graphical_analysis as pet_ga
+from . import reference_tissue_models as pet_rtms
+from . import tcms_as_convolutions as pet_tcms
+from . import spectral_analysis as pet_sa
+from . import parametric_images as pet_pim
+from ..utils.time_activity_curve import get_frame_index_pairs_from_fine_times
+
+
+def _gen_example_tacs(num_frames: int = 24) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    r"""
+    Generates a small synthetic input TAC and tissue TAC with the argument types used by the CLIs.
+
+    Args:
+        num_frames (int): Number of time points. Defaults to 24.
+
+    Returns:
+        tuple: ``(times_in_mins, input_tac_vals, tissue_tac_vals)`` as C-contiguous ``float64``
+        arrays.
+    """
+    times = np.linspace(0.0, 90.0, num_frames)
+    input_vals = 10.0 * times * np.exp(-times / 2.0) + np.exp(-times / 60.0)
+    tissue_vals = pet_tcms.gen_tac_1tcm_cpet_from_tac(times, input_vals, 0.3, 0.1, 0.05)[1]
+    return times, input_vals, np.ascontiguousarray(tissue_vals)
+
+
+def _gen_example_image(tissue_tac_vals: np.ndarray) -> np.ndarray:
+    r"""
+    Generates a tiny 4D-PET image with the memory layout and dtype of :meth:`ants.ANTsImage.numpy`.
+
+    Args:
+        tissue_tac_vals (np.ndarray): TAC placed in every voxel.
+
+    Returns:
+        np.ndarray: Fortran-ordered ``float32`` array with shape ``(2, 2, 2, num_frames)``.
+    """
+    img = np.broadcast_to(tissue_tac_vals, (2, 2, 2, len(tissue_tac_vals)))
+    return np.asfortranarray(img, dtype=np.float32)
+
+
+def warmup_graphical_analysis_kernels() -> None:
+    r"""Compiles the Patlak, Logan, Alt-Logan and reference Logan kernels, with and without
+    :math:`R^2`."""
+    times, input_vals, tissue_vals = _gen_example_tacs()
+    thresh = 30.0
+    for method_name in ('patlak', 'logan', 'alt_logan'):
+        for a_func in (pet_ga.get_graphical_analysis_method(method_name=method_name),
+                       pet_ga.get_graphical_analysis_method_with_rsquared(method_name=method_name)):
+            a_func(input_tac_values=input_vals,
+                   region_tac_values=tissue_vals,
+                   tac_times_in_minutes=times,
+                   t_thresh_in_minutes=thresh)
+    for a_func in (pet_ga.logan_ref_region_analysis, pet_ga.logan_ref_region_analysis_with_rsquared):
+        a_func(input_tac_values=input_vals,
+               region_tac_values=tissue_vals,
+               tac_times_in_minutes=times,
+               t_thresh_in_minutes=thresh,
+               k2_prime=0.1)
+
+
+def warmup_reference_tissue_kernels() -> None:
+    r"""Compiles the linearized MRTM kernels."""
+    times, ref_vals, tissue_vals = _gen_example_tacs()
+    common_kwargs = {'tac_times_in_minutes': times,
+                     'tgt_tac_vals': tissue_vals,
+                     'ref_tac_vals': ref_vals,
+                     't_thresh_in_mins': 30.0}
+    pet_rtms.fit_mrtm_original_to_tac(**common_kwargs)
+    pet_rtms.fit_mrtm_2003_to_tac(**common_kwargs)
+    pet_rtms.fit_mrtm2_2003_to_tac(**common_kwargs, k2_prime=0.1)
+
+
+def warmup_tcm_kernels() -> None:
+    r"""Compiles the convolution-based TCM kernels, including frame-averaging."""
+    fine_times = np.linspace(0.0, 90.0, 256)
+    input_vals = 10.0 * fine_times * np.exp(-fine_times / 2.0)
+    pet_tcms.gen_tac_1tcm_cpet_from_tac(fine_times, input_vals, 0.3, 0.1, 0.05)
+    pet_tcms.gen_tac_2tcm_cpet_from_tac(fine_times, input_vals, 0.3, 0.1, 0.05, 0.01, 0.05)
+    pet_tcms.gen_tac_2tcm_with_k4zero_cpet_from_tac(fine_times, input_vals, 0.3, 0.1, 0.05, 0.05)
+    pet_tcms.batched_discrete_convolutions_with_exponentials(fine_times, input_vals[None, :], np.asarray([0.1]))
+
+    frame_starts = np.linspace(0.0, 80.0, 9)
+    frame_idx_pairs = get_frame_index_pairs_from_fine_times(fine_times=fine_times,
+                                                            frame_starts=frame_starts,
+                                                            frame_ends=frame_starts + 10.0)
+    params = lmfit.create_params(k1=0.3, k2=0.1, k3=0.05, k4=0.01, vb=0.05)
+    pet_tcms.model_serial_1tcm_frame_avgd(params, fine_times, input_vals, frame_idx_pairs)
+    pet_tcms.model_serial_2tcm_frame_avgd(params, fine_times, input_vals, frame_idx_pairs)
+
+
+def warmup_spectral_analysis_kernels() -> None:
+    r"""Compiles the batched NNLS kernels used by spectral analysis."""
+    times, input_vals, tissue_vals = _gen_example_tacs()
+    basis = np.ascontiguousarray(np.stack([input_vals, tissue_vals, times], axis=1))
+    pet_sa.solve_spectral_nnls(basis=basis, tacs_vals=tissue_vals[None, :])
+
+
+def warmup_parametric_image_kernels() -> None:
+    r"""Compiles the voxel-wise graphical analysis loops for 4D-PET images."""
+    times, input_vals, tissue_vals = _gen_example_tacs()
+    pet_img = _gen_example_image(tissue_vals)
+    for method_name in ('patlak', 'logan', 'alt_logan'):
+        pet_pim.generate_parametric_images_with_graphical_method(pTAC_times=times,
+                                                                 pTAC_vals=input_vals,
+                                                                 tTAC_img=pet_img,
+                                                                 t_thresh_in_mins=30.0,
+                                                                 method_name=method_name)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        pet_pim.generate_parametric_images_with_graphical_method(pTAC_times=times,
+                                                                 pTAC_vals=input_vals,
+                                                                 tTAC_img=pet_img,
+                                                                 t_thresh_in_mins=30.0,
+                                                                 method_name='logan_ref',
+                                                                 k2_prime=0.1)
+
+
+WARMUP_GROUPS: dict[str, Callable[[], None]] = {
+    'graphical-analysis': warmup_graphical_analysis_kernels,
+    'reference-tissue': warmup_reference_tissue_kernels,
+    'tcm': warmup_tcm_kernels,
+    'spectral-analysis': warmup_spectral_analysis_kernels,
+    'parametric-images': warmup_parametric_image_kernels,
+    }
+
+
+def warmup_numba_kernels(groups: list[str] | None = None, verbose: bool = False) -> dict[str, float]:
+    r"""
+    Compiles the numba kernels of the requested groups into the on-disk cache.
+
+    Args:
+        groups (list[str] | None): Names of groups in :data:`WARMUP_GROUPS`. If None, all groups
+            are compiled. Defaults to None.
+        verbose (bool): If True, prints the time taken by each group. Defaults to False.
+
+    Returns:
+        dict[str, float]: Wall time in seconds taken by each group.
+
+    Raises:
+        ValueError: If a group name is not in :data:`WARMUP_GROUPS`.
+    """
+    groups = list(WARMUP_GROUPS) if groups is None else groups
+    unknown_groups = set(groups) - set(WARMUP_GROUPS)
+    if unknown_groups:
+        raise ValueError(f"Unknown warm-up groups: {sorted(unknown_groups)}. "
+                         f"Valid groups: {list(WARMUP_GROUPS)}.")
+    timings = {}
+    for a_group in groups:
+        start = time.perf_counter()
+        WARMUP_GROUPS[a_group]()
+        timings[a_group] = time.perf_counter() - start
+        if verbose:
+            print(f"{a_group:<20}: {timings[a_group]:.2f}s")
+    return timings
@@ -24,13 +24,18 @@ from .reference_tissue_models import fit_mrtm2_2003_to_tac,calc_bp_from_mrtm2_20
 from .fit_tac_with_rtms import get_rtm_kwargs,get_rtm_method,get_rtm_output_size
 from ..utils.time_activity_curve import TimeActivityCurve
 from ..utils.dimension import (check_physical_space_for_ants_image_pair)
-from .graphical_analysis import get_graphical_analysis_method, get_index_from_threshold
+from .graphical_analysis import (get_graphical_analysis_method,
+                                 get_index_from_threshold,
+                                 patlak_analysis,
+                                 logan_analysis,
+                                 alternative_logan_analysis,
+                                 logan_ref_region_analysis)
 from ..input_function.blood_input import read_plasma_glucose_concentration
 from ..utils.image_io import safe_copy_meta
 from ..utils.time_activity_curve import safe_load_tac
 from ..utils.dimension import gen_3d_img_from_timeseries
 
-@numba.njit()
+@numba.njit(cache=True)
 def apply_linearized_analysis_to_all_voxels(pTAC_times: np.ndarray,
                                             pTAC_vals: np.ndarray,
                                             tTAC_img: np.ndarray,
@@ -88,7 +93,7 @@ def apply_linearized_analysis_to_all_voxels(pTAC_times: np.ndarray,
 
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def parametric_refregion_analysis(pTAC_times: np.ndarray,
                                   pTAC_vals: np.ndarray,
                                   tTAC_img: np.ndarray,
@@ -154,6 +159,88 @@ def parametric_refregion_analysis(pTAC_times: np.ndarray,
     return slope_img, intercept_img
 
 
+@numba.njit(cache=True)
+def _patlak_analysis_all_voxels(pTAC_times: np.ndarray,
+                                pTAC_vals: np.ndarray,
+                                tTAC_img: np.ndarray,
+                                t_thresh_in_mins: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Same as :func:`apply_linearized_analysis_to_all_voxels` with :func:`patlak_analysis`."""
+    slope_img = np.zeros(tTAC_img.shape[:3], float)
+    intercept_img = np.zeros_like(slope_img)
+    for i, j, k in np.ndindex(slope_img.shape):
+        analysis_vals = patlak_analysis(input_tac_values=pTAC_vals,
+                                        region_tac_values=tTAC_img[i, j, k, :],
+                                        tac_times_in_minutes=pTAC_times,
+                                        t_thresh_in_minutes=t_thresh_in_mins)
+        slope_img[i, j, k] = analysis_vals[0]
+        intercept_img[i, j, k] = analysis_vals[1]
+    return slope_img, intercept_img
+
+
+@numba.njit(cache=True)
+def _logan_analysis_all_voxels(pTAC_times: np.ndarray,
+                               pTAC_vals: np.ndarray,
+                               tTAC_img: np.ndarray,
+                               t_thresh_in_mins: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Same as :func:`apply_linearized_analysis_to_all_voxels` with :func:`logan_analysis`."""
+    slope_img = np.zeros(tTAC_img.shape[:3], float)
+    intercept_img = np.zeros_like(slope_img)
+    for i, j, k in np.ndindex(slope_img.shape):
+        analysis_vals = logan_analysis(input_tac_values=pTAC_vals,
+                                       region_tac_values=tTAC_img[i, j, k, :],
+                                       tac_times_in_minutes=pTAC_times,
+                                       t_thresh_in_minutes=t_thresh_in_mins)
+        slope_img[i, j, k] = analysis_vals[0]
+        intercept_img[i, j, k] = analysis_vals[1]
+    return slope_img, intercept_img
+
+
+@numba.njit(cache=True)
+def _alt_logan_analysis_all_voxels(pTAC_times: np.ndarray,
+                                   pTAC_vals: np.ndarray,
+                                   tTAC_img: np.ndarray,
+                                   t_thresh_in_mins: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Same as :func:`apply_linearized_analysis_to_all_voxels` with :func:`alternative_logan_analysis`."""
+    slope_img = np.zeros(tTAC_img.shape[:3], float)
+    intercept_img = np.zeros_like(slope_img)
+    for i, j, k in np.ndindex(slope_img.shape):
+        analysis_vals = alternative_logan_analysis(input_tac_values=pTAC_vals,
+                                                   region_tac_values=tTAC_img[i, j, k, :],
+                                                   tac_times_in_minutes=pTAC_times,
+                                                   t_thresh_in_minutes=t_thresh_in_mins)
+        slope_img[i, j, k] = analysis_vals[0]
+        intercept_img[i, j, k] = analysis_vals[1]
+    return slope_img, intercept_img
+
+
+@numba.njit(cache=True)
+def _logan_ref_analysis_all_voxels(pTAC_times: np.ndarray,
+                                   pTAC_vals: np.ndarray,
+                                   tTAC_img: np.ndarray,
+                                   t_thresh_in_mins: float,
+                                   k2_prime: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Same as :func:`parametric_refregion_analysis` with :func:`logan_ref_region_analysis`."""
+    slope_img = np.zeros(tTAC_img.shape[:3], float)
+    intercept_img = np.zeros_like(slope_img)
+    for i, j, k in np.ndindex(slope_img.shape):
+        analysis_vals = logan_ref_region_analysis(input_tac_values=pTAC_vals,
+                                                  region_tac_values=tTAC_img[i, j, k, :],
+                                                  tac_times_in_minutes=pTAC_times,
+                                                  t_thresh_in_minutes=t_thresh_in_mins,
+                                                  k2_prime=k2_prime)
+        slope_img[i, j, k] = analysis_vals[0]
+        intercept_img[i, j, k] = analysis_vals[1]
+    return slope_img, intercept_img
+
+
+# Voxel-wise kernels which call each analysis function directly. Passing a numba function as an
+# argument (or value) stops numba from caching the compiled loop, so every process recompiles it.
+_CACHED_ALL_VOXELS_KERNELS = {'patlak': _patlak_analysis_all_voxels,
+                              'logan': _logan_analysis_all_voxels,
+                              'alt_logan': _alt_logan_analysis_all_voxels,
+                              'logan_ref': _logan_ref_analysis_all_voxels}
+
+
 def generate_parametric_images_with_graphical_method(pTAC_times: np.ndarray,
                                                      pTAC_vals: np.ndarray,
                                                      tTAC_img: np.ndarray,
@@ -196,20 +283,19 @@ def generate_parametric_images_with_graphical_method(pTAC_times: np.ndarray,
     if len(run_kwargs)>0:
         warnings.warn(f"Got the following run kwargs: {run_kwargs}. Kwargs other than 'k2_prime'"
                       "will be ignored.")
-    analysis_func = get_graphical_analysis_method(method_name=method_name)
+    get_graphical_analysis_method(method_name=method_name)  # Validates method_name.
+    all_voxels_kernel = _CACHED_ALL_VOXELS_KERNELS[method_name]
     if method_name!='logan_ref':
-        slope_img, intercept_img = apply_linearized_analysis_to_all_voxels(pTAC_times=pTAC_times,
-                                                                           pTAC_vals=pTAC_vals,
-                                                                           tTAC_img=tTAC_img,
-                                                                           t_thresh_in_mins=t_thresh_in_mins,
-                                                                           analysis_func=analysis_func)
+        slope_img, intercept_img = all_voxels_kernel(pTAC_times=pTAC_times,
+                                                     pTAC_vals=pTAC_vals,
+                                                     tTAC_img=tTAC_img,
+                                                     t_thresh_in_mins=t_thresh_in_mins)
     else:
-        slope_img, intercept_img = parametric_refregion_analysis(pTAC_times=pTAC_times,
-                                                                 pTAC_vals=pTAC_vals,
-                                                                 tTAC_img=tTAC_img,
-                                                                 t_thresh_in_mins=t_thresh_in_mins,
-                                                                 analysis_func=analysis_func,
-                                                                 k2_prime=run_kwargs['k2_prime'])
+        slope_img, intercept_img = all_voxels_kernel(pTAC_times=pTAC_times,
+                                                     pTAC_vals=pTAC_vals,
+                                                     tTAC_img=tTAC_img,
+                                                     t_thresh_in_mins=t_thresh_in_mins,
+                                                     k2_prime=run_kwargs['k2_prime'])
 
     return slope_img, intercept_img
 
@@ -630,7 +630,7 @@ def fit_frtm2_to_tac_with_bounds(tac_times_in_minutes: np.ndarray,
 
     return sp_fit(f=_fitting_frtm, xdata=tac_times_in_minutes, ydata=tgt_tac_vals, p0=st_values, bounds=[lo_values, hi_values])
 
-@numba.njit(fastmath=True)
+@numba.njit(fastmath=True, cache=True)
 def fit_mrtm_original_to_tac(tac_times_in_minutes: np.ndarray,
                              tgt_tac_vals: np.ndarray,
                              ref_tac_vals: np.ndarray,
@@ -703,7 +703,7 @@ def fit_mrtm_original_to_tac(tac_times_in_minutes: np.ndarray,
     return fit_ans, y_fit
 
 
-@numba.njit(fastmath=True)
+@numba.njit(fastmath=True, cache=True)
 def fit_mrtm_2003_to_tac(tac_times_in_minutes: np.ndarray,
                          tgt_tac_vals: np.ndarray,
                          ref_tac_vals: np.ndarray,
@@ -762,7 +762,7 @@ def fit_mrtm_2003_to_tac(tac_times_in_minutes: np.ndarray,
     return fit_ans, y_fit
 
 
-@numba.njit(fastmath=True)
+@numba.njit(fastmath=True, cache=True)
 def fit_mrtm2_2003_to_tac(tac_times_in_minutes: np.ndarray,
                           tgt_tac_vals: np.ndarray,
                           ref_tac_vals: np.ndarray,
@@ -0,0 +1,709 @@
+r"""
+This module provides functions and classes to perform spectral analysis (Cunningham & Jones, 1993)
+on Time Activity Curve (TAC) data. Spectral analysis is a model-free method which describes the
+tissue TAC as a non-negative sum of the input TAC convolved with a fixed bank of exponentials:
+
+.. math::
+
+    C_\mathrm{T}(t) = \sum_{j} \alpha_{j} \left(C_\mathrm{P}(t) \otimes e^{-\beta_{j} t}\right)
+    + \alpha_{0} \int_{0}^{t} C_\mathrm{P}(s)\mathrm{d}s + V_\mathrm{B} C_\mathrm{P}(t),
+
+where every :math:`\alpha\geq0`. Since the basis of convolved exponentials only depends on the
+input TAC and the frame times, it is built once per subject and the non-negative least squares
+(NNLS) problems for all ROI TACs or voxels are solved together in a parallel batched kernel that
+shares the Gram matrix of the basis.
+
+The main outputs are:
+    * :math:`K_{1}=\sum_{j}\alpha_{j}`
+    * :math:`V_\mathrm{T}=\sum_{j}\alpha_{j}/\beta_{j}` for the reversible components.
+    * :math:`K_{i}=\alpha_{0}`, the trapping component.
+    * The impulse response function :math:`\mathrm{IRF}(t)=\alpha_{0} + \sum_{j}\alpha_{j}e^{-\beta_{j}t}`.
+
+The :class:`MultiTACSpectralAnalysis` class runs the analysis on a directory of ROI TACs, and the
+:class:`SpectralAnalysisParametricImage` class runs the analysis voxel-wise on a 4D-PET image.
+
+References:
+    Cunningham VJ, Jones T. Spectral analysis of dynamic PET studies. J Cereb Blood Flow Metab.
+    1993;13(1):15-23.
+
+    Bro R, De Jong S. A fast non-negativity-constrained least squares algorithm. J Chemometrics.
+    1997;11(5):393-401.
+
+"""
+import os
+import json
+import warnings
+import numba
+import numpy as np
+import pandas as pd
+import ants
+
+from .tcms_as_convolutions import discrete_convolution_with_exponential
+from .graphical_analysis import km_multifit_analysis_to_tsv, km_multifit_analysis_to_jsons
+from ..utils.time_activity_curve import TimeActivityCurve, MultiTACAnalysisMixin, safe_load_tac
+from ..utils.dimension import gen_3d_img_from_timeseries, check_physical_space_for_ants_image_pair
+from ..utils.image_io import safe_copy_meta
+
+
+def get_spectral_betas(beta_min: float = 1.0e-3,
+                       beta_max: float = 6.0,
+                       num_betas: int = 100) -> np.ndarray:
+    r"""
+    Generates logarithmically spaced exponential rates, :math:`\beta_{j}`, for the spectral basis.
+
+    Args:
+        beta_min (float): Smallest rate in per-minute units. Should be of the order of the inverse
+            of the scan duration. Defaults to 1.0e-3.
+        beta_max (float): Largest rate in per-minute units. Should be of the order of the inverse
+            of the shortest frame duration. Defaults to 6.0.
+        num_betas (int): Number of rates. Defaults to 100.
+
+    Returns:
+        np.ndarray: Array of ``num_betas`` rates between ``beta_min`` and ``beta_max``.
+
+    Raises:
+        ValueError: If the rates are not strictly positive and increasing, or if fewer than one
+            rate is requested.
+    """
+    if not 0.0 < beta_min < beta_max:
+        raise ValueError(f"Rates must satisfy 0 < beta_min < beta_max. Got beta_min={beta_min} "
+                         f"and beta_max={beta_max}.")
+    if num_betas < 1:
+        raise ValueError(f"num_betas must be at least 1. Got {num_betas}.")
+    return np.geomspace(beta_min, beta_max, num_betas)
+
+
+def get_spectral_basis_rates(betas: np.ndarray,
+                             include_trapping: bool = True,
+                             include_blood: bool = True) -> np.ndarray:
+    r"""
+    Gets the rate associated with each column of the spectral basis.
+
+    The trapping component is assigned a rate of 0, and the blood component is assigned a rate of
+    ``np.inf``, such that the returned array is ordered like the columns generated by
+    :func:`generate_spectral_basis`.
+
+    Args:
+        betas (np.ndarray): Rates of the exponential components.
+        include_trapping (bool): If True, a trapping (:math:`\beta=0`) component is prepended.
+        include_blood (bool): If True, a blood (:math:`\beta=\infty`) component is appended.
+
+    Returns:
+        np.ndarray: The rates for each column of the spectral basis.
+    """
+    rates = np.asarray(betas, dtype=float)
+    if include_trapping:
+        rates = np.append(0.0, rates)
+    if include_blood:
+        rates = np.append(rates, np.inf)
+    return rates
+
+
+def generate_spectral_basis(input_tac: TimeActivityCurve,
+                            tac_times_in_minutes: np.ndarray,
+                            betas: np.ndarray,
+                            include_trapping: bool = True,
+                            include_blood: bool = True,
+                            resample_num: int = 4096) -> np.ndarray:
+    r"""
+    Generates the spectral basis TACs sampled at the provided times.
+
+    The input TAC is resampled evenly between 0 and the last TAC time so that each column,
+    :math:`C_\mathrm{P}(t)\otimes e^{-\beta_{j}t}`, can be computed with the :math:`\mathcal{O}(N)`
+    recurrence in :func:`discrete_convolution_with_exponential`. The columns are then linearly
+    interpolated onto ``tac_times_in_minutes``.
+
+    Args:
+        input_tac (TimeActivityCurve): The input function TAC.
+        tac_times_in_minutes (np.ndarray): Times at which the tissue TACs are sampled.
+        betas (np.ndarray): Rates of the exponential components.
+        include_trapping (bool): If True, the first column is the integral of the input TAC.
+            Defaults to True.
+        include_blood (bool): If True, the last column is the input TAC itself. Defaults to True.
+        resample_num (int): Number of evenly spaced samples used for the convolutions. Defaults to
+            4096.
+
+    Returns:
+        np.ndarray: The basis with shape ``(len(tac_times_in_minutes), num_basis)``.
+
+    See Also:
+        * :func:`get_spectral_basis_rates` for the rate associated with each column.
+    """
+    fine_times = np.linspace(0.0, tac_times_in_minutes[-1], resample_num)
+    sanitized_tac = TimeActivityCurve(times=np.asarray(input_tac.times, dtype=float).copy(),
+                                      activity=np.asarray(input_tac.activity, dtype=float).copy())
+    sanitized_tac.add_zero_time_and_activity()
+    fine_input_vals = np.interp(x=fine_times, xp=sanitized_tac.times, fp=sanitized_tac.activity)
+
+    rates = get_spectral_basis_rates(betas=betas,
+                                     include_trapping=include_trapping,
+                                     include_blood=include_blood)
+    basis = np.zeros((len(tac_times_in_minutes), len(rates)), float)
+    for rate_id, rate in enumerate(rates):
+        if np.isinf(rate):
+            fine_vals = fine_input_vals
+        else:
+            fine_vals = discrete_convolution_with_exponential(func_times=fine_times,
+                                                              func_vals=fine_input_vals,
+                                                              k1=1.0,
+                                                              k2=rate)
+        basis[:, rate_id] = np.interp(x=tac_times_in_minutes, xp=fine_times, fp=fine_vals)
+    return basis
+
+
+@numba.njit(cache=True)
+def _solve_passive_set(ata: np.ndarray, atb: np.ndarray, passive: np.ndarray) -> np.ndarray:
+    """Solves the unconstrained normal equations restricted to the passive set."""
+    num_vars = len(atb)
+    idx = np.flatnonzero(passive)
+    sub_ata = np.empty((len(idx), len(idx)), float)
+    sub_atb = np.empty(len(idx), float)
+    for i, row in enumerate(idx):
+        sub_atb[i] = atb[row]
+        for j, col in enumerate(idx):
+            sub_ata[i, j] = ata[row, col]
+    sub_sol = np.linalg.lstsq(sub_ata, sub_atb)[0]
+    sol = np.zeros(num_vars, float)
+    for i, row in enumerate(idx):
+        sol[row] = sub_sol[i]
+    return sol
+
+
+@numba.njit(cache=True)
+def nnls_from_normal_equations(ata: np.ndarray,
+                               atb: np.ndarray,
+                               tol: float = 1.0e-10,
+                               max_iter: int = 500) -> np.ndarray:
+    r"""
+    Solves a non-negative least squares problem given its normal equations.
+
+    Implements the fast NNLS algorithm of Bro & De Jong (1997), which is the Lawson-Hanson active
+    set algorithm working on :math:`A^{T}A` and :math:`A^{T}b` instead of :math:`A` and :math:`b`.
+    When many problems share the same design matrix, :math:`A^{T}A` only has to be computed once.
+
+    Args:
+        ata (np.ndarray): The Gram matrix, :math:`A^{T}A`, with shape ``(n, n)``.
+        atb (np.ndarray): The projected data, :math:`A^{T}b`, with shape ``(n,)``.
+        tol (float): Tolerance on the dual variables used to decide convergence. Defaults to
+            1.0e-10.
+        max_iter (int): Maximum number of inner-loop iterations. Defaults to 500.
+
+    Returns:
+        np.ndarray: The non-negative solution with shape ``(n,)``.
+    """
+    num_vars = len(atb)
+    passive = np.zeros(num_vars, np.bool_)
+    sol = np.zeros(num_vars, float)
+    dual = atb.copy()
+    num_iter = 0
+    while (not passive.all()) and np.max(np.where(passive, -np.inf, dual)) > tol:
+        passive[np.argmax(np.where(passive, -np.inf, dual))] = True
+        trial = _solve_passive_set(ata, atb, passive)
+        while np.any(passive & (trial <= 0.0)):
+            num_iter += 1
+            if num_iter > max_iter:
+                return sol
+            alpha = 1.0
+            for i in range(num_vars):
+                if passive[i] and trial[i] <= 0.0:
+                    step = sol[i] / (sol[i] - trial[i])
+                    if step < alpha:
+                        alpha = step
+            sol = sol + alpha * (trial - sol)
+            for i in range(num_vars):
+                if passive[i] and sol[i] <= tol:
+                    passive[i] = False
+                    sol[i] = 0.0
+            trial = _solve_passive_set(ata, atb, passive)
+        sol = trial
+        dual = atb - ata @ sol
+    return sol
+
+
+@numba.njit(parallel=True, cache=True)
+def batched_nnls_from_normal_equations(ata: np.ndarray,
+                                       atb_batch: np.ndarray,
+                                       tol: float = 1.0e-10,
+                                       max_iter: int = 500) -> np.ndarray:
+    r"""
+    Solves many non-negative least squares problems which share the same design matrix.
+
+    The problems are distributed over threads with :func:`numba.prange`.
+
+    Args:
+        ata (np.ndarray): The shared Gram matrix, :math:`A^{T}A`, with shape ``(n, n)``.
+        atb_batch (np.ndarray): The projected data for each problem, with shape
+            ``(num_problems, n)``.
+        tol (float): Tolerance on the dual variables used to decide convergence. Defaults to
+            1.0e-10.
+        max_iter (int): Maximum number of inner-loop iterations per problem. Defaults to 500.
+
+    Returns:
+        np.ndarray: The non-negative solutions with shape ``(num_problems, n)``.
+
+    See Also:
+        * :func:`nnls_from_normal_equations`
+    """
+    num_problems = atb_batch.shape[0]
+    solutions = np.zeros_like(atb_batch)
+    for problem_id in numba.prange(num_problems):
+        solutions[problem_id] = nnls_from_normal_equations(ata, atb_batch[problem_id], tol, max_iter)
+    return solutions
+
+
+def solve_spectral_nnls(basis: np.ndarray,
+                        tacs_vals: np.ndarray,
+                        weights: np.ndarray | None = None) -> np.ndarray:
+    r"""
+    Finds the non-negative spectral coefficients for a batch of TACs.
+
+    The basis columns are scaled to unit norm before building the Gram matrix to keep it well
+    conditioned, and the coefficients are scaled back afterwards. TACs containing any NaN values
+    get NaN coefficients.
+
+    Args:
+        basis (np.ndarray): The spectral basis with shape ``(num_times, num_basis)``.
+        tacs_vals (np.ndarray): TAC values with shape ``(num_tacs, num_times)``.
+        weights (np.ndarray | None): Weights for each time point. If None, all time points are
+            weighted equally. Defaults to None.
+
+    Returns:
+        np.ndarray: Spectral coefficients with shape ``(num_tacs, num_basis)``.
+    """
+    tacs_vals = np.atleast_2d(np.asarray(tacs_vals, dtype=float))
+    if weights is None:
+        sqrt_weights = np.ones(basis.shape[0], float)
+    else:
+        sqrt_weights = np.sqrt(np.asarray(weights, dtype=float))
+
+    weighted_basis = basis * sqrt_weights[:, None]
+    col_norms = np.linalg.norm(weighted_basis, axis=0)
+    col_norms[col_norms == 0.0] = 1.0
+    weighted_basis /= col_norms
+
+    valid_tacs = ~np.isnan(tacs_vals).any(axis=1)
+    ata = weighted_basis.T @ weighted_basis
+    atb_batch = (tacs_vals[valid_tacs] * sqrt_weights) @ weighted_basis
+
+    coefficients = np.full((tacs_vals.shape[0], basis.shape[1]), np.nan)
+    coefficients[valid_tacs] = batched_nnls_from_normal_equations(ata, np.ascontiguousarray(atb_batch))
+    return coefficients / col_norms
+
+
+def calc_spectral_parameters(coefficients: np.ndarray, rates: np.ndarray) -> dict:
+    r"""
+    Calculates the macro-parameters from spectral coefficients.
+
+    Args:
+        coefficients (np.ndarray): Spectral coefficients with shape ``(num_tacs, num_basis)``.
+        rates (np.ndarray): The rate of each basis column. See :func:`get_spectral_basis_rates`.
+
+    Returns:
+        dict: Arrays of length ``num_tacs`` for the keys ``K1``, ``VT``, ``Ki``, ``VB`` and
+        ``NumberOfComponents``.
+    """
+    coefficients = np.atleast_2d(coefficients)
+    is_blood = np.isinf(rates)
+    is_trapping = rates == 0.0
+    is_reversible = ~(is_blood | is_trapping)
+
+    tissue_coeffs = coefficients[:, ~is_blood]
+    params = {
+        'K1': tissue_coeffs.sum(axis=1),
+        'VT': (coefficients[:, is_reversible] / rates[is_reversible]).sum(axis=1),
+        'Ki': coefficients[:, is_trapping].sum(axis=1),
+        'VB': coefficients[:, is_blood].sum(axis=1),
+        'NumberOfComponents': (tissue_coeffs > 0.0).sum(axis=1),
+        }
+    nan_rows = np.isnan(coefficients).any(axis=1)
+    for key in ('K1', 'VT', 'Ki', 'VB'):
+        params[key][nan_rows] = np.nan
+    return params
+
+
+def calc_impulse_response_functions(coefficients: np.ndarray,
+                                    rates: np.ndarray,
+                                    times_in_minutes: np.ndarray) -> np.ndarray:
+    r"""
+    Calculates the impulse response functions, :math:`\sum_{j}\alpha_{j}e^{-\beta_{j}t}`, from
+    spectral coefficients. The blood component is excluded.
+
+    Args:
+        coefficients (np.ndarray): Spectral coefficients with shape ``(num_tacs, num_basis)``.
+        rates (np.ndarray): The rate of each basis column. See :func:`get_spectral_basis_rates`.
+        times_in_minutes (np.ndarray): Times at which the impulse response functions are evaluated.
+
+    Returns:
+        np.ndarray: Impulse response functions with shape ``(num_tacs, len(times_in_minutes))``.
+    """
+    coefficients = np.atleast_2d(coefficients)
+    is_tissue = ~np.isinf(rates)
+    exp_kernels = np.exp(-np.outer(rates[is_tissue], times_in_minutes))
+    return coefficients[:, is_tissue] @ exp_kernels
+
+
+class MultiTACSpectralAnalysis(MultiTACAnalysisMixin):
+    r"""
+    Performs spectral analysis on multiple ROI TACs.
+
+    The spectral basis is generated once from the input TAC and all the ROI TACs are solved
+    together with :func:`solve_spectral_nnls`.
+
+    Attributes:
+        input_tac_path (str): Path to the input TAC file.
+        roi_tacs_dir (str): Directory containing region of interest TAC files.
+        output_directory (str): Directory for saving analysis results.
+        output_filename_prefix (str): Prefix for output filenames.
+        betas (np.ndarray): Rates of the exponential components.
+        include_trapping (bool): Whether the basis contains a trapping component.
+        include_blood (bool): Whether the basis contains a blood component.
+        analysis_props (list[dict]): Analysis properties for each ROI TAC.
+        irf_vals (np.ndarray): Impulse response functions for each ROI TAC, evaluated at the TAC
+            times.
+
+    Example:
+        .. code-block:: python
+
+            from petpal.kinetic_modeling.spectral_analysis import MultiTACSpectralAnalysis
+
+            spectral = MultiTACSpectralAnalysis(input_tac_path='/path/to/input_tac.tsv',
+                                                roi_tacs_dir='/path/to/tacs/',
+                                                output_directory='/path/to/output/',
+                                                output_filename_prefix='sub-001')
+            spectral()
+
+    """
+    def __init__(self,
+                 input_tac_path: str,
+                 roi_tacs_dir: str,
+                 output_directory: str,
+                 output_filename_prefix: str,
+                 beta_min: float = 1.0e-3,
+                 beta_max: float = 6.0,
+                 num_betas: int = 100,
+                 include_trapping: bool = True,
+                 include_blood: bool = True,
+                 resample_num: int = 4096):
+        """
+        Initializes the MultiTACSpectralAnalysis object.
+
+        Args:
+            input_tac_path (str): Path to the input TAC file.
+            roi_tacs_dir (str): Directory containing region of interest TAC files.
+            output_directory (str): Directory for saving analysis results.
+            output_filename_prefix (str): Prefix for output filenames.
+            beta_min (float): Smallest rate in per-minute units. Defaults to 1.0e-3.
+            beta_max (float): Largest rate in per-minute units. Defaults to 6.0.
+            num_betas (int): Number of rates. Defaults to 100.
+            include_trapping (bool): If True, includes a trapping component. Defaults to True.
+            include_blood (bool): If True, includes a blood component. Defaults to True.
+            resample_num (int): Number of evenly spaced samples used for the convolutions.
+                Defaults to 4096.
+        """
+        MultiTACAnalysisMixin.__init__(self, input_tac_path=input_tac_path, tacs_dir=roi_tacs_dir)
+        self.input_tac_path = os.path.abspath(input_tac_path)
+        self.output_directory = os.path.abspath(output_directory)
+        self.output_filename_prefix = output_filename_prefix
+        self.betas = get_spectral_betas(beta_min=beta_min, beta_max=beta_max, num_betas=num_betas)
+        self.include_trapping = include_trapping
+        self.include_blood = include_blood
+        self.resample_num = resample_num
+        self.analysis_props = self.init_analysis_props()
+        self.tac_times: np.ndarray | None = None
+        self.irf_vals: np.ndarray | None = None
+
+    def init_analysis_props(self) -> list[dict]:
+        """
+        Initializes the analysis properties for each ROI TAC.
+
+        Returns:
+            list[dict]: A list of analysis property dictionaries for each TAC.
+        """
+        analysis_props = []
+        for tac_file in self.tacs_files_list:
+            props = {'FilePathPTAC': self.input_tac_path,
+                     'FilePathTTAC': os.path.abspath(tac_file),
+                     'MethodName': 'spectral',
+                     'BetaMinimum': float(self.betas[0]),
+                     'BetaMaximum': float(self.betas[-1]),
+                     'NumberOfBetas': len(self.betas),
+                     'IncludeTrapping': self.include_trapping,
+                     'IncludeBlood': self.include_blood,
+                     'K1': None,
+                     'VT': None,
+                     'Ki': None,
+                     'VB': None,
+                     'NumberOfComponents': None,
+                     'SumOfSquaredResiduals': None}
+            analysis_props.append(props)
+        return analysis_props
+
+    def run_analysis(self):
+        """
+        Builds the spectral basis, solves the NNLS problems for every ROI TAC, and stores the
+        macro-parameters and impulse response functions.
+        """
+        input_tac = TimeActivityCurve.from_tsv(filename=self.input_tac_path)
+        tacs_list = self.get_tacs_objects_list_from_files_list(self.tacs_files_list)
+        tacs_vals = np.asarray([a_tac.activity for a_tac in tacs_list])
+        self.tac_times = tacs_list[0].times
+
+        basis = generate_spectral_basis(input_tac=input_tac,
+                                        tac_times_in_minutes=self.tac_times,
+                                        betas=self.betas,
+                                        include_trapping=self.include_trapping,
+                                        include_blood=self.include_blood,
+                                        resample_num=self.resample_num)
+        rates = get_spectral_basis_rates(betas=self.betas,
+                                         include_trapping=self.include_trapping,
+                                         include_blood=self.include_blood)
+        coefficients = solve_spectral_nnls(basis=basis, tacs_vals=tacs_vals)
+        params = calc_spectral_parameters(coefficients=coefficients, rates=rates)
+        ss_res = np.sum((tacs_vals - coefficients @ basis.T) ** 2., axis=1)
+        self.irf_vals = calc_impulse_response_functions(coefficients=coefficients,
+                                                        rates=rates,
+                                                        times_in_minutes=self.tac_times)
+
+        for tac_id, props in enumerate(self.analysis_props):
+            for param_name, param_vals in params.items():
+                props[param_name] = param_vals[tac_id].item()
+            props['SumOfSquaredResiduals'] = ss_res[tac_id].item()
+
+    def save_analysis(self, output_as_tsv: bool = True, output_as_json: bool = False):
+        """
+        Saves the analysis properties, and a table of the impulse response functions with one
+        column per region.
+
+        Args:
+            output_as_tsv (bool): Set True to write results to TSV table. Default True.
+            output_as_json (bool): Set True to write results to one JSON file per region.
+                Default False.
+
+        Raises:
+            RuntimeError: If :meth:`run_analysis` has not been called before this method.
+        """
+        if self.irf_vals is None:
+            raise RuntimeError("'run_analysis' method must be called before 'save_analysis'.")
+
+        if output_as_json:
+            km_multifit_analysis_to_jsons(analysis_props=self.analysis_props,
+                                          output_directory=self.output_directory,
+                                          output_filename_prefix=self.output_filename_prefix,
+                                          method='spectral',
+                                          inferred_seg_labels=self.inferred_seg_labels)
+        if output_as_tsv:
+            km_multifit_analysis_to_tsv(analysis_props=self.analysis_props,
+                                        output_directory=self.output_directory,
+                                        output_filename_prefix=self.output_filename_prefix,
+                                        method='spectral',
+                                        inferred_seg_labels=self.inferred_seg_labels)
+        if not output_as_tsv and not output_as_json:
+            warnings.warn('Both output_as_tsv and output_as_json set False. Fit properties not '
+                          'written to file.')
+
+        irf_table = pd.DataFrame(self.irf_vals.T, columns=self.inferred_seg_labels)
+        irf_table.insert(0, 'time(min)', self.tac_times)
+        irf_path = os.path.join(self.output_directory,
+                                f'{self.output_filename_prefix}_desc-spectral_irf.tsv')
+        irf_table.to_csv(irf_path, sep='\t', index=False)
+
+    def __call__(self, output_as_tsv: bool = True, output_as_json: bool = False):
+        """
+        Runs :meth:`run_analysis` and :meth:`save_analysis`.
+
+        Args:
+            output_as_tsv (bool): Set True to write results to TSV table. Default True.
+            output_as_json (bool): Set True to write results to one JSON file per region.
+                Default False.
+        """
+        self.run_analysis()
+        self.save_analysis(output_as_tsv=output_as_tsv, output_as_json=output_as_json)
+
+
+class SpectralAnalysisParametricImage:
+    r"""
+    Generates parametric images of 4D-PET images using spectral analysis.
+
+    The spectral basis is generated once from the input TAC, and the voxel TACs inside the mask
+    are solved together with :func:`solve_spectral_nnls`. Writes :math:`K_{1}`,
+    :math:`V_\mathrm{T}`, :math:`K_{i}` and :math:`V_\mathrm{B}` images, and a 4D image of the
+    impulse response function evaluated at the frame times.
+
+    Attributes:
+        input_tac_path (str): Absolute path to the input TAC file.
+        input_image_path (str): Absolute path to the 4D PET image file.
+        mask_image_path (str | None): Absolute path to the mask image, if any.
+        output_directory (str): Absolute path to the output directory.
+        output_filename_prefix (str): Prefix of the output file names.
+        analysis_props (dict): Dictionary of properties of the spectral analysis.
+        parametric_images (dict): 3D arrays for each macro-parameter, keyed by parameter name.
+        irf_image (np.ndarray): 4D array of the voxel-wise impulse response functions.
+
+    Example:
+        .. code-block:: python
+
+            from petpal.kinetic_modeling.spectral_analysis import SpectralAnalysisParametricImage
+
+            spectral = SpectralAnalysisParametricImage(input_tac_path='/path/to/input_tac.tsv',
+                                                       input_image_path='/path/to/pet.nii.gz',
+                                                       output_directory='/path/to/output/',
+                                                       output_filename_prefix='sub-001',
+                                                       mask_image_path='/path/to/mask.nii.gz')
+            spectral()
+
+    """
+    def __init__(self,
+                 input_tac_path: str,
+                 input_image_path: str,
+                 output_directory: str,
+                 output_filename_prefix: str,
+                 mask_image_path: str | None = None,
+                 beta_min: float = 1.0e-3,
+                 beta_max: float = 6.0,
+                 num_betas: int = 100,
+                 include_trapping: bool = True,
+                 include_blood: bool = True,
+                 resample_num: int = 4096):
+        """
+        Initializes the SpectralAnalysisParametricImage object.
+
+        Args:
+            input_tac_path (str): Path to the input TAC file. The TAC times are assumed to be the
+                frame times of the 4D PET image.
+            input_image_path (str): Path to the 4D PET image file.
+            output_directory (str): Path to the directory where output files are saved.
+            output_filename_prefix (str): Prefix to use for the names of the output files.
+            mask_image_path (str | None): Path to a mask in the same space as the PET image. Only
+                voxels where the mask is larger than 0.5 are analyzed. If None, every voxel is
+                analyzed. Defaults to None.
+            beta_min (float): Smallest rate in per-minute units. Defaults to 1.0e-3.
+            beta_max (float): Largest rate in per-minute units. Defaults to 6.0.
+            num_betas (int): Number of rates. Defaults to 100.
+            include_trapping (bool): If True, includes a trapping component. Defaults to True.
+            include_blood (bool): If True, includes a blood component. Defaults to True.
+            resample_num (int): Number of evenly spaced samples used for the convolutions.
+                Defaults to 4096.
+
+        Raises:
+            ValueError: When the PET image and mask are not in the same physical space.
+        """
+        self.input_tac_path = os.path.abspath(input_tac_path)
+        self.input_image_path = os.path.abspath(input_image_path)
+        self.pet_img = ants.image_read(filename=input_image_path)
+        self.mask_image_path = None
+        self.mask_img = None
+        if mask_image_path is not None:
+            self.mask_image_path = os.path.abspath(mask_image_path)
+            self.mask_img = ants.image_read(filename=mask_image_path)
+            template_img = gen_3d_img_from_timeseries(input_img=self.pet_img)
+            if not check_physical_space_for_ants_image_pair(template_img, self.mask_img):
+                raise ValueError(f'Input image {input_image_path} and mask {mask_image_path} not '
+                                 'in same physical space.')
+        self.output_directory = os.path.abspath(output_directory)
+        self.output_filename_prefix = output_filename_prefix
+        self.betas = get_spectral_betas(beta_min=beta_min, beta_max=beta_max, num_betas=num_betas)
+        self.include_trapping = include_trapping
+        self.include_blood = include_blood
+        self.resample_num = resample_num
+        self.analysis_props = self.init_analysis_props()
+        self.parametric_images: dict | None = None
+        self.irf_image: np.ndarray | None = None
+
+    def init_analysis_props(self) -> dict:
+        """
+        Initializes the analysis properties dictionary.
+
+        Returns:
+            dict: The initialized properties dictionary.
+        """
+        props = {'FilePathPTAC': self.input_tac_path,
+                 'FilePathTTAC': self.input_image_path,
+                 'FilePathMask': self.mask_image_path,
+                 'MethodName': 'spectral',
+                 'ImageDimensions': None,
+                 'NumberOfVoxelsFit': None,
+                 'BetaMinimum': float(self.betas[0]),
+                 'BetaMaximum': float(self.betas[-1]),
+                 'NumberOfBetas': len(self.betas),
+                 'IncludeTrapping': self.include_trapping,
+                 'IncludeBlood': self.include_blood}
+        return props
+
+    def run_analysis(self):
+        """
+        Builds the spectral basis, solves the NNLS problems for every voxel in the mask, and
+        stores the parametric images and the impulse response function image.
+        """
+        tac_times, tac_vals = safe_load_tac(filename=self.input_tac_path)
+        input_tac = TimeActivityCurve(times=tac_times, activity=tac_vals)
+        pet_arr = self.pet_img.numpy()
+        img_dims = pet_arr.shape[:3]
+        if self.mask_img is None:
+            mask_arr = np.ones(img_dims, bool)
+        else:
+            mask_arr = self.mask_img.numpy() > 0.5
+
+        basis = generate_spectral_basis(input_tac=input_tac,
+                                        tac_times_in_minutes=tac_times,
+                                        betas=self.betas,
+                                        include_trapping=self.include_trapping,
+                                        include_blood=self.include_blood,
+                                        resample_num=self.resample_num)
+        rates = get_spectral_basis_rates(betas=self.betas,
+                                         include_trapping=self.include_trapping,
+                                         include_blood=self.include_blood)
+        coefficients = solve_spectral_nnls(basis=basis, tacs_vals=pet_arr[mask_arr])
+        params = calc_spectral_parameters(coefficients=coefficients, rates=rates)
+
+        self.parametric_images = {}
+        for param_name in ('K1', 'VT', 'Ki', 'VB'):
+            param_img = np.zeros(img_dims, float)
+            param_img[mask_arr] = params[param_name]
+            self.parametric_images[param_name] = param_img
+        self.irf_image = np.zeros(pet_arr.shape, float)
+        self.irf_image[mask_arr] = calc_impulse_response_functions(coefficients=coefficients,
+                                                                   rates=rates,
+                                                                   times_in_minutes=tac_times)
+
+        self.analysis_props['ImageDimensions'] = img_dims
+        self.analysis_props['NumberOfVoxelsFit'] = int(mask_arr.sum())
+        for param_name, param_img in self.parametric_images.items():
+            param_vals = param_img[mask_arr]
+            self.analysis_props[f'{param_name}Maximum'] = float(np.nanmax(param_vals))
+            self.analysis_props[f'{param_name}Minimum'] = float(np.nanmin(param_vals))
+            self.analysis_props[f'{param_name}Mean'] = float(np.nanmean(param_vals))
+            self.analysis_props[f'{param_name}Variance'] = float(np.nanvar(param_vals))
+
+    def save_analysis(self):
+        """
+        Saves the parametric images, the impulse response function image and the analysis
+        properties in the output directory.
+
+        Raises:
+            RuntimeError: If :meth:`run_analysis` has not been called before this method.
+        """
+        if self.parametric_images is None:
+            raise RuntimeError("'run_analysis' method must be called before 'save_analysis'.")
+        file_name_prefix = os.path.join(self.output_directory,
+                                        f"{self.output_filename_prefix}_desc-spectral")
+        template_img = gen_3d_img_from_timeseries(input_img=self.pet_img)
+        try:
+            for param_name, param_img in self.parametric_images.items():
+                out_path = f"{file_name_prefix}_{param_name}.nii.gz"
+                ants.image_write(ants.from_numpy_like(data=param_img, image=template_img), out_path)
+                safe_copy_meta(input_image_path=self.input_image_path, out_image_path=out_path)
+            irf_path = f"{file_name_prefix}_irf.nii.gz"
+            ants.image_write(ants.from_numpy_like(data=self.irf_image, image=self.pet_img), irf_path)
+            safe_copy_meta(input_image_path=self.input_image_path, out_image_path=irf_path)
+        except IOError as exc:
+            print("An IOError occurred while attempting to write the NIfTI image files.")
+            raise exc from None
+
+        analysis_props_file = f"{file_name_prefix}_props.json"
+        with open(analysis_props_file, 'w', encoding='utf-8') as f:
+            json.dump(obj=self.analysis_props, fp=f, indent=4)
+
+    def __call__(self):
+        """Runs :meth:`run_analysis` and :meth:`save_analysis`."""
+        self.run_analysis()
+        self.save_analysis()
@@ -23,7 +23,9 @@ See Also:
 import inspect
 import json
 import os
+import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 from typing import Callable, Union
 import numpy as np
 import pandas as pd
@@ -31,6 +33,7 @@ from scipy.optimize import curve_fit as sp_cv_fit
 import lmfit
 
 from . import tcms_as_convolutions as pet_tcms
+from .spectral_analysis import get_spectral_betas, get_spectral_basis_rates, solve_spectral_nnls
 from ..input_function import blood_input as pet_bld
 from ..utils.time_activity_curve import (TimeActivityCurve,
                                          safe_load_tac,
@@ -390,6 +393,9 @@ class TACFitter(object):
         self.p_tac_vals: np.ndarray | None = self.resampled_p_tac[1]
         self.tgt_tac_vals: np.ndarray | None = self.resampled_t_tac[1]
         self.fit_results = None
+        self.input_shift_in_mins: float = 0.0
+        self.input_dispersion_in_mins: float = 0.0
+        self.delay_search_criterion: np.ndarray | None = None
 
     def _validate_inputs(self, input_tac: np.ndarray, roi_tac: np.ndarray, tcm_func: Callable):
         assert np.asarray(input_tac).ndim == 2, "Input TAC must be a 2D array of times and activity"
@@ -592,6 +598,153 @@ class TACFitter(object):
                                      p0=self.initial_guesses, bounds=(self.bounds_lo, self.bounds_hi),
                                      sigma=self.weights, maxfev=self.max_func_evals)
 
+    def simulate_bootstrap_tacs(self, num_samples: int, rng: np.random.Generator) -> np.ndarray:
+        r"""
+        Simulates noisy tissue TACs from the best fit for a parametric bootstrap.
+
+        The model TAC is generated once from the fitted parameters, and Gaussian noise is added to
+        all the samples at once. The noise at each time point is :math:`s\sigma_i`, where
+        :math:`\sigma_i` are the fitting weights and :math:`s^2` is the weighted residual variance
+        of the fit. Points with infinite weights (which did not contribute to the fit) are left
+        noiseless.
+
+        Args:
+            num_samples (int): Number of noisy TACs to simulate.
+            rng (np.random.Generator): Random number generator used for the noise.
+
+        Returns:
+            np.ndarray: Simulated TAC values with shape ``(num_samples, len(resample_times))``.
+
+        Raises:
+            RuntimeError: If :meth:`run_fit` has not been run.
+        """
+        if self.fit_results is None:
+            raise RuntimeError("'run_fit' must be run before simulating bootstrap TACs.")
+        fit_params = self.fit_results[0]
+        model_vals = self.fitting_func(self.resample_times, *fit_params)
+        sigma = np.where(np.isfinite(self.weights), self.weights, 0.0)
+        scaled_resids = np.divide(self.tgt_tac_vals - model_vals, self.weights,
+                                  out=np.zeros_like(model_vals), where=sigma > 0)
+        num_free = max(np.count_nonzero(sigma) - len(fit_params), 1)
+        noise_scale = np.sqrt(np.sum(scaled_resids ** 2) / num_free) * sigma
+        return model_vals[None, :] + rng.standard_normal((num_samples, model_vals.size)) * noise_scale[None, :]
+
+    def delay_search_data(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        r"""
+        Returns the fine times, target TAC values and target standard deviations for an input delay
+        search.
+
+        Returns:
+            tuple: ``(resample_times, tgt_tac_vals, weights)``.
+        """
+        return self.resample_times, self.tgt_tac_vals, self.weights
+
+    def set_input_tac_vals(self, input_tac_vals: np.ndarray) -> None:
+        r"""
+        Replaces the input TAC values, on :attr:`resample_times`, used by the TCM.
+
+        Args:
+            input_tac_vals (np.ndarray): New input TAC values.
+
+        Side Effects:
+            p_tac_vals (np.ndarray): Set to ``input_tac_vals``. ``resampled_p_tac`` keeps the original
+            input.
+        """
+        self.p_tac_vals = np.asarray(input_tac_vals, dtype=float)
+
+    def calc_weighted_sse(self, fit_params: np.ndarray) -> float:
+        r"""
+        Calculates the weighted sum of squared residuals of the target TAC for some parameters.
+
+        Args:
+            fit_params (np.ndarray): TCM parameters.
+
+        Returns:
+            float: :math:`\sum_i (y_i - f_i)^2/\sigma_i^2` over points with finite weights.
+        """
+        resids = (self.tgt_tac_vals - self.fitting_func(self.resample_times, *fit_params)) / self.weights
+        return float(np.sum(resids[np.isfinite(self.weights)] ** 2))
+
+    def fit_input_delay_and_dispersion(self,
+                                       shifts_in_mins: np.ndarray | None = None,
+                                       dispersions_in_mins: np.ndarray | None = None,
+                                       criterion: str = 'aic',
+                                       num_refine: int = 5) -> tuple[float, float]:
+        r"""
+        Estimates the delay and dispersion of the input TAC, then fits the TCM with the corrected input.
+
+        All combinations of ``shifts_in_mins`` and ``dispersions_in_mins`` are applied to the
+        original resampled input with :func:`gen_delayed_dispersed_input_tacs`. The candidates are
+        ranked with :func:`search_input_delay_and_dispersion`, and the fitter is left fit with the
+        best one.
+
+        Args:
+            shifts_in_mins (np.ndarray): Candidate shifts in minutes. Positive values shift the input
+                to earlier times. If None, uses -30s to 30s in 3s steps. Defaults to None.
+            dispersions_in_mins (np.ndarray): Candidate dispersion time-constants in minutes. If
+                None, uses ``[0.0]``, which only estimates the delay. Defaults to None.
+            criterion (str): ``'sse'`` or ``'aic'``. With ``'aic'``, a candidate with a positive
+                dispersion counts one parameter more than one without, so dispersion is only
+                picked if it improves the fit enough. See :func:`count_input_timing_params`.
+                Defaults to ``'aic'``.
+            num_refine (int): Number of candidates refit with the nonlinear model. Defaults to 5.
+
+        Returns:
+            tuple: The best ``(shift_in_mins, dispersion_in_mins)``.
+
+        Side Effects:
+            - p_tac_vals (np.ndarray): Set to the best shifted and dispersed input.
+            - fit_results: Results of the fit with the best input.
+            - input_shift_in_mins, input_dispersion_in_mins (float): The best shift and dispersion.
+            - delay_search_criterion (np.ndarray): Linear-stage criterion with shape
+              ``(num_shifts, num_dispersions)``.
+        """
+        if shifts_in_mins is None:
+            shifts_in_mins = np.linspace(-0.5, 0.5, 21)
+        if dispersions_in_mins is None:
+            dispersions_in_mins = np.zeros(1)
+        shifts_in_mins = np.atleast_1d(np.asarray(shifts_in_mins, dtype=float))
+        dispersions_in_mins = np.atleast_1d(np.asarray(dispersions_in_mins, dtype=float))
+        candidates = gen_delayed_dispersed_input_tacs(fine_times=self.resample_times,
+                                                      input_tac_vals=self.resampled_p_tac[1],
+                                                      shifts_in_mins=shifts_in_mins,
+                                                      dispersions_in_mins=dispersions_in_mins)
+        best_id, linear_criterion = search_input_delay_and_dispersion(
+                fitter=self,
+                candidate_inputs=candidates.reshape(-1, candidates.shape[-1]),
+                criterion=criterion,
+                num_refine=num_refine,
+                num_input_params=count_input_timing_params(shifts_in_mins=shifts_in_mins,
+                                                           dispersions_in_mins=dispersions_in_mins))
+        shift_id, disp_id = np.unravel_index(best_id, candidates.shape[:2])
+        self.input_shift_in_mins = float(shifts_in_mins[shift_id])
+        self.input_dispersion_in_mins = float(dispersions_in_mins[disp_id])
+        self.delay_search_criterion = linear_criterion.reshape(candidates.shape[:2])
+        return self.input_shift_in_mins, self.input_dispersion_in_mins
+
+    def refit_with_warm_start(self, tac_vals: np.ndarray) -> np.ndarray:
+        r"""
+        Fits the TCM to new tissue TAC values, starting from the current best fit.
+
+        Used to refit bootstrap samples. The weights, bounds and input function are the same as for
+        :meth:`run_fit`, but the initial guesses are the fitted parameters which makes the refits
+        converge in far fewer iterations.
+
+        Args:
+            tac_vals (np.ndarray): Tissue TAC values on :attr:`resample_times`.
+
+        Returns:
+            np.ndarray: The fitted parameters. All NaN if the fit did not converge.
+        """
+        warm_start = np.clip(self.fit_results[0], self.bounds_lo, self.bounds_hi)
+        try:
+            fit_params, _ = sp_cv_fit(f=self.fitting_func, xdata=self.resample_times, ydata=tac_vals,
+                                      p0=warm_start, bounds=(self.bounds_lo, self.bounds_hi),
+                                      sigma=self.weights, maxfev=self.max_func_evals)
+        except (RuntimeError, ValueError):
+            fit_params = np.full_like(warm_start, np.nan)
+        return fit_params
+
 
 class TACFitterWithoutBloodVolume(TACFitter):
     r"""
@@ -680,6 +833,311 @@ class TACFitterWithoutBloodVolume(TACFitter):
                       "TACFitter currently.",
                       DeprecationWarning, stacklevel=2)
 
+def _refit_bootstrap_tacs(fitter: Union['TACFitter', 'FrameAveragedTACFitter'],
+                          bootstrap_tacs: np.ndarray,
+                          deadline: float) -> np.ndarray:
+    r"""
+    Refits a chunk of bootstrap TACs until the wall-clock deadline passes.
+
+    Args:
+        fitter (TACFitter | FrameAveragedTACFitter): Fitter which has already been run.
+        bootstrap_tacs (np.ndarray): Simulated TACs with shape ``(num_samples, num_points)``.
+        deadline (float): Wall-clock time, from :func:`time.time`, after which no new fits are started.
+
+    Returns:
+        np.ndarray: Fitted parameters with shape ``(num_samples, num_params)``. Samples which were
+        not fit before the deadline are NaN.
+    """
+    bootstrap_params = np.full((len(bootstrap_tacs), len(fitter.fit_results[0])), np.nan)
+    for sample_id, tac_vals in enumerate(bootstrap_tacs):
+        if time.time() > deadline:
+            break
+        bootstrap_params[sample_id] = fitter.refit_with_warm_start(tac_vals)
+    return bootstrap_params
+
+
+def run_parametric_bootstrap(fitter: Union['TACFitter', 'FrameAveragedTACFitter'],
+                             num_samples: int = 500,
+                             seed: int | None = None,
+                             num_workers: int = 1,
+                             time_budget_in_secs: float | None = None) -> np.ndarray:
+    r"""
+    Runs a parametric bootstrap around the best fit of a TAC fitter.
+
+    All the noisy TACs are simulated up-front from a single seeded generator using
+    :meth:`TACFitter.simulate_bootstrap_tacs` (or the frame-averaged equivalent), so the results
+    do not depend on the number of workers. The TACs are then refit with warm starts from the
+    point estimate. With more than one worker, chunks of samples are refit in a process pool.
+
+    If a wall-time budget is given, no new refits are started once it has been spent and the
+    remaining samples are returned as NaN rows.
+
+    Args:
+        fitter (TACFitter | FrameAveragedTACFitter): Fitter which has already been run.
+        num_samples (int): Number of bootstrap samples. Defaults to 500.
+        seed (int, optional): Seed for the noise generator. Defaults to None.
+        num_workers (int): Number of worker processes. Defaults to 1, which refits in the current
+            process.
+        time_budget_in_secs (float, optional): Wall-time budget for the refits. Defaults to None,
+            which refits all the samples.
+
+    Returns:
+        np.ndarray: Bootstrap parameter estimates with shape ``(num_samples, num_params)``.
+
+    See Also:
+        * :func:`calc_bootstrap_percentile_cis`
+    """
+    rng = np.random.default_rng(seed)
+    bootstrap_tacs = fitter.simulate_bootstrap_tacs(num_samples=num_samples, rng=rng)
+    deadline = np.inf if time_budget_in_secs is None else time.time() + time_budget_in_secs
+
+    if num_workers <= 1:
+        return _refit_bootstrap_tacs(fitter=fitter, bootstrap_tacs=bootstrap_tacs, deadline=deadline)
+
+    chunks = np.array_split(bootstrap_tacs, min(num_samples, 4 * num_workers))
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(_refit_bootstrap_tacs, fitter, a_chunk, deadline) for a_chunk in chunks]
+        return np.concatenate([a_future.result() for a_future in futures], axis=0)
+
+
+def calc_bootstrap_percentile_cis(bootstrap_params: np.ndarray,
+                                  confidence: float = 0.95) -> tuple[np.ndarray, np.ndarray]:
+    r"""
+    Calculates percentile confidence intervals from bootstrap parameter estimates.
+
+    Args:
+        bootstrap_params (np.ndarray): Bootstrap estimates with shape ``(num_samples, num_params)``.
+            NaN rows (failed or skipped fits) are ignored.
+        confidence (float): Confidence level of the intervals. Defaults to 0.95.
+
+    Returns:
+        tuple: ``(lower, upper)`` bounds of the intervals for each parameter.
+    """
+    alpha = 0.5 * (1.0 - confidence)
+    valid_params = bootstrap_params[np.all(np.isfinite(bootstrap_params), axis=1)]
+    if len(valid_params) == 0:
+        nan_vals = np.full(bootstrap_params.shape[1], np.nan)
+        return nan_vals, nan_vals.copy()
+    lower, upper = np.quantile(valid_params, [alpha, 1.0 - alpha], axis=0)
+    return lower, upper
+
+
+def gen_delayed_dispersed_input_tacs(fine_times: np.ndarray,
+                                     input_tac_vals: np.ndarray,
+                                     shifts_in_mins: np.ndarray,
+                                     dispersions_in_mins: np.ndarray) -> np.ndarray:
+    r"""
+    Generates shifted and dispersed copies of an evenly sampled input TAC on a grid of candidates.
+
+    Shifts follow the convention of :meth:`TimeActivityCurve.shifted_tac`: positive values shift the
+    input to earlier times, :math:`C_\mathrm{P}(t+\delta)`, and negative values to later times.
+    Activity before the first time is zero and activity after the last time is held constant.
+    Each shifted input is then dispersed by convolving with the unit-area kernel
+    :math:`\frac{1}{\tau}e^{-t/\tau}`. A dispersion of 0 leaves the input unchanged.
+
+    Args:
+        fine_times (np.ndarray): Evenly sampled times of the input TAC, in minutes.
+        input_tac_vals (np.ndarray): Input TAC values at ``fine_times``.
+        shifts_in_mins (np.ndarray): Candidate shifts in minutes.
+        dispersions_in_mins (np.ndarray): Candidate dispersion time-constants in minutes.
+
+    Returns:
+        np.ndarray: Candidate input TACs with shape ``(num_shifts, num_dispersions, num_times)``.
+    """
+    shifts_in_mins = np.atleast_1d(np.asarray(shifts_in_mins, dtype=float))
+    dispersions_in_mins = np.atleast_1d(np.asarray(dispersions_in_mins, dtype=float))
+    shifted_vals = np.asarray([np.interp(x=fine_times + a_shift, xp=fine_times, fp=input_tac_vals, left=0.0)
+                               for a_shift in shifts_in_mins])
+
+    candidates = np.empty((len(shifts_in_mins), len(dispersions_in_mins), len(fine_times)), float)
+    for disp_id, a_disp in enumerate(dispersions_in_mins):
+        if a_disp <= 0.0:
+            candidates[:, disp_id] = shifted_vals
+        else:
+            rate = np.asarray([1.0 / a_disp])
+            candidates[:, disp_id] = rate[0] * pet_tcms.batched_discrete_convolutions_with_exponentials(
+                    fine_times, shifted_vals, rate)[:, 0]
+    return candidates
+
+
+def count_input_timing_params(shifts_in_mins: np.ndarray,
+                              dispersions_in_mins: np.ndarray) -> np.ndarray:
+    r"""
+    Counts the input timing parameters of each candidate from :func:`gen_delayed_dispersed_input_tacs`.
+
+    Every candidate has a fitted delay. Only candidates with a positive dispersion also have a
+    fitted dispersion, so that the AIC of :func:`calc_fit_criterion` penalizes dispersion and
+    only picks a dispersed input if it fits better by enough to pay for the extra parameter.
+
+    Args:
+        shifts_in_mins (np.ndarray): Candidate shifts in minutes.
+        dispersions_in_mins (np.ndarray): Candidate dispersion time-constants in minutes.
+
+    Returns:
+        np.ndarray: Number of timing parameters of each candidate, flattened in the order of
+        ``candidates.reshape(-1, num_times)``.
+    """
+    shifts_in_mins = np.atleast_1d(np.asarray(shifts_in_mins, dtype=float))
+    dispersions_in_mins = np.atleast_1d(np.asarray(dispersions_in_mins, dtype=float))
+    num_params = 1 + (dispersions_in_mins > 0.0).astype(int)
+    return np.broadcast_to(num_params, (len(shifts_in_mins), len(dispersions_in_mins))).ravel()
+
+
+def calc_spectral_sse_for_input_tacs(fine_times: np.ndarray,
+                                     input_tacs_vals: np.ndarray,
+                                     tgt_tac_vals: np.ndarray,
+                                     sigma: np.ndarray | None = None,
+                                     frame_idx_pairs: np.ndarray | None = None,
+                                     betas: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray]:
+    r"""
+    Calculates the weighted SSE of a linear spectral fit of the target TAC for each candidate input.
+
+    This is the cheap, linear stage of an input delay search. The convolutions of all the
+    candidate inputs with the spectral exponentials are computed in one batched pass. A
+    non-negative spectral model is fit for every candidate with
+    :func:`~petpal.kinetic_modeling.spectral_analysis.solve_spectral_nnls`. The spectral model
+    contains any compartmental model, so a poor SSE means the input timing is wrong.
+
+    Args:
+        fine_times (np.ndarray): Evenly sampled times of the input TACs, in minutes.
+        input_tacs_vals (np.ndarray): Candidate inputs with shape ``(num_candidates, num_times)``.
+        tgt_tac_vals (np.ndarray): Target tissue TAC values. Sampled on ``fine_times``, or
+            frame-averaged if ``frame_idx_pairs`` is provided.
+        sigma (np.ndarray | None): Standard deviation of each target point. Infinite values are
+            ignored. If None, all points are weighted equally. Defaults to None.
+        frame_idx_pairs (np.ndarray | None): Indices of the fine times in each frame. If provided,
+            the basis is frame-averaged before fitting. Defaults to None.
+        betas (np.ndarray | None): Rates of the spectral basis. If None, uses 32 rates from
+            :func:`~petpal.kinetic_modeling.spectral_analysis.get_spectral_betas`. Defaults to None.
+
+    Returns:
+        tuple: ``(sse, num_components)`` for each candidate input.
+    """
+    if betas is None:
+        betas = get_spectral_betas(num_betas=32)
+    rates = get_spectral_basis_rates(betas=betas, include_trapping=True, include_blood=True)
+    bases = pet_tcms.batched_discrete_convolutions_with_exponentials(fine_times,
+                                                                     np.ascontiguousarray(input_tacs_vals),
+                                                                     rates)
+    if frame_idx_pairs is not None:
+        cum_vals = np.concatenate([np.zeros(bases.shape[:2] + (1,)), np.cumsum(bases, axis=-1)], axis=-1)
+        starts, ends = frame_idx_pairs[:, 0], frame_idx_pairs[:, 1]
+        bases = (cum_vals[..., ends] - cum_vals[..., starts]) / (ends - starts)
+
+    if sigma is None:
+        sigma = np.ones_like(tgt_tac_vals)
+    weights = np.zeros_like(tgt_tac_vals)
+    valid_pts = np.isfinite(sigma) & (sigma > 0)
+    weights[valid_pts] = 1.0 / sigma[valid_pts] ** 2
+
+    sse = np.full(len(bases), np.inf)
+    num_components = np.zeros(len(bases), int)
+    for cand_id, a_basis in enumerate(bases):
+        coefficients = solve_spectral_nnls(basis=a_basis.T, tacs_vals=tgt_tac_vals, weights=weights)[0]
+        if np.any(np.isnan(coefficients)):
+            continue
+        resids = tgt_tac_vals - a_basis.T @ coefficients
+        sse[cand_id] = np.sum(weights * resids ** 2)
+        num_components[cand_id] = np.count_nonzero(coefficients)
+    return sse, num_components
+
+
+def calc_fit_criterion(sse: np.ndarray,
+                       num_points: int,
+                       num_params: np.ndarray | int,
+                       criterion: str = 'aic') -> np.ndarray:
+    r"""
+    Calculates the criterion used to rank candidate fits.
+
+    Args:
+        sse (np.ndarray): Weighted sum of squared residuals of each fit.
+        num_points (int): Number of fitted points.
+        num_params (np.ndarray | int): Number of fitted parameters of each fit.
+        criterion (str): ``'sse'`` or ``'aic'``, where
+            :math:`\mathrm{AIC}=N\ln(\mathrm{SSE}/N)+2k`. Defaults to ``'aic'``.
+
+    Returns:
+        np.ndarray: The criterion for each fit. Lower is better.
+
+    Raises:
+        ValueError: If ``criterion`` is not ``'sse'`` or ``'aic'``.
+    """
+    sse = np.asarray(sse, dtype=float)
+    if criterion == 'sse':
+        return sse
+    if criterion == 'aic':
+        with np.errstate(divide='ignore'):
+            return num_points * np.log(sse / num_points) + 2.0 * np.asarray(num_params)
+    raise ValueError(f"criterion must be one of 'sse' or 'aic'. Got {criterion}.")
+
+
+def search_input_delay_and_dispersion(fitter: Union['TACFitter', 'FrameAveragedTACFitter'],
+                                      candidate_inputs: np.ndarray,
+                                      frame_idx_pairs: np.ndarray | None = None,
+                                      criterion: str = 'aic',
+                                      num_refine: int = 5,
+                                      num_input_params: np.ndarray | int = 2) -> tuple[int, np.ndarray]:
+    r"""
+    Picks the best of a grid of candidate input TACs for a fitter.
+
+    The search has three stages:
+        1. A linear spectral fit for every candidate, computed in one batched pass with
+           :func:`calc_spectral_sse_for_input_tacs`, ranks all the candidates.
+        2. The ``num_refine`` best candidates are refit with the nonlinear TCM, warm-started from a
+           fit with the best linear candidate.
+        3. The fitter is left with the best candidate as its input, and :meth:`run_fit` is run
+           once more for the final parameters and covariances.
+
+    Used by :meth:`TACFitter.fit_input_delay_and_dispersion` and
+    :meth:`FrameAveragedTACFitter.fit_input_delay_and_dispersion`.
+
+    Args:
+        fitter (TACFitter | FrameAveragedTACFitter): The fitter. Must implement ``set_input_tac_vals``.
+        candidate_inputs (np.ndarray): Candidate inputs on the fitter's fine times with shape
+            ``(num_candidates, num_times)``.
+        frame_idx_pairs (np.ndarray | None): Frame index pairs for frame-averaged fitters. Defaults
+            to None.
+        criterion (str): ``'sse'`` or ``'aic'``. Defaults to ``'aic'``.
+        num_refine (int): Number of candidates refit with the nonlinear model. Defaults to 5.
+        num_input_params (np.ndarray | int): Number of input timing parameters of each candidate,
+            added to the model parameters for the AIC. See :func:`count_input_timing_params`.
+            Defaults to 2, a delay and a dispersion for every candidate.
+
+    Returns:
+        tuple: ``(best_candidate_id, linear_criterion)``, where ``linear_criterion`` is the criterion of
+        the linear fit of each candidate.
+    """
+    fine_times, tgt_vals, sigma = fitter.delay_search_data()
+    linear_sse, num_components = calc_spectral_sse_for_input_tacs(fine_times=fine_times,
+                                                                  input_tacs_vals=candidate_inputs,
+                                                                  tgt_tac_vals=tgt_vals,
+                                                                  sigma=sigma,
+                                                                  frame_idx_pairs=frame_idx_pairs)
+    num_points = int(np.count_nonzero(np.isfinite(sigma))) if sigma is not None else len(tgt_vals)
+    num_input_params = np.broadcast_to(num_input_params, (len(candidate_inputs),))
+    linear_criterion = calc_fit_criterion(sse=linear_sse, num_points=num_points,
+                                          num_params=num_components + num_input_params,
+                                          criterion=criterion)
+    refine_ids = np.argsort(linear_criterion)[:max(num_refine, 1)]
+
+    fitter.set_input_tac_vals(candidate_inputs[refine_ids[0]])
+    fitter.run_fit()
+    nonlinear_sse = np.full(len(refine_ids), np.inf)
+    for rank, cand_id in enumerate(refine_ids):
+        fitter.set_input_tac_vals(candidate_inputs[cand_id])
+        a_sse = fitter.calc_weighted_sse(fitter.refit_with_warm_start(tgt_vals))
+        if np.isfinite(a_sse):
+            nonlinear_sse[rank] = a_sse
+    nonlinear_criterion = calc_fit_criterion(sse=nonlinear_sse, num_points=num_points,
+                                             num_params=len(fitter.fit_results[0]) + num_input_params[refine_ids],
+                                             criterion=criterion)
+    best_id = refine_ids[int(np.argmin(nonlinear_criterion))]
+
+    fitter.set_input_tac_vals(candidate_inputs[best_id])
+    fitter.run_fit()
+    return best_id, linear_criterion
+
+
 class TCMAnalysis(object):
     r"""
     A class dedicated to perform Tissue Compartment Model (TCM) fitting to time-activity curves (TACs).
@@ -730,7 +1188,12 @@ class TCMAnalysis(object):
                  resample_num: int = 512,
                  aif_fit_thresh_in_mins: float = 40.0,
                  max_func_iters: int = 2500,
-                 ignore_blood_volume: bool = False):
+                 ignore_blood_volume: bool = False,
+                 num_bootstrap_samples: int = 0,
+                 bootstrap_confidence: float = 0.95,
+                 bootstrap_seed: int | None = None,
+                 bootstrap_num_workers: int = 1,
+                 bootstrap_time_budget_in_secs: float | None = None):
         r"""
         Initializes an instance of the TCMAnalysis class.
 
@@ -743,6 +1206,12 @@ class TCMAnalysis(object):
 
         After initialization, you can directly run and save the analysis using bundled methods :meth:`run_analysis` and
         :meth:`save_analysis`, respectively.
+
+        If ``num_bootstrap_samples`` is positive, a parametric bootstrap is run after the fit using
+        :func:`run_parametric_bootstrap`, and percentile confidence intervals are added to the fit
+        properties. The bootstrap is seeded with ``bootstrap_seed``, refit by
+        ``bootstrap_num_workers`` processes, and stops starting new refits once
+        ``bootstrap_time_budget_in_secs`` has passed.
         
         See Also:
             * :meth:`validated_tcm`
@@ -765,6 +1234,12 @@ class TCMAnalysis(object):
             self.fitter_class = TACFitterWithoutBloodVolume
         else:
             self.fitter_class = TACFitter
+        self.num_bootstrap_samples: int = num_bootstrap_samples
+        self.bootstrap_confidence: float = bootstrap_confidence
+        self.bootstrap_seed: int | None = bootstrap_seed
+        self.bootstrap_num_workers: int = bootstrap_num_workers
+        self.bootstrap_time_budget_in_secs: float | None = bootstrap_time_budget_in_secs
+        self.bootstrap_params: np.ndarray | None = None
         self.analysis_props: dict = self.init_analysis_props()
         self.fit_results: Union[None, tuple[np.ndarray, np.ndarray]] = None
         self._has_analysis_been_run: bool = False
@@ -928,6 +1403,31 @@ class TCMAnalysis(object):
         """
         self.update_props_with_formatted_fit_values(fit_results=self.fit_results,
                                                     fit_props_dict=self.analysis_props)
+        if self.bootstrap_params is not None:
+            self.update_props_with_bootstrap_cis(bootstrap_params=self.bootstrap_params,
+                                                 fit_props_dict=self.analysis_props)
+
+    def update_props_with_bootstrap_cis(self, bootstrap_params: np.ndarray, fit_props_dict: dict):
+        r"""
+        Update the analysis properties dictionary with bootstrap confidence intervals.
+
+        Args:
+            bootstrap_params (np.ndarray): Bootstrap estimates with shape ``(num_samples, num_params)``.
+            fit_props_dict (dict): Dictionary to update with formatted confidence intervals.
+
+        Side Effects:
+            Updates the FitProperties section of fit_props_dict with BootstrapLowerCI, BootstrapUpperCI,
+            BootstrapConfidence, NumberOfBootstrapSamples and BootstrapSeed.
+        """
+        lower, upper = calc_bootstrap_percentile_cis(bootstrap_params=bootstrap_params,
+                                                     confidence=self.bootstrap_confidence)
+        format_func = self._generate_pretty_params
+        fit_props = fit_props_dict["FitProperties"]
+        fit_props["BootstrapLowerCI"] = format_func(lower.round(5).tolist())
+        fit_props["BootstrapUpperCI"] = format_func(upper.round(5).tolist())
+        fit_props["BootstrapConfidence"] = self.bootstrap_confidence
+        fit_props["NumberOfBootstrapSamples"] = int(np.all(np.isfinite(bootstrap_params), axis=1).sum())
+        fit_props["BootstrapSeed"] = self.bootstrap_seed
     
     def calculate_fit(self):
         r"""
@@ -961,6 +1461,12 @@ class TCMAnalysis(object):
         self.fit_results = self.fitter_class.fit_results
         if self.bounds is None:
             self.bounds = self.fitter_class.bounds
+        if self.num_bootstrap_samples > 0:
+            self.bootstrap_params = run_parametric_bootstrap(fitter=self.fitter_class,
+                                                             num_samples=self.num_bootstrap_samples,
+                                                             seed=self.bootstrap_seed,
+                                                             num_workers=self.bootstrap_num_workers,
+                                                             time_budget_in_secs=self.bootstrap_time_budget_in_secs)
 
     def _generate_pretty_params(self, results: np.ndarray) -> dict:
         r"""
@@ -1338,6 +1844,9 @@ class FrameAveragedTACFitter():
         self.fit_residuals: None | np.ndarray = None
         self.fit_sum_of_square_residuals: None | np.ndarray = None
         self.fit_tac: None | TimeActivityCurve = None
+        self.input_shift_in_mins: float = 0.0
+        self.input_dispersion_in_mins: float = 0.0
+        self.delay_search_criterion: None | np.ndarray = None
 
 
     def _validate_inputs(self,
@@ -1484,6 +1993,166 @@ class FrameAveragedTACFitter():
         _fit_tac_activity = self.tcm_func(self.result_obj.params, *self.fine_input_tac.tac, self.frame_idx_pairs)
         self.fit_tac = TimeActivityCurve(self.roi_tac.times_in_mins, _fit_tac_activity)
 
+    def simulate_bootstrap_tacs(self, num_samples: int, rng: np.random.Generator) -> np.ndarray:
+        r"""
+        Simulates noisy frame-averaged ROI TACs from the best fit for a parametric bootstrap.
+
+        The fitted TAC is generated once, and Gaussian noise is added to all the samples at once.
+        The noise in each frame is the reduced chi-square of the fit times the fitting weights (or
+        just the residual standard deviation for unweighted fits). Frames with infinite weights are
+        left noiseless.
+
+        Args:
+            num_samples (int): Number of noisy TACs to simulate.
+            rng (np.random.Generator): Random number generator used for the noise.
+
+        Returns:
+            np.ndarray: Simulated TAC values with shape ``(num_samples, num_frames)``.
+
+        Raises:
+            RuntimeError: If :meth:`run_fit` has not been run.
+        """
+        if self.result_obj is None:
+            raise RuntimeError("'run_fit' must be run before simulating bootstrap TACs.")
+        model_vals = self.fit_tac.activity
+        noise_scale = np.sqrt(self.result_obj.redchi) * np.ones_like(model_vals)
+        if self.weights is not None:
+            noise_scale *= np.where(np.isfinite(self.weights), self.weights, 0.0)
+        return model_vals[None, :] + rng.standard_normal((num_samples, model_vals.size)) * noise_scale[None, :]
+
+    def delay_search_data(self) -> tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+        r"""
+        Returns the fine times, target TAC values and target standard deviations for an input delay
+        search.
+
+        Returns:
+            tuple: ``(fine_times, roi_tac_activity, weights)``.
+        """
+        return self.fine_input_tac.times_in_mins, self.roi_tac.activity, self.weights
+
+    def set_input_tac_vals(self, input_tac_vals: np.ndarray) -> None:
+        r"""
+        Replaces the fine input TAC values used by the TCM, and rebuilds the minimizer.
+
+        Args:
+            input_tac_vals (np.ndarray): New input TAC values on the fine times.
+
+        Side Effects:
+            fine_input_tac (TimeActivityCurve): Activity set to ``input_tac_vals``. ``input_tac`` keeps
+            the original input.
+        """
+        self.fine_input_tac = TimeActivityCurve(self.fine_input_tac.times_in_mins,
+                                                np.asarray(input_tac_vals, dtype=float))
+        self._fit_obj = lmfit.Minimizer(userfcn=self.tcm_func,
+                                        params=self.tcm_fit_params,
+                                        fcn_args=(*self.fine_input_tac.tac,
+                                                  self.frame_idx_pairs,
+                                                  self.roi_tac.activity,
+                                                  self.weights))
+
+    def calc_weighted_sse(self, fit_params: np.ndarray) -> float:
+        r"""
+        Calculates the weighted sum of squared residuals of the ROI TAC for some parameters.
+
+        Args:
+            fit_params (np.ndarray): TCM parameters, in the order of the model parameter names.
+
+        Returns:
+            float: Sum of the squared (weighted) residuals, ignoring non-finite residuals.
+        """
+        params = self.tcm_fit_params.copy()
+        for name, val in zip(self.model_config.param_names, fit_params):
+            params[name].value = val
+        resids = self.tcm_func(params, *self.fine_input_tac.tac, self.frame_idx_pairs,
+                               self.roi_tac.activity, self.weights)
+        return float(np.sum(resids[np.isfinite(resids)] ** 2))
+
+    def fit_input_delay_and_dispersion(self,
+                                       shifts_in_mins: np.ndarray | None = None,
+                                       dispersions_in_mins: np.ndarray | None = None,
+                                       criterion: str = 'aic',
+                                       num_refine: int = 5) -> tuple[float, float]:
+        r"""
+        Estimates the delay and dispersion of the input TAC, then fits the TCM with the corrected input.
+
+        All combinations of ``shifts_in_mins`` and ``dispersions_in_mins`` are applied to the
+        original input, resampled on the fine times, with :func:`gen_delayed_dispersed_input_tacs`.
+        The candidates are ranked with :func:`search_input_delay_and_dispersion` using frame-averaged
+        spectral bases, and the fitter is left fit with the best one.
+
+        Args:
+            shifts_in_mins (np.ndarray): Candidate shifts in minutes. Positive values shift the input
+                to earlier times. If None, uses -30s to 30s in 3s steps. Defaults to None.
+            dispersions_in_mins (np.ndarray): Candidate dispersion time-constants in minutes. If
+                None, uses ``[0.0]``, which only estimates the delay. Defaults to None.
+            criterion (str): ``'sse'`` or ``'aic'``. With ``'aic'``, a candidate with a positive
+                dispersion counts one parameter more than one without, so dispersion is only
+                picked if it improves the fit enough. See :func:`count_input_timing_params`.
+                Defaults to ``'aic'``.
+            num_refine (int): Number of candidates refit with the nonlinear model. Defaults to 5.
+
+        Returns:
+            tuple: The best ``(shift_in_mins, dispersion_in_mins)``.
+
+        Side Effects:
+            - fine_input_tac (TimeActivityCurve): Set to the best shifted and dispersed input.
+            - Fit attributes populated by :meth:`run_fit` with the best input.
+            - input_shift_in_mins, input_dispersion_in_mins (float): The best shift and dispersion.
+            - delay_search_criterion (np.ndarray): Linear-stage criterion with shape
+              ``(num_shifts, num_dispersions)``.
+        """
+        if shifts_in_mins is None:
+            shifts_in_mins = np.linspace(-0.5, 0.5, 21)
+        if dispersions_in_mins is None:
+            dispersions_in_mins = np.zeros(1)
+        shifts_in_mins = np.atleast_1d(np.asarray(shifts_in_mins, dtype=float))
+        dispersions_in_mins = np.atleast_1d(np.asarray(dispersions_in_mins, dtype=float))
+        fine_times = self.fine_roi_tac.times_in_mins
+        original_input_vals = self.input_tac.resampled_tac_on_times(fine_times).activity
+        candidates = gen_delayed_dispersed_input_tacs(fine_times=fine_times,
+                                                      input_tac_vals=original_input_vals,
+                                                      shifts_in_mins=shifts_in_mins,
+                                                      dispersions_in_mins=dispersions_in_mins)
+        best_id, linear_criterion = search_input_delay_and_dispersion(
+                fitter=self,
+                candidate_inputs=candidates.reshape(-1, candidates.shape[-1]),
+                frame_idx_pairs=self.frame_idx_pairs,
+                criterion=criterion,
+                num_refine=num_refine,
+                num_input_params=count_input_timing_params(shifts_in_mins=shifts_in_mins,
+                                                           dispersions_in_mins=dispersions_in_mins))
+        shift_id, disp_id = np.unravel_index(best_id, candidates.shape[:2])
+        self.input_shift_in_mins = float(shifts_in_mins[shift_id])
+        self.input_dispersion_in_mins = float(dispersions_in_mins[disp_id])
+        self.delay_search_criterion = linear_criterion.reshape(candidates.shape[:2])
+        return self.input_shift_in_mins, self.input_dispersion_in_mins
+
+    def refit_with_warm_start(self, tac_vals: np.ndarray) -> np.ndarray:
+        r"""
+        Fits the TCM to new frame-averaged ROI TAC values, starting from the current best fit.
+
+        Used to refit bootstrap samples. The weights, bounds and input function are the same as for
+        :meth:`run_fit`, but the parameters start from the fitted values.
+
+        Args:
+            tac_vals (np.ndarray): Frame-averaged ROI TAC values.
+
+        Returns:
+            np.ndarray: The fitted parameters. All NaN if the fit failed.
+        """
+        warm_start_params = self.result_obj.params.copy()
+        fit_obj = lmfit.Minimizer(userfcn=self.tcm_func,
+                                  params=warm_start_params,
+                                  fcn_args=(*self.fine_input_tac.tac,
+                                            self.frame_idx_pairs,
+                                            tac_vals,
+                                            self.weights))
+        try:
+            result = fit_obj.leastsq(**self.leastsq_kwargs)
+        except ValueError:
+            return np.full(len(warm_start_params), np.nan)
+        return np.asarray([val.value for _, val in result.params.items()])
+
     def __call__(self):
         r"""
         Execute the fit by calling the instance.
@@ -1560,7 +2229,12 @@ class FrameAveragedTCMAnalysis():
                  compartment_model: str,
                  parameter_bounds: None | np.ndarray = None,
                  weights: float | None | np.ndarray = None,
-                 resample_num: int = 8192):
+                 resample_num: int = 8192,
+                 num_bootstrap_samples: int = 0,
+                 bootstrap_confidence: float = 0.95,
+                 bootstrap_seed: int | None = None,
+                 bootstrap_num_workers: int = 1,
+                 bootstrap_time_budget_in_secs: float | None = None):
         r"""
         Initialize a FrameAveragedTCMAnalysis instance.
 
@@ -1577,6 +2251,15 @@ class FrameAveragedTCMAnalysis():
                 Defaults to None.
             weights (float, np.ndarray, or None, optional): Weights for fitting. Defaults to None.
             resample_num (int, optional): Number of points for TAC resampling. Defaults to 8192.
+            num_bootstrap_samples (int, optional): Number of parametric bootstrap samples used to
+                compute confidence intervals. Defaults to 0, which skips the bootstrap.
+            bootstrap_confidence (float, optional): Confidence level of the bootstrap intervals.
+                Defaults to 0.95.
+            bootstrap_seed (int or None, optional): Seed for the bootstrap noise. Defaults to None.
+            bootstrap_num_workers (int, optional): Number of worker processes for the bootstrap
+                refits. Defaults to 1.
+            bootstrap_time_budget_in_secs (float or None, optional): Wall-time budget for the
+                bootstrap refits. Defaults to None.
         """
         self.input_tac_path = os.path.abspath(input_tac_path)
         self.roi_tac_path = os.path.abspath(roi_tac_path)
@@ -1590,6 +2273,12 @@ class FrameAveragedTCMAnalysis():
         self.bounds = parameter_bounds
         self.weights = weights
         self.resample_num = resample_num
+        self.num_bootstrap_samples = num_bootstrap_samples
+        self.bootstrap_confidence = bootstrap_confidence
+        self.bootstrap_seed = bootstrap_seed
+        self.bootstrap_num_workers = bootstrap_num_workers
+        self.bootstrap_time_budget_in_secs = bootstrap_time_budget_in_secs
+        self.bootstrap_params: None | np.ndarray = None
         self.fitter_class = FrameAveragedTACFitter
         self.analysis_props: dict = self.init_analysis_props()
         self.fit_results: None | tuple | list= None
@@ -1751,6 +2440,12 @@ class FrameAveragedTCMAnalysis():
         fitter_cls()
         self.fit_results = fitter_cls.fit_results
         self.bounds = fitter_cls.bounds if self.bounds is None else self.bounds
+        if self.num_bootstrap_samples > 0:
+            self.bootstrap_params = run_parametric_bootstrap(fitter=fitter_cls,
+                                                             num_samples=self.num_bootstrap_samples,
+                                                             seed=self.bootstrap_seed,
+                                                             num_workers=self.bootstrap_num_workers,
+                                                             time_budget_in_secs=self.bootstrap_time_budget_in_secs)
 
     def calculate_fit_properties(self, pretty_params: bool = False):
         r"""Calculate and format fit properties for output.
@@ -1773,6 +2468,39 @@ class FrameAveragedTCMAnalysis():
                                                     param_bounds=self.bounds,
                                                     fit_props_dict=self.analysis_props,
                                                     pretty_params=pretty_params)
+        if self.bootstrap_params is not None:
+            self.update_props_with_bootstrap_cis(bootstrap_params=self.bootstrap_params,
+                                                 fit_props_dict=self.analysis_props,
+                                                 pretty_params=pretty_params)
+
+    def update_props_with_bootstrap_cis(self,
+                                        bootstrap_params: np.ndarray,
+                                        fit_props_dict: dict,
+                                        pretty_params: bool = False) -> None:
+        r"""Update properties dictionary with bootstrap confidence intervals.
+
+        Args:
+            bootstrap_params (np.ndarray): Bootstrap estimates with shape ``(num_samples, num_params)``.
+            fit_props_dict (dict): Dictionary to update with formatted confidence intervals.
+            pretty_params (bool, optional): If True, use LaTeX-formatted parameter names.
+                Defaults to False.
+
+        Side Effects:
+            Updates the FitProperties section of fit_props_dict with BootstrapLowerCI, BootstrapUpperCI,
+            BootstrapConfidence, NumberOfBootstrapSamples and BootstrapSeed.
+
+        See Also:
+            * :func:`calc_bootstrap_percentile_cis`
+        """
+        lower, upper = calc_bootstrap_percentile_cis(bootstrap_params=bootstrap_params,
+                                                     confidence=self.bootstrap_confidence)
+        param_names = self._model_config.pretty_param_names if pretty_params else self._model_config.param_names
+        fit_props = fit_props_dict["FitProperties"]
+        fit_props["BootstrapLowerCI"] = dict(zip(param_names, lower.round(5).tolist()))
+        fit_props["BootstrapUpperCI"] = dict(zip(param_names, upper.round(5).tolist()))
+        fit_props["BootstrapConfidence"] = self.bootstrap_confidence
+        fit_props["NumberOfBootstrapSamples"] = int(np.all(np.isfinite(bootstrap_params), axis=1).sum())
+        fit_props["BootstrapSeed"] = self.bootstrap_seed
 
     def update_props_with_formatted_fit_values(self,
                                                fit_values: np.ndarray,
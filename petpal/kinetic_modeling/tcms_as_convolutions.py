@@ -99,7 +99,45 @@ def discrete_convolution_with_exponential(func_times: np.ndarray, func_vals: np.
             c_out[i] = prev
         return c_out
 
-@numba.njit()
+@numba.njit(parallel=True, cache=True)
+def batched_discrete_convolutions_with_exponentials(func_times: np.ndarray,
+                                                    func_vals_batch: np.ndarray,
+                                                    rates: np.ndarray) -> np.ndarray:
+    r"""Computes the convolutions of several functions with several exponential kernels.
+
+    Each row of ``func_vals_batch`` is convolved with :math:`\exp(-k t)` for every rate :math:`k`
+    using :func:`discrete_convolution_with_exponential`, with the functions distributed over threads.
+    An infinite rate returns the function itself, which is convenient for blood volume terms.
+
+    .. important::
+        The function assumes that the times are evenly sampled. Answers will be incorrect if this is not the case.
+
+    Args:
+        func_times (np.ndarray): Array containing evenly sampled time-points where :math:`t\geq0`.
+        func_vals_batch (np.ndarray): Function values with shape ``(num_funcs, num_times)``.
+        rates (np.ndarray): Rates of the exponential kernels.
+
+    Returns:
+        (np.ndarray): Array with shape ``(num_funcs, num_rates, num_times)`` containing the convolutions.
+
+    See Also:
+        :func:`discrete_convolution_with_exponential`
+    """
+    num_funcs, num_times = func_vals_batch.shape
+    conv_vals = np.zeros((num_funcs, len(rates), num_times))
+    for func_id in numba.prange(num_funcs):
+        for rate_id in range(len(rates)):
+            if np.isinf(rates[rate_id]):
+                conv_vals[func_id, rate_id] = func_vals_batch[func_id]
+            else:
+                conv_vals[func_id, rate_id] = discrete_convolution_with_exponential(func_times,
+                                                                                    func_vals_batch[func_id],
+                                                                                    1.0,
+                                                                                    rates[rate_id])
+    return conv_vals
+
+
+@numba.njit(cache=True)
 def response_function_1tcm_c1(t: np.ndarray, k1: float, k2: float) -> np.ndarray:
     r"""The response function for the 1TCM :math:`f(t)=k_1 e^{-k_{2}t}`
     
@@ -114,7 +152,7 @@ def response_function_1tcm_c1(t: np.ndarray, k1: float, k2: float) -> np.ndarray
     return k1 * np.exp(-k2 * t)
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def response_function_2tcm_with_k4zero_c1(t: np.ndarray, k1: float, k2: float, k3: float) -> np.ndarray:
     r"""
     The response function for first compartment in the serial 2TCM with
@@ -136,7 +174,7 @@ def response_function_2tcm_with_k4zero_c1(t: np.ndarray, k1: float, k2: float, k
     return k1 * np.exp(-(k2 + k3) * t)
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def response_function_2tcm_with_k4zero_c2(t: np.ndarray, k1: float, k2: float, k3: float) -> np.ndarray:
     r"""The response function for second compartment in the serial 2TCM with :math:`k_{4}=0`;
     :math:`f(t)=\frac{k_{1}k_{3}}{k_{2}+k_{3}}(1-e^{-(k_{2} + k_{3})t})`.
@@ -156,7 +194,7 @@ def response_function_2tcm_with_k4zero_c2(t: np.ndarray, k1: float, k2: float, k
     return ((k1 * k3) / (k2 + k3)) * (1.0 - np.exp(-(k2 + k3) * t))
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def response_function_serial_2tcm_c1(t: np.ndarray, k1: float, k2: float, k3: float, k4: float) -> np.ndarray:
     r"""The response function for first compartment in the *serial* 2TCM.
     
@@ -196,7 +234,7 @@ def response_function_serial_2tcm_c1(t: np.ndarray, k1: float, k2: float, k3: fl
     return (k1 / delta_a) * ((k4 - alpha_1) * np.exp(-alpha_1 * t) + (alpha_2 - k4) * np.exp(-alpha_2 * t))
 
 
-@numba.njit()
+@numba.njit(cache=True)
 def response_function_serial_2tcm_c2(t: np.ndarray, k1: float, k2: float, k3: float, k4: float) -> np.ndarray:
     r"""The response function for second compartment in the *serial* 2TCM.
 
@@ -102,6 +102,15 @@ class PetpalLogging:
         self.logger.info(' '.join(self.cli_args))
 
 
+def str_to_bool(value: str) -> bool:
+    """Interpret a command line value such as 'True', 'false', 'yes' or '0' as a boolean."""
+    if value.lower() in ('true', 't', 'yes', 'y', '1'):
+        return True
+    if value.lower() in ('false', 'f', 'no', 'n', '0'):
+        return False
+    raise argparse.ArgumentTypeError(f"Boolean value expected, got {value}.")
+
+
 def type_identifier(arg_type_name: str) -> tuple:
     """Identify the locator, number of arguments, and default value for the argument type."""
     arg_default = None
@@ -119,6 +128,10 @@ def type_identifier(arg_type_name: str) -> tuple:
 
     if arg_type==str and arg_default is not None:
         arg_default = arg_default.replace("'","")
+    if arg_type==bool:
+        arg_type = str_to_bool
+        if arg_default is not None:
+            arg_default = str_to_bool(arg_default)
 
     return arg_type, nargs, arg_default
 
@@ -8,6 +8,7 @@ from .steps_base import *
 from ..preproc.image_operations_4d import SimpleAutoImageCropper, rescale_image
 from ..preproc.register import register_pet, warp_pet_to_atlas
 from ..preproc.motion_corr import windowed_motion_corr_to_target
+from ..preproc.transform_chain import motion_correct_and_register_with_single_resampling
 from ..input_function import blood_input
 from ..utils.bids_utils import parse_path_to_get_subject_and_session_id, snake_to_camel_case, gen_bids_like_dir_path, gen_bids_like_filepath
 from ..utils.image_io import safe_copy_meta
@@ -597,7 +598,8 @@ class ImageToImageStep(FunctionBasedStep):
             return cls(**defaults)
 
     @classmethod
-    def default_windowed_moco(cls, name: str = 'windowed_moco', verbose=False, **overrides):
+    def default_windowed_moco(cls, name: str = 'windowed_moco', verbose=False, num_workers: int = 1,
+                              num_threads: int = 0, **overrides):
         """
         Creates a default instance for motion correction of frames using a windowed strategy.
         See :func:`windowed_motion_corr_to_target<petpal.preproc.motion_corr.windowed_motion_corr_to_target>`
@@ -606,6 +608,10 @@ class ImageToImageStep(FunctionBasedStep):
         Args:
             name (str): Name of the step. Defaults to 'windowed_moco'.
             verbose:
+            num_workers (int): Number of worker processes registering windows in parallel.
+                Defaults to 1.
+            num_threads (int): Number of ITK threads used by each parallel registration. Defaults
+                to 0, which keeps the ITK default.
             **overrides:
 
         Returns:
@@ -614,7 +620,43 @@ class ImageToImageStep(FunctionBasedStep):
         defaults = dict(name=name, function=windowed_motion_corr_to_target,
                         input_image_path='', output_image_path='',
                         motion_target_option='weighted_series_sum', window_duration=60.0,
-                        verbose=verbose)
+                        verbose=verbose, num_workers=num_workers, num_threads=num_threads)
+        override_dict = defaults | overrides
+        try:
+            return cls(**override_dict)
+        except RuntimeError as err:
+            warnings.warn(f"Invalid override: {err}. Using default instance instead.", stacklevel=2)
+            return cls(**defaults)
+
+    @classmethod
+    def default_moco_register_single_resampling(cls,
+                                                 name: str = 'moco_register_single_resampling',
+                                                 anat_image_path: str = '',
+                                                 atlas_image_path: str | None = None,
+                                                 **overrides):
+        """
+        Creates a default instance for windowed motion correction, registration to an anatomical
+        image and optional warp to an atlas, with the dynamic PET resampled only once. Replaces
+        :meth:`default_windowed_moco` followed by :meth:`default_register_pet_to_t1` (and
+        :meth:`default_warp_pet_to_atlas`). See
+        :func:`motion_correct_and_register_with_single_resampling<petpal.preproc.transform_chain.motion_correct_and_register_with_single_resampling>`
+        for more details. All paths are empty-strings.
+
+        Args:
+            name (str): Name of the step. Defaults to 'moco_register_single_resampling'.
+            anat_image_path (str): Path to the anatomical image. Defaults to ''.
+            atlas_image_path (str | None): Path to the atlas image. If None, the output is in
+                anatomical space. Defaults to None.
+            **overrides: Override default parameters.
+
+        Returns:
+            ImageToImageStep: A new instance for motion correction and registration with a single
+            resampling.
+        """
+        defaults = dict(name=name, function=motion_correct_and_register_with_single_resampling,
+                        input_image_path='', output_image_path='',
+                        motion_target_option='weighted_series_sum', anat_image_path=anat_image_path,
+                        atlas_image_path=atlas_image_path, window_duration=60.0)
         override_dict = defaults | overrides
         try:
             return cls(**override_dict)
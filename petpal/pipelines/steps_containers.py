@@ -2,6 +2,7 @@ import copy
 from typing import Union
 import networkx as nx
 from matplotlib import pyplot as plt
+from ..utils.derived_image_cache import derived_image_cache
 from .steps_base import *
 from .preproc_steps import PreprocStepType, ImageToImageStep, TACsFromSegmentationStep, ResampleBloodTACStep
 from .kinetic_modeling_steps import KMStepType, GraphicalAnalysisStep, TCMFittingAnalysisStep, ParametricGraphicalAnalysisStep
@@ -134,10 +135,12 @@ class StepsContainer:
     
     def __call__(self):
         """
-        Executes all steps in the container in sequence.
+        Executes all steps in the container in sequence, sharing derived images between them
+        (see :meth:`StepsPipeline.__call__`).
         """
-        for step_id, (step_name, a_step) in enumerate(zip(self.step_names, self.step_objs)):
-            a_step()
+        with derived_image_cache():
+            for step_id, (step_name, a_step) in enumerate(zip(self.step_names, self.step_objs)):
+                a_step()
     
     def __getitem__(self, step: Union[int, str]):
         """
@@ -430,10 +433,15 @@ class StepsPipeline:
     def __call__(self):
         """
         Executes all steps in the pipeline in topologically sorted order.
+
+        Steps run inside :func:`~petpal.utils.derived_image_cache.derived_image_cache`, so static
+        images derived from the same PET image, such as weighted sums used as motion targets or
+        for SUV, are computed once per run. The cached files are removed when the run ends.
         """
-        for step_name in nx.topological_sort(self.dependency_graph):
-            step = self.get_step_from_node_label(node_label=step_name)
-            step()
+        with derived_image_cache():
+            for step_name in nx.topological_sort(self.dependency_graph):
+                step = self.get_step_from_node_label(node_label=step_name)
+                step()
     
     def add_step(self, container_name: str, step: StepType):
         """
@@ -3,13 +3,17 @@ from . import motion_target
 from . import image_operations_4d
 from . import motion_corr
 from . import partial_volume_corrections
+from . import native_partial_volume_corrections
+from . import transform_chain
 from . import register
+from . import registration_cache
 from . import standard_uptake_value
 from . import symmetric_geometric_transfer_matrix
 from . import segmentation_tools
 from . import decay_correction
 from . import regional_tac_extraction
 from . import brain_mask_pet
+from . import hessian_objectness
 
 def main():
     print("PETPAL - Pre-processing")
@@ -2,6 +2,7 @@
 """
 import ants
 from .motion_target import determine_motion_target
+from .registration_cache import cached_registration
 from ..utils.dimension import timeseries_from_img_list
 from ..utils.image_io import safe_copy_meta
 
@@ -39,7 +40,7 @@ def brain_mask_pet(input_image_path: str,
     motion_target = determine_motion_target(motion_target_option=motion_target_option,
                                             input_image_path=input_image_path)
     pet_ref = ants.image_read(motion_target)
-    xfm = ants.registration(
+    xfm = cached_registration(
         fixed=atlas,
         moving=pet_ref,
         type_of_transform='SyN'
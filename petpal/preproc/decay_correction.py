@@ -3,9 +3,9 @@ Provides functions for undo-ing decay correction and recalculating it.
 
 """
 from typing import Optional
-import math
 
 import ants
+import nibabel
 import numpy as np
 import pandas as pd
 
@@ -18,7 +18,8 @@ from ..meta.auto_cli import auto_cli
 
 def undo_decay_correction(input_image_path: str,
                           output_image_path: str,
-                          metadata_dict: dict = None) -> ants.ANTsImage:
+                          metadata_dict: dict = None,
+                          stream: bool = False) -> ants.ANTsImage | None:
     """Uses decay factors from the metadata for an image to remove decay correction for each frame.
 
     This function expects to find decay factors in the .json sidecar file, or the metadata_dict, if given. If there are
@@ -33,11 +34,16 @@ def undo_decay_correction(input_image_path: str,
         metadata_dict (dict, optional): Metadata dictionary to use instead of corresponding .json sidecar. If not
             specified (default behavior), function will try to use sidecar .json in the same directory as
             input_image_path.
+        stream (bool): If True, frames are read, scaled and written to output_image_path one at a time with
+            :func:`scale_frames_to_file`, and no image is returned. Default False.
 
     Returns:
-        ants.ANTsImage: ANTsImage with decay correction reversed."""
+        ants.ANTsImage | None: ANTsImage with decay correction reversed, or None if `stream` is True.
 
-    decay_corrected_image = ants.image_read(filename=input_image_path)
+    Raises:
+        ValueError: If `stream` is True and output_image_path is None."""
+    if stream and output_image_path is None:
+        raise ValueError('output_image_path is required to stream the corrected image.')
 
     if metadata_dict is not None:
         json_data = metadata_dict
@@ -47,17 +53,20 @@ def undo_decay_correction(input_image_path: str,
     frame_info = ScanTimingInfo.from_nifti(image_path=input_image_path)
     decay_factors = frame_info.decay
 
-    uncorrected_image_numpy = decay_corrected_image.numpy()
-
-    for frame_num, decay_factor in enumerate(decay_factors):
-        uncorrected_image_numpy[..., frame_num] /= decay_factor
-
-    uncorrected_image = ants.from_numpy_like(data=uncorrected_image_numpy,
-                                             image=decay_corrected_image)
+    if stream:
+        uncorrected_image = None
+        scale_frames_to_file(input_image_path=input_image_path,
+                             output_image_path=output_image_path,
+                             scalar_arr=1.0 / decay_factors)
+    else:
+        uncorrected_image = scale_frames(input_img=ants.image_read(filename=input_image_path),
+                                         scalar_arr=1.0 / decay_factors,
+                                         in_place=True)
 
     if output_image_path is not None:
-        ants.image_write(image=uncorrected_image,
-                         filename=output_image_path)
+        if uncorrected_image is not None:
+            ants.image_write(image=uncorrected_image,
+                             filename=output_image_path)
 
         json_data['DecayFactor'] = list(np.ones_like(decay_factors))
         json_data['ImageDecayCorrected'] = "false"
@@ -69,7 +78,8 @@ def undo_decay_correction(input_image_path: str,
 
 
 def decay_correct(input_image_path: str,
-                  output_image_path: str) -> ants.ANTsImage:
+                  output_image_path: str,
+                  stream: bool = False) -> ants.ANTsImage | None:
     r"""Recalculate decay_correction for nifti image based on frame reference times.
 
     This function will compute frame reference times based on frame time starts and frame durations (both of which
@@ -90,15 +100,21 @@ def decay_correct(input_image_path: str,
         input_image_path (str): Path to input (.nii.gz or .nii) image. A .json sidecar file should exist in the same
              directory as the input image.
         output_image_path (str): Path to output (.nii.gz or .nii) output image.
+        stream (bool): If True, frames are read, scaled and written to output_image_path one at a
+            time with :func:`scale_frames_to_file`, and no image is returned. Default False.
 
     Returns:
-        ants.ANTsImage: Decay-Corrected Image
+        ants.ANTsImage | None: Decay-Corrected Image, or None if `stream` is True.
 
+    Raises:
+        ValueError: If the image already has decay factors other than 1, or if `stream` is True
+            and output_image_path is None.
     """
+    if stream and output_image_path is None:
+        raise ValueError('output_image_path is required to stream the corrected image.')
     half_life = image_io.get_half_life_from_nifti(image_path=input_image_path)
 
     json_data = image_io.load_metadata_for_nifti_with_same_filename(image_path=input_image_path)
-    uncorrected_image = ants.image_read(filename=input_image_path)
 
     frame_info = ScanTimingInfo.from_nifti(image_path=input_image_path)
     frame_reference_times = np.asarray(frame_info.start + frame_info.duration / 2.0, float).tolist()
@@ -109,21 +125,26 @@ def decay_correct(input_image_path: str,
                          f'image has not had its previous decay correction undone. Try running undo_decay_correction '
                          f'before running this function to avoid decay correcting an image more than once.')
 
-    corrected_data = uncorrected_image.numpy()
-    new_decay_factors = []
-    for frame_num, frame_reference_time in enumerate(frame_reference_times):
-        new_decay_factor = math.exp(((math.log(2) / half_life) * frame_reference_time))
-        corrected_data[..., frame_num] *= new_decay_factor
-        new_decay_factors.append(new_decay_factor)
+    new_decay_factors = calculate_frame_decay_factor(
+        frame_reference_time=np.asarray(frame_reference_times),
+        half_life=half_life)
 
-    corrected_image = ants.from_numpy_like(data=corrected_data,
-                                           image=uncorrected_image)
+    if stream:
+        corrected_image = None
+        scale_frames_to_file(input_image_path=input_image_path,
+                             output_image_path=output_image_path,
+                             scalar_arr=new_decay_factors)
+    else:
+        corrected_image = scale_frames(input_img=ants.image_read(filename=input_image_path),
+                                       scalar_arr=new_decay_factors,
+                                       in_place=True)
 
     if output_image_path is not None:
-        ants.image_write(image=corrected_image,
-                         filename=output_image_path)
+        if corrected_image is not None:
+            ants.image_write(image=corrected_image,
+                             filename=output_image_path)
         output_json_path = image_io.gen_meta_data_filepath_for_nifti(nifty_path=output_image_path)
-        json_data['DecayFactor'] = new_decay_factors
+        json_data['DecayFactor'] = new_decay_factors.tolist()
         json_data['ImageDecayCorrected'] = "true"
         json_data['ImageDecayCorrectionTime'] = 0
         json_data['FrameReferenceTime'] = frame_reference_times
@@ -154,20 +175,136 @@ def calculate_frame_decay_factor(frame_reference_time: np.ndarray,
     return frame_decay_factor
 
 
-def scale_frames(input_img: ants.ANTsImage, scalar_arr: np.ndarray[float]):
-    nframes = input_img.shape[-1]
+def decay_recorrection_factors(input_image_path: str,
+                               metadata_dict: dict) -> tuple[np.ndarray, dict]:
+    """Factors that undo the decay correction of an image and redo it with the frame times in
+    `metadata_dict`, without reading or writing any image.
+
+    Scaling each frame by its factor gives the same image as :func:`undo_decay_correction`
+    followed by :func:`decay_correct`, where `metadata_dict` holds the frame times of the
+    intermediate image, such as frame times shifted to a new TimeZero.
+
+    Args:
+        input_image_path (str): Path to the decay corrected image. Its .json sidecar provides the
+            applied decay factors and the half-life.
+        metadata_dict (dict): Metadata with the frame times to decay correct to.
+
+    Returns:
+        tuple[np.ndarray, dict]: Factor for each frame, and a copy of `metadata_dict` updated with
+            the new decay factors and frame reference times, as written by :func:`decay_correct`.
+    """
+    original_decay_factors = ScanTimingInfo.from_nifti(image_path=input_image_path).decay
+    half_life = image_io.get_half_life_from_nifti(image_path=input_image_path)
+
+    frame_info = ScanTimingInfo.from_metadata(metadata_dict=metadata_dict)
+    frame_reference_times = np.asarray(frame_info.start + frame_info.duration / 2.0, float)
+    new_decay_factors = calculate_frame_decay_factor(frame_reference_time=frame_reference_times,
+                                                     half_life=half_life)
+
+    corrected_metadata = dict(metadata_dict)
+    corrected_metadata['DecayFactor'] = new_decay_factors.tolist()
+    corrected_metadata['ImageDecayCorrected'] = "true"
+    corrected_metadata['ImageDecayCorrectionTime'] = 0
+    corrected_metadata['FrameReferenceTime'] = frame_reference_times.tolist()
+    return new_decay_factors / original_decay_factors, corrected_metadata
+
+
+def _check_num_scalars(nframes: int, scalar_arr: np.ndarray[float]):
+    """Raise a ValueError if there is not exactly one scalar per frame."""
     nscalar = len(scalar_arr)
     if nframes!=nscalar:
         raise ValueError(f"Length of correction factors ({nscalar}) does not "
                          f"match number of frames in dynamic PET ({nframes}).")
-    modified_arr = ants.image_clone(input_img)
-    for frame, scalar in enumerate(scalar_arr):
-        modified_arr[:,:,:,frame] *= scalar
-    return modified_arr
+
+
+def scale_frame_array(frame_arr: np.ndarray, scalar_arr: np.ndarray[float]) -> np.ndarray:
+    """Multiply each frame of a 4D array by its scalar, in place.
+
+    The scalars are cast to the array's data type and broadcast over the time axis, so a float32
+    image is scaled in float32 without a temporary copy.
+
+    Args:
+        frame_arr (np.ndarray): 4D floating point array with frames along the last axis. Modified
+            in place.
+        scalar_arr (np.ndarray[float]): One scalar per frame.
+
+    Returns:
+        np.ndarray: `frame_arr`, scaled.
+
+    Raises:
+        ValueError: If the number of scalars does not match the number of frames.
+    """
+    _check_num_scalars(nframes=frame_arr.shape[-1], scalar_arr=scalar_arr)
+    np.multiply(frame_arr, np.asarray(scalar_arr, dtype=frame_arr.dtype), out=frame_arr)
+    return frame_arr
+
+
+def scale_frames(input_img: ants.ANTsImage,
+                 scalar_arr: np.ndarray[float],
+                 in_place: bool = False) -> ants.ANTsImage:
+    """Multiply each frame of a dynamic PET image by its scalar.
+
+    Scaling is done on a view of the image's voxel buffer with :func:`scale_frame_array`.
+
+    Args:
+        input_img (ants.ANTsImage): 4D image.
+        scalar_arr (np.ndarray[float]): One scalar per frame.
+        in_place (bool): If True and `input_img` has float pixels, scale `input_img` itself
+            instead of a copy. Default False.
+
+    Returns:
+        ants.ANTsImage: Scaled image, with float pixels.
+
+    Raises:
+        ValueError: If the number of scalars does not match the number of frames.
+    """
+    _check_num_scalars(nframes=input_img.shape[-1], scalar_arr=scalar_arr)
+    if in_place and input_img.pixeltype == 'float':
+        modified_img = input_img
+    else:
+        modified_img = ants.image_clone(input_img, pixeltype='float')
+    scale_frame_array(frame_arr=modified_img.view(), scalar_arr=scalar_arr)
+    return modified_img
+
+
+def scale_frames_to_file(input_image_path: str,
+                         output_image_path: str,
+                         scalar_arr: np.ndarray[float]):
+    """Multiply each frame of a dynamic PET image on disk by its scalar and write the result,
+    one frame at a time.
+
+    Frames are read with :func:`~petpal.utils.image_io.iter_nifti_frames` and written with
+    :func:`~petpal.utils.image_io.write_nifti_frames`, so peak memory is one frame. The output has
+    the header of the input image and float32 data. Metadata is not copied.
+
+    Args:
+        input_image_path (str): Path to 4D NIfTI image.
+        output_image_path (str): Path to which the scaled image is written.
+        scalar_arr (np.ndarray[float]): One scalar per frame.
+
+    Raises:
+        ValueError: If the number of scalars does not match the number of frames.
+    """
+    nframes = nibabel.load(input_image_path).shape[-1]
+    _check_num_scalars(nframes=nframes, scalar_arr=scalar_arr)
+    scalars = np.asarray(scalar_arr, dtype=np.float32)
+
+    def scaled_frames():
+        frames = image_io.iter_nifti_frames(image_path=input_image_path, dtype=np.float32)
+        for frame, scalar in zip(frames, scalars):
+            yield frame * scalar
+
+    image_io.write_nifti_frames(out_image_path=output_image_path,
+                                frames=scaled_frames(),
+                                template_image_path=input_image_path,
+                                num_frames=nframes)
 
 
 class DecayCorrect:
     """Decay correct or uncorrect each frame in a dynamic PET scan.
+
+    Frames are scaled in place in the loaded image, or, with ``stream=True``, read, scaled and
+    written one at a time so that the image is never fully loaded.
     
     :ivar image_loader: The image loader to use.
     :ivar modified_pet_img: The corrected PET image."""
@@ -188,7 +325,26 @@ class DecayCorrect:
                 line."""
 
         input_img = self.image_loader.load(filename=input_image_path)
-        self.modified_pet_img = scale_frames(input_img=input_img, scalar_arr=correction_factor)
+        self.modified_pet_img = scale_frames(input_img=input_img,
+                                             scalar_arr=correction_factor,
+                                             in_place=True)
+
+    def stream_factor(self,
+                      input_image_path: str,
+                      output_image_path: str,
+                      correction_factor: np.ndarray[float]):
+        """Apply correction factors to the image on disk one frame at a time and save the result
+        with the input metadata. Bypasses `image_loader`, and leaves `modified_pet_img` unset.
+
+        Args:
+            input_image_path (str): Path to dynamic PET image.
+            output_image_path (str): Path to where corrected image is saved.
+            correction_factor (np.ndarray[float]): Correction factor for each frame.
+        """
+        scale_frames_to_file(input_image_path=input_image_path,
+                             output_image_path=output_image_path,
+                             scalar_arr=correction_factor)
+        safe_copy_meta(input_image_path, out_image_path=output_image_path)
     
     def save_modified_pet(self, input_image_path: str, output_image_path: str):
         """Save the modified PET image
@@ -203,7 +359,8 @@ class DecayCorrect:
     def decay_correct_factor_from_file(self,
                                        input_image_path: str,
                                        output_image_path: str,
-                                       correction_factor_path: str):
+                                       correction_factor_path: str,
+                                       stream: bool = False):
         """Apply a set of correction factors to each frame in a PET image.
         
         Provide path to dynamic PET image, path to where corrected image is saved, and path to a
@@ -218,8 +375,14 @@ class DecayCorrect:
             correction_factor_path (str): Path to file with correction factors, one per frame. 
                 File must have exactly one column, with a header followed by one scalar per
                 line.
+            stream (bool): If True, scale and write the image one frame at a time. Default False.
         """
         correction_factor = pd.read_csv(correction_factor_path,index_col=False).iloc[:,0]
+        if stream:
+            self.stream_factor(input_image_path=input_image_path,
+                               output_image_path=output_image_path,
+                               correction_factor=correction_factor)
+            return
         self.apply_factor(input_image_path=input_image_path,
                           correction_factor=correction_factor)
         self.save_modified_pet(input_image_path=input_image_path,
@@ -253,7 +416,8 @@ class DecayFix(DecayCorrect):
     def __call__(self,                 
                 input_image_path: str,
                 output_image_path: str,
-                isotope_to_remove: str):
+                isotope_to_remove: str,
+                stream: bool = False):
         """Calculate correction factor based on the accurate metadata and name of the isotope
         incorrectly used to scale image data.
 
@@ -262,9 +426,15 @@ class DecayFix(DecayCorrect):
             output_image_path (str): Path to where corrected image is saved.
             isotope_to_remove (str): Name of the isotope that was incorrectly used to scale dynamic
                 PET image, such as 'o15' or 'c11'.
+            stream (bool): If True, scale and write the image one frame at a time. Default False.
         """
         correction_factor = self.fix_factor(input_image_path=input_image_path,
                                             isotope_to_remove=isotope_to_remove)
+        if stream:
+            self.stream_factor(input_image_path=input_image_path,
+                               output_image_path=output_image_path,
+                               correction_factor=correction_factor)
+            return
         self.apply_factor(input_image_path=input_image_path,
                           correction_factor=correction_factor)
         self.save_modified_pet(input_image_path=input_image_path,
@@ -0,0 +1,147 @@
+"""
+Frame-parallel application of transforms to dynamic PET images.
+
+Applying transforms to a 4D image frame by frame, collecting the frames in a list and stacking
+them back into a 4D image keeps two copies of the output in memory and resamples one frame at a
+time. :func:`apply_transforms_to_frames` resamples the frames in a pool of threads or processes
+and writes each one directly into a preallocated 4D output array.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import ants
+import numpy as np
+
+
+_RESAMPLE_WORKER_STATE = {}
+
+
+def write_frame_transforms(frame_xfms: list[str | ants.ANTsTransform],
+                           xfm_dir: str | None) -> list[str]:
+    """Get a transform file path for each frame, writing ANTs transforms to files in `xfm_dir`.
+
+    Transform file paths are passed through unchanged. Each distinct transform object is written
+    once, since frames in the same motion correction window share the same transform. The caller
+    owns `xfm_dir`, typically a :class:`tempfile.TemporaryDirectory` that lives as long as the
+    paths are used.
+
+    Args:
+        frame_xfms (list[str | ants.ANTsTransform]): Transform file path or ANTs transform of each
+            frame.
+        xfm_dir (str | None): Directory in which ANTs transforms are written. Only used if
+            `frame_xfms` holds ANTs transforms.
+
+    Returns:
+        frame_xfm_paths (list[str]): Transform file path of each frame.
+    """
+    written_xfm_paths = {}
+    frame_xfm_paths = []
+    for frame_xfm in frame_xfms:
+        if isinstance(frame_xfm, ants.ANTsTransform):
+            if id(frame_xfm) not in written_xfm_paths:
+                xfm_path = os.path.join(xfm_dir, f'frame_xfm_{len(written_xfm_paths)}.h5')
+                ants.write_transform(frame_xfm, xfm_path)
+                written_xfm_paths[id(frame_xfm)] = xfm_path
+            frame_xfm = written_xfm_paths[id(frame_xfm)]
+        frame_xfm_paths.append(frame_xfm)
+    return frame_xfm_paths
+
+
+def timeseries_from_frame_array(frame_arr: np.ndarray,
+                                template_img: ants.ANTsImage) -> ants.ANTsImage:
+    """Make a 4D image from an array of frames in the space of a 3D template image.
+
+    The 4D image has the same spacing, origin and direction as
+    :func:`~petpal.utils.dimension.timeseries_from_img_list` would give.
+
+    Args:
+        frame_arr (np.ndarray): 4D array with frames along the last axis.
+        template_img (ants.ANTsImage): 3D image with the same spatial shape as `frame_arr`.
+
+    Returns:
+        timeseries_img (ants.ANTsImage): 4D image.
+    """
+    direction_4d = np.eye(4)
+    direction_4d[:3, :3] = template_img.direction
+    return ants.from_numpy(frame_arr,
+                           origin=(*template_img.origin, 0.0),
+                           spacing=(*template_img.spacing, 1.0),
+                           direction=direction_4d)
+
+
+def _init_resample_worker(reference_img: ants.ANTsImage, interpolator: str):
+    """Store the reference image and interpolator shared by every frame in a worker process."""
+    _RESAMPLE_WORKER_STATE.update(reference_img=reference_img, interpolator=interpolator)
+
+
+def _resample_frame_in_worker(frame_img: ants.ANTsImage, transformlist: list[str]) -> np.ndarray:
+    """Resample one frame in a worker process and return its voxel array."""
+    return ants.apply_transforms(fixed=_RESAMPLE_WORKER_STATE['reference_img'],
+                                 moving=frame_img,
+                                 transformlist=transformlist,
+                                 interpolator=_RESAMPLE_WORKER_STATE['interpolator']).numpy()
+
+
+def apply_transforms_to_frames(input_img: ants.ANTsImage,
+                               reference_img: ants.ANTsImage,
+                               frame_transformlists: list[list[str]] | list[str] | str,
+                               interpolator: str = 'linear',
+                               num_workers: int = 1,
+                               use_processes: bool = False) -> ants.ANTsImage:
+    """Apply transforms to every frame of a 4D image, in parallel over frames.
+
+    Each frame is resampled with :func:`ants.apply_transforms` and written into one preallocated
+    4D output array.
+
+    Args:
+        input_img (ants.ANTsImage): 4D image to resample.
+        reference_img (ants.ANTsImage): 3D image defining the output space and sampling grid.
+        frame_transformlists (list[list[str]] | list[str] | str): Transform list of each frame, in
+            :func:`ants.apply_transforms` order, or a single transform list or transform file
+            applied to every frame.
+        interpolator (str): Interpolator passed on to :func:`ants.apply_transforms`. Default
+            'linear'.
+        num_workers (int): Number of frames resampled at the same time. Default 1, which resamples
+            the frames one at a time in the current thread.
+        use_processes (bool): If True, resample frames in worker processes instead of threads.
+            Default False.
+
+    Returns:
+        xfm_img (ants.ANTsImage): 4D image resampled into the space of `reference_img`.
+
+    Raises:
+        ValueError: If the number of transform lists does not match the number of frames.
+    """
+    frame_imgs = ants.ndimage_to_list(input_img)
+    num_frames = len(frame_imgs)
+    if isinstance(frame_transformlists, str):
+        frame_transformlists = [frame_transformlists]
+    if not frame_transformlists or isinstance(frame_transformlists[0], str):
+        frame_transformlists = [list(frame_transformlists)] * num_frames
+    if len(frame_transformlists) != num_frames:
+        raise ValueError(f"Got {len(frame_transformlists)} transform lists for an image with "
+                         f"{num_frames} frames.")
+
+    out_arr = np.zeros((*reference_img.shape, num_frames), dtype=np.float32)
+
+    def resample_frame(frame_index: int):
+        out_arr[..., frame_index] = ants.apply_transforms(
+            fixed=reference_img,
+            moving=frame_imgs[frame_index],
+            transformlist=frame_transformlists[frame_index],
+            interpolator=interpolator).numpy()
+
+    if num_workers <= 1 or num_frames <= 1:
+        for frame_index in range(num_frames):
+            resample_frame(frame_index)
+    elif use_processes:
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 initializer=_init_resample_worker,
+                                 initargs=(reference_img, interpolator)) as executor:
+            frame_arrs = executor.map(_resample_frame_in_worker, frame_imgs, frame_transformlists)
+            for frame_index, frame_arr in enumerate(frame_arrs):
+                out_arr[..., frame_index] = frame_arr
+    else:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            list(executor.map(resample_frame, range(num_frames)))
+
+    return timeseries_from_frame_array(frame_arr=out_arr, template_img=reference_img)
@@ -0,0 +1,298 @@
+r"""
+Multi-scale Hessian objectness (vesselness) of 3D images, implemented with NumPy and SciPy.
+
+This is an in-process version of :func:`ants.hessian_objectness`, which wraps ITK's
+``MultiScaleHessianBasedMeasureImageFilter`` with the ``HessianToObjectnessMeasureImageFilter``
+of Antiga's Insight Journal paper (http://hdl.handle.net/1926/576). At each scale
+:math:`\sigma`, the scale-normalized Hessian :math:`\sigma^2 \nabla^2 (G_\sigma * I)` is computed
+with Gaussian derivative filters, its eigenvalues are sorted by magnitude, and the objectness
+measure is computed voxel-wise from the eigenvalue ratios. The output is the maximum measure over
+scales.
+
+Differences from the ITK filter:
+
+    * The Gaussian derivatives are sampled kernels (:func:`scipy.ndimage.gaussian_filter1d`)
+      rather than ITK's recursive approximation, so values differ slightly.
+    * The six Hessian components of a scale share their 1D filter passes: smoothing and
+      differentiating along x is done once for all components, and so on along y and z, which
+      takes 15 1D passes instead of 18.
+    * Scales are computed in parallel threads.
+    * A bounding box, such as the neck in the field of view of a brain PET scan, restricts the
+      computation to a slab. The slab is padded by the radius of the widest kernel, so the result
+      inside the box is the same as for the whole image.
+
+Example:
+
+    .. code-block:: python
+
+        import ants
+        from petpal.preproc.hessian_objectness import multiscale_hessian_objectness
+
+        pet_img = ants.image_read('sub-001_desc-early_pet.nii.gz')
+        vesselness_arr = multiscale_hessian_objectness(image_arr=pet_img.numpy(),
+                                                       spacing=pet_img.spacing,
+                                                       sigma_min=2.0,
+                                                       sigma_max=8.0,
+                                                       bounding_box=((0, 128), (0, 128), (0, 30)),
+                                                       num_workers=4)
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scipy.ndimage import gaussian_filter1d
+
+
+def sigma_steps(sigma_min: float,
+                sigma_max: float,
+                number_of_sigma_steps: int = 10,
+                use_sigma_logarithmic_spacing: bool = True) -> np.ndarray:
+    """Scales of the multi-scale filter, spaced as in :func:`ants.hessian_objectness`.
+
+    Args:
+        sigma_min (float): Smallest scale.
+        sigma_max (float): Largest scale.
+        number_of_sigma_steps (int): Number of scales. If less than 2, only `sigma_min` is used.
+            Default 10.
+        use_sigma_logarithmic_spacing (bool): If True, scales are evenly spaced in log scale,
+            otherwise linearly. Default True.
+
+    Returns:
+        sigmas (np.ndarray): The scales.
+    """
+    if number_of_sigma_steps < 2:
+        return np.asarray([sigma_min], dtype=float)
+    if use_sigma_logarithmic_spacing:
+        return np.geomspace(sigma_min, sigma_max, number_of_sigma_steps)
+    return np.linspace(sigma_min, sigma_max, number_of_sigma_steps)
+
+
+def gaussian_hessian(image_arr: np.ndarray,
+                     sigma: float,
+                     spacing: tuple[float, float, float] = (1.0, 1.0, 1.0),
+                     truncate: float = 4.0) -> dict[tuple[int, int], np.ndarray]:
+    r"""Scale-normalized Hessian of a 3D image at one scale, from Gaussian derivative filters.
+
+    The component :math:`(i, j)` is :math:`\sigma^2 \partial_i \partial_j (G_\sigma * I)`, with
+    :math:`\sigma` and the derivatives in physical units. Each 1D pass is shared by all the
+    components that need it.
+
+    Args:
+        image_arr (np.ndarray): 3D image.
+        sigma (float): Scale, in the units of `spacing`.
+        spacing (tuple[float, float, float]): Voxel size along each axis. Default 1.
+        truncate (float): Kernel radius in units of sigma. Default 4.0.
+
+    Returns:
+        hessian (dict[tuple[int, int], np.ndarray]): The six components, keyed by axis pairs
+            ``(i, j)`` with ``i <= j``.
+    """
+    sigma_vox = [sigma / spacing_i for spacing_i in spacing]
+
+    def derivative(arr, axis, order):
+        return gaussian_filter1d(arr, sigma=sigma_vox[axis], axis=axis, order=order,
+                                 truncate=truncate, output=np.float64)
+
+    # Derivative orders along (x, y, z) of each component.
+    component_orders = {(0, 0): (2, 0, 0), (0, 1): (1, 1, 0), (0, 2): (1, 0, 1),
+                        (1, 1): (0, 2, 0), (1, 2): (0, 1, 1), (2, 2): (0, 0, 2)}
+    partials = {(): np.asarray(image_arr, dtype=np.float64)}
+    for axis in range(3):
+        needed = {orders[:axis + 1] for orders in component_orders.values()}
+        partials = {prefix: derivative(partials[prefix[:-1]], axis=axis, order=prefix[-1])
+                    for prefix in sorted(needed)}
+
+    hessian = {}
+    for (i, j), orders in component_orders.items():
+        hessian[(i, j)] = partials[orders] * (sigma ** 2 / (spacing[i] * spacing[j]))
+    return hessian
+
+
+def symmetric_eigenvalues(hessian: dict[tuple[int, int], np.ndarray]) -> np.ndarray:
+    """Eigenvalues of a field of symmetric 3x3 matrices, in closed form.
+
+    Uses the trigonometric solution of the characteristic polynomial, which is vectorized over
+    voxels and avoids building a ``(..., 3, 3)`` array for :func:`numpy.linalg.eigvalsh`.
+
+    Args:
+        hessian (dict[tuple[int, int], np.ndarray]): Upper triangle of the matrices, as returned
+            by :func:`gaussian_hessian`.
+
+    Returns:
+        eigenvalues (np.ndarray): Array with the eigenvalues of each matrix along the last axis,
+            in descending order.
+    """
+    h_xx, h_xy, h_xz = hessian[(0, 0)], hessian[(0, 1)], hessian[(0, 2)]
+    h_yy, h_yz, h_zz = hessian[(1, 1)], hessian[(1, 2)], hessian[(2, 2)]
+    mean_diag = (h_xx + h_yy + h_zz) / 3.0
+    d_xx, d_yy, d_zz = h_xx - mean_diag, h_yy - mean_diag, h_zz - mean_diag
+    off_diag_sq = h_xy ** 2 + h_xz ** 2 + h_yz ** 2
+    scale = np.sqrt((d_xx ** 2 + d_yy ** 2 + d_zz ** 2 + 2.0 * off_diag_sq) / 6.0)
+
+    det = (d_xx * (d_yy * d_zz - h_yz ** 2)
+           - h_xy * (h_xy * d_zz - h_yz * h_xz)
+           + h_xz * (h_xy * h_yz - d_yy * h_xz))
+    half_det = np.divide(det, 2.0 * scale ** 3, out=np.zeros_like(det), where=scale > 0)
+    phi = np.arccos(np.clip(half_det, -1.0, 1.0)) / 3.0
+
+    eig_max = mean_diag + 2.0 * scale * np.cos(phi)
+    eig_min = mean_diag + 2.0 * scale * np.cos(phi + 2.0 * np.pi / 3.0)
+    eig_mid = 3.0 * mean_diag - eig_max - eig_min
+    return np.stack([eig_max, eig_mid, eig_min], axis=-1)
+
+
+def objectness_measure(eigenvalues: np.ndarray,
+                       alpha: float = 0.5,
+                       beta: float = 0.5,
+                       gamma: float = 5.0,
+                       object_dimension: int = 1,
+                       is_bright_object: bool = True,
+                       set_scale_objectness_measure: bool = True) -> np.ndarray:
+    r"""Hessian objectness measure of ITK's ``HessianToObjectnessMeasureImageFilter``.
+
+    With the eigenvalues sorted by magnitude, :math:`|\lambda_1| \le |\lambda_2| \le |\lambda_3|`,
+    and :math:`M` the object dimension, the measure is zero unless
+    :math:`\lambda_{M+1}, \ldots, \lambda_3` have the sign of the object (negative for bright
+    objects). Otherwise it is the product of :math:`1 - e^{-R_A^2 / 2\alpha^2}`,
+    :math:`e^{-R_B^2 / 2\beta^2}` and :math:`1 - e^{-S^2 / 2\gamma^2}`, where :math:`R_A` and
+    :math:`R_B` are eigenvalue ratios and :math:`S` is the Frobenius norm, optionally scaled by
+    :math:`|\lambda_3|`.
+
+    Args:
+        eigenvalues (np.ndarray): Hessian eigenvalues along the last axis, in any order.
+        alpha (float): Weight of the plate-vs-line ratio :math:`R_A`. Default 0.5.
+        beta (float): Weight of the blob-vs-line ratio :math:`R_B`. Default 0.5.
+        gamma (float): Weight of the structureness :math:`S`. Default 5.0.
+        object_dimension (int): 0 for blobs, 1 for lines (vessels), 2 for plates. Default 1.
+        is_bright_object (bool): If True, enhance bright objects, otherwise dark ones.
+            Default True.
+        set_scale_objectness_measure (bool): If True, multiply the measure by the largest
+            eigenvalue magnitude. Default True.
+
+    Returns:
+        objectness (np.ndarray): Measure of each voxel.
+    """
+    num_dims = eigenvalues.shape[-1]
+    order = np.argsort(np.abs(eigenvalues), axis=-1)
+    sorted_eigs = np.take_along_axis(eigenvalues, order, axis=-1)
+    abs_eigs = np.abs(sorted_eigs)
+
+    object_eigs = sorted_eigs[..., object_dimension:]
+    if is_bright_object:
+        sign_ok = np.all(object_eigs <= 0, axis=-1)
+    else:
+        sign_ok = np.all(object_eigs >= 0, axis=-1)
+    objectness = sign_ok.astype(float)
+
+    if object_dimension < num_dims - 1:
+        ra_base = np.prod(abs_eigs[..., object_dimension + 1:], axis=-1)
+        objectness[ra_base <= 0] = 0.0
+        if alpha != 0:
+            ra_denominator = np.power(ra_base, 1.0 / (num_dims - object_dimension - 1))
+            ra = np.divide(abs_eigs[..., object_dimension], ra_denominator,
+                           out=np.zeros_like(ra_base), where=ra_base > 0)
+            objectness *= 1.0 - np.exp(-0.5 * ra ** 2 / alpha ** 2)
+
+    if object_dimension > 0:
+        rb_base = np.prod(abs_eigs[..., object_dimension:], axis=-1)
+        if beta == 0:
+            objectness[...] = 0.0
+        else:
+            objectness[rb_base <= 0] = 0.0
+            rb_denominator = np.power(rb_base, 1.0 / (num_dims - object_dimension))
+            rb = np.divide(abs_eigs[..., object_dimension - 1], rb_denominator,
+                           out=np.zeros_like(rb_base), where=rb_base > 0)
+            objectness *= np.exp(-0.5 * rb ** 2 / beta ** 2)
+
+    if gamma != 0:
+        frobenius_norm_sq = np.sum(abs_eigs ** 2, axis=-1)
+        objectness *= 1.0 - np.exp(-0.5 * frobenius_norm_sq / gamma ** 2)
+
+    if set_scale_objectness_measure:
+        objectness *= abs_eigs[..., -1]
+    return objectness
+
+
+def multiscale_hessian_objectness(image_arr: np.ndarray,
+                                  spacing: tuple[float, float, float] = (1.0, 1.0, 1.0),
+                                  sigma_min: float = 0.1,
+                                  sigma_max: float = 10.0,
+                                  number_of_sigma_steps: int = 10,
+                                  use_sigma_logarithmic_spacing: bool = True,
+                                  alpha: float = 0.5,
+                                  beta: float = 0.5,
+                                  gamma: float = 5.0,
+                                  object_dimension: int = 1,
+                                  is_bright_object: bool = True,
+                                  set_scale_objectness_measure: bool = True,
+                                  bounding_box: tuple[tuple[int, int], ...] | None = None,
+                                  num_workers: int = 1) -> np.ndarray:
+    """Maximum over scales of the Hessian objectness measure of a 3D image.
+
+    The arguments and defaults follow :func:`ants.hessian_objectness`. Each scale is computed
+    with :func:`gaussian_hessian`, :func:`symmetric_eigenvalues` and :func:`objectness_measure`,
+    `num_workers` scales at a time, and combined into a running maximum.
+
+    Args:
+        image_arr (np.ndarray): 3D image.
+        spacing (tuple[float, float, float]): Voxel size along each axis, in the units of the
+            scales. Default 1.
+        sigma_min (float): Smallest scale. Default 0.1.
+        sigma_max (float): Largest scale. Default 10.
+        number_of_sigma_steps (int): Number of scales. Default 10.
+        use_sigma_logarithmic_spacing (bool): If True, scales are evenly spaced in log scale.
+            Default True.
+        alpha (float): See :func:`objectness_measure`. Default 0.5.
+        beta (float): See :func:`objectness_measure`. Default 0.5.
+        gamma (float): See :func:`objectness_measure`. Default 5.0.
+        object_dimension (int): See :func:`objectness_measure`. Default 1.
+        is_bright_object (bool): See :func:`objectness_measure`. Default True.
+        set_scale_objectness_measure (bool): See :func:`objectness_measure`. Default True.
+        bounding_box (tuple[tuple[int, int], ...] | None): ``(start, stop)`` voxel indices along
+            each axis, stop excluded, of the region to compute. Voxels outside the box are zero.
+            Default None, which computes the whole image.
+        num_workers (int): Number of scales computed at the same time. Default 1.
+
+    Returns:
+        objectness_arr (np.ndarray): float32 array of the shape of `image_arr`.
+    """
+    image_arr = np.asarray(image_arr)
+    spacing = tuple(float(spacing_i) for spacing_i in spacing[:3])
+    sigmas = sigma_steps(sigma_min=sigma_min,
+                         sigma_max=sigma_max,
+                         number_of_sigma_steps=number_of_sigma_steps,
+                         use_sigma_logarithmic_spacing=use_sigma_logarithmic_spacing)
+
+    if bounding_box is None:
+        bounding_box = tuple((0, dim) for dim in image_arr.shape)
+    box = tuple(slice(max(int(start), 0), min(int(stop), dim))
+                for (start, stop), dim in zip(bounding_box, image_arr.shape))
+    pad_radii = [int(4.0 * float(np.max(sigmas)) / spacing_i + 0.5) for spacing_i in spacing]
+    padded_box = tuple(slice(max(box_i.start - radius, 0), min(box_i.stop + radius, dim))
+                       for box_i, radius, dim in zip(box, pad_radii, image_arr.shape))
+    inner_box = tuple(slice(box_i.start - padded_i.start, box_i.stop - padded_i.start)
+                      for box_i, padded_i in zip(box, padded_box))
+    slab_arr = image_arr[padded_box]
+
+    def objectness_at_scale(sigma: float) -> np.ndarray:
+        hessian = gaussian_hessian(image_arr=slab_arr, sigma=sigma, spacing=spacing)
+        hessian = {key: component[inner_box] for key, component in hessian.items()}
+        return objectness_measure(eigenvalues=symmetric_eigenvalues(hessian),
+                                  alpha=alpha,
+                                  beta=beta,
+                                  gamma=gamma,
+                                  object_dimension=object_dimension,
+                                  is_bright_object=is_bright_object,
+                                  set_scale_objectness_measure=set_scale_objectness_measure)
+
+    box_objectness = np.zeros([box_i.stop - box_i.start for box_i in box], dtype=float)
+    if num_workers <= 1 or len(sigmas) <= 1:
+        for sigma in sigmas:
+            np.maximum(box_objectness, objectness_at_scale(sigma), out=box_objectness)
+    else:
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            for scale_objectness in executor.map(objectness_at_scale, sigmas):
+                np.maximum(box_objectness, scale_objectness, out=box_objectness)
+
+    objectness_arr = np.zeros(image_arr.shape, dtype=np.float32)
+    objectness_arr[box] = box_objectness
+    return objectness_arr
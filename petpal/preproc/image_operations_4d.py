@@ -16,7 +16,7 @@ TODO:
     *   (stitch_broken_scans) Separate 'add desc entity' section to its own function somewhere.
     *   (stitch_broken_scans) Assumes non-BIDS key 'DecayFactor' instead of BIDS-required 'DecayCorrectionFactor' for
         ease-of-use with NIL data. Should be changed in the future.
-    *   (stitch_broken_scans) Currently writes intermediate files even if output_image_path is None.
+    *   (stitch_broken_scans) By default, writes intermediate files even if output_image_path is None.
 
 """
 import pathlib
@@ -27,11 +27,12 @@ import numpy as np
 from scipy.ndimage import center_of_mass
 
 from ..utils import image_io, math_lib
-from .decay_correction import undo_decay_correction, decay_correct
+from .decay_correction import undo_decay_correction, decay_correct, decay_recorrection_factors
 
 def stitch_broken_scans(input_image_path: str,
                         output_image_path: str,
-                        noninitial_image_paths: list[str]) -> ants.ANTsImage:
+                        noninitial_image_paths: list[str],
+                        write_intermediate_images: bool = True) -> ants.ANTsImage:
     """
     'Stitch' together 2 or more images from one session into a single image.
 
@@ -42,19 +43,28 @@ def stitch_broken_scans(input_image_path: str,
 
     Important: All noninitial images must be registered to the first image prior to calling this function.
 
+    Decay correction of the noninitial images is streamed to the intermediate files one frame at a time, and the
+    stitched image is filled frame by frame, so at most one full 4D image is held in memory.
+
+    With `write_intermediate_images` set to False, no intermediate files are written. The factors that undo and redo
+    the decay correction of each noninitial image are combined from the metadata with
+    :func:`~petpal.preproc.decay_correction.decay_recorrection_factors`, and each frame is read, scaled and written
+    directly into the stitched image.
+
     Args:
         input_image_path (str): Path to the initial image captured during PET session. 'TimeZero' from this image will be considered
             as the true value to correct the rest of the images to.
         output_image_path (str): Path to which the stitched image will be written. If None, no file will be written.
         noninitial_image_paths (list[str]): Path(s) to 1 or more additional images containing data from broken sections
             of the PET session. Note that all images must be registered to the first (input_image_path).
+        write_intermediate_images (bool): If True, write the 'desc-nodecaycorrect' and 'desc-decayredone' images
+            (and .json sidecars) next to each noninitial image. Default True.
 
     Returns:
         ants.ANTsImage: stitched image
     """
 
-    initial_image = ants.image_read(filename=input_image_path)
-    initial_image_data = initial_image.numpy()
+    initial_image_info = ants.image_header_info(input_image_path)
     initial_image_metadata = image_io.load_metadata_for_nifti_with_same_filename(image_path=input_image_path)
     noninitial_image_metadata_dicts = [image_io.load_metadata_for_nifti_with_same_filename(image_path=path)
                                        for path in noninitial_image_paths]
@@ -80,28 +90,39 @@ def stitch_broken_scans(input_image_path: str,
         additional_image_metadata['FrameTimesStart'] = [t+t_d.total_seconds() for t in original_frame_times_start]
         additional_image_metadata['TimeZero'] = actual_time_zero
 
-    corrected_arrays = [initial_image_data]
+    stitched_image_paths = [input_image_path]
+    stitched_image_factors = [None]
     new_metadata = initial_image_metadata
 
     for additional_image_path, metadata in zip(noninitial_image_paths,noninitial_image_metadata_dicts):
 
-        original_path = pathlib.Path(additional_image_path)
-        original_stem = original_path.stem
-        split_stem = original_stem.split("_")
-        split_stem.insert(-1, "desc-nodecaycorrect")
-        new_stem = "_".join(split_stem)
-        new_path = str(original_path).replace(original_stem, new_stem)
-
-        undo_decay_correction(input_image_path=additional_image_path,
-                              output_image_path=new_path,
-                              metadata_dict=metadata)
-
-        corrected_image_path = new_path.replace("desc-nodecaycorrect", "desc-decayredone")
-        corrected_image = decay_correct(input_image_path=new_path,
-                                        output_image_path=corrected_image_path)
+        if write_intermediate_images:
+            original_path = pathlib.Path(additional_image_path)
+            original_stem = original_path.stem
+            split_stem = original_stem.split("_")
+            split_stem.insert(-1, "desc-nodecaycorrect")
+            new_stem = "_".join(split_stem)
+            new_path = str(original_path).replace(original_stem, new_stem)
+
+            undo_decay_correction(input_image_path=additional_image_path,
+                                  output_image_path=new_path,
+                                  metadata_dict=metadata,
+                                  stream=True)
+
+            corrected_image_path = new_path.replace("desc-nodecaycorrect", "desc-decayredone")
+            decay_correct(input_image_path=new_path,
+                          output_image_path=corrected_image_path,
+                          stream=True)
+
+            stitched_image_paths.append(corrected_image_path)
+            stitched_image_factors.append(None)
+            updated_metadata = image_io.load_metadata_for_nifti_with_same_filename(image_path=corrected_image_path)
+        else:
+            recorrection_factors, updated_metadata = decay_recorrection_factors(input_image_path=additional_image_path,
+                                                                                metadata_dict=metadata)
+            stitched_image_paths.append(additional_image_path)
+            stitched_image_factors.append(recorrection_factors.astype(np.float32))
 
-        corrected_arrays.append(corrected_image.numpy())
-        updated_metadata = image_io.load_metadata_for_nifti_with_same_filename(image_path=corrected_image_path)
         new_metadata['FrameTimesStart'].extend(updated_metadata['FrameTimesStart'])
         new_metadata['FrameReferenceTime'].extend(updated_metadata['FrameReferenceTime'])
         new_metadata['FrameDuration'].extend(updated_metadata['FrameDuration'])
@@ -109,12 +130,22 @@ def stitch_broken_scans(input_image_path: str,
         new_metadata['ImageDecayCorrected'] = updated_metadata['ImageDecayCorrected']
         new_metadata['ImageDecayCorrectionTime'] = updated_metadata['ImageDecayCorrectionTime']
 
-    stitched_image_array = np.concatenate(corrected_arrays, axis=3)
-
-    stitched_image = ants.from_numpy(data=stitched_image_array,
-                                     origin=initial_image.origin,
-                                     spacing=initial_image.spacing,
-                                     direction=initial_image.direction)
+    num_frames = sum(nibabel.load(path).shape[3] for path in stitched_image_paths)
+    frame_shape = tuple(int(dim) for dim in initial_image_info['dimensions'][:3])
+    stitched_image = ants.make_image(imagesize=(*frame_shape, num_frames),
+                                     spacing=initial_image_info['spacing'],
+                                     origin=initial_image_info['origin'],
+                                     direction=initial_image_info['direction'],
+                                     pixeltype='float')
+    stitched_image_array = stitched_image.view()
+    frame_id = 0
+    for path, factors in zip(stitched_image_paths, stitched_image_factors):
+        for segment_frame_id, frame in enumerate(image_io.iter_nifti_frames(image_path=path, dtype=np.float32)):
+            if factors is None:
+                stitched_image_array[..., frame_id] = frame
+            else:
+                np.multiply(frame, factors[segment_frame_id], out=stitched_image_array[..., frame_id])
+            frame_id += 1
 
     if output_image_path is not None:
         ants.image_write(image=stitched_image,
@@ -308,12 +339,13 @@ def gauss_blur(input_image_path: str,
                blur_size_mm: float,
                out_image_path: str,
                verbose: bool,
-               use_fwhm: bool=True):
+               use_fwhm: bool=True,
+               num_workers: int=1):
     """
     Blur an image with a 3D Gaussian kernal of a provided size in mm. Extracts
     Gaussian sigma from provided blur size, and voxel sizes in the image
-    header. :py:func:`scipy.ndimage.gaussian_filter` is used to apply blurring.
-    Uses wrapper around :meth:`gauss_blur_computation`.
+    header. :class:`~petpal.utils.gaussian_blur.GaussianBlur` is used to apply blurring,
+    frame by frame in float32. Uses wrapper around :meth:`gauss_blur_computation`.
     
     Args:
         input_image_path (str): Path to 3D or 4D input image to be blurred.
@@ -322,18 +354,20 @@ def gauss_blur(input_image_path: str,
         verbose (bool): Set to ``True`` to output processing information.
         use_FWHM (bool): If ``True``, ``blur_size_mm`` is interpreted as the
             FWHM of the Gaussian kernal, rather than the standard deviation.
+        num_workers (int): Number of frames of a 4D image blurred at the same time. Default 1.
 
     Returns:
         out_image (nibabel.nifti1.Nifti1Image): Blurred image in nibabel format.
     """
     input_nibabel = nibabel.load(filename=input_image_path)
-    input_image = input_nibabel.get_fdata()
+    input_image = input_nibabel.get_fdata(dtype=np.float32)
     input_zooms = input_nibabel.header.get_zooms()
 
     blur_image = math_lib.gauss_blur_computation(input_image=input_image,
                                                  blur_size_mm=blur_size_mm,
                                                  input_zooms=input_zooms,
-                                                 use_fwhm=use_fwhm)
+                                                 use_fwhm=use_fwhm,
+                                                 num_workers=num_workers)
 
     out_image = nibabel.nifti1.Nifti1Image(dataobj=blur_image,
                                            affine=input_nibabel.affine,
@@ -359,6 +393,10 @@ def roi_tac(input_image_path: str,
     4D PET image, and region mapping. Computes the average of the PET image 
     within each region. Writes a tsv table with region name, frame start time,
     and mean value within region.
+
+    The PET image is read one frame at a time, so peak memory is a single frame plus the
+    segmentation. Values match
+    :func:`extract_mean_roi_tac_from_nifti_using_segmentation` on the full image.
     """
 
     if time_frame_keyword not in ['FrameReferenceTime', 'FrameTimesStart']:
@@ -366,15 +404,20 @@ def roi_tac(input_image_path: str,
                          "'FrameReferenceTime' or 'FrameTimesStart'")
 
     pet_meta = image_io.load_metadata_for_nifti_with_same_filename(input_image_path)
-    tac_extraction_func = extract_mean_roi_tac_from_nifti_using_segmentation
-    pet_numpy = nibabel.load(input_image_path).get_fdata()
     seg_numpy = nibabel.load(roi_image_path).get_fdata()
+    pet_shape = nibabel.load(input_image_path).shape
+    if seg_numpy.shape[:3]!=pet_shape[:3]:
+        raise ValueError('Mis-match in image shape of segmentation image '
+                         f'({seg_numpy.shape}) and PET image '
+                         f'({pet_shape[:3]}). Consider resampling '
+                         'segmentation to PET or vice versa.')
 
-
-    extracted_tac = tac_extraction_func(input_image_4d_numpy=pet_numpy,
-                                        segmentation_image_numpy=seg_numpy,
-                                        region=region,
-                                        verbose=verbose)
+    if verbose:
+        print(f'Running TAC for region index {region}')
+    masked_voxels = (seg_numpy > region - 0.1) & (seg_numpy < region + 0.1)
+    extracted_tac = np.asarray([np.mean(frame[masked_voxels]) for frame in
+                                image_io.iter_nifti_frames(image_path=input_image_path,
+                                                           dtype=float)])
     region_tac_file = np.array([pet_meta[time_frame_keyword],extracted_tac]).T
     header_text = 'mean_activity'
     np.savetxt(out_tac_path,region_tac_file,delimiter='\t',header=header_text,comments='')
@@ -388,10 +431,16 @@ class SimpleAutoImageCropper(object):
     by thresholding, and crop the image to remove regions outside these boundaries.
     It also supports copying metadata from the original image.
 
+    The boundaries are found on the mean over time of the image, accumulated one frame at a time
+    from the nibabel array proxy (see :meth:`gen_mean_projection`), optionally on every n-th voxel
+    only, and the crop is read by slicing the proxy. The full 4D image is never loaded as a
+    float64 array.
+
     Attributes:
         input_image_path (str): The file path to the input image.
         out_image_path (str): The file path to save the cropped image.
         thresh (float): The threshold value used to determine the boundaries.
+        downsample_factor (int): Spacing, in voxels, of the samples used to find the boundaries.
         verbose (bool): If True, prints information about image shapes.
         input_img_obj (nibabel.Nifti1Image): The loaded input image object.
         crop_img_obj (nibabel.Nifti1Image): The cropped image object.
@@ -423,7 +472,8 @@ class SimpleAutoImageCropper(object):
                  out_image_path: str,
                  thresh_val: float = 1.0e-2,
                  verbose: bool = True,
-                 copy_metadata: bool = True
+                 copy_metadata: bool = True,
+                 downsample_factor: int = 1
                  ):
         r"""
         Initializes the SimpleAutoImageCropper with input image path, output image path, and other
@@ -441,6 +491,9 @@ class SimpleAutoImageCropper(object):
                 True.
             copy_metadata (bool, optional): If True, copies metadata from the original image to the
                 cropped image. Defaults to True.
+            downsample_factor (int, optional): Find the boundaries on every n-th voxel along each
+                spatial axis, which reads less data for uncompressed images. Boundaries are
+                widened to stay conservative. Defaults to 1, which uses every voxel.
 
         Raises:
             AssertionError: If the `thresh_val` is not less than 0.5.
@@ -463,9 +516,12 @@ class SimpleAutoImageCropper(object):
         self.input_image_path = input_image_path
         self.out_image_path = out_image_path
         self.thresh = thresh_val
+        self.downsample_factor = downsample_factor
         self.verbose = verbose
         self.input_img_obj = nibabel.load(self.input_image_path)
-        self.crop_img_obj = self.get_cropped_image(img_obj=self.input_img_obj, thresh=self.thresh)
+        self.crop_img_obj = self.get_cropped_image(img_obj=self.input_img_obj,
+                                                   thresh=self.thresh,
+                                                   downsample_factor=self.downsample_factor)
 
         nibabel.save(filename=self.out_image_path, img=self.crop_img_obj)
         if copy_metadata:
@@ -517,6 +573,32 @@ class SimpleAutoImageCropper(object):
         if tmp_dim == 'z':
             return np.mean(img_arr, axis=(0, 1))
 
+    @staticmethod
+    def gen_mean_projection(img_obj: nibabel.Nifti1Image, downsample_factor: int = 1) -> np.ndarray:
+        r"""
+        Computes the mean over time of a 3D or 4D image, reading one frame at a time.
+
+        Frames are read by slicing the image's array proxy and accumulated into a float64 3D
+        buffer with :func:`~petpal.utils.math_lib.accumulate_weighted_frames`, so peak memory is a
+        few 3D volumes. With `downsample_factor` n, only every n-th voxel along each spatial axis
+        is read.
+
+        Args:
+            img_obj (nibabel.Nifti1Image): The input NIfTI image object.
+            downsample_factor (int, optional): Spacing of the voxels read along each spatial axis.
+                Defaults to 1.
+
+        Returns:
+            np.ndarray: 3D mean image, of shape ``ceil(shape / downsample_factor)``.
+        """
+        step = slice(None, None, downsample_factor)
+        if len(img_obj.shape) < 4:
+            return np.asarray(img_obj.dataobj[step, step, step], dtype=np.float64)
+        num_frames = img_obj.shape[3]
+        frames = (img_obj.dataobj[step, step, step, frame_id] for frame_id in range(num_frames))
+        return math_lib.accumulate_weighted_frames(frames=frames,
+                                                   frame_weights=np.full(num_frames, 1.0 / num_frames))
+
     @staticmethod
     def get_left_and_right_boundary_indices_for_threshold(line_prof: np.ndarray,
                                                           thresh: float = 1e-2):
@@ -556,7 +638,9 @@ class SimpleAutoImageCropper(object):
         return l_ind, r_ind
 
     @staticmethod
-    def get_index_pairs_for_all_dims(img_obj: nibabel.Nifti1Image, thresh: float = 1e-2):
+    def get_index_pairs_for_all_dims(img_obj: nibabel.Nifti1Image,
+                                     thresh: float = 1e-2,
+                                     downsample_factor: int = 1):
         r"""
         Gets the boundary indices for each dimension of the input image based on a threshold value.
 
@@ -567,6 +651,9 @@ class SimpleAutoImageCropper(object):
             img_obj (nibabel.Nifti1Image): The input NIfTI image object.
             thresh (float, optional): The threshold value used to determine the boundaries.
                                       Must be less than 0.5. Defaults to 1e-2.
+            downsample_factor (int, optional): Find the boundaries on every n-th voxel along each
+                spatial axis of :meth:`gen_mean_projection`. Each boundary is mapped back to full
+                resolution and widened by ``downsample_factor - 1`` voxels. Defaults to 1.
 
         Returns:
             tuple: A tuple of boundary index pairs for each dimension, formatted as
@@ -593,27 +680,28 @@ class SimpleAutoImageCropper(object):
                 print(boundaries)
         
         """
-        if len(img_obj.shape) > 3:
-            tmp_data = np.mean(img_obj.get_fdata(), axis=-1)
-        else:
-            tmp_data = img_obj.get_fdata()
+        tmp_data = SimpleAutoImageCropper.gen_mean_projection(img_obj=img_obj,
+                                                              downsample_factor=downsample_factor)
 
         prof_func = SimpleAutoImageCropper.gen_line_profile
         index_func = SimpleAutoImageCropper.get_left_and_right_boundary_indices_for_threshold
 
-        x_line_prof = prof_func(img_arr=tmp_data, dim='x')
-        x_left, x_right = index_func(line_prof=x_line_prof, thresh=thresh)
-
-        y_line_prof = prof_func(img_arr=tmp_data, dim='y')
-        y_left, y_right = index_func(line_prof=y_line_prof, thresh=thresh)
-
-        z_line_prof = prof_func(img_arr=tmp_data, dim='z')
-        z_left, z_right = index_func(line_prof=z_line_prof, thresh=thresh)
+        index_pairs = []
+        for dim_id, dim in enumerate(['x', 'y', 'z']):
+            line_prof = prof_func(img_arr=tmp_data, dim=dim)
+            left, right = index_func(line_prof=line_prof, thresh=thresh)
+            if downsample_factor > 1:
+                left = max(left * downsample_factor - (downsample_factor - 1), 0)
+                right = min(right * downsample_factor + (downsample_factor - 1),
+                            img_obj.shape[dim_id] - 1)
+            index_pairs.append((left, right))
 
-        return (x_left, x_right), (y_left, y_right), (z_left, z_right)
+        return tuple(index_pairs)
 
     @staticmethod
-    def get_cropped_image(img_obj: nibabel.Nifti1Image, thresh: float = 1e-2):
+    def get_cropped_image(img_obj: nibabel.Nifti1Image,
+                          thresh: float = 1e-2,
+                          downsample_factor: int = 1):
         r"""
         Crops the input medical image based on a threshold value.
 
@@ -624,9 +712,12 @@ class SimpleAutoImageCropper(object):
             img_obj (nibabel.Nifti1Image): The input NIfTI image object to be cropped.
             thresh (float, optional): The threshold value used to determine the boundaries.
                                       Must be less than 0.5. Defaults to 1e-2.
+            downsample_factor (int, optional): Spacing of the voxels used to find the boundaries.
+                See :meth:`get_index_pairs_for_all_dims`. Defaults to 1.
 
         Returns:
-            nibabel.Nifti1Image: The cropped NIfTI image object.
+            nibabel.Nifti1Image: The cropped NIfTI image object. Its data is read from the input
+                image's array proxy, within the crop box only.
 
         Raises:
             AssertionError: If the `thresh` value is not less than 0.5.
@@ -651,6 +742,7 @@ class SimpleAutoImageCropper(object):
         
         """
         (x_l, x_r), (y_l, y_r), (z_l, z_r) = SimpleAutoImageCropper.get_index_pairs_for_all_dims(img_obj=img_obj,
-                                                                                                 thresh=thresh)
+                                                                                                 thresh=thresh,
+                                                                                                 downsample_factor=downsample_factor)
 
         return img_obj.slicer[x_l:x_r, y_l:y_r, z_l:z_r, ...]
@@ -4,6 +4,14 @@ Provides methods to motion correct 4D PET data. Includes method
 4D input data to optimize contrast when computing motion correction or
 registration.
 """
+import os
+import sys
+import re
+import time
+import tempfile
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 from warnings import warn
 import ants
@@ -13,17 +21,191 @@ import seaborn as sns
 from scipy.spatial.transform import Rotation
 
 from .motion_target import determine_motion_target
+from .frame_resampling import apply_transforms_to_frames, write_frame_transforms
+from .registration_cache import RegistrationCache
 from ..utils.scan_timing import (ScanTimingInfo,
                                  get_window_index_pairs_from_durations)
 from ..utils.useful_functions import (weighted_series_sum_over_window_indices,
                                       coerce_outpath_extension)
-from ..utils.dimension import timeseries_from_img_list
 from ..utils.image_io import get_half_life_from_nifti, safe_copy_meta
 from ..io.table import TableSaver
 from ..io.image import ImageLoader
 from ..meta.auto_cli import auto_cli
 from .register import RegisterBase
 
+ITK_THREADS_ENV_VAR = 'ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS'
+
+WARM_START_REG_KWARGS = {'aff_iterations': (50, 25, 10),
+                         'aff_shrink_factors': (4, 2, 1),
+                         'aff_smoothing_sigmas': (2, 1, 0)}
+"""Reduced multi-resolution schedule for windows registered from the previous window's
+transform: the coarsest level of the default ANTs schedule is skipped and far fewer iterations
+are allowed at the others. See :meth:`MotionCorrect.register_windows`."""
+
+FIXED_SCHEDULE_TRANSFORMS = ('QuickRigid', 'AffineFast', 'BOLDRigid', 'BOLDAffine')
+"""Transform types for which :func:`ants.registration` sets its own iteration schedule, so a
+different number of levels in :data:`WARM_START_REG_KWARGS` makes the registration fail. Windows
+registered with these types are warm-started from the previous transform only."""
+
+_ANTS_DIAGNOSTIC_PATTERN = re.compile(r'DIAGNOSTIC,\s*(\d+),\s*([-+0-9.eE]+|nan|inf)')
+
+_WINDOW_WORKER_STATE = {}
+
+
+def _stdout_fileno() -> int | None:
+    """File descriptor of stdout, or None if stdout is not backed by one, as in notebooks or when
+    stdout is replaced by a :class:`io.StringIO`."""
+    try:
+        return sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+@contextmanager
+def _capture_stdout_fd(stdout_fd: int):
+    """Capture text written to the stdout file descriptor, including by ANTs' C++ code.
+
+    Yields a list that holds the captured text once the context exits."""
+    captured = []
+    sys.stdout.flush()
+    saved_fd = os.dup(stdout_fd)
+    with tempfile.TemporaryFile(mode='w+b') as capture_file:
+        os.dup2(capture_file.fileno(), stdout_fd)
+        try:
+            yield captured
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved_fd, stdout_fd)
+            os.close(saved_fd)
+            capture_file.seek(0)
+            captured.append(capture_file.read().decode(errors='replace'))
+
+
+def parse_ants_registration_log(registration_log: str) -> tuple[int, float]:
+    """Get the number of iterations and the final metric value from the verbose output of
+    :func:`ants.registration`.
+
+    Args:
+        registration_log (str): Text printed by :func:`ants.registration` with ``verbose=True``.
+
+    Returns:
+        tuple: (iterations, final_metric), the total number of optimizer iterations across all
+            stages and levels, and the last metric value. The metric is NaN if no iterations are
+            found.
+    """
+    diagnostics = _ANTS_DIAGNOSTIC_PATTERN.findall(registration_log)
+    if not diagnostics:
+        return 0, float('nan')
+    return len(diagnostics), float(diagnostics[-1][1])
+
+
+def run_instrumented_registration(fixed: ants.ANTsImage,
+                                  moving: ants.ANTsImage,
+                                  transform_type: str,
+                                  record_convergence: bool = True,
+                                  **reg_kwargs) -> tuple[str, dict]:
+    """Run :func:`ants.registration` and record its run time and convergence.
+
+    With `record_convergence`, registration runs verbosely with its output captured from the
+    stdout file descriptor and parsed by :func:`parse_ants_registration_log`. The output is
+    printed only if ``verbose=True`` is in `reg_kwargs`. If convergence is not requested, or
+    stdout has no file descriptor to capture, registration runs as usual and the iterations and
+    final metric are NaN. If the registration cache is on (see
+    :mod:`~petpal.preproc.registration_cache`), the convergence record is stored with the
+    transform, and a cache hit returns it with ``reg_time_s`` set to the time of the lookup.
+
+    Args:
+        fixed (ants.ANTsImage): Fixed image.
+        moving (ants.ANTsImage): Moving image.
+        transform_type (str): Type of transform used in ants.registration.
+        record_convergence (bool): If True, record the iterations and final metric value.
+            Default True.
+        reg_kwargs (keyword arguments): Keyword arguments passed on to :func:`ants.registration`.
+            Must include ``write_composite_transform=True``.
+
+    Returns:
+        tuple: (xfm_path, convergence), the path to the composite forward transform and a
+            dictionary with ``reg_time_s``, ``iterations`` and ``final_metric``.
+    """
+    reg_kwargs = dict(reg_kwargs)
+    print_log = reg_kwargs.pop('verbose', False)
+    start_time = time.perf_counter()
+    cache = RegistrationCache.from_environment()
+    if cache is not None:
+        cache_key = cache.registration_key(fixed=fixed,
+                                           moving=moving,
+                                           type_of_transform=transform_type,
+                                           reg_kwargs=reg_kwargs)
+        cached = cache.load(cache_key)
+        if cached is not None:
+            convergence = {**cached['metadata'], 'reg_time_s': time.perf_counter() - start_time}
+            return cached['fwdtransforms'], convergence
+    stdout_fd = _stdout_fileno() if record_convergence else None
+    if stdout_fd is None:
+        registration = ants.registration(fixed=fixed,
+                                         moving=moving,
+                                         type_of_transform=transform_type,
+                                         verbose=print_log,
+                                         **reg_kwargs)
+        reg_time = time.perf_counter() - start_time
+        iterations, final_metric = float('nan'), float('nan')
+    else:
+        with _capture_stdout_fd(stdout_fd) as registration_log:
+            registration = ants.registration(fixed=fixed,
+                                             moving=moving,
+                                             type_of_transform=transform_type,
+                                             verbose=True,
+                                             **reg_kwargs)
+        reg_time = time.perf_counter() - start_time
+        if print_log:
+            print(registration_log[0], flush=True)
+        iterations, final_metric = parse_ants_registration_log(registration_log[0])
+    convergence = {'reg_time_s': reg_time,
+                   'iterations': iterations,
+                   'final_metric': final_metric}
+    if cache is not None:
+        cache.store(cache_key, registration, metadata=convergence)
+    return registration['fwdtransforms'], convergence
+
+
+@contextmanager
+def _itk_threads_environment(num_threads: int):
+    """Set the number of ITK threads in the environment inherited by processes started inside the
+    context, and restore the previous value on exit. Does nothing if `num_threads` is 0."""
+    if num_threads <= 0:
+        yield
+        return
+    previous = os.environ.get(ITK_THREADS_ENV_VAR)
+    os.environ[ITK_THREADS_ENV_VAR] = str(num_threads)
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop(ITK_THREADS_ENV_VAR, None)
+        else:
+            os.environ[ITK_THREADS_ENV_VAR] = previous
+
+
+def _init_window_worker(target_img: ants.ANTsImage,
+                        transform_type: str,
+                        reg_kwargs: dict):
+    """Store the registration settings shared by every window in a worker process."""
+    _WINDOW_WORKER_STATE.update(target_img=target_img,
+                                transform_type=transform_type,
+                                reg_kwargs=reg_kwargs)
+
+
+def _register_window_in_worker(window_img: ants.ANTsImage) -> tuple[str, dict]:
+    """Register one window image to the target in a worker process.
+
+    ANTs transforms cannot be pickled, so the path to the composite transform is returned
+    instead, along with the convergence record."""
+    return run_instrumented_registration(fixed=_WINDOW_WORKER_STATE['target_img'],
+                                         moving=window_img,
+                                         transform_type=_WINDOW_WORKER_STATE['transform_type'],
+                                         **_WINDOW_WORKER_STATE['reg_kwargs'])
+
+
 class MotionCorrect(RegisterBase):
     """Run windowed motion correction on an image and save the result.
     
@@ -33,12 +215,22 @@ class MotionCorrect(RegisterBase):
     :ivar target_img: (ants.ANTsImage) Static target image
     :ivar scan_timing: :func:`~petpal.utils.scan_timing.ScanTimingInfo` Dynamic PET scan timing.
     :ivar half_life: (float) Half life of the PET tracer in seconds.
-    :ivar: reg_kwargs: (dict) Keyword arguments passed on to :py:func:`~ants.registration`"""
+    :ivar: reg_kwargs: (dict) Keyword arguments passed on to :py:func:`~ants.registration`
+    :ivar warm_start_reg_kwargs: (dict) Registration arguments replacing `reg_kwargs` for
+        warm-started windows. Defaults to :data:`WARM_START_REG_KWARGS`.
+    :ivar window_convergence: (pd.DataFrame) Run time, iterations and final metric of each window
+        registration from the last call to :meth:`register_windows`.
+    :ivar frame_xfm_paths: (list[str]) Path to the transform file of each frame from the last call
+        to :meth:`register_windows`, e.g. for
+        :class:`~petpal.preproc.transform_chain.TransformChain`."""
     def __init__(self,
                  image_loader: Optional[ImageLoader] = None,
                  table_saver: Optional[TableSaver] = None):
         super().__init__(image_loader)
         self.table_saver = table_saver or TableSaver()
+        self.warm_start_reg_kwargs = dict(WARM_START_REG_KWARGS)
+        self.window_convergence = None
+        self.frame_xfm_paths = None
 
     def window_index_pairs(self, window_duration: float=300) -> np.ndarray:
         """The pair of indices corresponding to each window in the image.
@@ -88,56 +280,143 @@ class MotionCorrect(RegisterBase):
         xfm_out = list(rot_pars)+list(translate_matrix)+list(ants_xfm.fixed_parameters)
         return xfm_out
 
+    def warm_start_kwargs(self, transform_type: str) -> dict:
+        """Registration arguments replacing `reg_kwargs` for a warm-started window.
+
+        This is :attr:`warm_start_reg_kwargs`, except for the transform types in
+        :data:`FIXED_SCHEDULE_TRANSFORMS`, whose iteration schedule is set by
+        :func:`ants.registration` and cannot be replaced.
+
+        Args:
+            transform_type (str): Type of transform used in ants.registration.
+
+        Returns:
+            warm_start_kwargs (dict): Registration arguments for warm-started windows.
+        """
+        if transform_type in FIXED_SCHEDULE_TRANSFORMS:
+            return {}
+        return self.warm_start_reg_kwargs
+
     def register_windows(self,
                          window_duration: float=300,
-                         transform_type: str='DenseRigid') -> list[ants.ANTsTransform]:
+                         transform_type: str='DenseRigid',
+                         num_workers: int=1,
+                         num_threads: int=0,
+                         warm_start: bool=False) -> list[ants.ANTsTransform]:
         """Run motion correction on the input image to the target image.
 
         Creates "windows" by summing over frames with total length equal to `window_duration` and
         registering the window to the target image. Returns the calculated transforms for each
         frame.
 
+        Windows are independent of one another, so with `num_workers` greater than one they are
+        registered in parallel worker processes. A single ANTs registration scales poorly past a
+        few threads, so several registrations with a few ITK threads each use the CPU better than
+        one registration at a time. Workers are started fresh (spawned) so that each applies its
+        own ITK thread count.
+
+        With `warm_start`, every window after the first is registered starting from the previous
+        window's transform, with the reduced multi-resolution schedule from
+        :meth:`warm_start_kwargs`. Adjacent windows usually differ by sub-millimetre motion,
+        so this needs far fewer iterations than starting from the identity. Warm-started windows
+        depend on each other and are always registered one at a time.
+
+        The run time, number of iterations and final metric value of each window registration
+        are stored in :attr:`window_convergence`.
+
         Args:
             window_duration (float): Duration of each window to sum over.
+            transform_type (str): Type of transform used in ants.registration. Default
+                DenseRigid.
+            num_workers (int): Number of worker processes registering windows in parallel.
+                Default 1, which registers the windows one at a time in the current process.
+            num_threads (int): Number of ITK threads used by each registration, set with the
+                environment variable ITK_GLOBAL_DEFAULT_NUMBER_OF_THREADS while the worker
+                processes start. Only applied in worker processes. Default 0, which keeps the ITK
+                default.
+            warm_start (bool): If True, seed each window registration with the previous window's
+                transform. Default False.
 
         Returns:
             window_xfm_stack (list[ants.ANTsTransform]): The transform to apply to each frame
                 calculated based on the window the frame is in."""
         window_xfm_stack = []
         window_index_pairs = self.window_index_pairs(window_duration=window_duration)
-
-        for _, (start_index, end_index) in enumerate(zip(*window_index_pairs)):
-            window_target_img = self.window_target_img(start_index=start_index,
-                                                       end_index=end_index)
-            window_registration = ants.registration(fixed=self.target_img,
-                                                    moving=window_target_img,
-                                                    type_of_transform=transform_type,
-                                                    **self.reg_kwargs)
-            window_xfm = ants.read_transform(window_registration['fwdtransforms'])
+        window_imgs = [self.window_target_img(start_index=start_index, end_index=end_index)
+                       for start_index, end_index in zip(*window_index_pairs)]
+
+        if warm_start and num_workers > 1:
+            warn("Warm-started windows are registered one at a time; ignoring num_workers.")
+        if warm_start or num_workers <= 1 or len(window_imgs) <= 1:
+            window_results = []
+            for window_img in window_imgs:
+                reg_kwargs = self.reg_kwargs
+                if warm_start and window_results:
+                    reg_kwargs = {**self.reg_kwargs,
+                                  **self.warm_start_kwargs(transform_type=transform_type),
+                                  'initial_transform': window_results[-1][0]}
+                window_results.append(run_instrumented_registration(fixed=self.target_img,
+                                                                    moving=window_img,
+                                                                    transform_type=transform_type,
+                                                                    **reg_kwargs))
+        else:
+            with _itk_threads_environment(num_threads=num_threads), \
+                    ProcessPoolExecutor(max_workers=num_workers,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_window_worker,
+                                        initargs=(self.target_img,
+                                                  transform_type,
+                                                  self.reg_kwargs)) as executor:
+                window_results = list(executor.map(_register_window_in_worker, window_imgs))
+
+        window_convergence = pd.DataFrame([convergence for _, convergence in window_results])
+        window_convergence.insert(0, 'start_frame', window_index_pairs[0])
+        window_convergence.insert(1, 'end_frame', window_index_pairs[1])
+        window_convergence['warm_start'] = warm_start & (window_convergence.index > 0)
+        window_convergence.index.name = 'window'
+        self.window_convergence = window_convergence
+
+        frame_xfm_paths = []
+        for (window_xfm_path, _), start_index, end_index in zip(window_results,
+                                                                *window_index_pairs):
+            window_xfm = ants.read_transform(window_xfm_path)
             for _ in range(start_index, end_index):
                 window_xfm_stack.append(window_xfm)
+                frame_xfm_paths.append(window_xfm_path)
+        self.frame_xfm_paths = frame_xfm_paths
 
         return window_xfm_stack
 
-    def apply_motion_correction(self, frame_xfms: list[ants.ANTsTransform]) -> ants.ANTsImage:
+    def apply_motion_correction(self,
+                                frame_xfms: list[ants.ANTsTransform | str],
+                                num_workers: int = 1,
+                                use_processes: bool = False) -> ants.ANTsImage:
         """Apply transforms to input image.
-        
+
+        Frames are resampled in parallel and written into one preallocated 4D image. See
+        :func:`~petpal.preproc.frame_resampling.apply_transforms_to_frames`. Transform file
+        paths, such as :attr:`frame_xfm_paths`, are used as they are. ANTs transforms are written
+        to a temporary directory that is removed once the frames are resampled.
+
         Args:
-            frame_xfms (list[ants.ANTsTransform]): Transforms for each frame in the input image.
+            frame_xfms (list[ants.ANTsTransform | str]): Transforms, or transform file paths, for
+                each frame in the input image.
+            num_workers (int): Number of frames resampled at the same time. Default 1.
+            use_processes (bool): If True, resample frames in worker processes instead of
+                threads. Default False.
 
         Returns:
             moco_img (ants.ANTsImage): Motion corrected dynamic PET image.
         """
-        input_img_list = ants.ndimage_to_list(self.input_img)
-        moco_img_stack = []
-
-        for frame_index, frame_img in enumerate(input_img_list):
-            frame_xfm = frame_xfms[frame_index]
-            moco_frame_img = frame_xfm.apply_to_image(image=frame_img,
-                                                      reference=self.target_img)
-            moco_img_stack.append(moco_frame_img)
-
-        moco_img = timeseries_from_img_list(moco_img_stack)
+        with tempfile.TemporaryDirectory() as xfm_dir:
+            frame_xfm_paths = write_frame_transforms(frame_xfms, xfm_dir=xfm_dir)
+            moco_img = apply_transforms_to_frames(input_img=self.input_img,
+                                                  reference_img=self.target_img,
+                                                  frame_transformlists=[[xfm_path] for xfm_path
+                                                                        in frame_xfm_paths],
+                                                  interpolator=self.reg_kwargs['interpolator'],
+                                                  num_workers=num_workers,
+                                                  use_processes=use_processes)
         return moco_img
 
     def plot_motion(self,
@@ -148,10 +427,10 @@ class MotionCorrect(RegisterBase):
 
         Args:
             frame_xfm_pars (pd.DataFrame): The six motion parameters for each frame, as well as the
-                center coordinates.
+                center coordinates and optional convergence columns, which are not plotted.
             out_plot_path (str): Path to where motion plot is saved, typically a .png file.
         """
-        xfm_pars = frame_xfm_pars.drop(columns=['cen_x','cen_y','cen_z'])
+        xfm_pars = frame_xfm_pars[['rot_x','rot_y','rot_z','tra_x','tra_y','tra_z']].copy()
         xfm_pars['times (min)'] = self.scan_timing.center_in_mins
         tidy_xfm_pars = xfm_pars.melt('times (min)', var_name='axis', value_name='mm/deg')
         plot = sns.lineplot(data=tidy_xfm_pars, x='times (min)', y='mm/deg', hue='axis')
@@ -165,6 +444,10 @@ class MotionCorrect(RegisterBase):
                             transform_type: str):
         """Save frame transform parameters as a table.
 
+        If windows were registered with :meth:`register_windows`, the table also carries the
+        window, registration time, iterations and final metric of the window each frame belongs
+        to.
+
         Args:
             frame_xfms (np.ndarray): Rigid transform parameters ordered as rotation, translation,
                 centerpoint, then X, Y, Z axis, totalling 9 parameters for each frame.
@@ -190,6 +473,15 @@ class MotionCorrect(RegisterBase):
                        'cen_z']
         xfms_df = pd.DataFrame(data=frame_xfm_pars,
                                columns=xfm_columns)
+        if self.window_convergence is not None:
+            window_durations = (self.window_convergence['end_frame']
+                                - self.window_convergence['start_frame'])
+            if window_durations.sum() == len(xfms_df):
+                frame_convergence = self.window_convergence.drop(columns=['start_frame',
+                                                                          'end_frame'])
+                frame_convergence = frame_convergence.loc[np.repeat(frame_convergence.index,
+                                                                    window_durations)]
+                xfms_df = pd.concat([xfms_df, frame_convergence.reset_index()], axis=1)
         xfms_df.index.name = 'frame'
         csv_filename = coerce_outpath_extension(path=filename, ext='.csv')
         self.table_saver.save(xfms_df,csv_filename)
@@ -204,6 +496,9 @@ class MotionCorrect(RegisterBase):
                  motion_target_path: str,
                  window_duration: float = 300,
                  transform_type: str = 'DenseRigid',
+                 num_workers: int = 1,
+                 num_threads: int = 0,
+                 warm_start: bool = False,
                  **reg_kwargs) -> ants.ANTsImage:
         """Motion correct a dynamic PET image.
 
@@ -219,6 +514,12 @@ class MotionCorrect(RegisterBase):
             transform_type (str):  Type of transform used in ants.registration. See
                 https://antspyx.readthedocs.io/en/latest/registration.html. Default DenseRigid.
             window_duration (float): Duration of each window in seconds. Default 300.
+            num_workers (int): Number of worker processes registering windows in parallel, and of
+                threads resampling frames in parallel. Default 1.
+            num_threads (int): Number of ITK threads used by each parallel registration. Default
+                0, which keeps the ITK default. See :meth:`register_windows`.
+            warm_start (bool): If True, register each window starting from the previous window's
+                transform with a reduced schedule. Default False. See :meth:`register_windows`.
             reg_kwargs (keyword arguments): Keyword arguments to pass on to the registration
                 function. See :py:func:`~ants.registration`.
 
@@ -231,8 +532,12 @@ class MotionCorrect(RegisterBase):
         self.set_reg_kwargs(**reg_kwargs)
         self.set_reg_kwargs(write_composite_transform=True)
         frame_xfms = self.register_windows(window_duration=window_duration,
-                                           transform_type=transform_type)
-        moco_img = self.apply_motion_correction(frame_xfms=frame_xfms)
+                                           transform_type=transform_type,
+                                           num_workers=num_workers,
+                                           num_threads=num_threads,
+                                           warm_start=warm_start)
+        moco_img = self.apply_motion_correction(frame_xfms=self.frame_xfm_paths,
+                                                num_workers=num_workers)
 
         if transform_type in self.rigid_xfms:
             self.save_xfm_parameters(frame_xfms=frame_xfms,
@@ -254,6 +559,8 @@ def windowed_motion_corr_to_target(input_image_path: str,
                                    type_of_transform: str = 'QuickRigid',
                                    interpolator: str = 'linear',
                                    copy_metadata: bool = True,
+                                   num_workers: int = 1,
+                                   num_threads: int = 0,
                                    **kwargs):
     """
     Performs windowed motion correction (MoCo) to align frames of a 4D PET image to a given target image.
@@ -280,6 +587,11 @@ def windowed_motion_corr_to_target(input_image_path: str,
         window_duration (float): Window size in seconds for dividing the image into time sections.
         type_of_transform (str): Type of transformation to use in registration (default: 'QuickRigid').
         interpolator (str): Interpolation method for the transformation (default: 'linear').
+        copy_metadata (bool): If True, copy the metadata of the input image to the output image.
+            Default True.
+        num_workers (int): Number of worker processes registering windows in parallel. Default 1.
+        num_threads (int): Number of ITK threads used by each parallel registration. Default 0,
+            which keeps the ITK default. See :meth:`MotionCorrect.register_windows`.
         **kwargs: Additional arguments passed to :func:`ants.registration`.
 
     Returns:
@@ -302,18 +614,26 @@ def windowed_motion_corr_to_target(input_image_path: str,
     """
     reg_kwargs_default = {'aff_metric'               : 'mattes',
                           'write_composite_transform': True,
-                          'type_of_transform': type_of_transform,
                           'interpolator': interpolator}
     reg_kwargs = {**reg_kwargs_default, **kwargs}
+    motion_target_path = determine_motion_target(motion_target_option=motion_target_option,
+                                                 input_image_path=input_image_path)
 
     motion_corrector = MotionCorrect()
-    moco_img = motion_corrector(input_image_path=input_image_path,
-                                output_image_path=out_image_path,
-                                motion_target_option=motion_target_option,
-                                window_duration=window_duration,
-                                copy_metadata=copy_metadata,
-                                save_xfm=False
-                                **reg_kwargs)
+    motion_corrector.set_input_scan_properties(input_image_path=input_image_path)
+    motion_corrector.set_target_img(motion_target_path=motion_target_path)
+    motion_corrector.set_reg_kwargs(**reg_kwargs)
+    motion_corrector.register_windows(window_duration=window_duration,
+                                      transform_type=type_of_transform,
+                                      num_workers=num_workers,
+                                      num_threads=num_threads)
+    moco_img = motion_corrector.apply_motion_correction(frame_xfms=motion_corrector.frame_xfm_paths,
+                                                        num_workers=num_workers)
+
+    if out_image_path is not None:
+        ants.image_write(image=moco_img, filename=out_image_path)
+        if copy_metadata:
+            safe_copy_meta(input_image_path=input_image_path, out_image_path=out_image_path)
     return moco_img
 
 def main():
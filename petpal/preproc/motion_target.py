@@ -9,10 +9,18 @@ from ..utils.scan_timing import ScanTimingInfo
 from ..utils.image_io import get_half_life_from_nifti, safe_copy_meta
 from ..io.image import ImageLoader
 from ..utils.useful_functions import get_average_of_timeseries
-from .standard_uptake_value import weighted_sum_for_suv
+from ..utils.derived_image_cache import active_derived_image_cache
+from .standard_uptake_value import weighted_sum_for_suv, cached_weighted_sum_for_suv_path
 from ..utils.dimension import get_frame_from_timeseries
 
 
+def _write_mean_image(input_image_path: str, out_image_path: str):
+    """Write the unweighted time-average of a 4D image."""
+    input_img = ants.image_read(input_image_path)
+    mean_img = get_average_of_timeseries(input_image=input_img)
+    ants.image_write(image=mean_img,filename=out_image_path)
+
+
 def determine_motion_target(motion_target_option: str | tuple | list,
                             input_image_path: str = None) -> str:
     """
@@ -35,6 +43,10 @@ def determine_motion_target(motion_target_option: str | tuple | list,
     from the first to the frame 300 seconds later. If the two elements are the
     same, returns the one frame closest to the entered time.
 
+    Computed targets are written to temporary files. Inside
+    :func:`~petpal.utils.derived_image_cache.derived_image_cache`, they are written to the cache
+    instead, computed once per image and option, and removed when the cache closes.
+
     Args:
         motion_target_option (str | tuple | list): Determines how the method behaves,
             according to the above description. Can be a file, a method
@@ -53,21 +65,29 @@ def determine_motion_target(motion_target_option: str | tuple | list,
             raised.
         TypeError: If start and end time are incompatible with ``float`` type.
     """
+    cache = active_derived_image_cache()
     if isinstance(motion_target_option, str):
         if os.path.exists(motion_target_option):
             return motion_target_option
 
         if motion_target_option == 'weighted_series_sum':
+            if cache is not None:
+                return cached_weighted_sum_for_suv_path(cache=cache,
+                                                        input_image_path=input_image_path)
             out_image_file = tempfile.mkstemp(suffix='_wss.nii.gz')[1]
             weighted_sum_for_suv(input_image_path=input_image_path,
                                 output_image_path=out_image_file)
             return out_image_file
 
         if motion_target_option == 'mean_image':
+            if cache is not None:
+                return cache.get_or_create(input_image_path=input_image_path,
+                                           operation='mean_image',
+                                           create=lambda out_image_file: _write_mean_image(
+                                               input_image_path=input_image_path,
+                                               out_image_path=out_image_file))
             out_image_file = tempfile.mkstemp(suffix='_mean.nii.gz')[1]
-            input_img = ants.image_read(input_image_path)
-            mean_img = get_average_of_timeseries(input_image=input_img)
-            ants.image_write(image=mean_img,filename=out_image_file)
+            _write_mean_image(input_image_path=input_image_path, out_image_path=out_image_file)
             return out_image_file
 
         raise ValueError("motion_target_option did not match a file or 'weighted_series_sum'")
@@ -85,6 +105,11 @@ def determine_motion_target(motion_target_option: str | tuple | list,
                             'able to be cast into float! Provided values are '
                             f"{start_time} and {end_time}.") from exc
 
+        if cache is not None:
+            return cached_weighted_sum_for_suv_path(cache=cache,
+                                                    input_image_path=input_image_path,
+                                                    start_time=float(start_time),
+                                                    end_time=float(end_time))
         out_image_file = tempfile.mkstemp(suffix='_wss.nii.gz')[1]
         weighted_sum_for_suv(input_image_path=input_image_path,
                                 output_image_path=out_image_file,
@@ -0,0 +1,443 @@
+"""
+Native partial volume correction (PVC) methods, implemented with NumPy and SciPy.
+
+This module provides in-process versions of the common methods of the
+`PETPVC <https://github.com/UCL/PETPVC>`_ package, which :class:`~.partial_volume_corrections.PetPvc`
+runs through Docker. No container is needed, so the methods also work where Docker is not
+available, and 4D images are corrected frame by frame without writing intermediate files.
+
+Available methods (names follow PETPVC's ``--pvc`` option):
+
+    * ``GTM``: Geometric Transfer Matrix (Rousset et al., 1998). Regional values only.
+    * ``RBV``: Region-based voxel-wise correction (Thomas et al., 2011).
+    * ``IY``: Iterative Yang (Erlandsson et al., 2012).
+    * ``VC``: Van Cittert deconvolution.
+
+The Gaussian point spread function (PSF) is applied through :class:`GaussianPsf`, with
+:class:`~petpal.utils.gaussian_blur.GaussianBlur`, which switches to FFT convolution for wide
+kernels and reuses the kernel's transfer function across frames and iterations. For the
+region-based methods the PSF only ever acts on the regions, so every ROI is blurred once with
+:meth:`~.symmetric_geometric_transfer_matrix.Sgtm.get_sparse_voxel_by_roi_matrix` and the
+resulting sparse operator is shared by all frames. Frames can be corrected in parallel worker
+processes, each of which receives the shared operators once.
+
+Example:
+
+    .. code-block:: python
+
+        from petpal.preproc.native_partial_volume_corrections import NativePvc
+
+        pvc_handler = NativePvc()
+        pvc_handler.run_pvc(pet_4d_filepath="/path/to/input/pet_image.nii.gz",
+                            output_filepath="/path/to/output/pet_image_pvc-RBV.nii.gz",
+                            pvc_method="RBV",
+                            psf_dimensions=(6.0, 6.0, 6.0),
+                            mask_filepath="/path/to/input/segmentation.nii.gz",
+                            num_workers=4)
+
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import nibabel
+import pandas as pd
+from scipy import sparse
+
+from .symmetric_geometric_transfer_matrix import Sgtm
+from ..utils.image_io import safe_copy_meta
+from ..utils.gaussian_blur import GaussianBlur
+from ..utils.segmentation_index import SegmentationIndex
+
+
+NATIVE_PVC_METHODS = ('GTM', 'RBV', 'IY', 'VC')
+
+
+class GaussianPsf:
+    """Isotropic or anisotropic Gaussian point spread function on a voxel grid.
+
+    Attributes:
+        fwhm (tuple[float, float, float]): Full width at half maximum along x, y, z in mm.
+        voxel_spacing (tuple[float, float, float]): Voxel size along x, y, z in mm.
+        truncate (float): Kernel radius in units of sigma, as in
+            :func:`~scipy.ndimage.gaussian_filter`.
+        gaussian_blur (GaussianBlur): Blur applying the PSF to images.
+    """
+    def __init__(self,
+                 fwhm: float | tuple[float, float, float],
+                 voxel_spacing: tuple[float, float, float],
+                 truncate: float = 4.0):
+        if isinstance(fwhm, (float, int)):
+            fwhm = (fwhm, fwhm, fwhm)
+        self.fwhm = tuple(float(fwhm_i) for fwhm_i in fwhm)
+        self.voxel_spacing = tuple(float(spacing_i) for spacing_i in voxel_spacing[:3])
+        self.truncate = truncate
+        self.gaussian_blur = GaussianBlur(sigma=self.sigma, truncate=self.truncate)
+
+    @property
+    def sigma(self) -> list[float]:
+        """Gaussian sigma in voxels along each axis, using the same FWHM conversion as
+        :attr:`~.symmetric_geometric_transfer_matrix.Sgtm.sigma`."""
+        return [(fwhm_i / 2.355) / spacing_i
+                for fwhm_i, spacing_i in zip(self.fwhm, self.voxel_spacing)]
+
+    def blur(self, image_arr: np.ndarray) -> np.ndarray:
+        """Apply the PSF to a 3D image.
+
+        Args:
+            image_arr (np.ndarray): 3D image.
+
+        Returns:
+            blurred_arr (np.ndarray): Image convolved with the PSF.
+        """
+        return self.gaussian_blur.blur_frame(image_arr)
+
+    def blurred_roi_matrix(self,
+                           segmentation_arr: np.ndarray,
+                           labels: np.ndarray,
+                           segmentation_index: SegmentationIndex | None = None
+                           ) -> sparse.csc_array:
+        """Sparse matrix whose columns are the PSF-blurred ROIs, see
+        :meth:`~.symmetric_geometric_transfer_matrix.Sgtm.get_sparse_voxel_by_roi_matrix`.
+
+        Args:
+            segmentation_arr (np.ndarray): 3D discrete segmentation.
+            labels (np.ndarray): ROI labels, one per column.
+            segmentation_index (SegmentationIndex | None): Precomputed index of
+                ``segmentation_arr``. Default None.
+
+        Returns:
+            voxel_by_roi_matrix (sparse.csc_array): Blurred ROIs with shape
+                ``(n_voxels, n_rois)``, rows in C-order.
+        """
+        return Sgtm.get_sparse_voxel_by_roi_matrix(unique_labels=labels,
+                                                   segmentation_arr=segmentation_arr,
+                                                   sigma=self.sigma,
+                                                   segmentation_index=segmentation_index,
+                                                   truncate=self.truncate)
+
+
+class RegionOperators:
+    """Operators shared by every frame in the region-based PVC methods.
+
+    Attributes:
+        labels (np.ndarray): ROI labels.
+        counts (np.ndarray): Number of voxels in each ROI.
+        roi_matrix (sparse.csc_array): ROI indicator matrix ``R`` with shape
+            ``(n_voxels, n_rois)``.
+        voxel_by_roi_matrix (sparse.csc_array): PSF-blurred ROIs ``V = PSF * R``.
+        gtm (np.ndarray): Geometric transfer matrix, ``GTM[i, j]`` is the mean of the blurred ROI
+            ``j`` over ROI ``i``.
+        image_shape (tuple[int, int, int]): Shape of the segmentation.
+    """
+    def __init__(self,
+                 segmentation_arr: np.ndarray,
+                 psf: GaussianPsf,
+                 zeroth_roi: bool = False,
+                 segmentation_index: SegmentationIndex | None = None):
+        if segmentation_index is None:
+            segmentation_index = SegmentationIndex.from_array(segmentation_arr)
+        labels = segmentation_index.labels
+        if not zeroth_roi:
+            labels = labels[labels != 0]
+        self.labels = labels
+        self.image_shape = tuple(segmentation_arr.shape)
+
+        rows = [segmentation_index.region_voxel_indices(label) for label in labels]
+        self.counts = np.asarray([len(roi_rows) for roi_rows in rows], dtype=float)
+        indptr = np.concatenate([[0], np.cumsum(self.counts, dtype=np.int64)])
+        self.roi_matrix = sparse.csc_array((np.ones(int(indptr[-1])),
+                                            np.concatenate(rows),
+                                            indptr),
+                                           shape=(segmentation_arr.size, len(labels)))
+        self.voxel_by_roi_matrix = psf.blurred_roi_matrix(segmentation_arr=segmentation_arr,
+                                                          labels=labels,
+                                                          segmentation_index=segmentation_index)
+        self.voxel_by_roi_matrix = self.voxel_by_roi_matrix.astype(float)
+        self.gtm = (self.roi_matrix.T @ self.voxel_by_roi_matrix).toarray()
+        self.gtm /= self.counts[:, None]
+
+    def region_means(self, image_arr: np.ndarray) -> np.ndarray:
+        """Mean of a 3D image in each ROI."""
+        return (self.roi_matrix.T @ image_arr.ravel()) / self.counts
+
+    def piecewise_constant_image(self, region_values: np.ndarray) -> np.ndarray:
+        """Image with ``region_values[j]`` in ROI ``j`` and zero elsewhere, as a flat array."""
+        return self.roi_matrix @ region_values
+
+    def blurred_piecewise_constant_image(self, region_values: np.ndarray) -> np.ndarray:
+        """PSF applied to :meth:`piecewise_constant_image`, as a flat array, without filtering."""
+        return self.voxel_by_roi_matrix @ region_values
+
+
+def _safe_ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Element-wise ratio that is zero where the denominator is zero."""
+    ratio = np.zeros_like(numerator, dtype=float)
+    np.divide(numerator, denominator, out=ratio, where=denominator > 0)
+    return ratio
+
+
+def gtm_pvc(frame_arr: np.ndarray, region_ops: RegionOperators) -> np.ndarray:
+    r"""Geometric transfer matrix correction of the regional means of one frame.
+
+    Solves :math:`\mathrm{GTM}\,c = t`, where :math:`t` holds the observed ROI means.
+
+    Args:
+        frame_arr (np.ndarray): 3D PET frame.
+        region_ops (RegionOperators): Shared region operators.
+
+    Returns:
+        region_values (np.ndarray): Corrected mean activity in each ROI.
+    """
+    return np.linalg.solve(region_ops.gtm, region_ops.region_means(frame_arr))
+
+
+def rbv_pvc(frame_arr: np.ndarray, region_ops: RegionOperators) -> np.ndarray:
+    r"""Region-based voxel-wise correction of one frame.
+
+    The GTM-corrected regional values :math:`c` define a piecewise-constant image :math:`S`, and
+    the frame is scaled voxel-wise by :math:`S / (\mathrm{PSF} * S)`. Voxels outside the ROIs are
+    set to zero.
+
+    Args:
+        frame_arr (np.ndarray): 3D PET frame.
+        region_ops (RegionOperators): Shared region operators.
+
+    Returns:
+        corrected_arr (np.ndarray): Corrected 3D frame.
+    """
+    region_values = gtm_pvc(frame_arr=frame_arr, region_ops=region_ops)
+    scale = _safe_ratio(region_ops.piecewise_constant_image(region_values),
+                        region_ops.blurred_piecewise_constant_image(region_values))
+    return (frame_arr.ravel() * scale).reshape(region_ops.image_shape)
+
+
+def iterative_yang_pvc(frame_arr: np.ndarray,
+                       region_ops: RegionOperators,
+                       num_iterations: int = 10) -> np.ndarray:
+    r"""Iterative Yang correction of one frame.
+
+    Starting from the observed frame :math:`g`, each iteration takes the ROI means of the current
+    estimate as the piecewise-constant image :math:`S_k` and updates
+    :math:`f_{k+1} = g\,S_k / (\mathrm{PSF} * S_k)`. Voxels outside the ROIs are set to zero.
+
+    Args:
+        frame_arr (np.ndarray): 3D PET frame.
+        region_ops (RegionOperators): Shared region operators.
+        num_iterations (int): Number of iterations. Default 10.
+
+    Returns:
+        corrected_arr (np.ndarray): Corrected 3D frame.
+    """
+    observed = frame_arr.ravel().astype(float)
+    estimate = observed
+    for _ in range(num_iterations):
+        region_values = region_ops.region_means(estimate)
+        estimate = observed * _safe_ratio(
+            region_ops.piecewise_constant_image(region_values),
+            region_ops.blurred_piecewise_constant_image(region_values))
+    return estimate.reshape(region_ops.image_shape)
+
+
+def van_cittert_pvc(frame_arr: np.ndarray,
+                    psf: GaussianPsf,
+                    num_iterations: int = 10,
+                    alpha: float = 1.5,
+                    stop_tolerance: float = 0.01) -> np.ndarray:
+    r"""Van Cittert deconvolution of one frame.
+
+    Iterates :math:`f_{k+1} = f_k + \alpha\,(g - \mathrm{PSF} * f_k)` from :math:`f_0 = g`, and
+    stops early once the relative change :math:`\|f_{k+1} - f_k\| / \|f_k\|` falls below
+    ``stop_tolerance``.
+
+    Args:
+        frame_arr (np.ndarray): 3D PET frame.
+        psf (GaussianPsf): Point spread function.
+        num_iterations (int): Maximum number of iterations. Default 10.
+        alpha (float): Step size. Default 1.5.
+        stop_tolerance (float): Relative change below which iterations stop. Default 0.01.
+
+    Returns:
+        corrected_arr (np.ndarray): Corrected 3D frame.
+    """
+    observed = np.asarray(frame_arr, dtype=float)
+    estimate = observed.copy()
+    for _ in range(num_iterations):
+        update = alpha * (observed - psf.blur(estimate))
+        estimate += update
+        estimate_norm = np.linalg.norm(estimate)
+        if estimate_norm > 0 and np.linalg.norm(update) / estimate_norm < stop_tolerance:
+            break
+    return estimate
+
+
+_WORKER_STATE = {}
+
+
+def _init_pvc_worker(pvc_method: str, operator, method_kwargs: dict):
+    """Store the shared operator of a PVC method in a worker process."""
+    _WORKER_STATE['pvc_method'] = pvc_method
+    _WORKER_STATE['operator'] = operator
+    _WORKER_STATE['method_kwargs'] = method_kwargs
+
+
+def _correct_frame(frame_arr: np.ndarray,
+                   pvc_method: str | None = None,
+                   operator=None,
+                   method_kwargs: dict | None = None) -> np.ndarray:
+    """Apply a PVC method to one frame, using the worker state if no operator is given."""
+    if operator is None:
+        pvc_method = _WORKER_STATE['pvc_method']
+        operator = _WORKER_STATE['operator']
+        method_kwargs = _WORKER_STATE['method_kwargs']
+    match pvc_method:
+        case 'GTM':
+            return gtm_pvc(frame_arr=frame_arr, region_ops=operator)
+        case 'RBV':
+            return rbv_pvc(frame_arr=frame_arr, region_ops=operator)
+        case 'IY':
+            return iterative_yang_pvc(frame_arr=frame_arr, region_ops=operator, **method_kwargs)
+        case 'VC':
+            return van_cittert_pvc(frame_arr=frame_arr, psf=operator, **method_kwargs)
+    raise ValueError(f"PVC method {pvc_method} not in {NATIVE_PVC_METHODS}.")
+
+
+def apply_pvc_to_frames(frames: list[np.ndarray],
+                        pvc_method: str,
+                        operator: RegionOperators | GaussianPsf,
+                        num_workers: int = 1,
+                        **method_kwargs) -> list[np.ndarray]:
+    """Apply a PVC method to every frame, optionally in parallel worker processes.
+
+    The shared operator is sent to each worker once, when the worker starts, rather than with
+    every frame.
+
+    Args:
+        frames (list[np.ndarray]): 3D PET frames.
+        pvc_method (str): One of :data:`NATIVE_PVC_METHODS`.
+        operator (RegionOperators | GaussianPsf): Region operators for ``GTM``, ``RBV`` and
+            ``IY``, or the PSF for ``VC``.
+        num_workers (int): Number of worker processes. Default 1, which corrects the frames in
+            the current process.
+        **method_kwargs: Additional keyword arguments of the method, such as ``num_iterations``.
+
+    Returns:
+        corrected_frames (list[np.ndarray]): Corrected frames, or regional values for ``GTM``.
+    """
+    if num_workers <= 1 or len(frames) <= 1:
+        return [_correct_frame(a_frame, pvc_method, operator, method_kwargs) for a_frame in frames]
+    with ProcessPoolExecutor(max_workers=num_workers,
+                             initializer=_init_pvc_worker,
+                             initargs=(pvc_method, operator, method_kwargs)) as executor:
+        return list(executor.map(_correct_frame, frames))
+
+
+class NativePvc:
+    """Runs PETPVC-style partial volume correction in-process.
+
+    Mirrors :meth:`~.partial_volume_corrections.PetPvc.run_petpvc`, so it can be used as a
+    drop-in backend where Docker is unavailable.
+
+    Examples:
+
+        .. code-block:: python
+
+            from petpal.preproc.native_partial_volume_corrections import NativePvc
+
+            NativePvc().run_pvc(pet_4d_filepath="/path/to/input/pet_image.nii",
+                                output_filepath="/path/to/output/corrected_pet_image.nii",
+                                pvc_method="IY",
+                                psf_dimensions=6.0,
+                                mask_filepath="/path/to/input/segmentation.nii",
+                                num_iterations=10)
+
+    """
+    def run_pvc(self,
+                pet_4d_filepath: str,
+                output_filepath: str,
+                pvc_method: str,
+                psf_dimensions: tuple[float, float, float] | float,
+                mask_filepath: str | None = None,
+                verbose: bool = False,
+                num_workers: int = 1,
+                zeroth_roi: bool = False,
+                **method_kwargs) -> np.ndarray | pd.DataFrame:
+        """Run partial volume correction on a 3D or 4D PET image.
+
+        Args:
+            pet_4d_filepath (str): The file path to the input 3D or 4D PET image.
+            output_filepath (str): The file path where the output is saved. For ``GTM`` this is a
+                TSV of regional values with one row per ROI and one column per frame; for the
+                other methods a NIfTI image.
+            pvc_method (str): One of ``'GTM'``, ``'RBV'``, ``'IY'`` or ``'VC'``.
+            psf_dimensions (tuple[float, float, float] | float): The full-width half-max (FWHM)
+                in mm along x, y, z axes.
+            mask_filepath (str, optional): Discrete segmentation defining the ROIs, in the same
+                space as the PET image. Required for ``GTM``, ``RBV`` and ``IY``; not used by
+                ``VC``. Defaults to None.
+            verbose (bool, optional): If True, prints progress information. Defaults to False.
+            num_workers (int): Number of worker processes for correcting frames in parallel.
+                Defaults to 1.
+            zeroth_roi (bool): If True, label ``0`` is treated as an ROI. Defaults to False.
+            **method_kwargs: Additional keyword arguments of the method, such as
+                ``num_iterations`` for ``IY`` and ``VC``, or ``alpha`` and ``stop_tolerance``
+                for ``VC``.
+
+        Returns:
+            pvc_result (np.ndarray | pd.DataFrame): Corrected image array, or the table of
+                regional values for ``GTM``.
+
+        Raises:
+            ValueError: If the method is not supported, or a segmentation is required but
+                missing.
+        """
+        pvc_method = pvc_method.upper()
+        if pvc_method not in NATIVE_PVC_METHODS:
+            raise ValueError(f"PVC method {pvc_method} not in {NATIVE_PVC_METHODS}.")
+        if pvc_method != 'VC' and mask_filepath is None:
+            raise ValueError(f"PVC method {pvc_method} requires a segmentation (mask_filepath).")
+
+        pet_img = nibabel.load(pet_4d_filepath)
+        pet_arr = pet_img.get_fdata(dtype=np.float32)
+        is_4d = pet_arr.ndim == 4
+        frames = [pet_arr[..., i] for i in range(pet_arr.shape[3])] if is_4d else [pet_arr]
+        psf = GaussianPsf(fwhm=psf_dimensions, voxel_spacing=pet_img.header.get_zooms()[:3])
+
+        if pvc_method == 'VC':
+            operator = psf
+        else:
+            segmentation_arr = nibabel.load(mask_filepath).get_fdata(dtype=np.float32)
+            if segmentation_arr.shape != pet_arr.shape[:3]:
+                raise ValueError(f'Got incompatible image sizes: {pet_arr.shape}, '
+                                 f'{segmentation_arr.shape}.')
+            operator = RegionOperators(segmentation_arr=segmentation_arr,
+                                       psf=psf,
+                                       zeroth_roi=zeroth_roi)
+        if verbose:
+            print(f"(NativePvc): Running {pvc_method} on {len(frames)} frame(s) with "
+                  f"sigma {psf.sigma} voxels.")
+
+        corrected = apply_pvc_to_frames(frames=frames,
+                                        pvc_method=pvc_method,
+                                        operator=operator,
+                                        num_workers=num_workers,
+                                        **method_kwargs)
+
+        if pvc_method == 'GTM':
+            gtm_result = pd.DataFrame({'Region': operator.labels.astype(int)})
+            if is_4d:
+                for i, region_values in enumerate(corrected):
+                    gtm_result[f'Frame{i}'] = region_values
+            else:
+                gtm_result['Mean'] = corrected[0]
+            gtm_result.to_csv(output_filepath, sep='\t', index=False)
+            return gtm_result
+
+        corrected_arr = np.stack(corrected, axis=-1) if is_4d else corrected[0]
+        corrected_arr = corrected_arr.astype(np.float32)
+        out_img = nibabel.Nifti1Image(dataobj=corrected_arr,
+                                      affine=pet_img.affine,
+                                      header=pet_img.header)
+        nibabel.save(out_img, output_filepath)
+        safe_copy_meta(input_image_path=pet_4d_filepath, out_image_path=output_filepath)
+        if verbose:
+            print(f"(NativePvc): Corrected image saved to {output_filepath}")
+        return corrected_arr
@@ -3,13 +3,16 @@ Regional TAC extraction
 """
 from warnings import warn
 import os
-from collections.abc import Callable
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
 import pathlib
 import numpy as np
 import ants
+import nibabel
 import pandas as pd
 
 from .segmentation_tools import combine_regions_as_mask
+from ..utils.segmentation_index import SegmentationIndex
 from ..utils import image_io
 from ..utils.scan_timing import ScanTimingInfo
 from ..utils.dimension import check_physical_space_for_ants_image_pair
@@ -142,6 +145,206 @@ def voxel_average_w_uncertainty(pet_voxels: np.ndarray) -> tuple[np.ndarray, np.
     return (pet_average, pet_uncertainty)
 
 
+@dataclass
+class LabelWiseVoxelStats:
+    """
+    Per-label voxel statistics of a 4D-PET image, used to get regional TACs for every region of a
+    segmentation from a single pass over the image.
+
+    Sums are accumulated in ``float64`` regardless of the image dtype. Regional means and standard
+    deviations of any combination of labels follow from these statistics without revisiting the
+    voxels, since sums, sums of squares and counts are additive over labels.
+
+    Attributes:
+        labels (np.ndarray): Sorted unique values present in the segmentation, shape (L,).
+        counts (np.ndarray): Number of voxels with each label, shape (L,).
+        sums (np.ndarray): Sum of the voxel values for each label and frame, shape (L, N).
+        sums_of_squares (np.ndarray): Sum of the squared voxel values for each label and frame,
+            shape (L, N).
+        dtype (np.dtype): Data type of the input image. Regional TACs are returned in this type so
+            that they match the values from
+            :func:`~petpal.preproc.regional_tac_extraction.voxel_average_w_uncertainty`.
+
+    See Also:
+        * :func:`calc_label_wise_voxel_stats`
+    """
+    labels: np.ndarray
+    counts: np.ndarray
+    sums: np.ndarray
+    sums_of_squares: np.ndarray
+    dtype: np.dtype
+
+    def region_mean_and_std(self,
+                            region_mapping: int | list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Combines the per-label statistics of one or more labels into the regional mean and the
+        standard deviation for each frame.
+
+        Same definitions as :func:`voxel_average_w_uncertainty` on the voxels of
+        ``combine_regions_as_mask(seg_arr, region_mapping)``: the population standard deviation
+        over all voxels of the region. A region with no voxels returns all-NaN arrays, and a
+        region with any NaN voxel returns NaN for the frames where the NaN occurs.
+
+        Args:
+            region_mapping (int | list[int]): The integer ID or IDs corresponding to the ROI.
+
+        Returns:
+            average_w_uncertainty (tuple[np.ndarray, np.ndarray]): Average and standard deviation
+                of the region voxels for each frame.
+        """
+        in_region = np.isin(self.labels, np.atleast_1d(region_mapping))
+        num_voxels = self.counts[in_region].sum()
+        if num_voxels == 0:
+            empty_vals = np.full(self.sums.shape[1], np.nan, dtype=self.dtype)
+            return empty_vals, empty_vals.copy()
+        region_mean = self.sums[in_region].sum(axis=0) / num_voxels
+        region_var = self.sums_of_squares[in_region].sum(axis=0) / num_voxels - region_mean**2
+        region_std = np.sqrt(np.clip(region_var, 0.0, None))
+        return region_mean.astype(self.dtype), region_std.astype(self.dtype)
+
+
+def calc_label_wise_voxel_stats(input_arr: np.ndarray,
+                                seg_arr: np.ndarray,
+                                segmentation_index: SegmentationIndex | None = None
+                                ) -> LabelWiseVoxelStats:
+    """
+    Computes the voxel counts, sums and sums of squares for every label of a segmentation and
+    every frame of a 4D image in one pass.
+
+    Each frame is reduced for all labels at once with
+    :func:`~petpal.preproc.regional_tac_extraction.accumulate_label_wise_voxel_stats`. This
+    replaces building a full-volume mask and indexing the 4D array for each region, so the cost
+    no longer grows with the number of regions.
+
+    Args:
+        input_arr (np.ndarray): Input 4D-image from which to extract the statistics.
+        seg_arr (np.ndarray): 3D discrete segmentation in the same space as ``input_arr``.
+        segmentation_index (SegmentationIndex | None): Precomputed index of ``seg_arr``. Default
+            None.
+
+    Returns:
+        label_stats (LabelWiseVoxelStats): Per-label statistics for every frame.
+
+    Raises:
+         AssertionError: If input array is not 4D.
+         AssertionError: If input and segmentation array shapes are mismatched.
+
+    Example:
+
+        .. code-block:: python
+
+            import ants
+
+            from petpal.preproc.regional_tac_extraction import calc_label_wise_voxel_stats
+
+            pet_arr = ants.image_read("/path/to/pet.nii.gz").numpy()
+            seg_arr = ants.image_read("/path/to/seg.nii.gz").numpy()
+
+            label_stats = calc_label_wise_voxel_stats(input_arr=pet_arr, seg_arr=seg_arr)
+            putamen_tac, putamen_std = label_stats.region_mean_and_std(region_mapping=[12, 51])
+
+    """
+    assert len(input_arr.shape) == 4, "Input array must be 4D."
+    assert input_arr.shape[:3] == seg_arr.shape, (
+            "Array must have the same physical dimensions.")
+
+    if np.issubdtype(input_arr.dtype, np.floating):
+        out_dtype = input_arr.dtype
+    else:
+        out_dtype = np.dtype(float)
+    frames = (input_arr[..., frame_id] for frame_id in range(input_arr.shape[3]))
+    return accumulate_label_wise_voxel_stats(frames=frames,
+                                             seg_arr=seg_arr,
+                                             dtype=out_dtype,
+                                             segmentation_index=segmentation_index)
+
+
+def calc_label_wise_voxel_stats_from_nifti(input_image_path: str | pathlib.Path,
+                                           seg_arr: np.ndarray,
+                                           segmentation_index: SegmentationIndex | None = None
+                                           ) -> LabelWiseVoxelStats:
+    """
+    Computes the per-label statistics of a 4D NIfTI image, streaming the image frame by frame.
+
+    Same output as :func:`calc_label_wise_voxel_stats` on the ``float32`` array from
+    :meth:`ants.ANTsImage.numpy`, but the 4D image is never held in memory: frames are read one
+    at a time with :func:`~petpal.utils.image_io.iter_nifti_frames`, so peak memory is a single
+    frame plus the segmentation.
+
+    Args:
+        input_image_path (str | pathlib.Path): Path to the 4D PET image.
+        seg_arr (np.ndarray): 3D discrete segmentation in the same space as the PET image.
+        segmentation_index (SegmentationIndex | None): Precomputed index of ``seg_arr``. Default
+            None.
+
+    Returns:
+        label_stats (LabelWiseVoxelStats): Per-label statistics for every frame.
+
+    Raises:
+         AssertionError: If input image is not 4D.
+         AssertionError: If input image and segmentation array shapes are mismatched.
+    """
+    image_shape = nibabel.load(input_image_path).shape
+    assert len(image_shape) == 4, "Input image must be 4D."
+    assert image_shape[:3] == seg_arr.shape, (
+            "Array must have the same physical dimensions.")
+    frames = image_io.iter_nifti_frames(image_path=input_image_path, dtype=np.float32)
+    return accumulate_label_wise_voxel_stats(frames=frames,
+                                             seg_arr=seg_arr,
+                                             dtype=np.float32,
+                                             segmentation_index=segmentation_index)
+
+
+def accumulate_label_wise_voxel_stats(frames: Iterable[np.ndarray],
+                                      seg_arr: np.ndarray,
+                                      dtype: np.dtype = np.float32,
+                                      segmentation_index: SegmentationIndex | None = None
+                                      ) -> LabelWiseVoxelStats:
+    """
+    Accumulates per-label voxel counts, sums and sums of squares over a sequence of 3D frames.
+
+    The segmentation is flattened once and mapped to label indices, after which each frame is
+    reduced for all labels at once with :func:`numpy.bincount`. Only the current frame is needed
+    at any time, so ``frames`` can be a generator reading from disk.
+
+    Args:
+        frames (Iterable[np.ndarray]): 3D frames, each with the same shape as ``seg_arr``.
+        seg_arr (np.ndarray): 3D discrete segmentation.
+        dtype (np.dtype): Data type of regional TACs computed from the statistics. Default
+            ``np.float32``.
+        segmentation_index (SegmentationIndex | None): Precomputed index of ``seg_arr``. If
+            provided, the label of each voxel is read from the index instead of scanning the
+            segmentation. Default None.
+
+    Returns:
+        label_stats (LabelWiseVoxelStats): Per-label statistics for every frame.
+    """
+    if segmentation_index is None:
+        order = 'F'
+        labels, label_idx = np.unique(seg_arr.ravel(order=order), return_inverse=True)
+    else:
+        order = 'C'
+        labels = segmentation_index.labels
+        label_idx = segmentation_index.voxel_label_positions()
+    num_labels = len(labels)
+
+    counts = np.bincount(label_idx, minlength=num_labels)
+    sums = []
+    sums_of_squares = []
+    for frame in frames:
+        frame_vals = frame.ravel(order=order).astype(float)
+        sums.append(np.bincount(label_idx, weights=frame_vals, minlength=num_labels))
+        sums_of_squares.append(np.bincount(label_idx,
+                                           weights=frame_vals * frame_vals,
+                                           minlength=num_labels))
+
+    return LabelWiseVoxelStats(labels=labels,
+                               counts=counts,
+                               sums=np.stack(sums, axis=1),
+                               sums_of_squares=np.stack(sums_of_squares, axis=1),
+                               dtype=np.dtype(dtype))
+
+
 def write_tacs(input_image_path: str,
                label_map_path: str,
                segmentation_image_path: str,
@@ -168,18 +371,15 @@ def write_tacs(input_image_path: str,
     label_map = image_io.read_label_map_tsv(label_map_file=label_map_path)
     regions_abrev = label_map['abbreviation']
 
-    pet_numpy = ants.image_read(input_image_path).numpy()
     seg_numpy = ants.image_read(segmentation_image_path).numpy()
 
     scan_timing_info = ScanTimingInfo.from_nifti(image_path=input_image_path)
     tac_times_in_mins = scan_timing_info.center_in_mins
 
+    label_stats = calc_label_wise_voxel_stats_from_nifti(input_image_path=input_image_path,
+                                                         seg_arr=seg_numpy)
     for i, region_map in enumerate(label_map['mapping']):
-        region_mask = combine_regions_as_mask(segmentation_img=seg_numpy,
-                                              label=int(region_map))
-        pet_masked_region = apply_mask_4d(input_arr=pet_numpy,
-                                          mask_arr=region_mask)
-        extracted_tac, tac_uncertainty = voxel_average_w_uncertainty(pet_masked_region)
+        extracted_tac, tac_uncertainty = label_stats.region_mean_and_std(int(region_map))
         region_tac = TimeActivityCurve(times=tac_times_in_mins,
                                        activity=extracted_tac,
                                        uncertainty=tac_uncertainty)
@@ -225,14 +425,11 @@ def roi_tac(input_image_path: str,
                          "'FrameReferenceTime' or 'FrameTimesStart'")
 
     pet_meta = image_io.load_metadata_for_nifti_with_same_filename(input_image_path)
-    pet_numpy = ants.image_read(input_image_path).numpy()
     seg_numpy = ants.image_read(roi_image_path).numpy()
 
-    region_mask = combine_regions_as_mask(segmentation_img=seg_numpy,
-                                          label=region)
-    pet_masked_region = apply_mask_4d(input_arr=pet_numpy,
-                                      mask_arr=region_mask)
-    extracted_tac, tac_uncertainty = voxel_average_w_uncertainty(pet_masked_region)
+    label_stats = calc_label_wise_voxel_stats_from_nifti(input_image_path=input_image_path,
+                                                         seg_arr=seg_numpy)
+    extracted_tac, tac_uncertainty = label_stats.region_mean_and_std(region)
     region_tac = TimeActivityCurve(times=pet_meta[time_frame_keyword],
                                    activity=extracted_tac,
                                    uncertainty=tac_uncertainty)
@@ -246,7 +443,10 @@ class WriteRegionalTacs:
     Write regional TACs
 
     Attributes:
-        pet_arr (np.ndarray): Numpy array containing 4D PET data.
+        input_image_path (str | pathlib.Path): Path to the input 4D PET image.
+        pet_arr (np.ndarray): Numpy array containing 4D PET data. Only loaded on first access,
+            which is needed for a custom ``tac_extraction_func``. The default extraction streams
+            the image frame by frame instead.
         seg_arr (np.ndarray): Numpy array containing 3D discrete segmentation data.
         tac_extraction_func (Callable): A function that takes a 2D M x N numpy array with M voxels
             and N time frames as well as any number of optional keyword arguments and returns a
@@ -255,7 +455,11 @@ class WriteRegionalTacs:
         region_names (list): Names of regions to use in the analysis.
         region_maps (list): Region mappings to use in the analysis, corresponding 1-1 with
             region_names.
-
+        segmentation_index (SegmentationIndex | None): Optional precomputed index of the
+            segmentation image.
+        label_stats (LabelWiseVoxelStats | None): Per-label voxel statistics of the PET image,
+            computed on first use when the default ``tac_extraction_func`` is used. Computed from
+            ``pet_arr`` if it is already loaded, and streamed from ``input_image_path`` otherwise.
 
     Example:
 
@@ -291,7 +495,8 @@ class WriteRegionalTacs:
                  input_image_path: str | pathlib.Path,
                  segmentation_path: str | pathlib.Path,
                  label_map: str | dict,
-                 tac_extraction_func: Callable=voxel_average_w_uncertainty):
+                 tac_extraction_func: Callable=voxel_average_w_uncertainty,
+                 segmentation_index: SegmentationIndex | None = None):
         """Initialize WriteRegionalTacs.
         
         Args:
@@ -304,8 +509,12 @@ class WriteRegionalTacs:
                 :class:`LabelMapLoader<petpal.meta.label_maps.LabelMapLoader>`.
             tac_extraction_func (Callable): Function to get TAC from 2D array of voxels. Default
                 :func:`~petpal.preproc.regional_tac_extraction.voxel_average_w_uncertainty`.
+            segmentation_index (SegmentationIndex | None): Precomputed index of the segmentation
+                image, shared with other analyses of the same segmentation. Used to find the
+                voxels of each label without rescanning the segmentation. Default None.
         """
-        self.pet_arr = ants.image_read(filename=input_image_path).numpy()
+        self.input_image_path = input_image_path
+        self._pet_arr = None
         self.seg_arr = ants.image_read(filename=segmentation_path).numpy()
 
         self.tac_extraction_func = tac_extraction_func
@@ -314,6 +523,40 @@ class WriteRegionalTacs:
         label_map_dict = LabelMapLoader(label_map_option=label_map).label_map
         self.region_names = list(label_map_dict.keys())
         self.region_maps = list(label_map_dict.values())
+        self.label_stats = None
+        self.segmentation_index = segmentation_index
+
+    @property
+    def pet_arr(self) -> np.ndarray:
+        """4D PET data, read from ``input_image_path`` on first access."""
+        if self._pet_arr is None:
+            self._pet_arr = ants.image_read(filename=self.input_image_path).numpy()
+        return self._pet_arr
+
+    @pet_arr.setter
+    def pet_arr(self, pet_arr: np.ndarray):
+        self._pet_arr = pet_arr
+        self.label_stats = None
+
+    def calc_label_stats(self) -> LabelWiseVoxelStats:
+        """Compute the per-label voxel statistics used by :meth:`extract_tac`.
+
+        If the PET array has not been loaded, the image is streamed from disk one frame at a time
+        with :func:`calc_label_wise_voxel_stats_from_nifti`, so peak memory is one frame plus the
+        segmentation.
+
+        Returns:
+            label_stats (LabelWiseVoxelStats): Per-label statistics for every frame."""
+        if self._pet_arr is None:
+            self.label_stats = calc_label_wise_voxel_stats_from_nifti(
+                input_image_path=self.input_image_path,
+                seg_arr=self.seg_arr,
+                segmentation_index=self.segmentation_index)
+        else:
+            self.label_stats = calc_label_wise_voxel_stats(input_arr=self._pet_arr,
+                                                           seg_arr=self.seg_arr,
+                                                           segmentation_index=self.segmentation_index)
+        return self.label_stats
 
     def set_tac_extraction_func(self, tac_extraction_func: Callable):
         """Sets the tac extraction function used to a different function.
@@ -361,10 +604,28 @@ class WriteRegionalTacs:
             return True
         return False
 
+    def uses_label_wise_stats(self, **tac_calc_kwargs) -> bool:
+        """Check if TACs can be taken from the per-label statistics instead of masking the
+        image for each region. This is the case for the default
+        :func:`~petpal.preproc.regional_tac_extraction.voxel_average_w_uncertainty` without any
+        additional keyword arguments.
+
+        Args:
+            **tac_calc_kwargs: Additional keyword arguments passed on to tac_extraction_func.
+
+        Returns:
+            uses_label_wise_stats (bool): If True, :meth:`extract_tac` uses ``self.label_stats``."""
+        return self.tac_extraction_func is voxel_average_w_uncertainty and not tac_calc_kwargs
+
     def extract_tac(self,region_mapping: int | list[int], **tac_calc_kwargs) -> TimeActivityCurve:
         """
         Run self.tac_extraction_func on one region and return the TAC.
 
+        With the default ``tac_extraction_func``, the TAC is combined from per-label statistics
+        that are computed once for all labels and frames with
+        :func:`~petpal.preproc.regional_tac_extraction.calc_label_wise_voxel_stats`. Any other
+        function is applied to the masked voxels of the region.
+
         Args:
             region_mapping (int | list[int]): The integer ID or IDs corresponding to the ROI.
             **tac_calc_kwargs: Additional keyword arguments passed on to tac_extraction_func.
@@ -372,8 +633,17 @@ class WriteRegionalTacs:
         Returns:
             region_tac (TimeActivityCurve): The calculated TAC for the region. 
         """
+        if self.uses_label_wise_stats(**tac_calc_kwargs):
+            if self.label_stats is None:
+                self.calc_label_stats()
+            extracted_tac, uncertainty = self.label_stats.region_mean_and_std(region_mapping)
+            return TimeActivityCurve(times=self.scan_timing.center_in_mins,
+                                     activity=extracted_tac,
+                                     uncertainty=uncertainty)
+
         region_mask = combine_regions_as_mask(segmentation_img=self.seg_arr,
-                                              label=region_mapping)
+                                              label=region_mapping,
+                                              segmentation_index=self.segmentation_index)
 
         pet_masked_region = apply_mask_4d(input_arr=self.pet_arr,
                                           mask_arr=region_mask)
@@ -16,6 +16,8 @@ from ..utils.scan_timing import ScanTimingInfo
 from ..utils.image_io import get_half_life_from_nifti, safe_copy_meta
 from ..io.image import ImageLoader
 from .motion_target import determine_motion_target
+from .frame_resampling import apply_transforms_to_frames
+from .registration_cache import cached_registration
 from ..utils import image_io
 from ..utils.useful_functions import coerce_outpath_extension
 from ..utils.dimension import check_physical_space_for_ants_image_pair
@@ -45,10 +47,10 @@ def register_pet_to_pet(input_image_path: str,
     wss_reference_ants = ants.image_read(wss_reference)
     input_ants = ants.image_read(input_image_path)
 
-    registration_transform = ants.registration(fixed=wss_reference_ants,
-                                               moving=wss_input_ants,
-                                               type_of_transform='DenseRigid',
-                                               write_composite_transform=True)
+    registration_transform = cached_registration(fixed=wss_reference_ants,
+                                                 moving=wss_input_ants,
+                                                 type_of_transform='DenseRigid',
+                                                 write_composite_transform=True)
     registered_ants_image = ants.apply_transforms(moving=input_ants,
                                                   fixed=wss_reference_ants,
                                                   transformlist=registration_transform['fwdtransforms'],
@@ -69,6 +71,7 @@ def register_pet(input_reg_image_path: str,
                  motion_target_option: Union[str, tuple],
                  verbose: bool,
                  type_of_transform: str = 'DenseRigid',
+                 num_workers: int = 1,
                  **kwargs):
     """
     Computes and runs rigid registration of 4D PET image series to 3D anatomical image, typically
@@ -89,6 +92,8 @@ def register_pet(input_reg_image_path: str,
         out_image_path (str): Path to a .nii or .nii.gz file to which the registered PET series
             is written.
         verbose (bool): Set to ``True`` to output processing information.
+        num_workers (int): Number of frames of a 4D image resampled at the same time. See
+            :func:`~petpal.preproc.frame_resampling.apply_transforms_to_frames`. Default 1.
         kwargs (keyword arguments): Additional arguments passed to :py:func:`ants.registration`.
     """
     motion_target = determine_motion_target(motion_target_option=motion_target_option,
@@ -96,11 +101,11 @@ def register_pet(input_reg_image_path: str,
     motion_target_image = ants.image_read(motion_target)
     mri_image = ants.image_read(reference_image_path)
     pet_image_ants = ants.image_read(input_reg_image_path)
-    xfm_output = ants.registration(moving=motion_target_image,
-                                   fixed=mri_image,
-                                   type_of_transform=type_of_transform,
-                                   write_composite_transform=True,
-                                   **kwargs)
+    xfm_output = cached_registration(moving=motion_target_image,
+                                     fixed=mri_image,
+                                     type_of_transform=type_of_transform,
+                                     write_composite_transform=True,
+                                     **kwargs)
     if verbose:
         print(f'Registration computed transforming image {motion_target} to '
               f'{reference_image_path} space')
@@ -110,11 +115,18 @@ def register_pet(input_reg_image_path: str,
     else:
         dim = 0
 
-    xfm_apply = ants.apply_transforms(moving=pet_image_ants,
-                                      fixed=mri_image,
-                                      transformlist=xfm_output['fwdtransforms'],
-                                      interpolator='linear',
-                                      imagetype=dim)
+    if dim == 3 and num_workers > 1:
+        xfm_apply = apply_transforms_to_frames(input_img=pet_image_ants,
+                                               reference_img=mri_image,
+                                               frame_transformlists=xfm_output['fwdtransforms'],
+                                               interpolator='linear',
+                                               num_workers=num_workers)
+    else:
+        xfm_apply = ants.apply_transforms(moving=pet_image_ants,
+                                          fixed=mri_image,
+                                          transformlist=xfm_output['fwdtransforms'],
+                                          interpolator='linear',
+                                          imagetype=dim)
     if verbose:
         print(f'Registration applied to {input_reg_image_path}')
 
@@ -129,6 +141,7 @@ def warp_pet_to_atlas(input_image_path: str,
                       anat_image_path: str,
                       atlas_image_path: str,
                       type_of_transform: str = 'SyN',
+                      num_workers: int = 1,
                       **kwargs) -> ants.ANTsImage:
     """Warp a (3D or 4D) PET image (in anatomical space) to atlas space using an anatomical image.
 
@@ -140,6 +153,8 @@ def warp_pet_to_atlas(input_image_path: str,
         atlas_image_path (str): Path to atlas to which input image is warped.
         type_of_transform (str): Type of non-linear transform applied to input 
             image using ants.registration. Default is 'SyN' (Symmetric Normalization).
+        num_workers (int): Number of frames of a 4D image resampled at the same time. See
+            :func:`~petpal.preproc.frame_resampling.apply_transforms_to_frames`. Default 1.
         kwargs (keyword arguments): Additional arguments passed to ants.registration().
     
     Returns:
@@ -152,22 +167,28 @@ def warp_pet_to_atlas(input_image_path: str,
     assert check_physical_space_for_ants_image_pair(input_img, anat_img), (
         "input image and anatomical image must occupy the same physical space")
 
-    anat_atlas_xfm = ants.registration(fixed=atlas_img,
-                                       moving=anat_img,
-                                       type_of_transform=type_of_transform,
-                                       write_composite_transform=True,
-                                       **kwargs)
+    anat_atlas_xfm = cached_registration(fixed=atlas_img,
+                                         moving=anat_img,
+                                         type_of_transform=type_of_transform,
+                                         write_composite_transform=True,
+                                         **kwargs)
 
     if input_img.dimension == 4:
         dim = 3
     else:
         dim = 0
 
-    warped_img = ants.apply_transforms(fixed=atlas_img,
-                                       moving=input_img,
-                                       transformlist=anat_atlas_xfm['fwdtransforms'],
-                                       verbose=True,
-                                       imagetype=dim)
+    if dim == 3 and num_workers > 1:
+        warped_img = apply_transforms_to_frames(input_img=input_img,
+                                                reference_img=atlas_img,
+                                                frame_transformlists=anat_atlas_xfm['fwdtransforms'],
+                                                num_workers=num_workers)
+    else:
+        warped_img = ants.apply_transforms(fixed=atlas_img,
+                                           moving=input_img,
+                                           transformlist=anat_atlas_xfm['fwdtransforms'],
+                                           verbose=True,
+                                           imagetype=dim)
 
     return warped_img
 
@@ -177,6 +198,7 @@ def apply_xfm_ants(input_image_path: str,
                    out_image_path: str,
                    xfm_paths: list[str],
                    copy_meta: bool = False,
+                   num_workers: int = 1,
                    **kwargs) -> ants.ANTsImage:
     """
     Applies existing transforms in ANTs or ITK format to an input image, onto
@@ -191,6 +213,9 @@ def apply_xfm_ants(input_image_path: str,
             ANTs or ITK format, and can be affine matrix or warp coefficients.
         copy_meta (bool): If True, copies metadata file read from input_image_path as the metadata
             for new image out_image_path.
+        num_workers (int): Number of frames of a 4D image resampled at the same time, when no
+            additional keyword arguments are given. See
+            :func:`~petpal.preproc.frame_resampling.apply_transforms_to_frames`. Default 1.
 
     Returns:
         xfm_img (ants.ANTsImage): The input image transformed with an ANTs transform file.
@@ -203,11 +228,18 @@ def apply_xfm_ants(input_image_path: str,
     else:
         dim = 0
 
-    xfm_img = ants.apply_transforms(fixed=ref_image_ants,
-                                    moving=pet_image_ants,
-                                    transformlist=xfm_paths,
-                                    imagetype=dim,
-                                    **kwargs)
+    if dim == 3 and num_workers > 1 and set(kwargs) <= {'interpolator'}:
+        xfm_img = apply_transforms_to_frames(input_img=pet_image_ants,
+                                             reference_img=ref_image_ants,
+                                             frame_transformlists=xfm_paths,
+                                             num_workers=num_workers,
+                                             **kwargs)
+    else:
+        xfm_img = ants.apply_transforms(fixed=ref_image_ants,
+                                        moving=pet_image_ants,
+                                        transformlist=xfm_paths,
+                                        imagetype=dim,
+                                        **kwargs)
 
     ants.image_write(xfm_img, out_image_path)
 
@@ -390,14 +422,21 @@ class RegisterPet(RegisterBase):
 
     def register_target(self, transform_type: str='DenseRigid'):
         """Calculate tranform from static target image to reference."""
-        xfm_output = ants.registration(moving=self.target_img,
-                                       fixed=self.reference_img,
-                                       type_of_transform=transform_type,
-                                       **self.reg_kwargs)
+        xfm_output = cached_registration(moving=self.target_img,
+                                         fixed=self.reference_img,
+                                         type_of_transform=transform_type,
+                                         **self.reg_kwargs)
         return xfm_output['fwdtransforms']
     
-    def apply_transform(self, xfm_path: str):
-        """Apply the calculated transform to the dynamic PET image."""
+    def apply_transform(self, xfm_path: str, num_workers: int = 1):
+        """Apply the calculated transform to the dynamic PET image, resampling `num_workers`
+        frames at the same time if greater than one."""
+        if num_workers > 1:
+            return apply_transforms_to_frames(input_img=self.input_img,
+                                              reference_img=self.reference_img,
+                                              frame_transformlists=xfm_path,
+                                              interpolator=self.reg_kwargs['interpolator'],
+                                              num_workers=num_workers)
         pet_registered = ants.apply_transforms(moving=self.input_img,
                                                fixed=self.reference_img,
                                                transformlist=xfm_path,
@@ -412,6 +451,7 @@ class RegisterPet(RegisterBase):
                  reference_image_path: str,
                  transform_type: str = 'DenseRigid',
                  out_xfm_folder: str = None,
+                 num_workers: int = 1,
                  **reg_kwargs):
         """Register dynamic PET to reference
         
@@ -427,6 +467,7 @@ class RegisterPet(RegisterBase):
                 Default 'DenseRigid'.
             out_xfm_folder (str): If set, saves transform files for each stage to the specified
                 folder.
+            num_workers (int): Number of frames resampled at the same time. Default 1.
             reg_kwargs (kwargs): Additional keyword arguments passed on to
                 :py:func:`ants.registration`."""
         self.set_input_scan_properties(input_image_path=input_image_path)
@@ -435,7 +476,7 @@ class RegisterPet(RegisterBase):
         self.set_reg_kwargs(**reg_kwargs)
 
         xfm_path = self.register_target(transform_type=transform_type)
-        pet_registered = self.apply_transform(xfm_path=xfm_path)
+        pet_registered = self.apply_transform(xfm_path=xfm_path, num_workers=num_workers)
         if out_xfm_folder is not None:
             os.makedirs(out_xfm_folder, exist_ok=True)
             if isinstance(xfm_path, list):
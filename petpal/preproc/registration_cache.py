@@ -0,0 +1,265 @@
+"""
+Content-addressed cache of :func:`ants.registration` results.
+
+Re-running a pipeline after changing a downstream parameter recomputes every registration, even
+though the images being registered have not changed; a SyN registration to an atlas alone takes
+many minutes. :func:`cached_registration` is a drop-in replacement for :func:`ants.registration`
+that looks up the result by a hash of the fixed and moving image contents, the transform type,
+the registration keyword arguments and the ANTs version. On a hit, the stored transform files are
+returned without registering.
+
+The cache is off unless a cache directory is set, either with
+:func:`enable_registration_cache` or with the environment variable
+``PETPAL_REGISTRATION_CACHE_DIR``. Since the setting lives in the environment, it also reaches
+worker processes. When the cache grows over its size limit (``PETPAL_REGISTRATION_CACHE_MAX_GB``,
+default 20 GB), the least recently used entries are removed.
+
+Example:
+
+    .. code-block:: python
+
+        from petpal.preproc.registration_cache import enable_registration_cache
+        from petpal.preproc.register import warp_pet_to_atlas
+
+        enable_registration_cache('/scratch/petpal_registration_cache', max_size_gb=50)
+        # The first call registers; calls with the same images and settings reuse the transforms.
+        warped_img = warp_pet_to_atlas(input_image_path='sub-001_space-mpr_pet.nii.gz',
+                                       anat_image_path='sub-001_T1w.nii.gz',
+                                       atlas_image_path='atlas_T1w.nii.gz')
+
+Note:
+    Cache hits only return the transforms, ``fwdtransforms`` and ``invtransforms``, and not the
+    warped images of :func:`ants.registration`.
+"""
+import os
+import json
+import uuid
+import shutil
+import hashlib
+import ants
+import numpy as np
+
+
+REGISTRATION_CACHE_DIR_ENV_VAR = 'PETPAL_REGISTRATION_CACHE_DIR'
+REGISTRATION_CACHE_MAX_GB_ENV_VAR = 'PETPAL_REGISTRATION_CACHE_MAX_GB'
+DEFAULT_MAX_CACHE_GB = 20.0
+
+_UNHASHED_REG_KWARGS = ('verbose', 'outprefix')
+
+
+def enable_registration_cache(cache_dir: str, max_size_gb: float = DEFAULT_MAX_CACHE_GB):
+    """Cache registration results in `cache_dir`, for this process and processes it starts.
+
+    Args:
+        cache_dir (str): Directory in which registration results are stored.
+        max_size_gb (float): Size of the cache in GB over which the least recently used entries
+            are removed. Default 20.
+    """
+    os.environ[REGISTRATION_CACHE_DIR_ENV_VAR] = str(cache_dir)
+    os.environ[REGISTRATION_CACHE_MAX_GB_ENV_VAR] = str(max_size_gb)
+
+
+def disable_registration_cache():
+    """Stop caching registration results. Existing cache entries are kept on disk."""
+    os.environ.pop(REGISTRATION_CACHE_DIR_ENV_VAR, None)
+    os.environ.pop(REGISTRATION_CACHE_MAX_GB_ENV_VAR, None)
+
+
+class RegistrationCache:
+    """Registration results stored by a hash of their inputs.
+
+    Each entry is a directory named by the key, holding copies of the transform files and an
+    ``entry.json`` file listing them. The modification time of ``entry.json`` marks when the entry
+    was last used.
+
+    :ivar cache_dir: Directory holding the cache entries.
+    :ivar max_size_bytes: Size of the cache over which the least recently used entries are
+        removed.
+    """
+    def __init__(self, cache_dir: str, max_size_bytes: float):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_environment(cls) -> 'RegistrationCache | None':
+        """The cache set by :func:`enable_registration_cache` or the environment, or None if
+        caching is off."""
+        cache_dir = os.environ.get(REGISTRATION_CACHE_DIR_ENV_VAR)
+        if not cache_dir:
+            return None
+        max_size_gb = float(os.environ.get(REGISTRATION_CACHE_MAX_GB_ENV_VAR,
+                                           DEFAULT_MAX_CACHE_GB))
+        return cls(cache_dir=cache_dir, max_size_bytes=max_size_gb * 1e9)
+
+    @staticmethod
+    def hash_image(img: ants.ANTsImage) -> str:
+        """Hash of the voxel values and physical space of an image."""
+        img_hash = hashlib.sha256()
+        img_arr = np.ascontiguousarray(img.numpy())
+        img_hash.update(repr((img_arr.dtype.str, img_arr.shape, img.spacing, img.origin,
+                              np.asarray(img.direction).tolist())).encode())
+        img_hash.update(img_arr.tobytes())
+        return img_hash.hexdigest()
+
+    @classmethod
+    def _hashable_value(cls, value) -> object:
+        """Replace images and existing files in a registration argument by hashes of their
+        contents."""
+        if isinstance(value, ants.ANTsImage):
+            return ('image', cls.hash_image(value))
+        if isinstance(value, (list, tuple)):
+            return [cls._hashable_value(element) for element in value]
+        if isinstance(value, str) and os.path.isfile(value):
+            with open(value, 'rb') as value_file:
+                return ('file', hashlib.sha256(value_file.read()).hexdigest())
+        return repr(value)
+
+    @classmethod
+    def registration_key(cls,
+                         fixed: ants.ANTsImage,
+                         moving: ants.ANTsImage,
+                         type_of_transform: str,
+                         reg_kwargs: dict) -> str:
+        """Key of a registration: a hash of the fixed and moving images, the transform type, the
+        keyword arguments and the ANTs version.
+
+        Arguments that do not change the transforms, such as ``verbose``, are left out.
+        """
+        hashed_kwargs = {name: cls._hashable_value(value) for name, value in
+                         sorted(reg_kwargs.items()) if name not in _UNHASHED_REG_KWARGS}
+        key_items = [ants.__version__,
+                     cls.hash_image(fixed),
+                     cls.hash_image(moving),
+                     type_of_transform,
+                     hashed_kwargs]
+        return hashlib.sha256(json.dumps(key_items, sort_keys=True).encode()).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key: str) -> dict | None:
+        """Get a stored registration result and mark it as used.
+
+        Args:
+            key (str): Key from :meth:`registration_key`.
+
+        Returns:
+            registration (dict | None): ``fwdtransforms`` and ``invtransforms`` pointing to files
+                in the cache, and any ``metadata`` stored with them, or None if there is no entry.
+        """
+        entry_json = os.path.join(self._entry_path(key), 'entry.json')
+        try:
+            with open(entry_json, 'r', encoding='utf-8') as entry_file:
+                entry = json.load(entry_file)
+            os.utime(entry_json)
+        except (OSError, ValueError):
+            return None
+
+        def to_cache_paths(xfm_names):
+            if isinstance(xfm_names, str):
+                return os.path.join(self._entry_path(key), xfm_names)
+            return [os.path.join(self._entry_path(key), xfm_name) for xfm_name in xfm_names]
+
+        registration = {name: to_cache_paths(entry[name])
+                        for name in ('fwdtransforms', 'invtransforms')}
+        registration['metadata'] = entry.get('metadata', {})
+        return registration
+
+    def store(self, key: str, registration: dict, metadata: dict | None = None):
+        """Copy the transforms of a registration result into the cache, then evict old entries
+        if the cache is over its size limit.
+
+        The entry is assembled in a temporary directory and renamed into place, so concurrent
+        processes never see a partial entry.
+
+        Args:
+            key (str): Key from :meth:`registration_key`.
+            registration (dict): Result of :func:`ants.registration`.
+            metadata (dict | None): JSON-serializable information stored with the transforms.
+        """
+        tmp_entry_path = os.path.join(self.cache_dir, f'tmp-{uuid.uuid4().hex}')
+        os.makedirs(tmp_entry_path)
+        copied_names = {}
+
+        def copy_xfms(xfm_paths):
+            if isinstance(xfm_paths, str):
+                return copy_xfms([xfm_paths])[0]
+            xfm_names = []
+            for xfm_path in xfm_paths:
+                if xfm_path not in copied_names:
+                    xfm_name = f'{len(copied_names)}_{os.path.basename(xfm_path)}'
+                    shutil.copyfile(xfm_path, os.path.join(tmp_entry_path, xfm_name))
+                    copied_names[xfm_path] = xfm_name
+                xfm_names.append(copied_names[xfm_path])
+            return xfm_names
+
+        entry = {name: copy_xfms(registration[name])
+                 for name in ('fwdtransforms', 'invtransforms')}
+        entry['metadata'] = metadata or {}
+        with open(os.path.join(tmp_entry_path, 'entry.json'), 'w', encoding='utf-8') as entry_file:
+            json.dump(entry, entry_file)
+        try:
+            os.rename(tmp_entry_path, self._entry_path(key))
+        except OSError:
+            shutil.rmtree(tmp_entry_path, ignore_errors=True)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in its size limit."""
+        entries = []
+        for entry_name in os.listdir(self.cache_dir):
+            entry_path = os.path.join(self.cache_dir, entry_name)
+            entry_json = os.path.join(entry_path, 'entry.json')
+            if entry_name.startswith('tmp-') or not os.path.isfile(entry_json):
+                continue
+            entry_size = sum(os.path.getsize(os.path.join(entry_path, file_name))
+                             for file_name in os.listdir(entry_path))
+            entries.append((os.path.getmtime(entry_json), entry_size, entry_path))
+
+        cache_size = sum(entry_size for _, entry_size, _ in entries)
+        for _, entry_size, entry_path in sorted(entries):
+            if cache_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            cache_size -= entry_size
+
+
+def cached_registration(fixed: ants.ANTsImage,
+                        moving: ants.ANTsImage,
+                        type_of_transform: str = 'SyN',
+                        **kwargs) -> dict:
+    """Run :func:`ants.registration`, reusing a cached result for identical inputs.
+
+    When caching is off, this is exactly :func:`ants.registration`. See the module documentation
+    for how to turn caching on.
+
+    Args:
+        fixed (ants.ANTsImage): Fixed image.
+        moving (ants.ANTsImage): Moving image.
+        type_of_transform (str): Type of transform. Default 'SyN', as :func:`ants.registration`.
+        kwargs (keyword arguments): Additional arguments passed on to :func:`ants.registration`.
+
+    Returns:
+        registration (dict): Result of :func:`ants.registration`. On a cache hit, only
+            ``fwdtransforms`` and ``invtransforms``.
+    """
+    cache = RegistrationCache.from_environment()
+    if cache is None:
+        return ants.registration(fixed=fixed,
+                                 moving=moving,
+                                 type_of_transform=type_of_transform,
+                                 **kwargs)
+    key = cache.registration_key(fixed=fixed,
+                                 moving=moving,
+                                 type_of_transform=type_of_transform,
+                                 reg_kwargs=kwargs)
+    registration = cache.load(key)
+    if registration is not None:
+        return registration
+    registration = ants.registration(fixed=fixed,
+                                     moving=moving,
+                                     type_of_transform=type_of_transform,
+                                     **kwargs)
+    cache.store(key, registration)
+    return registration
@@ -19,10 +19,14 @@ from ..utils.dimension import (check_physical_space_for_ants_image_pair,
 
 from ..utils.useful_functions import get_average_of_timeseries
 from ..utils import math_lib
+from ..utils.segmentation_index import SegmentationIndex
+from .hessian_objectness import multiscale_hessian_objectness
 
 
 def combine_regions_as_mask(segmentation_img: ants.core.ANTsImage | np.ndarray,
-                            label: int | list[int]) -> ants.core.ANTsImage:
+                            label: int | list[int],
+                            segmentation_index: SegmentationIndex | None = None
+                            ) -> ants.core.ANTsImage:
     """
     Create a mask from a segmentation image and one or more labels.
 
@@ -33,6 +37,9 @@ def combine_regions_as_mask(segmentation_img: ants.core.ANTsImage | np.ndarray,
     Args:
         segmentation_img (ants.core.ANTsImage | np.ndarray): Image or array of brain regions.
         label (int | list[int]): Label or labels to mask the segmentation with.
+        segmentation_index (SegmentationIndex | None): Precomputed index of ``segmentation_img``.
+            If provided, the mask is built from the stored voxel lists instead of comparing the
+            whole segmentation against each label. Default None.
     
     Returns:
         mask (ants.core.ANTsImage | np.ndarray): Image or array of mask on the provided labels.
@@ -57,6 +64,11 @@ def combine_regions_as_mask(segmentation_img: ants.core.ANTsImage | np.ndarray,
     
 
     """
+    if segmentation_index is not None:
+        mask = segmentation_index.region_mask(label).astype(int)
+        if isinstance(segmentation_img, ants.core.ANTsImage):
+            return ants.from_numpy_like(mask.astype(np.float32), segmentation_img)
+        return mask
     if isinstance(label, Integral):
         label = [label]
     mask = sum(segmentation_img==l for l in label)
@@ -470,6 +482,9 @@ def calc_vesselness_measure_image(input_image: ants.core.ANTsImage,
                                   beta: float = 0.5,
                                   gamma: float = 5.0,
                                   morph_open_radius: int = 1,
+                                  backend: str = 'ants',
+                                  bounding_box: tuple[tuple[int, int], ...] | None = None,
+                                  num_workers: int = 1,
                                   **hessian_func_kwargs) -> ants.core.ANTsImage:
     """
     Computes a vesselness measure image using Hessian-based objectness filtering.
@@ -481,6 +496,10 @@ def calc_vesselness_measure_image(input_image: ants.core.ANTsImage,
     in the output image. Optionally, a morphological opening operation can be
     applied to the result to refine the output and remove pepper-like artefacts.
 
+    With ``backend='native'``, the same measure is computed with
+    :func:`~petpal.preproc.hessian_objectness.multiscale_hessian_objectness` instead, which
+    computes scales in parallel and can be restricted to a bounding box, such as the neck.
+
     From the docs of :func:`ants.hessian_objectness`:
     '
     Based on the paper by Westin et al., "Geometrical
@@ -503,6 +522,15 @@ def calc_vesselness_measure_image(input_image: ants.core.ANTsImage,
         morph_open_radius (int, optional): Radius for the optional morphological
             opening operation (default: 1). If set to 0, no morphological opening
             will be applied.
+        backend (str, optional): ``'ants'`` to use :func:`ants.hessian_objectness`, or
+            ``'native'`` to use
+            :func:`~petpal.preproc.hessian_objectness.multiscale_hessian_objectness`
+            (default: 'ants').
+        bounding_box (tuple[tuple[int, int], ...], optional): ``(start, stop)`` voxel indices
+            along each axis, stop excluded, of the region in which vesselness is computed.
+            Vesselness is zero outside. Requires the native backend (default: None).
+        num_workers (int, optional): Number of scales computed at the same time by the native
+            backend (default: 1).
         **hessian_func_kwargs: Additional keyword arguments for the Hessian
             objectness function.
 
@@ -519,6 +547,8 @@ def calc_vesselness_measure_image(input_image: ants.core.ANTsImage,
 
     Raises:
         AssertionError: If the input image is not 3D.
+        ValueError: If the backend is not 'ants' or 'native', or a bounding box is given with
+            the ants backend.
 
     Workflow:
         1. Normalize the input image to have values between 0 and 1.
@@ -530,13 +560,31 @@ def calc_vesselness_measure_image(input_image: ants.core.ANTsImage,
     """
     assert len(input_image.shape) == 3, "Input image must be 3D."
 
+    if backend not in ('ants', 'native'):
+        raise ValueError(f"Backend {backend} not in ('ants', 'native').")
+    if backend == 'ants' and bounding_box is not None:
+        raise ValueError("A bounding box requires the native backend.")
+
     tmp_img: ants.core.ANTsImage = input_image / input_image.max()
-    hess_objectness_img = tmp_img.hessian_objectness(sigma_min=sigma_min,
-                                                     sigma_max=sigma_max,
-                                                     gamma=gamma,
-                                                     alpha=alpha,
-                                                     beta=beta,
-                                                     **hessian_func_kwargs)
+    if backend == 'native':
+        objectness_arr = multiscale_hessian_objectness(image_arr=tmp_img.numpy(),
+                                                       spacing=tmp_img.spacing,
+                                                       sigma_min=sigma_min,
+                                                       sigma_max=sigma_max,
+                                                       gamma=gamma,
+                                                       alpha=alpha,
+                                                       beta=beta,
+                                                       bounding_box=bounding_box,
+                                                       num_workers=num_workers,
+                                                       **hessian_func_kwargs)
+        hess_objectness_img = tmp_img.new_image_like(objectness_arr)
+    else:
+        hess_objectness_img = tmp_img.hessian_objectness(sigma_min=sigma_min,
+                                                         sigma_max=sigma_max,
+                                                         gamma=gamma,
+                                                         alpha=alpha,
+                                                         beta=beta,
+                                                         **hessian_func_kwargs)
     if morph_open_radius > 0:
         hess_objectness_img = hess_objectness_img.morphology(operation='open',
                                                              radius=morph_open_radius,
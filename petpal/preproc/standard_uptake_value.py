@@ -3,42 +3,28 @@ Module for functions calculating standard uptake value (SUV) and related measure
 uptake value ratio (SUVR).
 """
 import ants
-
-from ..utils.dimension import gen_3d_img_from_timeseries
+import numpy as np
 
 from ..utils.stats import mean_value_in_region
-from ..utils.math_lib import weighted_sum_computation
+from ..utils.segmentation_index import SegmentationIndex
+from ..utils.derived_image_cache import DerivedImageCache, active_derived_image_cache
+from ..utils.math_lib import weighted_sum_frame_weights, accumulate_weighted_frames
 from ..utils.useful_functions import nearest_frame_to_timepoint
 from ..utils.image_io import (get_half_life_from_nifti,
+                              iter_nifti_frames,
                               load_metadata_for_nifti_with_same_filename,
                               safe_copy_meta)
 
 
-def weighted_sum_for_suv(input_image_path: str,
-                         output_image_path: str | None,
-                         start_time: float=0,
-                         end_time: float=-1) -> ants.ANTsImage:
-    """Function that calculates the weighted series sum for a PET image specifically for
-    calculating the standard uptake value (SUV) of the image.
-    
-    Args:
-        input_image_path (str): Path to a 4D PET image which we calculate the sum on.
-        output_image_path (str): Path to which output image is saved. If None, returns
-            calculated image without saving.
-        start_time: Time in seconds from the start of the scan from which to begin sum calculation.
-            Only frames after selected time will be included in the sum. Default 0.
-        end_time: Time in seconds from the start of the scan from which to end sum calculation.
-            Only frames before selected time will be included in the sum. If -1, use all frames
-            after `start_time` in the calculation. Default -1.
-            
-    Returns:
-        weighted_sum_img (ants.ANTsImage): 3D image resulting from the sum calculation.
-    """
+def _compute_weighted_sum_for_suv(input_image_path: str,
+                                  start_time: float,
+                                  end_time: float) -> ants.ANTsImage:
+    """Compute the weighted series sum of :func:`weighted_sum_for_suv`, without the cache."""
     half_life = get_half_life_from_nifti(image_path=input_image_path)
     if half_life <= 0:
         raise ValueError('(ImageOps4d): Radioisotope half life is zero or negative.')
     pet_meta = load_metadata_for_nifti_with_same_filename(input_image_path)
-    pet_img = ants.image_read(input_image_path)
+    pet_header = ants.image_header_info(input_image_path)
     frame_start = pet_meta['FrameTimesStart']
     frame_duration = pet_meta['FrameDuration']
 
@@ -59,17 +45,93 @@ def weighted_sum_for_suv(input_image_path: str,
     calc_last_frame = int(nearest_frame(last_frame_time+scan_start))
     if calc_first_frame==calc_last_frame:
         calc_last_frame += 1
-    pet_series_adjusted = pet_img[:,:,:,calc_first_frame:calc_last_frame]
     frame_start_adjusted = frame_start[calc_first_frame:calc_last_frame]
     frame_duration_adjusted = frame_duration[calc_first_frame:calc_last_frame]
     decay_correction_adjusted = decay_correction[calc_first_frame:calc_last_frame]
 
-    weighted_sum_arr = weighted_sum_computation(frame_duration=frame_duration_adjusted,
-                                                half_life=half_life,
-                                                pet_series=pet_series_adjusted,
-                                                frame_start=frame_start_adjusted,
-                                                decay_correction=decay_correction_adjusted)
-    weighted_sum_img = ants.from_numpy_like(weighted_sum_arr,gen_3d_img_from_timeseries(pet_img))
+    frame_weights = weighted_sum_frame_weights(frame_duration=frame_duration_adjusted,
+                                               half_life=half_life,
+                                               frame_start=frame_start_adjusted,
+                                               decay_correction=decay_correction_adjusted)
+    frames = iter_nifti_frames(image_path=input_image_path,
+                               frame_indices=range(calc_first_frame, calc_last_frame))
+    weighted_sum_arr = accumulate_weighted_frames(frames=frames, frame_weights=frame_weights)
+    weighted_sum_img = ants.from_numpy(data=weighted_sum_arr,
+                                       origin=pet_header['origin'][:3],
+                                       spacing=pet_header['spacing'][:3],
+                                       direction=np.asarray(pet_header['direction'])[:3, :3])
+
+    return weighted_sum_img
+
+
+def cached_weighted_sum_for_suv_path(cache: DerivedImageCache,
+                                     input_image_path: str,
+                                     start_time: float=0,
+                                     end_time: float=-1) -> str:
+    """Path to the weighted series sum of :func:`weighted_sum_for_suv` in a derived image cache,
+    computed on the first request for the same image, time window and half-life.
+
+    Args:
+        cache (DerivedImageCache): Active derived image cache.
+        input_image_path (str): Path to a 4D PET image which we calculate the sum on.
+        start_time: Time in seconds from the start of the scan from which to begin sum calculation.
+            Default 0.
+        end_time: Time in seconds from the start of the scan from which to end sum calculation. If
+            -1, use all frames after `start_time`. Default -1.
+
+    Returns:
+        weighted_sum_path (str): Path to the weighted sum image, owned by the cache.
+    """
+    def write_weighted_sum(out_image_path: str):
+        ants.image_write(_compute_weighted_sum_for_suv(input_image_path=input_image_path,
+                                                       start_time=start_time,
+                                                       end_time=end_time),
+                         out_image_path)
+
+    return cache.get_or_create(input_image_path=input_image_path,
+                               operation='weighted_sum_for_suv',
+                               create=write_weighted_sum,
+                               start_time=float(start_time),
+                               end_time=float(end_time),
+                               half_life=get_half_life_from_nifti(image_path=input_image_path))
+
+
+def weighted_sum_for_suv(input_image_path: str,
+                         output_image_path: str | None,
+                         start_time: float=0,
+                         end_time: float=-1) -> ants.ANTsImage:
+    """Function that calculates the weighted series sum for a PET image specifically for
+    calculating the standard uptake value (SUV) of the image.
+
+    Frames in the time range are streamed from disk one at a time and accumulated into a 3D
+    buffer, so the 4D image is never loaded. Inside
+    :func:`~petpal.utils.derived_image_cache.derived_image_cache`, the sum is computed once per
+    image and time window and shared.
+    
+    Args:
+        input_image_path (str): Path to a 4D PET image which we calculate the sum on.
+        output_image_path (str): Path to which output image is saved. If None, returns
+            calculated image without saving.
+        start_time: Time in seconds from the start of the scan from which to begin sum calculation.
+            Only frames after selected time will be included in the sum. Default 0.
+        end_time: Time in seconds from the start of the scan from which to end sum calculation.
+            Only frames before selected time will be included in the sum. If -1, use all frames
+            after `start_time` in the calculation. Default -1.
+            
+    Returns:
+        weighted_sum_img (ants.ANTsImage): 3D image resulting from the sum calculation.
+    """
+    cache = active_derived_image_cache()
+    if cache is None:
+        weighted_sum_img = _compute_weighted_sum_for_suv(input_image_path=input_image_path,
+                                                         start_time=start_time,
+                                                         end_time=end_time)
+    else:
+        weighted_sum_img = ants.image_read(
+            cached_weighted_sum_for_suv_path(cache=cache,
+                                             input_image_path=input_image_path,
+                                             start_time=start_time,
+                                             end_time=end_time))
 
     if output_image_path is not None:
         ants.image_write(weighted_sum_img, output_image_path)
@@ -117,7 +179,8 @@ def suvr(input_image_path: str,
          segmentation_image_path: str,
          ref_region: int | list[int],
          start_time: float,
-         end_time: float) -> ants.ANTsImage:
+         end_time: float,
+         segmentation_index: SegmentationIndex | None = None) -> ants.ANTsImage:
     """
     Computes an ``SUVR`` (Standard Uptake Value Ratio) by taking the average of
     an input image within a reference region, and dividing the input image by
@@ -136,6 +199,9 @@ def suvr(input_image_path: str,
         end_time: Time in seconds from the start of the scan from which to end sum calculation.
             Only frames before selected time will be included in the sum. If -1, use all frames
             after `start_time` in the calculation. Default -1.
+        segmentation_index (SegmentationIndex | None): Precomputed index of the segmentation
+            image, used to read the reference region voxels without masking the image. Default
+            None.
 
     Returns:
         ants.ANTsImage: SUVR parametric image
@@ -148,7 +214,8 @@ def suvr(input_image_path: str,
 
     ref_region_avg = mean_value_in_region(input_img=sum_img,
                                           seg_img=segmentation_img,
-                                          mappings=ref_region)
+                                          mappings=ref_region,
+                                          segmentation_index=segmentation_index)
 
     suvr_img = sum_img / ref_region_avg
 
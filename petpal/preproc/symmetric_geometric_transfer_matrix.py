@@ -7,7 +7,8 @@ is 4D, the output will be a partial volume corrected TAC for each ROI.
 import os
 import warnings
 import numpy as np
-from scipy.ndimage import gaussian_filter
+from scipy import sparse
+from scipy.linalg import cho_factor, cho_solve, LinAlgError
 import ants
 import pandas as pd
 
@@ -15,7 +16,8 @@ from ..meta.label_maps import LabelMapLoader
 from ..utils.dimension import check_physical_space_for_ants_image_pair
 from ..utils.scan_timing import ScanTimingInfo
 from ..utils.time_activity_curve import TimeActivityCurve
-from ..preproc.segmentation_tools import unique_segmentation_labels
+from ..utils.segmentation_index import SegmentationIndex
+from ..utils.gaussian_blur import GaussianBlur
 
 class Sgtm:
     """Handle sGTM partial volume correction on provided PET images.
@@ -25,7 +27,8 @@ class Sgtm:
                  segmentation_image_path: str,
                  fwhm: float | tuple[float, float, float],
                  label_map_option: str | None = None,
-                 zeroth_roi: bool = False):
+                 zeroth_roi: bool = False,
+                 segmentation_index: SegmentationIndex | None = None):
         r"""Initialize running sGTM
 
         Args:
@@ -39,6 +42,10 @@ class Sgtm:
                 Defaults to None.
             zeroth_roi (bool): If False, ignores the zeroth ``0`` label in calculations, often used to
                 exclude background or non-ROI regions. Defaults to False.
+            segmentation_index (Optional, SegmentationIndex): Precomputed index of the
+                segmentation image. If not provided, it is built once from the segmentation image.
+                Used to find the unique ROI indices and each ROI's voxels without rescanning the
+                segmentation. Defaults to None.
 
 
         Example:
@@ -79,6 +86,9 @@ class Sgtm:
         self.fwhm = fwhm
         self.zeroth_roi = zeroth_roi
         self.sgtm_result = None
+        if segmentation_index is None:
+            segmentation_index = SegmentationIndex.from_array(self.segmentation_image.numpy())
+        self.segmentation_index = segmentation_index
 
     def run(self):
         r"""Determine whether input image is 3D or 4D and run the correct sGTM method.
@@ -150,6 +160,19 @@ class Sgtm:
             sigma = [(fwhm_i / 2.355) / res_i for fwhm_i, res_i in zip(self.fwhm, resolution)]
         return sigma
 
+    @property
+    def unique_segmentation_mappings(self) -> np.ndarray:
+        r"""Unique ROI indices in the segmentation image, read from the segmentation index. Same
+        output as :func:`~petpal.preproc.segmentation_tools.unique_segmentation_labels`.
+
+        Returns:
+            labels (np.ndarray): Array of unique integers in the segmentation image.
+        """
+        labels = self.segmentation_index.labels.astype(np.uint32)
+        if not self.zeroth_roi:
+            labels = labels[labels != 0]
+        return labels
+
     @property
     def unique_labels(self) -> tuple[np.ndarray, list[str]]:
         r"""Get unique ROI indices and corresponding labels. If a segmentation label map was provided at instantiation,
@@ -162,8 +185,7 @@ class Sgtm:
                 and inferred segmentation labels.
         """
         if self.label_map_option is None:
-            region_index_map = unique_segmentation_labels(segmentation_img=self.segmentation_image,
-                                                          zeroth_roi=self.zeroth_roi)
+            region_index_map = self.unique_segmentation_mappings
             region_short_names = [f'UNK{i:05d}' for i in region_index_map]
         else:
             warnings.warn(f"Using label map for sGTM with option: {self.label_map_option}. Users "
@@ -172,8 +194,7 @@ class Sgtm:
                           "segmentation to ensure this criteria is met, or use sGTM without "
                           "label map for automated complete region mapping.")
             seg_label_map = LabelMapLoader(label_map_option=self.label_map_option).label_map
-            unique_mappings = unique_segmentation_labels(segmentation_img=self.segmentation_image,
-                                                       zeroth_roi=self.zeroth_roi)
+            unique_mappings = self.unique_segmentation_mappings
             region_index_map = []
             region_short_names = []
             label_map_labels = list(seg_label_map.keys())
@@ -198,9 +219,13 @@ class Sgtm:
                 obtained by applying a Gaussian filter to each ROI.
 
         Returns:
-            omega (np.ndarray): ``\Omega`` matrix as described in :meth:`run_sgtm`.
+            omega (np.ndarray): ``\Omega`` matrix as described in :meth:`run_sgtm`. Always a
+                dense array, also for a sparse ``V`` from :meth:`get_sparse_voxel_by_roi_matrix`,
+                in which case only overlapping ROI pairs contribute to the product.
         """
         omega = voxel_by_roi_matrix.T @ voxel_by_roi_matrix
+        if sparse.issparse(omega):
+            omega = omega.toarray()
         return omega
 
 
@@ -212,8 +237,8 @@ class Sgtm:
 
         Args:
             omega (np.ndarray): The Omega matrix for sGTM. See :meth:`run_sgtm` for details.
-            voxel_by_roi_matrix (np.ndarray): The ``V`` matrix for sGTM. See :meth:`run_sgtm`
-                for more details.
+            voxel_by_roi_matrix (np.ndarray | sparse.csc_array): The ``V`` matrix for sGTM,
+                dense or sparse. See :meth:`run_sgtm` for more details.
             input_numpy (np.ndarray): The input 3D PET image converted to numpy array.
         """
         t_vector = voxel_by_roi_matrix.T @ input_numpy.ravel()
@@ -223,10 +248,53 @@ class Sgtm:
         return t_corrected, condition_number
 
 
+    @staticmethod
+    def solve_sgtm_4d(omega: np.ndarray,
+                      voxel_by_roi_matrix: np.ndarray | sparse.csc_array,
+                      input_numpy: np.ndarray) -> np.ndarray:
+        r"""Solve the sGTM linear equations for all frames of a 4D image at once.
+
+        Equivalent to :meth:`solve_sgtm` on each frame, but :math:`\Omega` is Cholesky-factored
+        once, :math:`T = V^T P` is computed for all frames as one matrix product over the 4D
+        array reshaped to ``(n_voxels, n_frames)``, and all frames are back-substituted
+        together. The condition number, which the 4D path does not use, is not computed. If
+        :math:`\Omega` is not numerically positive definite, falls back to
+        :func:`numpy.linalg.solve`.
+
+        Args:
+            omega (np.ndarray): The Omega matrix for sGTM. See :meth:`run_sgtm_3d` for details.
+            voxel_by_roi_matrix (np.ndarray | sparse.csc_array): The ``V`` matrix for sGTM, with
+                rows in the C-order of the spatial dimensions.
+            input_numpy (np.ndarray): The input 4D PET image converted to numpy array.
+
+        Returns:
+            frame_results (np.ndarray): Corrected activity with shape ``(n_frames, n_rois)``.
+        """
+        num_frames = input_numpy.shape[-1]
+        if input_numpy.flags.f_contiguous:
+            # Reshape the Fortran-ordered array without a copy and reorder V's rows to match.
+            voxels_by_frames = input_numpy.reshape((-1, num_frames), order='F')
+            c_index_of_f_voxel = np.arange(voxels_by_frames.shape[0]).reshape(
+                input_numpy.shape[:-1]).ravel(order='F')
+            voxel_by_roi_matrix = voxel_by_roi_matrix[c_index_of_f_voxel]
+        else:
+            voxels_by_frames = input_numpy.reshape((-1, num_frames))
+        t_matrix = np.asarray(voxel_by_roi_matrix.T @ voxels_by_frames, dtype=float)
+
+        try:
+            omega_factor = cho_factor(np.asarray(omega, dtype=float))
+            t_corrected = cho_solve(omega_factor, t_matrix)
+        except LinAlgError:
+            t_corrected = np.linalg.solve(omega, t_matrix)
+        return t_corrected.T
+
+
     @staticmethod
     def get_voxel_by_roi_matrix(unique_labels: np.ndarray,
                                 segmentation_arr: np.ndarray,
-                                sigma: list[float]) -> np.ndarray:
+                                sigma: list[float],
+                                segmentation_index: SegmentationIndex | None = None
+                                ) -> np.ndarray:
         r"""Get the ``V`` matrix for sGTM by blurring each ROI and converting into vectors.
         See :meth:`run_sgtm` for more details.
 
@@ -236,20 +304,96 @@ class Sgtm:
             segmentation_arr (np.ndarray): Array containing discrete segmentation image converted
                 to a numpy array.
             sigma (list[float]): List of sigma blurring radii on x, y, z axes respectively.
+            segmentation_index (Optional, SegmentationIndex): Precomputed index of
+                ``segmentation_arr``. If provided, each ROI mask is built from the index instead
+                of comparing the whole segmentation against each label. Defaults to None.
 
         Returns:
             voxel_by_roi_matrix (np.ndarray): The blurred ROI matrix for sGTM.
         """
         voxel_by_roi_matrix = np.zeros((segmentation_arr.size, len(unique_labels)))
+        roi_blur = GaussianBlur(sigma=sigma, method='direct')
 
         for i, label in enumerate(unique_labels):
-            masked_roi = (segmentation_arr == label).astype('float32')
-            blurred_roi = gaussian_filter(masked_roi, sigma=sigma)
+            if segmentation_index is None:
+                masked_roi = (segmentation_arr == label).astype('float32')
+            else:
+                masked_roi = segmentation_index.region_mask(label).astype('float32')
+            blurred_roi = roi_blur.blur_frame(masked_roi)
             voxel_by_roi_matrix[:, i] = blurred_roi.ravel()
 
         return voxel_by_roi_matrix.astype(np.float32)
 
 
+    @staticmethod
+    def get_sparse_voxel_by_roi_matrix(unique_labels: np.ndarray,
+                                       segmentation_arr: np.ndarray,
+                                       sigma: list[float],
+                                       segmentation_index: SegmentationIndex | None = None,
+                                       truncate: float = 4.0) -> sparse.csc_array:
+        r"""Get the ``V`` matrix for sGTM as a sparse matrix, blurring each ROI only within its
+        bounding box padded by the Gaussian kernel radius.
+
+        A blurred ROI is exactly zero farther than the kernel radius,
+        ``int(truncate * sigma + 0.5)`` voxels, from the ROI. Each ROI is therefore cropped to
+        its padded bounding box, blurred there with the same separable
+        :class:`~petpal.utils.gaussian_blur.GaussianBlur` as :meth:`get_voxel_by_roi_matrix`, and
+        stored as one sparse column. The ROIs are blurred by direct filtering rather than FFT,
+        which keeps voxels beyond the kernel radius exactly zero. The values match the dense matrix, while memory and
+        filtering cost scale with the ROI sizes instead of ``n_voxels * n_rois``.
+
+        Args:
+            unique_labels (np.ndarray): Array containing unique values in the discrete segmentation
+                image.
+            segmentation_arr (np.ndarray): Array containing discrete segmentation image converted
+                to a numpy array.
+            sigma (list[float]): List of sigma blurring radii on x, y, z axes respectively.
+            segmentation_index (Optional, SegmentationIndex): Precomputed index of
+                ``segmentation_arr``, used for the voxels and bounding box of each ROI. Built from
+                ``segmentation_arr`` if not provided. Defaults to None.
+            truncate (float): Gaussian kernel radius in units of sigma, as in
+                :func:`~scipy.ndimage.gaussian_filter`. Defaults to 4.0.
+
+        Returns:
+            voxel_by_roi_matrix (sparse.csc_array): The blurred ROI matrix for sGTM with shape
+                ``(n_voxels, n_rois)`` and dtype float32. Rows follow the C-order of
+                ``segmentation_arr.ravel()``.
+        """
+        if segmentation_index is None:
+            segmentation_index = SegmentationIndex.from_array(segmentation_arr)
+        image_shape = segmentation_arr.shape
+        roi_blur = GaussianBlur(sigma=sigma, truncate=truncate, method='direct')
+        kernel_radii = roi_blur.kernel_radii
+
+        col_rows = []
+        col_vals = []
+        for label in unique_labels:
+            roi_box = segmentation_index.region_bounding_box(label)
+            crop = tuple(slice(max(box.start - radius, 0), min(box.stop + radius, dim))
+                         for box, radius, dim in zip(roi_box, kernel_radii, image_shape))
+            crop_shape = tuple(crop_slice.stop - crop_slice.start for crop_slice in crop)
+
+            roi_coords = np.unravel_index(segmentation_index.region_voxel_indices(label),
+                                          image_shape)
+            masked_roi = np.zeros(crop_shape, dtype='float32')
+            masked_roi[tuple(coord - crop_slice.start
+                             for coord, crop_slice in zip(roi_coords, crop))] = 1.0
+            blurred_roi = roi_blur.blur_frame(masked_roi)
+
+            crop_axes = np.ix_(*(np.arange(crop_slice.start, crop_slice.stop)
+                                 for crop_slice in crop))
+            col_rows.append(np.ravel_multi_index(crop_axes, image_shape).ravel())
+            col_vals.append(blurred_roi.ravel())
+
+        indptr = np.concatenate([[0], np.cumsum([len(rows) for rows in col_rows])])
+        voxel_by_roi_matrix = sparse.csc_array((np.concatenate(col_vals),
+                                                np.concatenate(col_rows),
+                                                indptr),
+                                               shape=(segmentation_arr.size, len(unique_labels)))
+        voxel_by_roi_matrix.eliminate_zeros()
+        return voxel_by_roi_matrix
+
+
     def run_sgtm_3d(self) -> tuple[np.ndarray, np.ndarray, float]:
         r"""Apply Symmetric Geometric Transfer Matrix (SGTM) method for Partial Volume Correction
         (PVC) to PET images based on ROI labels.
@@ -278,7 +422,9 @@ class Sgtm:
             where :math:`V` is the matrix obtained by applying Gaussian filtering to each ROI,
             converting each ROI into a vector. The element :math:`\Omega_{ij}` of the matrix
             :math:`\Omega` is the dot product of vectors corresponding to the i-th and j-th ROIs,
-            representing the spatial overlap between these ROIs after blurring.
+            representing the spatial overlap between these ROIs after blurring. :math:`V` is
+            built as a sparse matrix with :meth:`get_sparse_voxel_by_roi_matrix`, so only ROI
+            pairs whose blurred supports overlap contribute to :math:`\Omega`.
 
             The vector :math:`t` is calculated as:
 
@@ -303,9 +449,11 @@ class Sgtm:
 
         unique_labels = self.unique_labels[0]
 
-        voxel_by_roi_matrix = Sgtm.get_voxel_by_roi_matrix(unique_labels=unique_labels,
-                                                           segmentation_arr=segmentation_arr,
-                                                           sigma=self.sigma)
+        voxel_by_roi_matrix = Sgtm.get_sparse_voxel_by_roi_matrix(
+            unique_labels=unique_labels,
+            segmentation_arr=segmentation_arr,
+            sigma=self.sigma,
+            segmentation_index=self.segmentation_index)
         omega = Sgtm.get_omega_matrix(voxel_by_roi_matrix=voxel_by_roi_matrix)
         t_corrected, condition_number = Sgtm.solve_sgtm(omega=omega,
                                                         voxel_by_roi_matrix=voxel_by_roi_matrix,
@@ -320,6 +468,9 @@ class Sgtm:
         This results in a time series of average activity for each region specified in the
         segmentation image. This can then be used for kinetic modeling.
 
+        :math:`\Omega` is factored once and every frame is solved together, see
+        :meth:`solve_sgtm_4d`.
+
         Returns:
             frame_results (np.ndarray): Average activity in each region calculated with sGTM
                 for each frame.
@@ -327,25 +478,22 @@ class Sgtm:
         if not check_physical_space_for_ants_image_pair(self.input_image,
                                                         self.segmentation_image):
             raise AssertionError("PET and ROI images must be the same dimensions")
-        pet_frame_list = self.input_image.ndimage_to_list()
+        input_numpy = self.input_image.numpy()
         segmentation_arr = self.segmentation_image.numpy()
 
         unique_labels = self.unique_labels[0]
 
-        voxel_by_roi_matrix = Sgtm.get_voxel_by_roi_matrix(unique_labels=unique_labels,
-                                                           segmentation_arr=segmentation_arr,
-                                                           sigma=self.sigma)
+        voxel_by_roi_matrix = Sgtm.get_sparse_voxel_by_roi_matrix(
+            unique_labels=unique_labels,
+            segmentation_arr=segmentation_arr,
+            sigma=self.sigma,
+            segmentation_index=self.segmentation_index)
         omega = Sgtm.get_omega_matrix(voxel_by_roi_matrix=voxel_by_roi_matrix)
+        frame_results = Sgtm.solve_sgtm_4d(omega=omega,
+                                           voxel_by_roi_matrix=voxel_by_roi_matrix,
+                                           input_numpy=input_numpy)
 
-        frame_results = []
-        for frame in pet_frame_list:
-            input_numpy = frame.numpy()
-            t_corrected, _cond_num = Sgtm.solve_sgtm(omega=omega,
-                                                     voxel_by_roi_matrix=voxel_by_roi_matrix,
-                                                     input_numpy=input_numpy)
-            frame_results += [t_corrected]
-
-        return np.asarray(frame_results)
+        return frame_results
 
     def save_results_3d(self, sgtm_result: tuple, out_tsv_path: str):
         r"""Saves the result of an sGTM calculation.
@@ -0,0 +1,237 @@
+"""
+Collects the transforms that take a dynamic PET image to its final space and resamples the image
+once.
+
+The default preprocessing pipeline resamples the dynamic PET up to three times: once when
+applying the motion correction frame transforms, once when applying the PET to anatomical
+transform and once when warping to an atlas. Each pass is a full 4D interpolation, with its own
+intermediate image and its own interpolation blur. ANTs composes every transform in a transform
+list before interpolating, so passing the whole chain for each frame to
+:func:`ants.apply_transforms` resamples each frame only once.
+
+:class:`TransformChain` holds the per-frame transforms (e.g. from
+:meth:`~petpal.preproc.motion_corr.MotionCorrect.register_windows`) and the transforms shared by
+every frame (e.g. PET to T1, then T1 to atlas), and
+:func:`motion_correct_and_register_with_single_resampling` computes the whole chain and applies it.
+
+Example:
+
+    .. code-block:: python
+
+        from petpal.preproc.transform_chain import (
+            motion_correct_and_register_with_single_resampling)
+
+        motion_correct_and_register_with_single_resampling(
+            input_image_path='sub-001_pet.nii.gz',
+            out_image_path='sub-001_space-atlas_pet.nii.gz',
+            motion_target_option='weighted_series_sum',
+            anat_image_path='sub-001_T1w.nii.gz',
+            atlas_image_path='atlas_T1w.nii.gz',
+            window_duration=300)
+
+"""
+import tempfile
+import ants
+
+from .frame_resampling import apply_transforms_to_frames, write_frame_transforms
+from .motion_corr import MotionCorrect
+from .motion_target import determine_motion_target
+from .registration_cache import cached_registration
+from ..utils.image_io import safe_copy_meta
+
+
+class TransformChain:
+    """Transforms taking each frame of a dynamic PET image to a final space.
+
+    Transforms are stored in the order they act on the moving image: first the frame's own
+    transform, if any, then each shared stage in the order it was added. For
+    :func:`ants.apply_transforms`, where the last transform in the list is applied first, the
+    order is reversed by :meth:`transformlist`.
+
+    :ivar reference_img: (ants.ANTsImage) Image defining the final space and sampling grid.
+    :ivar frame_xfm_paths: (list[str] | None) Path to the transform of each frame, such as the
+        motion correction transforms. None if every frame shares the same transforms.
+    :ivar stage_xfm_paths: (list[list[str]]) Transforms shared by every frame, one list per stage,
+        in the order the stages act on the image. Each list is in
+        :func:`ants.apply_transforms` order, as returned by ``ants.registration``'s
+        ``fwdtransforms``.
+    """
+    def __init__(self, reference_img: ants.ANTsImage):
+        self.reference_img = reference_img
+        self.frame_xfm_paths = None
+        self.stage_xfm_paths = []
+        self._xfm_dir = None
+
+    def set_frame_transforms(self, frame_xfms: list[str | ants.ANTsTransform]):
+        """Set the transform of each frame.
+
+        Args:
+            frame_xfms (list[str | ants.ANTsTransform]): Transform file path or ANTs transform of
+                each frame. Paths, such as
+                :attr:`~petpal.preproc.motion_corr.MotionCorrect.frame_xfm_paths`, are used as
+                they are. ANTs transforms are written to a temporary directory owned by the chain
+                and removed with it, once for each distinct transform object, since frames in the
+                same window share the same transform.
+        """
+        if self._xfm_dir is None and any(isinstance(frame_xfm, ants.ANTsTransform)
+                                         for frame_xfm in frame_xfms):
+            self._xfm_dir = tempfile.TemporaryDirectory()
+        xfm_dir = None if self._xfm_dir is None else self._xfm_dir.name
+        self.frame_xfm_paths = write_frame_transforms(frame_xfms, xfm_dir=xfm_dir)
+
+    def add_stage(self, xfm_paths: str | list[str]):
+        """Add transforms shared by every frame, acting after all the transforms already in the
+        chain.
+
+        Args:
+            xfm_paths (str | list[str]): Transform file or files of the stage, e.g. the
+                ``fwdtransforms`` of ``ants.registration``.
+        """
+        if isinstance(xfm_paths, str):
+            xfm_paths = [xfm_paths]
+        self.stage_xfm_paths.append(list(xfm_paths))
+
+    def transformlist(self, frame_index: int | None = None) -> list[str]:
+        """The transform list for :func:`ants.apply_transforms` taking a frame to the final space.
+
+        Args:
+            frame_index (int | None): Index of the frame. Must be given if the chain has frame
+                transforms. Default None.
+
+        Returns:
+            transformlist (list[str]): Transform files, last applied first.
+        """
+        transformlist = []
+        for xfm_paths in reversed(self.stage_xfm_paths):
+            transformlist += xfm_paths
+        if self.frame_xfm_paths is not None:
+            transformlist.append(self.frame_xfm_paths[frame_index])
+        return transformlist
+
+    def apply(self,
+              input_img: ants.ANTsImage,
+              interpolator: str = 'linear',
+              num_workers: int = 1,
+              use_processes: bool = False) -> ants.ANTsImage:
+        """Resample a 3D or 4D image into the final space in one interpolation per frame.
+
+        Args:
+            input_img (ants.ANTsImage): Image in the space the chain starts from.
+            interpolator (str): Interpolator passed on to :func:`ants.apply_transforms`. Default
+                'linear'.
+            num_workers (int): Number of frames resampled at the same time. Default 1. See
+                :func:`~petpal.preproc.frame_resampling.apply_transforms_to_frames`.
+            use_processes (bool): If True, resample frames in worker processes instead of
+                threads. Default False.
+
+        Returns:
+            xfm_img (ants.ANTsImage): Image resampled into the space of `reference_img`.
+
+        Raises:
+            ValueError: If the number of frame transforms does not match the number of frames.
+        """
+        if input_img.dimension == 3:
+            return ants.apply_transforms(fixed=self.reference_img,
+                                         moving=input_img,
+                                         transformlist=self.transformlist(frame_index=0),
+                                         interpolator=interpolator)
+
+        num_frames = input_img.shape[-1]
+        if self.frame_xfm_paths is not None and len(self.frame_xfm_paths) != num_frames:
+            raise ValueError(f"Chain has {len(self.frame_xfm_paths)} frame transforms, but the "
+                             f"image has {num_frames} frames.")
+        frame_transformlists = [self.transformlist(frame_index=frame_index)
+                                for frame_index in range(num_frames)]
+        return apply_transforms_to_frames(input_img=input_img,
+                                          reference_img=self.reference_img,
+                                          frame_transformlists=frame_transformlists,
+                                          interpolator=interpolator,
+                                          num_workers=num_workers,
+                                          use_processes=use_processes)
+
+
+def motion_correct_and_register_with_single_resampling(input_image_path: str,
+                                                       out_image_path: str,
+                                                       motion_target_option: str | tuple,
+                                                       anat_image_path: str,
+                                                       atlas_image_path: str | None = None,
+                                                       window_duration: float = 300,
+                                                       moco_transform_type: str = 'DenseRigid',
+                                                       anat_transform_type: str = 'DenseRigid',
+                                                       atlas_transform_type: str = 'SyN',
+                                                       interpolator: str = 'linear',
+                                                       resample_num_workers: int = 1,
+                                                       **moco_kwargs) -> ants.ANTsImage:
+    """Motion correct a dynamic PET image, register it to an anatomical image and optionally warp
+    it to an atlas, resampling the image only once.
+
+    Computes the windowed motion correction transforms with
+    :meth:`~petpal.preproc.motion_corr.MotionCorrect.register_windows`, the rigid transform from
+    the motion target to the anatomical image, and, if `atlas_image_path` is set, the transform
+    from the anatomical image to the atlas. The chain of transforms is then applied to each frame
+    in a single interpolation with :class:`TransformChain`. This replaces running
+    :class:`~petpal.preproc.motion_corr.MotionCorrect`,
+    :func:`~petpal.preproc.register.register_pet` and
+    :func:`~petpal.preproc.register.warp_pet_to_atlas` one after the other, which resamples the
+    dynamic image three times.
+
+    Args:
+        input_image_path (str): Path to dynamic PET image.
+        out_image_path (str): Path to which the resampled image is saved.
+        motion_target_option (str | tuple): Option for the motion target, a static image
+            representing the dynamic PET image, to which windows are registered and which is
+            registered to the anatomical image. See
+            :func:`~petpal.preproc.motion_target.determine_motion_target`.
+        anat_image_path (str): Path to anatomical image, such as a T1w MRI.
+        atlas_image_path (str | None): Path to atlas image. If None, the output is in anatomical
+            space. Default None.
+        window_duration (float): Duration of each motion correction window in seconds. Default
+            300.
+        moco_transform_type (str): Type of transform for motion correction. Default DenseRigid.
+        anat_transform_type (str): Type of transform from the motion target to the anatomical
+            image. Default DenseRigid.
+        atlas_transform_type (str): Type of transform from the anatomical image to the atlas.
+            Default SyN.
+        interpolator (str): Interpolator used for the single resampling. Default 'linear'.
+        resample_num_workers (int): Number of frames resampled at the same time. Default 1.
+        moco_kwargs (keyword arguments): Additional arguments passed on to
+            :meth:`~petpal.preproc.motion_corr.MotionCorrect.register_windows`, such as
+            `num_workers` or `warm_start`.
+
+    Returns:
+        xfm_img (ants.ANTsImage): Motion corrected dynamic PET image in anatomical or atlas space.
+    """
+    motion_target_path = determine_motion_target(motion_target_option=motion_target_option,
+                                                 input_image_path=input_image_path)
+    motion_corrector = MotionCorrect()
+    motion_corrector.set_input_scan_properties(input_image_path=input_image_path)
+    motion_corrector.set_target_img(motion_target_path=motion_target_path)
+    motion_corrector.set_reg_kwargs(write_composite_transform=True)
+    motion_corrector.register_windows(window_duration=window_duration,
+                                      transform_type=moco_transform_type,
+                                      **moco_kwargs)
+
+    anat_img = ants.image_read(anat_image_path)
+    anat_xfm = cached_registration(fixed=anat_img,
+                                   moving=motion_corrector.target_img,
+                                   type_of_transform=anat_transform_type,
+                                   write_composite_transform=True)
+    transform_chain = TransformChain(reference_img=anat_img)
+    transform_chain.set_frame_transforms(motion_corrector.frame_xfm_paths)
+    transform_chain.add_stage(anat_xfm['fwdtransforms'])
+
+    if atlas_image_path is not None:
+        atlas_img = ants.image_read(atlas_image_path)
+        atlas_xfm = cached_registration(fixed=atlas_img,
+                                        moving=anat_img,
+                                        type_of_transform=atlas_transform_type,
+                                        write_composite_transform=True)
+        transform_chain.reference_img = atlas_img
+        transform_chain.add_stage(atlas_xfm['fwdtransforms'])
+
+    xfm_img = transform_chain.apply(input_img=motion_corrector.input_img,
+                                    interpolator=interpolator,
+                                    num_workers=resample_num_workers)
+    ants.image_write(xfm_img, out_image_path)
+    safe_copy_meta(input_image_path=input_image_path, out_image_path=out_image_path)
+    return xfm_img
@@ -11,6 +11,9 @@ from . import scan_timing
 from . import metadata
 from . import stats
 from . import dimension
+from . import segmentation_index
+from . import derived_image_cache
+from . import gaussian_blur
 
 def main():
     print("PETPAL - Utilities")
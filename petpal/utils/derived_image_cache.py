@@ -0,0 +1,139 @@
+"""
+Per-run cache of images derived from an input image, such as weighted sums and mean images.
+
+Several preprocessing steps derive the same static image from the same dynamic PET image: the
+motion target of motion correction and registration, the reference image of
+:func:`~petpal.preproc.brain_mask_pet.brain_mask_pet`, and the summed image of
+:func:`~petpal.preproc.standard_uptake_value.suv` and
+:func:`~petpal.preproc.standard_uptake_value.suvr`. While a :class:`DerivedImageCache` is active,
+each derived image is computed once, written to the cache directory, and the file is reused by
+every later request with the same key. The key is the input path and its modification time (and
+that of its .json sidecar), the operation and the operation's parameters, such as the time window
+and the half-life. When the cache is closed, its files are removed.
+
+:class:`~petpal.pipelines.steps_containers.StepsPipeline` runs its steps inside
+:func:`derived_image_cache`, so derived images are shared across the steps of one run.
+
+Example:
+
+    .. code-block:: python
+
+        from petpal.utils.derived_image_cache import derived_image_cache
+        from petpal.preproc.standard_uptake_value import suv, suvr
+
+        with derived_image_cache():
+            # The weighted sum over 1800-3600 s is computed once and used by both.
+            suv(input_image_path='sub-001_pet.nii.gz', output_image_path='sub-001_suv.nii.gz',
+                weight=70, dose=370, start_time=1800, end_time=3600)
+            suvr(input_image_path='sub-001_pet.nii.gz', output_image_path='sub-001_suvr.nii.gz',
+                 segmentation_image_path='sub-001_dseg.nii.gz', ref_region=8,
+                 start_time=1800, end_time=3600)
+
+"""
+import os
+import shutil
+import tempfile
+from collections.abc import Callable
+from contextlib import contextmanager
+
+from .image_io import gen_meta_data_filepath_for_nifti
+
+_ACTIVE_CACHES = []
+
+
+class DerivedImageCache:
+    """Files of images derived from input images, computed once and shared while the cache is
+    active.
+
+    :ivar cache_dir: Directory holding the derived images, removed when the cache is closed.
+    :ivar entries: Mapping from each key to the path of its derived image.
+    """
+    def __init__(self):
+        self.cache_dir = tempfile.mkdtemp(prefix='petpal_derived_')
+        self.entries = {}
+
+    @staticmethod
+    def derived_image_key(input_image_path: str, operation: str, **params) -> tuple:
+        """Key of an image derived from `input_image_path`.
+
+        The key changes when the input image or its .json sidecar are modified, since timing and
+        decay information is read from the sidecar.
+
+        Args:
+            input_image_path (str): Path to the input image.
+            operation (str): Name of the operation deriving the image.
+            params (keyword arguments): Parameters of the operation.
+
+        Returns:
+            key (tuple): Hashable key.
+        """
+        input_image_path = os.path.abspath(input_image_path)
+        meta_path = gen_meta_data_filepath_for_nifti(nifty_path=input_image_path)
+        meta_mtime = os.stat(meta_path).st_mtime_ns if os.path.exists(meta_path) else None
+        return (input_image_path,
+                os.stat(input_image_path).st_mtime_ns,
+                meta_mtime,
+                operation,
+                tuple(sorted(params.items())))
+
+    def get_or_create(self,
+                      input_image_path: str,
+                      operation: str,
+                      create: Callable[[str], object],
+                      **params) -> str:
+        """Path to a derived image, created on the first request.
+
+        Args:
+            input_image_path (str): Path to the input image.
+            operation (str): Name of the operation deriving the image.
+            create (Callable[[str], object]): Function writing the derived image to the path it is
+                given. Only called if the image is not in the cache.
+            params (keyword arguments): Parameters of the operation, part of the key.
+
+        Returns:
+            derived_image_path (str): Path to the derived image in the cache directory. The file
+                is removed when the cache is closed, so it must not be moved or deleted.
+        """
+        key = self.derived_image_key(input_image_path, operation, **params)
+        derived_image_path = self.entries.get(key)
+        if derived_image_path is not None and os.path.exists(derived_image_path):
+            return derived_image_path
+        derived_image_path = os.path.join(self.cache_dir,
+                                          f'{len(self.entries)}_{operation}.nii.gz')
+        create(derived_image_path)
+        self.entries[key] = derived_image_path
+        return derived_image_path
+
+    def close(self):
+        """Remove the cached files."""
+        self.entries.clear()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+def active_derived_image_cache() -> DerivedImageCache | None:
+    """The innermost active :class:`DerivedImageCache`, or None outside of
+    :func:`derived_image_cache`."""
+    return _ACTIVE_CACHES[-1] if _ACTIVE_CACHES else None
+
+
+@contextmanager
+def derived_image_cache():
+    """Share derived images within the block, and remove them when it exits.
+
+    If a cache is already active, it is reused, so nested blocks (such as a pipeline run inside a
+    larger script) share the outer cache and its files live until the outer block exits.
+
+    Yields:
+        cache (DerivedImageCache): The active cache.
+    """
+    cache = active_derived_image_cache()
+    if cache is not None:
+        yield cache
+        return
+    cache = DerivedImageCache()
+    _ACTIVE_CACHES.append(cache)
+    try:
+        yield cache
+    finally:
+        _ACTIVE_CACHES.remove(cache)
+        cache.close()
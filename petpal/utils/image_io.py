@@ -7,12 +7,15 @@ import json
 import os
 import pathlib
 import re
+from collections.abc import Iterable, Iterator
 
 import ants
 import nibabel
 import numpy as np
 import pandas as pd
 from nibabel.filebasedimages import FileBasedHeader
+from nibabel.openers import ImageOpener
+from nibabel.volumeutils import seek_tell
 
 from .constants import HALF_LIVES
 
@@ -399,6 +402,96 @@ def safe_load_4dpet_nifti(filename: str) -> nibabel.nifti1.Nifti1Image:
         raise e
 
 
+def iter_nifti_frames(image_path: str | pathlib.Path,
+                      dtype: np.dtype = np.float32,
+                      frame_indices: Iterable[int] | None = None) -> Iterator[np.ndarray]:
+    """
+    Iterate over the frames of a 3D or 4D NIfTI image without loading the whole image.
+
+    Frames are read one at a time through the nibabel array proxy, so peak memory is one frame
+    regardless of the scan length. The file is kept open between frames, so compressed images
+    are decompressed once in a single forward pass. Values are scaled by the header slope and
+    intercept, as with :meth:`nibabel.nifti1.Nifti1Image.get_fdata`.
+
+    Args:
+        image_path (str | pathlib.Path): Path to a .nii or .nii.gz file.
+        dtype (np.dtype): Data type of the yielded frames. The default ``float32`` matches the
+            arrays returned by :meth:`ants.ANTsImage.numpy`. Default ``np.float32``.
+        frame_indices (Iterable[int] | None): Indices of the frames to read, in the order they are
+            yielded. Increasing indices keep the single forward pass. If None, every frame is
+            read. Ignored for a 3D image. Default None.
+
+    Yields:
+        np.ndarray: 3D array for each frame, in the voxel order of the file. A 3D image yields a
+        single frame.
+
+    Example:
+
+        .. code-block:: python
+
+            from petpal.utils.image_io import iter_nifti_frames
+
+            frame_maxima = [frame.max() for frame in iter_nifti_frames("/path/to/pet.nii.gz")]
+
+    """
+    image = nibabel.load(image_path, keep_file_open=True)
+    if len(image.shape) == 3:
+        yield np.asarray(image.dataobj, dtype=dtype)
+        return
+    if frame_indices is None:
+        frame_indices = range(image.shape[3])
+    for frame_id in frame_indices:
+        yield np.asarray(image.dataobj[..., frame_id], dtype=dtype)
+
+
+def write_nifti_frames(out_image_path: str | pathlib.Path,
+                       frames: Iterable[np.ndarray],
+                       template_image_path: str | pathlib.Path,
+                       num_frames: int,
+                       dtype: np.dtype = np.float32):
+    """
+    Write a 4D NIfTI image one frame at a time.
+
+    The header, including the affine and timing units, is taken from a template image, with the
+    shape set to the template's spatial shape and `num_frames` frames, no scaling and `dtype`
+    data. NIfTI stores each frame contiguously, so the frames are written in a single forward
+    pass and peak memory is one frame. Counterpart to :func:`iter_nifti_frames`.
+
+    Args:
+        out_image_path (str | pathlib.Path): Path to a .nii or .nii.gz file to write.
+        frames (Iterable[np.ndarray]): 3D array for each frame, in the voxel order of the
+            template.
+        template_image_path (str | pathlib.Path): Path to the NIfTI image whose header is used.
+        num_frames (int): Number of frames in `frames`.
+        dtype (np.dtype): Data type written to disk. Default ``np.float32``.
+
+    Raises:
+        ValueError: If `frames` does not yield exactly `num_frames` frames of the template's
+            spatial shape.
+    """
+    template = nibabel.load(template_image_path)
+    frame_shape = template.shape[:3]
+    header = nibabel.Nifti1Header.from_header(template.header)
+    header.set_data_shape((*frame_shape, num_frames))
+    header.set_data_dtype(dtype)
+    header.set_slope_inter(1.0, 0.0)
+    header['vox_offset'] = 0
+    disk_dtype = header.get_data_dtype()
+
+    frames_written = 0
+    with ImageOpener(out_image_path, 'wb') as out_file:
+        header.write_to(out_file)
+        seek_tell(out_file, header.get_data_offset(), write0=True)
+        for frame in frames:
+            if frame.shape != frame_shape or frames_written == num_frames:
+                raise ValueError(f'Expected {num_frames} frames of shape {frame_shape}, got a '
+                                 f'frame of shape {frame.shape} after {frames_written} frames.')
+            out_file.write(np.asarray(frame, dtype=disk_dtype).tobytes(order='F'))
+            frames_written += 1
+    if frames_written != num_frames:
+        raise ValueError(f'Expected {num_frames} frames, got {frames_written}.')
+
+
 def validate_two_images_same_dimensions(image_1: nibabel.nifti1.Nifti1Image,
                                         image_2: nibabel.nifti1.Nifti1Image,
                                         check_4d: bool=False):
@@ -1,10 +1,78 @@
 """
 Library for math functions for use elsewhere.
 """
+from collections.abc import Iterable
 import numpy as np
-from scipy.ndimage import gaussian_filter
 import ants
 
+from .gaussian_blur import GaussianBlur
+
+def weighted_sum_frame_weights(frame_duration: np.ndarray,
+                               half_life: float,
+                               frame_start: np.ndarray,
+                               decay_correction: np.ndarray) -> np.ndarray:
+    """
+    Weight of each frame in the weighted sum of a PET image series, such that the weighted sum is
+    the sum over frames of each frame times its weight.
+
+    Args:
+        frame_duration (np.ndarray): Duration of each frame in pet series
+        half_life (float): Half life of tracer radioisotope in seconds.
+        frame_start (np.ndarray): Start time of each frame in pet series,
+            measured with respect to scan TimeZero.
+        decay_correction (np.ndarray): Decay correction factor that scales
+            each frame in the pet series.
+
+    Returns:
+        frame_weights (np.ndarray): Weight of each frame: the frame duration divided by the decay
+            correction, times the total decay over the whole duration, divided by the whole
+            duration.
+
+    See Also:
+        * :func:`weighted_sum_computation`
+    """
+    frame_duration = np.asarray(frame_duration, dtype=float)
+    decay_constant = np.log(2.0) / half_life
+    image_total_duration = np.sum(frame_duration)
+    total_decay = decay_constant * image_total_duration
+    total_decay /= 1.0 - np.exp(-1.0 * decay_constant * image_total_duration)
+    total_decay /= np.exp(-1 * decay_constant * frame_start[0])
+    return frame_duration / np.asarray(decay_correction, dtype=float) * total_decay / image_total_duration
+
+
+def accumulate_weighted_frames(frames: Iterable[np.ndarray],
+                               frame_weights: np.ndarray) -> np.ndarray:
+    """
+    Sum frames times their weights, one frame at a time, into a float64 3D buffer.
+
+    Only the running sum and one scaled frame are allocated, so frames can be streamed from disk
+    (e.g. with :func:`~petpal.utils.image_io.iter_nifti_frames`) without ever holding the 4D
+    series.
+
+    Args:
+        frames (Iterable[np.ndarray]): 3D array of each frame.
+        frame_weights (np.ndarray): Weight of each frame.
+
+    Returns:
+        weighted_sum (np.ndarray): 3D float64 array with the weighted sum of the frames.
+
+    Raises:
+        ValueError: If the number of frames does not match the number of weights, or there are no
+            frames.
+    """
+    weighted_sum = None
+    scaled_frame = None
+    for frame, weight in zip(frames, frame_weights, strict=True):
+        if weighted_sum is None:
+            weighted_sum = np.zeros(np.shape(frame), dtype=np.float64)
+            scaled_frame = np.empty_like(weighted_sum)
+        np.multiply(frame, weight, out=scaled_frame)
+        weighted_sum += scaled_frame
+    if weighted_sum is None:
+        raise ValueError('Cannot compute a weighted sum of zero frames.')
+    return weighted_sum
+
+
 def weighted_sum_computation(pet_series: ants.core.ANTsImage | np.ndarray,
                              frame_duration: np.ndarray,
                              half_life: float,
@@ -13,6 +81,9 @@ def weighted_sum_computation(pet_series: ants.core.ANTsImage | np.ndarray,
     """
     Weighted sum of a PET image based on time and re-corrected for decay correction.
 
+    Frames are weighted by :func:`weighted_sum_frame_weights` and accumulated one at a time with
+    :func:`accumulate_weighted_frames`, so no scaled copy of the series is made.
+
     Args:
         image_frame_duration (np.ndarray): Duration of each frame in pet series
         half_life (float): Half life of tracer radioisotope in seconds.
@@ -31,16 +102,14 @@ def weighted_sum_computation(pet_series: ants.core.ANTsImage | np.ndarray,
         * :meth:`petpal.image_operations_4d.weighted_series_sum`: Function where this is implemented.
 
     """
-    decay_constant = np.log(2.0) / half_life
-    image_total_duration = np.sum(frame_duration)
-    total_decay = decay_constant * image_total_duration
-    total_decay /= 1.0 - np.exp(-1.0 * decay_constant * image_total_duration)
-    total_decay /= np.exp(-1 * decay_constant * frame_start[0])
-    
-    pet_series_scaled = pet_series[:, :, :] * frame_duration / decay_correction
-    pet_series_sum_scaled = pet_series_scaled.sum(axis=3)
-    image_weighted_sum = pet_series_sum_scaled * total_decay / image_total_duration
-    return image_weighted_sum
+    frame_weights = weighted_sum_frame_weights(frame_duration=frame_duration,
+                                               half_life=half_life,
+                                               frame_start=frame_start,
+                                               decay_correction=decay_correction)
+    if isinstance(pet_series, ants.core.ANTsImage):
+        pet_series = pet_series.view()
+    frames = (pet_series[:, :, :, frame_id] for frame_id in range(pet_series.shape[3]))
+    return accumulate_weighted_frames(frames=frames, frame_weights=frame_weights)
 
 
 def weighted_sum_computation_over_index_window(pet_series: ants.core.ANTsImage | np.ndarray,
@@ -66,6 +135,8 @@ def weighted_sum_computation_over_index_window(pet_series: ants.core.ANTsImage |
     Returns:
         np.ndarray: Weighted sum for the image series over the specified window.
     """
+    if isinstance(pet_series, ants.core.ANTsImage):
+        pet_series = pet_series.view()
     window_image_series = pet_series[:, :, :, window_start_id:window_end_id]
 
     sub_frm_dur = frame_durations[window_start_id:window_end_id]
@@ -84,10 +155,15 @@ def weighted_sum_computation_over_index_window(pet_series: ants.core.ANTsImage |
 def gauss_blur_computation(input_image: np.ndarray,
                            blur_size_mm: float,
                            input_zooms: list,
-                           use_fwhm: bool):
+                           use_fwhm: bool,
+                           num_workers: int = 1):
     """
     Applies a Gaussian blur to an array image. Function intended to be a
     wrapper to be applied by other methods.
+
+    The frames of a 4D image are blurred separately, `num_workers` at a time, with
+    :class:`~petpal.utils.gaussian_blur.GaussianBlur`, which uses FFT convolution for wide
+    kernels. The result is float64 for float64 input, and float32 otherwise.
     """
     if use_fwhm:
         blur_size = blur_size_mm / (2*np.sqrt(2*np.log(2)))
@@ -98,7 +174,6 @@ def gauss_blur_computation(input_image: np.ndarray,
     sigma_y = blur_size / input_zooms[1]
     sigma_z = blur_size / input_zooms[2]
 
-    blur_image = gaussian_filter(input=input_image,
-                                 sigma=(sigma_x,sigma_y,sigma_z),
-                                 axes=(0,1,2))
+    blur_image = GaussianBlur(sigma=(sigma_x,sigma_y,sigma_z),
+                              num_workers=num_workers).blur_frames(image_arr=input_image)
     return blur_image
@@ -0,0 +1,335 @@
+"""
+Reusable voxel index of a discrete segmentation image.
+
+Regional analyses (TAC extraction, regional statistics, SUVR reference regions, sGTM) all need the
+voxels belonging to each label of a segmentation. Comparing the whole segmentation against every
+label is repeated for each region and each analysis. :class:`SegmentationIndex` scans the
+segmentation once and stores the voxels of every label in compressed sparse row (CSR) layout:
+
+    * ``labels``: the sorted unique values of the segmentation.
+    * ``voxel_indices``: flat (C-order) voxel indices grouped by label and sorted within each
+      label.
+    * ``offsets``: voxels of ``labels[i]`` are ``voxel_indices[offsets[i]:offsets[i+1]]``.
+
+The index can be cached next to the segmentation image with :meth:`SegmentationIndex.from_image`,
+so later runs on the same segmentation skip the scan entirely.
+
+Example:
+
+    .. code-block:: python
+
+        import ants
+        from petpal.utils.segmentation_index import SegmentationIndex
+        from petpal.preproc.regional_tac_extraction import WriteRegionalTacs
+
+        seg_index = SegmentationIndex.from_image('sub-001_seg.nii.gz',
+                                                 label_map_option='freesurfer')
+        putamen_mask = seg_index.region_mask([12, 51])
+        print(seg_index.counts, seg_index.find_label_name(12))
+
+        tac_writer = WriteRegionalTacs(input_image_path='sub-001_pet.nii.gz',
+                                       segmentation_path='sub-001_seg.nii.gz',
+                                       label_map='freesurfer',
+                                       segmentation_index=seg_index)
+
+"""
+import os
+import pathlib
+import numpy as np
+import ants
+
+from ..meta.label_maps import LabelMapLoader
+
+
+class SegmentationIndex:
+    """Voxel lists for each label of a segmentation, in CSR layout.
+
+    :ivar labels: Sorted unique values in the segmentation, shape (L,).
+    :ivar offsets: Start of the voxels of each label in ``voxel_indices``, shape (L+1,).
+    :ivar voxel_indices: Flat C-order voxel indices grouped by label, shape (num_voxels,).
+    :ivar shape: Shape of the segmentation array.
+    :ivar bounding_boxes: Inclusive minimum and exclusive maximum voxel coordinates of each label
+        as ``[x_min, y_min, z_min, x_max, y_max, z_max]``, shape (L, 6).
+    :ivar label_map: Optional label map dictionary used to resolve region names.
+    """
+    def __init__(self,
+                 labels: np.ndarray,
+                 offsets: np.ndarray,
+                 voxel_indices: np.ndarray,
+                 shape: tuple[int, ...],
+                 bounding_boxes: np.ndarray,
+                 label_map: dict | None = None):
+        self.labels = labels
+        self.offsets = offsets
+        self.voxel_indices = voxel_indices
+        self.shape = tuple(int(dim) for dim in shape)
+        self.bounding_boxes = bounding_boxes
+        self.label_map = label_map
+
+    @classmethod
+    def from_array(cls,
+                   segmentation_arr: np.ndarray,
+                   label_map_option: str | dict | None = None) -> 'SegmentationIndex':
+        """Build the index with a single sort of the segmentation.
+
+        Args:
+            segmentation_arr (np.ndarray): 3D discrete segmentation array.
+            label_map_option (str | dict | None): Label map used to resolve region names. See
+                :class:`~petpal.meta.label_maps.LabelMapLoader`. Default None.
+
+        Returns:
+            segmentation_index (SegmentationIndex): Index of the segmentation.
+        """
+        segmentation_arr = np.asarray(segmentation_arr)
+        flat_seg = segmentation_arr.ravel()
+        voxel_indices = np.argsort(flat_seg, kind='stable')
+        labels, starts = np.unique(flat_seg[voxel_indices], return_index=True)
+        offsets = np.append(starts, flat_seg.size)
+        if flat_seg.size < np.iinfo(np.uint32).max:
+            voxel_indices = voxel_indices.astype(np.uint32)
+
+        bounding_boxes = np.zeros((len(labels), 6), dtype=np.int64)
+        strides = np.cumprod((1,) + segmentation_arr.shape[:0:-1])[::-1]
+        for axis, (stride, dim) in enumerate(zip(strides, segmentation_arr.shape)):
+            axis_coords = (voxel_indices // voxel_indices.dtype.type(stride)) % dim
+            bounding_boxes[:, axis] = np.minimum.reduceat(axis_coords, starts)
+            bounding_boxes[:, axis + 3] = np.maximum.reduceat(axis_coords, starts) + 1
+
+        label_map = None
+        if label_map_option is not None:
+            label_map = LabelMapLoader(label_map_option=label_map_option).label_map
+        return cls(labels=labels,
+                   offsets=offsets,
+                   voxel_indices=voxel_indices,
+                   shape=segmentation_arr.shape,
+                   bounding_boxes=bounding_boxes,
+                   label_map=label_map)
+
+    @classmethod
+    def from_image(cls,
+                   segmentation_image_path: str | pathlib.Path,
+                   label_map_option: str | dict | None = None,
+                   use_cache: bool = True) -> 'SegmentationIndex':
+        """Build the index of a segmentation image, reusing the cache next to it if valid.
+
+        The cache is written to :meth:`gen_cache_path` and is valid as long as the size and
+        modification time of the segmentation image are unchanged.
+
+        Args:
+            segmentation_image_path (str | pathlib.Path): Path to the segmentation image.
+            label_map_option (str | dict | None): Label map used to resolve region names. See
+                :class:`~petpal.meta.label_maps.LabelMapLoader`. Default None.
+            use_cache (bool): If True, read the cache if it is valid and write it otherwise.
+                Default True.
+
+        Returns:
+            segmentation_index (SegmentationIndex): Index of the segmentation.
+        """
+        cache_path = cls.gen_cache_path(segmentation_image_path)
+        source_stamp = cls._source_stamp(segmentation_image_path)
+        if use_cache and os.path.exists(cache_path):
+            with np.load(cache_path) as cache:
+                if np.array_equal(cache['source_stamp'], source_stamp):
+                    seg_index = cls.load(cache_path)
+                    if label_map_option is not None:
+                        seg_index.label_map = LabelMapLoader(label_map_option).label_map
+                    return seg_index
+
+        segmentation_arr = ants.image_read(str(segmentation_image_path)).numpy()
+        seg_index = cls.from_array(segmentation_arr=segmentation_arr,
+                                   label_map_option=label_map_option)
+        if use_cache:
+            try:
+                seg_index.save(cache_path, source_stamp=source_stamp)
+            except OSError:
+                pass
+        return seg_index
+
+    @staticmethod
+    def gen_cache_path(segmentation_image_path: str | pathlib.Path) -> str:
+        """Path of the cached index for a segmentation image: the image path with the NIfTI
+        extension replaced by ``_segindex.npz``.
+
+        Args:
+            segmentation_image_path (str | pathlib.Path): Path to the segmentation image.
+
+        Returns:
+            cache_path (str): Path to the cached index.
+        """
+        seg_path = str(segmentation_image_path)
+        for extension in ('.nii.gz', '.nii'):
+            if seg_path.endswith(extension):
+                seg_path = seg_path[:-len(extension)]
+                break
+        return f'{seg_path}_segindex.npz'
+
+    @staticmethod
+    def _source_stamp(segmentation_image_path: str | pathlib.Path) -> np.ndarray:
+        """Size and modification time of the segmentation image, used to validate the cache."""
+        seg_stat = os.stat(segmentation_image_path)
+        return np.asarray([seg_stat.st_size, seg_stat.st_mtime_ns], dtype=np.int64)
+
+    def save(self, filename: str | pathlib.Path, source_stamp: np.ndarray | None = None):
+        """Save the index to a ``.npz`` file. The label map is not saved.
+
+        Args:
+            filename (str | pathlib.Path): Path to the output file.
+            source_stamp (np.ndarray | None): Size and modification time of the segmentation
+                image, used by :meth:`from_image` to validate the cache. Default None.
+        """
+        if source_stamp is None:
+            source_stamp = np.zeros(2, dtype=np.int64)
+        with open(filename, 'wb') as cache_file:
+            np.savez(cache_file,
+                     labels=self.labels,
+                     offsets=self.offsets,
+                     voxel_indices=self.voxel_indices,
+                     shape=np.asarray(self.shape),
+                     bounding_boxes=self.bounding_boxes,
+                     source_stamp=source_stamp)
+
+    @classmethod
+    def load(cls, filename: str | pathlib.Path) -> 'SegmentationIndex':
+        """Load an index saved with :meth:`save`.
+
+        Args:
+            filename (str | pathlib.Path): Path to the ``.npz`` file.
+
+        Returns:
+            segmentation_index (SegmentationIndex): Index of the segmentation.
+        """
+        with np.load(filename) as cache:
+            return cls(labels=cache['labels'],
+                       offsets=cache['offsets'],
+                       voxel_indices=cache['voxel_indices'],
+                       shape=tuple(cache['shape']),
+                       bounding_boxes=cache['bounding_boxes'])
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Number of voxels with each label."""
+        return np.diff(self.offsets)
+
+    def label_positions(self, mappings: int | list[int]) -> np.ndarray:
+        """Positions in ``labels`` of the mappings present in the segmentation.
+
+        Args:
+            mappings (int | list[int]): One or more label values.
+
+        Returns:
+            positions (np.ndarray): Indices into ``labels``. Mappings that are not in the
+                segmentation are skipped.
+        """
+        return np.flatnonzero(np.isin(self.labels, np.atleast_1d(mappings)))
+
+    def region_voxel_indices(self, mappings: int | list[int]) -> np.ndarray:
+        """Sorted flat C-order indices of the voxels matching any of the mappings.
+
+        Args:
+            mappings (int | list[int]): One or more label values.
+
+        Returns:
+            voxel_indices (np.ndarray): Flat voxel indices, in the same order as
+                ``np.flatnonzero(mask)``.
+        """
+        positions = self.label_positions(mappings)
+        if len(positions) == 1:
+            pos = positions[0]
+            return self.voxel_indices[self.offsets[pos]:self.offsets[pos + 1]]
+        region_indices = [self.voxel_indices[self.offsets[pos]:self.offsets[pos + 1]]
+                          for pos in positions]
+        if not region_indices:
+            return self.voxel_indices[:0]
+        return np.sort(np.concatenate(region_indices))
+
+    def region_mask(self, mappings: int | list[int]) -> np.ndarray:
+        """Boolean mask of the voxels matching any of the mappings.
+
+        Args:
+            mappings (int | list[int]): One or more label values.
+
+        Returns:
+            mask (np.ndarray): Boolean array with the shape of the segmentation.
+        """
+        mask = np.zeros(int(np.prod(self.shape)), dtype=bool)
+        mask[self.region_voxel_indices(mappings)] = True
+        return mask.reshape(self.shape)
+
+    def region_values(self, input_arr: np.ndarray, mappings: int | list[int]) -> np.ndarray:
+        """Values of a 3D or 4D array at the voxels matching any of the mappings.
+
+        Equivalent to ``input_arr[mask]`` with ``mask = self.region_mask(mappings)``, without
+        building the mask or copying ``input_arr``.
+
+        Args:
+            input_arr (np.ndarray): Array whose first three dimensions match the segmentation.
+            mappings (int | list[int]): One or more label values.
+
+        Returns:
+            region_values (np.ndarray): Array of shape (num_voxels,) for a 3D input, or
+                (num_voxels, num_frames) for a 4D input.
+        """
+        assert input_arr.shape[:3] == self.shape, (
+            "Array must have the same physical dimensions as the segmentation.")
+        coords = np.unravel_index(self.region_voxel_indices(mappings), self.shape)
+        return input_arr[coords]
+
+    def region_bounding_box(self, mappings: int | list[int]) -> tuple[slice, slice, slice]:
+        """Smallest box containing all voxels matching any of the mappings.
+
+        Args:
+            mappings (int | list[int]): One or more label values.
+
+        Returns:
+            bounding_box (tuple[slice, slice, slice]): Slices for each spatial dimension. Empty
+                slices if none of the mappings are in the segmentation.
+        """
+        boxes = self.bounding_boxes[self.label_positions(mappings)]
+        if len(boxes) == 0:
+            return (slice(0, 0),) * 3
+        box_min = boxes[:, :3].min(axis=0)
+        box_max = boxes[:, 3:].max(axis=0)
+        return tuple(slice(int(lo), int(hi)) for lo, hi in zip(box_min, box_max))
+
+    def voxel_label_positions(self) -> np.ndarray:
+        """Position in ``labels`` of the label of every voxel, as a flat C-order array.
+
+        Returns:
+            label_positions (np.ndarray): Integer array with one entry per voxel, for use with
+                :func:`numpy.bincount`.
+        """
+        label_positions = np.empty(len(self.voxel_indices), dtype=np.intp)
+        label_positions[self.voxel_indices] = np.repeat(np.arange(len(self.labels)), self.counts)
+        return label_positions
+
+    def find_label_name(self, label: int) -> str:
+        """Find the region name of a label in the label map. If a name is not found, return
+        'UNK' followed by the label.
+
+        Args:
+            label (int): Label mapping for a region.
+
+        Returns:
+            region_name (str): Name of the region corresponding to the provided label.
+        """
+        if self.label_map is not None:
+            for region_name, mapping in self.label_map.items():
+                if mapping == label:
+                    return region_name
+        return f'UNK{int(label):>04}'
+
+    def region_mappings(self, region_name: str) -> int | list[int]:
+        """Mappings of a named region in the label map.
+
+        Args:
+            region_name (str): Name of the region in the label map.
+
+        Returns:
+            mappings (int | list[int]): Mapping or mappings of the region.
+
+        Raises:
+            ValueError: If no label map was provided.
+        """
+        if self.label_map is None:
+            raise ValueError("SegmentationIndex has no label map to resolve region names.")
+        return self.label_map[region_name]
@@ -1,14 +1,18 @@
 """Tools for running statistics on PET imaging data."""
 from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
+import pandas as pd
 import ants
 
 from ..meta.label_maps import LabelMapLoader
 from .dimension import check_physical_space_for_ants_image_pair
+from .segmentation_index import SegmentationIndex
 
 def mean_value_in_region(input_img: ants.ANTsImage,
                          seg_img: ants.ANTsImage,
-                         mappings: int | list[int]) -> float:
+                         mappings: int | list[int],
+                         segmentation_index: SegmentationIndex | None = None) -> float:
     """Calculate the mean value in a 3D PET image over a region based on one or more integer
     mappings corresponding to regions in a segmentation image.
     
@@ -16,10 +20,18 @@ def mean_value_in_region(input_img: ants.ANTsImage,
         input_img (ants.ANTsImage): 3D PET image over which to calculate the mean.
         seg_img (ants.ANTsImage): Segmentation image in same space as `input_img`.
         mappings (int | list[int]): One or more mappings to mask input_image over.
+        segmentation_index (SegmentationIndex | None): Precomputed index of `seg_img`. If
+            provided, the region voxels are read from the index instead of masking the image.
+            Default None.
 
     Returns:
         region_mean (float): Mean PET value over voxels in the regions corresponding to
             `mappings`."""
+    if segmentation_index is not None:
+        voxel_arr = nonzero_region_voxels(input_arr=input_img.numpy(),
+                                          segmentation_index=segmentation_index,
+                                          mappings=mappings)
+        return voxel_arr.mean()
     region_mask = ants.mask_image(input_img, seg_img, level=mappings)
     region_arr = region_mask.numpy().flatten()
     region_arr_nonzero = region_arr.nonzero()
@@ -27,6 +39,170 @@ def mean_value_in_region(input_img: ants.ANTsImage,
     return voxel_arr.mean()
 
 
+def nonzero_region_voxels(input_arr: np.ndarray,
+                          segmentation_index: SegmentationIndex,
+                          mappings: int | list[int]) -> np.ndarray:
+    """Get the non-zero voxel values of a 3D array in a region, using a segmentation index.
+
+    Matches the voxels kept by masking with :func:`ants.mask_image` and dropping zeros, in the
+    same C-order.
+
+    Args:
+        input_arr (np.ndarray): 3D array in the same space as the indexed segmentation.
+        segmentation_index (SegmentationIndex): Index of the segmentation.
+        mappings (int | list[int]): One or more mappings defining the region.
+
+    Returns:
+        voxel_arr (np.ndarray): Non-zero voxel values in the region as a flattened array."""
+    region_arr = segmentation_index.region_values(input_arr=input_arr, mappings=mappings)
+    return region_arr[region_arr.nonzero()]
+
+
+REGIONAL_STATISTICS = ('mean', 'std', 'nvox', 'max', 'min', 'median')
+"""Statistics computed by :func:`calc_grouped_stats`. Percentiles are also available as
+``'p<percent>'``, e.g. ``'p95'`` or ``'p2.5'``."""
+
+
+def parse_percentile(statistic: str) -> float | None:
+    """Get the percentile requested by a statistic name of the form ``'p<percent>'``.
+
+    Args:
+        statistic (str): Name of the statistic, e.g. ``'p95'``.
+
+    Returns:
+        percentile (float | None): Percentile between 0 and 100, or None if `statistic` is not
+            a percentile.
+
+    Raises:
+        ValueError: If the percentile is outside of [0, 100].
+    """
+    if not statistic.startswith('p'):
+        return None
+    try:
+        percentile = float(statistic[1:])
+    except ValueError:
+        return None
+    if not 0 <= percentile <= 100:
+        raise ValueError(f"Percentile in {statistic} must be between 0 and 100.")
+    return percentile
+
+
+def validate_statistics(statistics: list[str]):
+    """Check that every statistic is in :data:`REGIONAL_STATISTICS` or is a percentile.
+
+    Args:
+        statistics (list[str]): Names of the statistics.
+
+    Raises:
+        ValueError: If a statistic is not recognized.
+    """
+    for statistic in statistics:
+        if statistic not in REGIONAL_STATISTICS and parse_percentile(statistic) is None:
+            raise ValueError(f"Statistic {statistic} not recognized. Choose from "
+                             f"{REGIONAL_STATISTICS} or 'p<percent>'.")
+
+
+def group_sorted_region_voxels(input_arr: np.ndarray,
+                               segmentation_index: SegmentationIndex,
+                               region_mappings: list[int | list[int]]) -> tuple[np.ndarray,
+                                                                              np.ndarray]:
+    """Gather the non-zero voxels of every region and sort them within each region at once.
+
+    Voxels of all regions are concatenated with a region number and sorted with a single
+    :func:`numpy.lexsort`, so that region ``i`` holds the sorted values
+    ``sorted_values[offsets[i]:offsets[i+1]]``. A voxel belonging to several regions, e.g. with
+    merged left and right regions, appears once in each of them.
+
+    Args:
+        input_arr (np.ndarray): 3D array in the same space as the indexed segmentation.
+        segmentation_index (SegmentationIndex): Index of the segmentation.
+        region_mappings (list[int | list[int]]): Mappings defining each region.
+
+    Returns:
+        tuple: (sorted_values, offsets), the grouped sorted voxel values as float64 and the start
+            of each region in them, shape (num_regions+1,).
+    """
+    region_voxels = [nonzero_region_voxels(input_arr=input_arr,
+                                           segmentation_index=segmentation_index,
+                                           mappings=mappings) for mappings in region_mappings]
+    counts = np.asarray([len(voxels) for voxels in region_voxels], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    if offsets[-1] == 0:
+        return np.zeros(0, dtype=float), offsets
+    values = np.concatenate(region_voxels).astype(float)
+    region_numbers = np.repeat(np.arange(len(region_mappings)), counts)
+    order = np.lexsort((values, region_numbers))
+    return values[order], offsets
+
+
+def calc_grouped_stats(sorted_values: np.ndarray,
+                       offsets: np.ndarray,
+                       statistics: list[str]) -> dict[str, np.ndarray]:
+    """Calculate several statistics of every region from the grouped sorted voxel values.
+
+    Sums use one :func:`numpy.bincount` over all regions, while minimum, maximum, median and
+    percentiles are read directly from the sorted values. Medians and percentiles are exact and
+    use the same linear interpolation as :func:`numpy.percentile`. The standard deviation is the
+    population standard deviation, as :func:`numpy.std`. Statistics of regions without voxels
+    are NaN.
+
+    Args:
+        sorted_values (np.ndarray): Voxel values sorted within each region, as returned by
+            :func:`group_sorted_region_voxels`.
+        offsets (np.ndarray): Start of each region in `sorted_values`.
+        statistics (list[str]): Statistics to calculate, from :data:`REGIONAL_STATISTICS` or
+            ``'p<percent>'``.
+
+    Returns:
+        region_stats (dict[str, np.ndarray]): Values of each statistic for every region.
+
+    Raises:
+        ValueError: If a statistic is not recognized.
+    """
+    validate_statistics(statistics)
+    counts = np.diff(offsets)
+    num_regions = len(counts)
+    has_voxels = counts > 0
+    starts = offsets[:-1]
+    region_numbers = np.repeat(np.arange(num_regions), counts)
+    safe_counts = np.maximum(counts, 1)
+
+    region_mean = None
+    region_stats = {}
+    for statistic in statistics:
+        if statistic in region_stats:
+            continue
+        percentile = 50.0 if statistic == 'median' else parse_percentile(statistic)
+        if statistic == 'nvox':
+            region_stats[statistic] = counts.copy()
+            continue
+        if statistic in ('mean', 'std') and region_mean is None:
+            region_mean = np.bincount(region_numbers, weights=sorted_values,
+                                      minlength=num_regions) / safe_counts
+        stat_arr = np.full(num_regions, np.nan)
+        if statistic == 'mean':
+            stat_arr[has_voxels] = region_mean[has_voxels]
+        elif statistic == 'std':
+            deviations = sorted_values - region_mean[region_numbers]
+            variance = np.bincount(region_numbers, weights=deviations**2,
+                                   minlength=num_regions) / safe_counts
+            stat_arr[has_voxels] = np.sqrt(variance[has_voxels])
+        elif statistic == 'min':
+            stat_arr[has_voxels] = sorted_values[starts[has_voxels]]
+        elif statistic == 'max':
+            stat_arr[has_voxels] = sorted_values[offsets[1:][has_voxels] - 1]
+        else:
+            position = (counts[has_voxels] - 1) * percentile / 100
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, counts[has_voxels] - 1)
+            fraction = position - lower
+            lower_values = sorted_values[starts[has_voxels] + lower]
+            upper_values = sorted_values[starts[has_voxels] + upper]
+            stat_arr[has_voxels] = lower_values + fraction * (upper_values - lower_values)
+        region_stats[statistic] = stat_arr
+    return region_stats
+
+
 class RegionalStats:
     """Run statistics on each region in a parametric 3D PET kinetic model or other image.
     
@@ -39,6 +215,8 @@ class RegionalStats:
         * RegionalStats.median: Median value in each region.
         * RegionalStats.get_stats(stats_func): Get a generic statistic run on each region. Runs
           function `stats_func` on each region, which must take a 1D array as the only argument.
+        * RegionalStats.get_multiple_stats(statistics): Get several preset statistics, or
+          percentiles such as ``'p95'``, from one pass over the voxels sorted by region.
 
     Example:
 
@@ -65,18 +243,29 @@ class RegionalStats:
             region_95th = region_stats_obj.get_stats(calc_95th_percentile)
             write_dict_to_json(region_95th,'sub-001_ses-01_Region95thPercentileSUVR.json')
 
+            # Several statistics at once, as a table with one row per region
+            region_stats_table = region_stats_obj.get_multiple_stats_table(['mean', 'std', 'p95'])
+            region_stats_table.to_csv('sub-001_ses-01_RegionStatsSUVR.tsv', sep='\\t', index=False)
+
     :ivar pet_img: 3D PET image on which to get statistics for each region.
     :ivar seg_img: Segmentation image in same space as `pet_img` defining regions.
-    :ivar label_map: Dictionary that assigns labels to regions in `seg_img`."""
+    :ivar label_map: Dictionary that assigns labels to regions in `seg_img`.
+    :ivar segmentation_index: Index of the voxels of each label in `seg_img`. Built once from
+        `seg_img` if not provided, so each region is read without rescanning the segmentation."""
     def __init__(self,
                  input_image_path: str,
                  segmentation_image_path: str,
-                 label_map_option: str | dict):
+                 label_map_option: str | dict,
+                 segmentation_index: SegmentationIndex | None = None):
         self.pet_img = ants.image_read(input_image_path)
         self.seg_img = ants.image_read(segmentation_image_path)
         assert check_physical_space_for_ants_image_pair(self.pet_img, self.seg_img), (
             "input image and anatomical image must occupy the same physical space")
         self.label_map = LabelMapLoader(label_map_option=label_map_option).label_map
+        if segmentation_index is None:
+            segmentation_index = SegmentationIndex.from_array(self.seg_img.numpy())
+        self.segmentation_index = segmentation_index
+        self._pet_arr = self.pet_img.numpy()
 
     def get_voxels(self, label: str) -> np.ndarray:
         """Get the voxel array for the selected label.
@@ -87,10 +276,9 @@ class RegionalStats:
         Returns:
             voxel_arr (np.ndarray): Voxels in region as a flattened array."""
         mappings = self.label_map[label]
-        region_mask = ants.mask_image(self.pet_img, self.seg_img, level=mappings)
-        region_arr = region_mask.numpy().flatten()
-        region_arr_nonzero = region_arr.nonzero()
-        voxel_arr = region_arr[region_arr_nonzero]
+        voxel_arr = nonzero_region_voxels(input_arr=self._pet_arr,
+                                          segmentation_index=self.segmentation_index,
+                                          mappings=mappings)
         return voxel_arr
 
     def get_stats(self, stats_func: Callable, dtype: object=float) -> dict:
@@ -117,32 +305,187 @@ class RegionalStats:
                 region_stats[label] = dtype(region_stat)
         return region_stats
 
+    def _calc_multiple_stats(self, statistics: list[str]) -> dict[str, np.ndarray]:
+        """Calculate the statistics for every region in the label map, in label map order."""
+        region_mappings = [self.label_map[label] for label in self.label_map]
+        sorted_values, offsets = group_sorted_region_voxels(
+            input_arr=self._pet_arr,
+            segmentation_index=self.segmentation_index,
+            region_mappings=region_mappings)
+        return calc_grouped_stats(sorted_values=sorted_values,
+                                  offsets=offsets,
+                                  statistics=statistics)
+
+    def get_multiple_stats(self, statistics: list[str]) -> dict:
+        """Get several statistics for all regions in one pass.
+
+        Voxels are grouped and sorted by region once, and every statistic is computed from the
+        grouped sorted values. See :func:`calc_grouped_stats`.
+
+        Args:
+            statistics (list[str]): Statistics to calculate, from :data:`REGIONAL_STATISTICS` or
+                percentiles as ``'p<percent>'``.
+
+        Returns:
+            region_stats (dict): For each statistic, a dictionary with the statistic of each
+                region of interest.
+        """
+        stats_arrs = self._calc_multiple_stats(statistics=statistics)
+        region_stats = {}
+        for statistic, stat_arr in stats_arrs.items():
+            dtype = int if statistic == 'nvox' else float
+            region_stats[statistic] = {label: dtype(value) for label, value in
+                                       zip(self.label_map, stat_arr)}
+        return region_stats
+
+    def get_multiple_stats_table(self, statistics: list[str]) -> pd.DataFrame:
+        """Get several statistics for all regions in one pass, as a table.
+
+        Args:
+            statistics (list[str]): Statistics to calculate. See :meth:`get_multiple_stats`.
+
+        Returns:
+            region_stats_table (pd.DataFrame): Table with a ``Region`` column and one column per
+                statistic.
+        """
+        stats_arrs = self._calc_multiple_stats(statistics=statistics)
+        return pd.DataFrame({'Region': list(self.label_map), **stats_arrs})
+
     @property
     def mean(self) -> dict:
         """Get mean value for each region."""
-        return self.get_stats(stats_func=np.mean)
+        return self.get_multiple_stats(['mean'])['mean']
 
     @property
     def std(self) -> dict:
         """Get standard deviation of values for each region."""
-        return self.get_stats(stats_func=np.std)
+        return self.get_multiple_stats(['std'])['std']
 
     @property
     def nvox(self) -> dict:
         """Get number of voxels in each region."""
-        return self.get_stats(stats_func=len, dtype=int)
+        return self.get_multiple_stats(['nvox'])['nvox']
 
     @property
     def max(self) -> dict:
         """Get maximum value in each region."""
-        return self.get_stats(stats_func=np.max)
+        return self.get_multiple_stats(['max'])['max']
 
     @property
     def min(self) -> dict:
         """Get minimum value in each region."""
-        return self.get_stats(stats_func=np.min)
+        return self.get_multiple_stats(['min'])['min']
 
     @property
     def median(self) -> dict:
         """Get median value in each region."""
-        return self.get_stats(stats_func=np.median)
+        return self.get_multiple_stats(['median'])['median']
+
+
+BATCH_MANIFEST_COLUMNS = ('image', 'segmentation', 'label_map')
+"""Columns required in the manifest of :func:`batch_regional_stats`."""
+
+
+def _regional_stats_for_segmentation(segmentation_path: str,
+                                     label_map_option: str,
+                                     manifest_rows: pd.DataFrame,
+                                     statistics: list[str]) -> list[pd.DataFrame]:
+    """Run regional statistics on every image registered to one segmentation.
+
+    The segmentation is read and indexed once, and the index is reused for each image.
+
+    Args:
+        segmentation_path (str): Path to the segmentation image shared by `manifest_rows`.
+        label_map_option (str): Label map shared by `manifest_rows`.
+        manifest_rows (pd.DataFrame): Manifest rows of the images to run statistics on.
+        statistics (list[str]): Statistics to calculate. See :func:`calc_grouped_stats`.
+
+    Returns:
+        row_tables (list[pd.DataFrame]): Long-format statistics for each row of `manifest_rows`.
+    """
+    seg_img = ants.image_read(segmentation_path)
+    segmentation_index = SegmentationIndex.from_array(seg_img.numpy())
+    label_map = LabelMapLoader(label_map_option=label_map_option).label_map
+    region_names = list(label_map)
+    region_mappings = [label_map[region] for region in region_names]
+
+    row_tables = []
+    for _, row in manifest_rows.iterrows():
+        input_img = ants.image_read(row['image'])
+        assert check_physical_space_for_ants_image_pair(input_img, seg_img), (
+            f"{row['image']} and {segmentation_path} must occupy the same physical space")
+        sorted_values, offsets = group_sorted_region_voxels(input_arr=input_img.numpy(),
+                                                            segmentation_index=segmentation_index,
+                                                            region_mappings=region_mappings)
+        stats_arrs = calc_grouped_stats(sorted_values=sorted_values,
+                                        offsets=offsets,
+                                        statistics=statistics)
+        row_table = pd.DataFrame({'Region': np.tile(region_names, len(stats_arrs)),
+                                  'Statistic': np.repeat(list(stats_arrs), len(region_names)),
+                                  'Value': np.concatenate(list(stats_arrs.values()))})
+        for column in reversed(manifest_rows.columns):
+            row_table.insert(0, column, row[column])
+        row_tables.append(row_table)
+    return row_tables
+
+
+def batch_regional_stats(manifest: pd.DataFrame | str,
+                         statistics: list[str],
+                         num_workers: int = 1) -> pd.DataFrame:
+    """Run regional statistics on many images and subjects, returning one long-format table.
+
+    Each row of the manifest gives an image, the segmentation it is registered to and the label
+    map of that segmentation. Rows sharing a segmentation and label map are processed together,
+    so each segmentation is read and indexed once and the index is reused for every image
+    registered to it (e.g. SUVR, BP and Ki images of one subject). Groups are processed in
+    parallel worker processes.
+
+    Example:
+
+        .. code-block:: python
+
+            from petpal.utils.stats import batch_regional_stats
+
+            # manifest.tsv has columns: subject, measure, image, segmentation, label_map
+            cohort_stats = batch_regional_stats(manifest='manifest.tsv',
+                                                statistics=['mean', 'std', 'nvox'],
+                                                num_workers=8)
+            cohort_stats.to_csv('cohort_regional_stats.tsv', sep='\\t', index=False)
+
+    Args:
+        manifest (pd.DataFrame | str): Table, or path to a TSV file, with columns ``image``,
+            ``segmentation`` and ``label_map``. Any other columns, such as subject or measure
+            identifiers, are copied to the output.
+        statistics (list[str]): Statistics to calculate. See :func:`calc_grouped_stats`.
+        num_workers (int): Number of worker processes. Default 1, which runs in the current
+            process.
+
+    Returns:
+        cohort_stats (pd.DataFrame): Long-format table with the manifest columns and
+            ``Region``, ``Statistic`` and ``Value`` columns, one row per image, region and
+            statistic, in manifest order.
+
+    Raises:
+        ValueError: If a required manifest column is missing.
+    """
+    if isinstance(manifest, str):
+        manifest = pd.read_csv(manifest, sep='\t')
+    missing_columns = [col for col in BATCH_MANIFEST_COLUMNS if col not in manifest.columns]
+    if missing_columns:
+        raise ValueError(f"Manifest is missing the columns {missing_columns}.")
+    validate_statistics(statistics)
+
+    manifest = manifest.reset_index(drop=True)
+    groups = list(manifest.groupby(['segmentation', 'label_map'], sort=False))
+    group_args = [(segmentation_path, label_map_option, group_rows, statistics)
+                  for (segmentation_path, label_map_option), group_rows in groups]
+    if num_workers <= 1 or len(group_args) <= 1:
+        group_tables = [_regional_stats_for_segmentation(*args) for args in group_args]
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            group_tables = list(executor.map(_regional_stats_for_segmentation, *zip(*group_args)))
+
+    row_tables = {}
+    for (_, group_rows), group_row_tables in zip(groups, group_tables):
+        row_tables.update(zip(group_rows.index, group_row_tables))
+    return pd.concat([row_tables[row] for row in manifest.index], ignore_index=True)
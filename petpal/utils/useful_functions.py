@@ -123,6 +123,10 @@ def weighted_series_sum(input_image_path: str,
     indicates the total quantity computed over all frames, and :math:`S(f)` is the final weighted
     sum image.
 
+    Frames are streamed from disk one at a time and accumulated into a 3D buffer with
+    :func:`~petpal.utils.math_lib.accumulate_weighted_frames`, so peak memory is a few 3D volumes
+    regardless of the number of frames.
+
     # TODO: Determine half_life from .json rather than passing as argument.
 
     Args:
@@ -151,7 +155,6 @@ def weighted_series_sum(input_image_path: str,
         raise ValueError('(ImageOps4d): Radioisotope half life is zero or negative.')
     pet_meta = image_io.load_metadata_for_nifti_with_same_filename(input_image_path)
     pet_image = nibabel.load(input_image_path)
-    pet_series = pet_image.get_fdata()
     frame_start = pet_meta['FrameTimesStart']
     frame_duration = pet_meta['FrameDuration']
 
@@ -170,7 +173,7 @@ def weighted_series_sum(input_image_path: str,
                 f"with half life {half_life} s")
 
     if end_time==-1:
-        pet_series_adjusted = pet_series
+        frame_indices = range(len(frame_start))
         frame_start_adjusted = frame_start
         frame_duration_adjusted = frame_duration
         decay_correction_adjusted = decay_correction
@@ -185,17 +188,20 @@ def weighted_series_sum(input_image_path: str,
         calc_last_frame = int(nearest_frame(end_time+scan_start))
         if calc_first_frame==calc_last_frame:
             calc_last_frame += 1
-        pet_series_adjusted = pet_series[:,:,:,calc_first_frame:calc_last_frame]
+        frame_indices = range(calc_first_frame, calc_last_frame)
         frame_start_adjusted = frame_start[calc_first_frame:calc_last_frame]
         frame_duration_adjusted = frame_duration[calc_first_frame:calc_last_frame]
         decay_correction_adjusted = decay_correction[calc_first_frame:calc_last_frame]
 
-    wsc = math_lib.weighted_sum_computation
-    image_weighted_sum = wsc(frame_duration=frame_duration_adjusted,
-                             half_life=half_life,
-                             pet_series=pet_series_adjusted,
-                             frame_start=frame_start_adjusted,
-                             decay_correction=decay_correction_adjusted)
+    frame_weights = math_lib.weighted_sum_frame_weights(frame_duration=frame_duration_adjusted,
+                                                        half_life=half_life,
+                                                        frame_start=frame_start_adjusted,
+                                                        decay_correction=decay_correction_adjusted)
+    frames = image_io.iter_nifti_frames(image_path=input_image_path,
+                                        dtype=np.float64,
+                                        frame_indices=frame_indices)
+    image_weighted_sum = math_lib.accumulate_weighted_frames(frames=frames,
+                                                             frame_weights=frame_weights)
 
     if out_image_path is not None:
         pet_sum_image = nibabel.nifti1.Nifti1Image(dataobj=image_weighted_sum,
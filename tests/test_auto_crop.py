@@ -0,0 +1,26 @@
+import nibabel
+import numpy as np
+
+from petpal.preproc.image_operations_4d import SimpleAutoImageCropper
+
+
+def test_streamed_crop_box_matches_full_mean(tmp_path):
+    rng = np.random.default_rng(0)
+    pet_arr = np.zeros((30, 34, 26, 5), dtype=np.float32)
+    pet_arr[6:22, 4:30, 8:23] = rng.random((16, 26, 15, 5)) + 0.5
+    input_path = str(tmp_path / 'pet.nii.gz')
+    nibabel.save(nibabel.Nifti1Image(pet_arr, np.eye(4)), input_path)
+    img = nibabel.load(input_path)
+
+    np.testing.assert_allclose(SimpleAutoImageCropper.gen_mean_projection(img),
+                               pet_arr.mean(axis=-1), rtol=1e-6)
+    full_box = SimpleAutoImageCropper.get_index_pairs_for_all_dims(img)
+    assert full_box == ((6, 21), (4, 29), (8, 22))
+    coarse_box = SimpleAutoImageCropper.get_index_pairs_for_all_dims(img, downsample_factor=3)
+    for (left, right), (coarse_left, coarse_right) in zip(full_box, coarse_box):
+        assert coarse_left <= left and coarse_right >= right
+
+    output_path = str(tmp_path / 'pet_crop.nii.gz')
+    SimpleAutoImageCropper(input_path, output_path, verbose=False, copy_metadata=False)
+    np.testing.assert_array_equal(nibabel.load(output_path).get_fdata(dtype=np.float32),
+                                  pet_arr[6:21, 4:29, 8:22])
@@ -0,0 +1,65 @@
+import json
+import ants
+import nibabel
+import numpy as np
+import pytest
+
+from petpal.preproc.decay_correction import scale_frames, scale_frames_to_file
+from petpal.preproc.image_operations_4d import stitch_broken_scans
+
+
+def test_streamed_scaling_matches_in_memory_scaling(tmp_path):
+    rng = np.random.default_rng(0)
+    pet_arr = rng.random((5, 4, 3, 6)).astype(np.float32)
+    affine = np.diag([2.0, 2.0, 3.0, 1.0])
+    input_path = str(tmp_path / 'pet.nii.gz')
+    nibabel.save(nibabel.Nifti1Image(pet_arr, affine), input_path)
+    factors = np.linspace(0.5, 3.0, 6)
+
+    input_img = ants.image_read(input_path)
+    scaled_img = scale_frames(input_img=input_img, scalar_arr=factors)
+    np.testing.assert_allclose(scaled_img.numpy(), pet_arr * factors.astype(np.float32))
+    np.testing.assert_array_equal(input_img.numpy(), pet_arr)
+
+    output_path = str(tmp_path / 'pet_scaled.nii.gz')
+    scale_frames_to_file(input_image_path=input_path,
+                         output_image_path=output_path,
+                         scalar_arr=factors)
+    streamed = nibabel.load(output_path)
+    np.testing.assert_array_equal(streamed.get_fdata(dtype=np.float32), scaled_img.numpy())
+    np.testing.assert_allclose(streamed.affine, affine)
+
+    with pytest.raises(ValueError):
+        scale_frames_to_file(input_image_path=input_path,
+                             output_image_path=output_path,
+                             scalar_arr=factors[:-1])
+
+
+def test_stitching_without_intermediate_images_matches(tmp_path):
+    rng = np.random.default_rng(0)
+    half_life = 6586.2
+    image_paths = []
+    for session, time_zero, starts, durations in [(1, '10:00:00', [0, 60], [60, 120]),
+                                                  (2, '10:30:00', [0, 300, 600], [300, 300, 300])]:
+        image_path = str(tmp_path / f'sub-01_ses-{session}_pet.nii.gz')
+        nibabel.save(nibabel.Nifti1Image(rng.random((4, 3, 2, len(starts))).astype(np.float32),
+                                         np.eye(4)), image_path)
+        reference_times = np.asarray(starts) + np.asarray(durations) / 2
+        with open(tmp_path / f'sub-01_ses-{session}_pet.json', 'w', encoding='utf-8') as meta_file:
+            json.dump({'TimeZero': time_zero, 'FrameTimesStart': starts, 'FrameDuration': durations,
+                       'FrameReferenceTime': reference_times.tolist(),
+                       'DecayFactor': np.exp(np.log(2) / half_life * reference_times).tolist(),
+                       'RadionuclideHalfLife': half_life}, meta_file)
+        image_paths.append(image_path)
+
+    with_files = stitch_broken_scans(image_paths[0], str(tmp_path / 'a_pet.nii.gz'), image_paths[1:])
+    num_files = len(list(tmp_path.iterdir()))
+    streamed = stitch_broken_scans(image_paths[0], str(tmp_path / 'b_pet.nii.gz'), image_paths[1:],
+                                   write_intermediate_images=False)
+    assert len(list(tmp_path.iterdir())) == num_files + 2
+    np.testing.assert_allclose(streamed.numpy(), with_files.numpy(), rtol=1e-6)
+    with open(tmp_path / 'a_pet.json', encoding='utf-8') as a_file, \
+            open(tmp_path / 'b_pet.json', encoding='utf-8') as b_file:
+        a_meta, b_meta = json.load(a_file), json.load(b_file)
+    np.testing.assert_allclose(b_meta['DecayFactor'], a_meta['DecayFactor'])
+    np.testing.assert_allclose(b_meta['FrameReferenceTime'], a_meta['FrameReferenceTime'])
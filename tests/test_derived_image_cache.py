@@ -0,0 +1,42 @@
+import json
+import os
+import nibabel
+import numpy as np
+
+from petpal.preproc import standard_uptake_value
+from petpal.preproc.motion_target import determine_motion_target
+from petpal.utils.derived_image_cache import derived_image_cache
+
+
+def test_weighted_sum_is_computed_once_per_run(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    image_path = str(tmp_path / 'pet.nii.gz')
+    nibabel.save(nibabel.Nifti1Image(rng.random((4, 3, 2, 5)).astype(np.float32), np.eye(4)),
+                 image_path)
+    with open(tmp_path / 'pet.json', 'w', encoding='utf-8') as meta_file:
+        json.dump({'FrameTimesStart': [0, 10, 20, 40, 70],
+                   'FrameDuration': [10, 10, 20, 30, 40],
+                   'DecayCorrectionFactor': [1.0, 1.1, 1.2, 1.4, 1.7],
+                   'RadionuclideHalfLife': 1220.0}, meta_file)
+
+    compute_calls = []
+    compute = standard_uptake_value._compute_weighted_sum_for_suv
+
+    def counted_compute(**kwargs):
+        compute_calls.append(kwargs)
+        return compute(**kwargs)
+
+    monkeypatch.setattr(standard_uptake_value, '_compute_weighted_sum_for_suv', counted_compute)
+
+    uncached = standard_uptake_value.weighted_sum_for_suv(image_path, None).numpy()
+    with derived_image_cache() as cache:
+        target_path = determine_motion_target('weighted_series_sum', input_image_path=image_path)
+        with derived_image_cache() as nested_cache:
+            assert nested_cache is cache
+            summed = standard_uptake_value.weighted_sum_for_suv(image_path, None).numpy()
+        assert determine_motion_target((0, 40), input_image_path=image_path) != target_path
+        assert os.path.dirname(target_path) == cache.cache_dir
+
+    assert len(compute_calls) == 3
+    np.testing.assert_allclose(summed, uncached)
+    assert not os.path.exists(target_path)
@@ -0,0 +1,37 @@
+import ants
+import numpy as np
+import pytest
+from petpal.preproc.frame_resampling import apply_transforms_to_frames, write_frame_transforms
+
+
+@pytest.mark.parametrize("num_workers", [1, 3])
+def test_frame_parallel_resampling_matches_4d_apply_transforms(tmp_path, num_workers):
+    rng = np.random.default_rng(3)
+    pet_img = ants.from_numpy(rng.random((12, 10, 8, 4)).astype(np.float32),
+                              spacing=(2.0, 2.0, 2.0, 1.0))
+    reference_img = ants.from_numpy(np.zeros((16, 14, 10), dtype=np.float32),
+                                    spacing=(1.5, 1.5, 1.5))
+    xfm = ants.create_ants_transform(transform_type='AffineTransform', dimension=3,
+                                     translation=(1.3, -0.7, 0.4))
+    xfm_path = str(tmp_path / 'xfm.mat')
+    ants.write_transform(xfm, xfm_path)
+
+    expected = ants.apply_transforms(fixed=reference_img, moving=pet_img,
+                                     transformlist=[xfm_path], imagetype=3)
+    resampled = apply_transforms_to_frames(input_img=pet_img,
+                                           reference_img=reference_img,
+                                           frame_transformlists=[xfm_path],
+                                           num_workers=num_workers)
+
+    np.testing.assert_allclose(resampled.numpy(), expected.numpy(), atol=1e-6)
+    assert resampled.spacing == expected.spacing
+
+
+def test_write_frame_transforms_writes_each_transform_once(tmp_path):
+    xfm = ants.create_ants_transform(transform_type='AffineTransform', dimension=3,
+                                     translation=(1.0, 0.0, 0.0))
+    frame_xfm_paths = write_frame_transforms([xfm, xfm, 'frame2.h5'], xfm_dir=str(tmp_path))
+
+    assert frame_xfm_paths[0] == frame_xfm_paths[1]
+    assert frame_xfm_paths[2] == 'frame2.h5'
+    assert [path.name for path in tmp_path.iterdir()] == ['frame_xfm_0.h5']
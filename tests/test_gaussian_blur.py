@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from scipy.ndimage import gaussian_filter
+
+from petpal.utils.gaussian_blur import GaussianBlur
+
+
+@pytest.mark.parametrize("method,num_workers", [('direct', 1), ('fft', 1), ('fft', 3)])
+def test_frame_blur_matches_gaussian_filter(method, num_workers):
+    rng = np.random.default_rng(0)
+    sigma = (2.5, 0.0, 4.0)
+    pet_arr = rng.random((20, 14, 9, 4))
+    expected = gaussian_filter(pet_arr, sigma=sigma, axes=(0, 1, 2))
+
+    blur = GaussianBlur(sigma=sigma, method=method, num_workers=num_workers)
+    np.testing.assert_allclose(blur.blur_frames(pet_arr), expected, atol=1e-12)
+    blurred_float32 = blur.blur_frames(pet_arr.astype(np.float32))
+    assert blurred_float32.dtype == np.float32
+    np.testing.assert_allclose(blurred_float32, expected, atol=1e-6)
+
+
+def test_auto_method_picks_fft_for_wide_kernels():
+    assert not GaussianBlur(sigma=1.0).use_fft((40, 40, 40))
+    assert not GaussianBlur(sigma=8.0 / 2.355 / 2.0).use_fft((128, 128, 96))
+    assert GaussianBlur(sigma=8.0).use_fft((192, 192, 128))
+
+
+def test_fft_blur_keeps_nan_local():
+    rng = np.random.default_rng(1)
+    pet_arr = rng.random((20, 14, 9))
+    pet_arr[3, 4, 5] = np.nan
+    expected = gaussian_filter(pet_arr, sigma=1.5)
+
+    blurred_arr = GaussianBlur(sigma=1.5, method='fft').blur_frame(pet_arr)
+    np.testing.assert_allclose(blurred_arr, expected, atol=1e-12)
+    assert np.isfinite(blurred_arr[15:, :, :]).all()
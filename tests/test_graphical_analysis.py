@@ -2,6 +2,7 @@ import os
 import warnings
 import pytest
 import pandas as pd
+import numpy as np
 
 from petpal.utils.image_io import flatten_metadata
 import petpal.kinetic_modeling.graphical_analysis as ga
@@ -87,4 +88,16 @@ def test_save_analysis_warns_when_no_output_requested(monkeypatch):
     monkeypatch.setattr(ga, "km_multifit_analysis_to_jsons", lambda *a, **k: (_ for _ in ()).throw(AssertionError("should not be called")))
 
     with pytest.warns(UserWarning):
-        inst.save_analysis(output_as_tsv=False, output_as_json=False)
\ No newline at end of file
+        inst.save_analysis(output_as_tsv=False, output_as_json=False)
+
+def test_suffix_line_fits_match_polyfit():
+    rng = np.random.default_rng(0)
+    xdata = np.linspace(0.0, 10.0, 12)
+    ydata = 2.0 * xdata + 1.0 + rng.normal(scale=0.1, size=(3, xdata.size))
+    slopes, intercepts, num_points = ga.calculate_suffix_line_fits(xdata=np.tile(xdata, (3, 1)), ydata=ydata)
+    for start in range(xdata.size - 2):
+        for row in range(3):
+            ref_slope, ref_intercept = np.polyfit(xdata[start:], ydata[row, start:], 1)
+            assert np.isclose(slopes[row, start], ref_slope)
+            assert np.isclose(intercepts[row, start], ref_intercept)
+        assert num_points[0, start] == xdata.size - start
@@ -0,0 +1,24 @@
+import ants
+import numpy as np
+
+from petpal.preproc.hessian_objectness import multiscale_hessian_objectness
+
+
+def test_native_objectness_matches_ants_and_bounding_box():
+    rng = np.random.default_rng(0)
+    x, y, _ = np.meshgrid(np.arange(32), np.arange(30), np.arange(24), indexing='ij')
+    tube_arr = np.exp(-((x - 15) ** 2 + (y - 14) ** 2) / 8.0) + 0.02 * rng.random(x.shape)
+    tube_arr = tube_arr.astype(np.float32)
+    spacing = (2.0, 2.0, 2.5)
+
+    expected = ants.hessian_objectness(ants.from_numpy(tube_arr, spacing=spacing),
+                                       sigma_min=2.0, sigma_max=8.0).numpy()
+    objectness = multiscale_hessian_objectness(tube_arr, spacing=spacing,
+                                               sigma_min=2.0, sigma_max=8.0, num_workers=2)
+    assert np.corrcoef(objectness.ravel(), expected.ravel())[0, 1] > 0.999
+
+    box = ((4, 28), (0, 30), (6, 18))
+    boxed = multiscale_hessian_objectness(tube_arr, spacing=spacing, sigma_min=2.0,
+                                          sigma_max=8.0, bounding_box=box)
+    np.testing.assert_allclose(boxed[4:28, :, 6:18], objectness[4:28, :, 6:18], rtol=1e-6)
+    assert not boxed[:, :, :6].any() and not boxed[:4].any()
@@ -0,0 +1,92 @@
+import io
+import os
+import sys
+import ants
+import numpy as np
+from scipy.ndimage import gaussian_filter, shift
+from petpal.preproc.motion_corr import (ITK_THREADS_ENV_VAR,
+                                        MotionCorrect,
+                                        parse_ants_registration_log,
+                                        run_instrumented_registration)
+from petpal.utils.scan_timing import ScanTimingInfo
+
+ANTS_LOG = """Stage 0
+DIAGNOSTIC,Iteration,metricValue,convergenceValue,ITERATION_TIME_INDEX,SINCE_LAST
+ 2DIAGNOSTIC,     1, -1.447548985481e+00, inf, 7.1819e-03, 7.1819e-03, 
+ 2DIAGNOSTIC,     2, -1.500121474266e+00, inf, 7.3149e-03, 1.3304e-04, 
+DIAGNOSTIC,Iteration,metricValue,convergenceValue,ITERATION_TIME_INDEX,SINCE_LAST
+ 2DIAGNOSTIC,     1, -8.650814890862e-01, inf, 3.1270e-01, 2.2079e-02, 
+"""
+
+
+def test_parse_ants_registration_log():
+    iterations, final_metric = parse_ants_registration_log(ANTS_LOG)
+    assert iterations == 3
+    assert final_metric == -8.650814890862e-01
+
+    iterations, final_metric = parse_ants_registration_log("Stage 0\n")
+    assert iterations == 0
+    assert np.isnan(final_metric)
+
+
+def shifted_motion_correct() -> MotionCorrect:
+    """Four one-minute frames of a blob, shifted by half a voxel after the first two."""
+    rng = np.random.default_rng(0)
+    target_arr = gaussian_filter(rng.random((24, 24, 24)), 2.0)
+    target_arr[target_arr < np.quantile(target_arr, 0.5)] = 0
+    moved_arr = shift(target_arr, (0.5, 0, 0))
+    frames = [target_arr, target_arr, moved_arr, moved_arr]
+    motion_correct = MotionCorrect()
+    motion_correct.input_img = ants.from_numpy(np.stack(frames, axis=-1).astype(np.float32))
+    motion_correct.target_img = ants.from_numpy(target_arr.astype(np.float32))
+    motion_correct.half_life = 6586.2
+    start = np.arange(4) * 60.0
+    duration = np.full(4, 60.0)
+    motion_correct.scan_timing = ScanTimingInfo(duration=duration,
+                                                start=start,
+                                                end=start + duration,
+                                                center=start + duration / 2,
+                                                decay=np.ones(4))
+    motion_correct.set_reg_kwargs(write_composite_transform=True)
+    return motion_correct
+
+
+def test_warm_start_with_fixed_schedule_transform():
+    motion_correct = shifted_motion_correct()
+    frame_xfms = motion_correct.register_windows(window_duration=120,
+                                                 transform_type='QuickRigid',
+                                                 warm_start=True)
+
+    assert len(frame_xfms) == 4
+    assert motion_correct.window_convergence['warm_start'].tolist() == [False, True]
+
+
+def test_registration_without_stdout_file_descriptor(monkeypatch):
+    motion_correct = shifted_motion_correct()
+    monkeypatch.setattr(sys, 'stdout', io.StringIO())
+    xfm_path, convergence = run_instrumented_registration(fixed=motion_correct.target_img,
+                                                          moving=motion_correct.target_img,
+                                                          transform_type='QuickRigid',
+                                                          **motion_correct.reg_kwargs)
+
+    assert ants.read_transform(xfm_path) is not None
+    assert convergence['reg_time_s'] > 0
+    assert np.isnan(convergence['iterations'])
+    assert np.isnan(convergence['final_metric'])
+
+
+def test_parallel_register_windows_matches_serial(monkeypatch):
+    monkeypatch.setenv('ANTS_RANDOM_SEED', '1')
+    monkeypatch.setenv(ITK_THREADS_ENV_VAR, '1')
+    motion_correct = shifted_motion_correct()
+    serial_xfms = motion_correct.register_windows(window_duration=120,
+                                                  transform_type='DenseRigid')
+    parallel_xfms = motion_correct.register_windows(window_duration=120,
+                                                    transform_type='DenseRigid',
+                                                    num_workers=2,
+                                                    num_threads=1)
+
+    assert os.environ[ITK_THREADS_ENV_VAR] == '1'
+    assert len(parallel_xfms) == len(serial_xfms)
+    for serial_xfm, parallel_xfm in zip(serial_xfms, parallel_xfms):
+        np.testing.assert_allclose(parallel_xfm.parameters, serial_xfm.parameters, atol=1e-6)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from petpal.preproc.native_partial_volume_corrections import (GaussianPsf,
+                                                              RegionOperators,
+                                                              apply_pvc_to_frames)
+
+
+@pytest.fixture
+def blurred_phantom():
+    seg_arr = np.zeros((16, 16, 16), dtype=np.int32)
+    seg_arr[2:14, 2:14, 2:14] = 1
+    seg_arr[5:11, 5:11, 5:11] = 2
+    true_values = np.array([0.0, 1.0, 4.0])
+    psf = GaussianPsf(fwhm=4.0, voxel_spacing=(1.0, 1.0, 1.0))
+    true_arr = true_values[seg_arr]
+    return seg_arr, true_arr, psf.blur(true_arr), psf
+
+
+def test_gtm_and_rbv_recover_piecewise_constant_phantom(blurred_phantom):
+    seg_arr, true_arr, observed_arr, psf = blurred_phantom
+    region_ops = RegionOperators(segmentation_arr=seg_arr, psf=psf)
+
+    gtm_values, = apply_pvc_to_frames([observed_arr], 'GTM', region_ops)
+    np.testing.assert_allclose(gtm_values, [1.0, 4.0], rtol=1e-5)
+
+    rbv_frames = apply_pvc_to_frames([observed_arr, 2 * observed_arr], 'RBV', region_ops)
+    np.testing.assert_allclose(rbv_frames[0], true_arr, atol=1e-5)
+    np.testing.assert_allclose(rbv_frames[1], 2 * true_arr, atol=1e-5)
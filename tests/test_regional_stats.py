@@ -0,0 +1,62 @@
+import numpy as np
+import nibabel as nib
+import pandas as pd
+import pytest
+from petpal.utils.stats import RegionalStats, batch_regional_stats
+
+
+@pytest.fixture
+def stats_obj(tmp_path):
+    rng = np.random.default_rng(7)
+    seg_arr = rng.integers(0, 4, size=(10, 9, 8)).astype(np.int16)
+    pet_arr = rng.normal(loc=2.0, scale=1.0, size=seg_arr.shape).astype(np.float32)
+    nib.save(nib.Nifti1Image(pet_arr, np.eye(4)), tmp_path / 'pet.nii.gz')
+    nib.save(nib.Nifti1Image(seg_arr, np.eye(4)), tmp_path / 'seg.nii.gz')
+    return RegionalStats(input_image_path=str(tmp_path / 'pet.nii.gz'),
+                         segmentation_image_path=str(tmp_path / 'seg.nii.gz'),
+                         label_map_option={'A': 1, 'B': 2, 'AB': [1, 2], 'C': 3})
+
+
+def test_multiple_stats_match_per_region_stats(stats_obj):
+    stats_funcs = {'mean': np.mean, 'std': np.std, 'min': np.min, 'max': np.max,
+                   'median': np.median, 'p95': lambda arr: np.percentile(arr, 95)}
+    multiple_stats = stats_obj.get_multiple_stats([*stats_funcs, 'nvox'])
+
+    for statistic, stats_func in stats_funcs.items():
+        expected = stats_obj.get_stats(stats_func=stats_func)
+        assert multiple_stats[statistic].keys() == expected.keys()
+        np.testing.assert_allclose(list(multiple_stats[statistic].values()),
+                                   list(expected.values()), rtol=1e-5)
+    assert multiple_stats['nvox'] == stats_obj.get_stats(stats_func=len, dtype=int)
+
+    stats_table = stats_obj.get_multiple_stats_table(['mean', 'nvox'])
+    assert list(stats_table['Region']) == ['A', 'B', 'AB', 'C']
+    assert list(stats_table['nvox']) == list(multiple_stats['nvox'].values())
+
+
+def test_batch_regional_stats_matches_single_image_stats(tmp_path, stats_obj):
+    rng = np.random.default_rng(11)
+    seg_arr = rng.integers(0, 3, size=(6, 5, 4)).astype(np.int16)
+    nib.save(nib.Nifti1Image(seg_arr, np.eye(4)), tmp_path / 'seg_2.nii.gz')
+    nib.save(nib.Nifti1Image(rng.random(seg_arr.shape).astype(np.float32), np.eye(4)),
+             tmp_path / 'pet_2.nii.gz')
+    label_map = tmp_path / 'label_map.json'
+    label_map.write_text('{"A": 1, "B": 2}')
+    manifest = pd.DataFrame({'subject': ['01', '02', '01'],
+                             'image': [str(tmp_path / name) for name in
+                                       ('pet.nii.gz', 'pet_2.nii.gz', 'pet.nii.gz')],
+                             'segmentation': [str(tmp_path / name) for name in
+                                              ('seg.nii.gz', 'seg_2.nii.gz', 'seg.nii.gz')],
+                             'label_map': str(label_map)})
+
+    cohort_stats = batch_regional_stats(manifest=manifest, statistics=['mean', 'nvox'],
+                                        num_workers=2)
+
+    assert list(cohort_stats.columns) == ['subject', 'image', 'segmentation', 'label_map',
+                                          'Region', 'Statistic', 'Value']
+    assert list(cohort_stats['subject']) == ['01'] * 4 + ['02'] * 4 + ['01'] * 4
+    first_means = cohort_stats.iloc[:2]
+    np.testing.assert_allclose(first_means['Value'],
+                               [stats_obj.mean['A'], stats_obj.mean['B']])
+    pd.testing.assert_frame_equal(cohort_stats.iloc[:4].reset_index(drop=True),
+                                  cohort_stats.iloc[8:].reset_index(drop=True))
@@ -0,0 +1,40 @@
+import os
+import ants
+import numpy as np
+
+from petpal.preproc import registration_cache
+from petpal.preproc.registration_cache import RegistrationCache, cached_registration
+
+
+def test_cached_registration_reuses_and_evicts(tmp_path, monkeypatch):
+    calls = []
+
+    def mock_registration(*, fixed, moving, type_of_transform, **kwargs):
+        calls.append(type_of_transform)
+        xfm_path = tmp_path / f'xfm{len(calls)}.mat'
+        xfm_path.write_bytes(b'x' * 1000)
+        return {'fwdtransforms': [str(xfm_path)], 'invtransforms': [str(xfm_path)]}
+
+    monkeypatch.setattr(registration_cache.ants, 'registration', mock_registration)
+    cache_dir = tmp_path / 'cache'
+    monkeypatch.setenv(registration_cache.REGISTRATION_CACHE_DIR_ENV_VAR, str(cache_dir))
+    monkeypatch.setenv(registration_cache.REGISTRATION_CACHE_MAX_GB_ENV_VAR, str(1500 / 1e9))
+
+    fixed = ants.from_numpy(np.arange(27, dtype=np.float32).reshape(3, 3, 3))
+    moving = ants.from_numpy(np.ones((3, 3, 3), dtype=np.float32))
+    first = cached_registration(fixed=fixed, moving=moving, type_of_transform='Rigid')
+    again = cached_registration(fixed=fixed, moving=moving.clone(), type_of_transform='Rigid',
+                                verbose=True)
+    assert calls == ['Rigid']
+    assert again['fwdtransforms'] == again['invtransforms']
+    with open(again['fwdtransforms'][0], 'rb') as cached_file, \
+            open(first['fwdtransforms'][0], 'rb') as registered_file:
+        assert cached_file.read() == registered_file.read()
+    assert os.path.dirname(again['fwdtransforms'][0]).startswith(str(cache_dir))
+
+    cached_registration(fixed=fixed, moving=moving, type_of_transform='Affine')
+    assert calls == ['Rigid', 'Affine']
+    # Only one 1000 byte entry fits, so the least recently used Rigid entry is evicted.
+    assert not os.path.exists(again['fwdtransforms'][0])
+    key = RegistrationCache.registration_key(fixed, moving, 'Affine', {})
+    assert RegistrationCache(str(cache_dir), 1500).load(key) is not None
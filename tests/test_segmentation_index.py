@@ -0,0 +1,41 @@
+import numpy as np
+import nibabel
+
+from petpal.utils.segmentation_index import SegmentationIndex
+from petpal.preproc.regional_tac_extraction import calc_label_wise_voxel_stats
+
+
+def make_segmentation():
+    rng = np.random.default_rng(3)
+    seg_arr = rng.integers(0, 5, size=(7, 6, 5)).astype(np.float32)
+    seg_arr[seg_arr == 4] = 0
+    seg_arr[1:3, 2, 3:5] = 4
+    return np.asfortranarray(seg_arr)
+
+
+def test_region_voxels_match_masks():
+    seg_arr = make_segmentation()
+    seg_index = SegmentationIndex.from_array(seg_arr, label_map_option={'a': 1, 'b': [2, 3]})
+    pet_arr = np.asfortranarray(np.random.default_rng(4).random((7, 6, 5, 3)))
+    for mappings in (1, [2, 3], [9]):
+        mask = np.isin(seg_arr, mappings)
+        assert np.array_equal(seg_index.region_mask(mappings), mask)
+        assert np.array_equal(seg_index.region_values(pet_arr, mappings), pet_arr[mask])
+    assert np.array_equal(seg_index.counts, [np.sum(seg_arr == label) for label in range(5)])
+    assert seg_index.region_bounding_box(4) == (slice(1, 3), slice(2, 3), slice(3, 5))
+    assert seg_index.region_mappings('B') == [2, 3]
+    assert seg_index.find_label_name(1) == 'A'
+    stats_with_index = calc_label_wise_voxel_stats(pet_arr, seg_arr, segmentation_index=seg_index)
+    stats_without_index = calc_label_wise_voxel_stats(pet_arr, seg_arr)
+    np.testing.assert_allclose(stats_with_index.sums, stats_without_index.sums)
+
+
+def test_from_image_writes_and_reuses_cache(tmp_path):
+    seg_arr = make_segmentation()
+    seg_path = str(tmp_path / 'seg.nii.gz')
+    nibabel.save(nibabel.Nifti1Image(seg_arr, np.eye(4)), seg_path)
+    seg_index = SegmentationIndex.from_image(seg_path)
+    assert (tmp_path / 'seg_segindex.npz').exists()
+    cached_index = SegmentationIndex.from_image(seg_path)
+    assert np.array_equal(cached_index.voxel_indices, seg_index.voxel_indices)
+    assert np.array_equal(cached_index.region_mask([1, 4]), np.isin(seg_arr, [1, 4]))
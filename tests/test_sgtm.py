@@ -1,3 +1,4 @@
+import numpy as np
 import pytest
 from petpal.preproc.symmetric_geometric_transfer_matrix import Sgtm
 
@@ -50,4 +51,28 @@ def test_save_calls_save_results_4d_multitacs_when_one_tsv_per_region_false():
     assert 'args' in called
     assert called['args'][0] is sgtm.sgtm_result
     assert called['args'][1] == "/tmp/dir2"
-    assert called['args'][2] == "pref2"
\ No newline at end of file
+    assert called['args'][2] == "pref2"
+def test_sparse_voxel_by_roi_matrix_matches_dense():
+    seg_arr = np.zeros((24, 20, 16), dtype=np.float32)
+    seg_arr[2:8, 3:9, 2:6] = 1
+    seg_arr[8:22, 3:9, 4:14] = 2
+    seg_arr[0:3, 15:20, 12:16] = 3
+    labels = np.asarray([1, 2, 3], dtype=np.uint32)
+    sigma = [1.5, 1.0, 2.0]
+    dense_v = Sgtm.get_voxel_by_roi_matrix(labels, seg_arr, sigma)
+    sparse_v = Sgtm.get_sparse_voxel_by_roi_matrix(labels, seg_arr, sigma)
+    np.testing.assert_array_equal(sparse_v.toarray(), dense_v)
+    np.testing.assert_allclose(Sgtm.get_omega_matrix(sparse_v), Sgtm.get_omega_matrix(dense_v),
+                               rtol=1e-5)
+
+def test_solve_sgtm_4d_matches_frame_by_frame_solve():
+    seg_arr = np.zeros((12, 10, 8), dtype=np.float32)
+    seg_arr[1:6, 2:8, 1:7] = 1
+    seg_arr[6:11, 2:8, 1:7] = 2
+    labels = np.asarray([1, 2], dtype=np.uint32)
+    voxel_by_roi_matrix = Sgtm.get_sparse_voxel_by_roi_matrix(labels, seg_arr, [1.0, 1.0, 1.0])
+    omega = Sgtm.get_omega_matrix(voxel_by_roi_matrix)
+    pet_arr = np.asfortranarray(np.random.default_rng(5).random((12, 10, 8, 4)), dtype=np.float32)
+    frame_results = Sgtm.solve_sgtm_4d(omega, voxel_by_roi_matrix, pet_arr)
+    expected = [Sgtm.solve_sgtm(omega, voxel_by_roi_matrix, pet_arr[..., i])[0] for i in range(4)]
+    np.testing.assert_allclose(frame_results, expected, rtol=1e-4)
@@ -0,0 +1,49 @@
+import numpy as np
+from scipy.optimize import nnls
+
+from petpal.kinetic_modeling import spectral_analysis as sa
+from petpal.kinetic_modeling.tcms_as_convolutions import gen_tac_1tcm_cpet_from_tac
+from petpal.utils.time_activity_curve import TimeActivityCurve
+
+
+def _make_input_tac():
+    times = np.linspace(0.0, 90.0, 901)
+    vals = 10.0 * times * np.exp(-times / 0.8) + 2.0 * np.exp(-times / 40.0) * (times > 0)
+    return TimeActivityCurve(times=times, activity=vals)
+
+
+def test_batched_nnls_matches_scipy_nnls():
+    rng = np.random.default_rng(0)
+    design = rng.random((25, 8))
+    targets = rng.normal(size=(6, 25))
+    ata = design.T @ design
+    atb = targets @ design
+
+    batched = sa.batched_nnls_from_normal_equations(ata, atb)
+
+    for problem_id in range(targets.shape[0]):
+        expected = nnls(design, targets[problem_id])[0]
+        np.testing.assert_allclose(batched[problem_id], expected, atol=1e-8)
+
+
+def test_spectral_analysis_recovers_1tcm_parameters():
+    input_tac = _make_input_tac()
+    frame_times = np.linspace(0.5, 90.0, 40)
+    betas = sa.get_spectral_betas()
+    rates = sa.get_spectral_basis_rates(betas=betas)
+    basis = sa.generate_spectral_basis(input_tac=input_tac,
+                                       tac_times_in_minutes=frame_times,
+                                       betas=betas)
+
+    k1_k2_pairs = [(0.1, 0.1), (0.2, 0.05)]
+    tacs_vals = []
+    for k1, k2 in k1_k2_pairs:
+        fine_tac = gen_tac_1tcm_cpet_from_tac(input_tac.times, input_tac.activity, k1, k2, 0.0)[1]
+        tacs_vals.append(np.interp(frame_times, input_tac.times, fine_tac))
+
+    coefficients = sa.solve_spectral_nnls(basis=basis, tacs_vals=np.asarray(tacs_vals))
+    params = sa.calc_spectral_parameters(coefficients=coefficients, rates=rates)
+
+    expected_vt = [k1 / k2 for k1, k2 in k1_k2_pairs]
+    np.testing.assert_allclose(params['VT'], expected_vt, rtol=1e-2)
+    assert np.all(params['Ki'] < 1e-4)
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+import petpal.kinetic_modeling.tcms_as_convolutions as pet_tcm
+import petpal.kinetic_modeling.tac_fitting as pet_fit
+
+TRUE_1TCM_PARAMS = np.array([0.3, 0.1, 0.05])
+
+
+@pytest.fixture(scope='module')
+def fitted_1tcm():
+    """1TCM fit of a noisy TAC simulated on the fitter's own resampling grid."""
+    times = np.linspace(0.0, 60.0, 512)
+    input_vals = 10.0 * times * np.exp(-times / 2.0) + 1.5 * (1.0 - np.exp(-times / 2.0))
+    tissue_tac = pet_tcm.gen_tac_1tcm_cpet_from_tac(times, input_vals, *TRUE_1TCM_PARAMS)
+    rng = np.random.default_rng(1)
+    noisy_vals = tissue_tac[1] + rng.normal(scale=0.02 * tissue_tac[1].max(), size=times.size)
+    fitter = pet_fit.TACFitter(pTAC=np.asarray([times, input_vals]),
+                               tTAC=np.asarray([times, noisy_vals]),
+                               tcm_func=pet_tcm.gen_tac_1tcm_cpet_from_tac,
+                               aif_fit_thresh_in_mins=59.0)
+    fitter.run_fit()
+    return fitter
+
+
+def test_parametric_bootstrap_does_not_depend_on_num_workers(fitted_1tcm):
+    serial_params = pet_fit.run_parametric_bootstrap(fitter=fitted_1tcm, num_samples=24, seed=0)
+    parallel_params = pet_fit.run_parametric_bootstrap(fitter=fitted_1tcm, num_samples=24, seed=0,
+                                                       num_workers=2)
+
+    np.testing.assert_array_equal(parallel_params, serial_params)
+
+
+def test_parametric_bootstrap_cis_contain_true_params(fitted_1tcm):
+    bootstrap_params = pet_fit.run_parametric_bootstrap(fitter=fitted_1tcm, num_samples=100, seed=0)
+    lower, upper = pet_fit.calc_bootstrap_percentile_cis(bootstrap_params=bootstrap_params)
+
+    assert np.all(np.isfinite(bootstrap_params))
+    assert np.all(lower <= TRUE_1TCM_PARAMS)
+    assert np.all(TRUE_1TCM_PARAMS <= upper)
@@ -0,0 +1,18 @@
+from petpal.preproc.transform_chain import TransformChain
+
+
+def test_transformlist_applies_frame_transform_first():
+    chain = TransformChain(reference_img=None)
+    chain.set_frame_transforms(['frame0.h5', 'frame1.h5'])
+    chain.add_stage('pet_to_t1.h5')
+    chain.add_stage(['t1_to_atlas_warp.nii.gz', 't1_to_atlas_affine.mat'])
+
+    assert chain.transformlist(frame_index=1) == ['t1_to_atlas_warp.nii.gz',
+                                                  't1_to_atlas_affine.mat',
+                                                  'pet_to_t1.h5',
+                                                  'frame1.h5']
+
+    chain.frame_xfm_paths = None
+    assert chain.transformlist() == ['t1_to_atlas_warp.nii.gz',
+                                     't1_to_atlas_affine.mat',
+                                     'pet_to_t1.h5']
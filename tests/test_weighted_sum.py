@@ -1,6 +1,9 @@
+import json
+import nibabel
 import numpy as np
 import pytest
 from petpal.utils.math_lib import weighted_sum_computation
+from petpal.utils.useful_functions import weighted_series_sum
 from petpal.utils.scan_timing import calculate_frame_reference_time
 from petpal.preproc.decay_correction import calculate_frame_decay_factor
 
@@ -48,4 +51,28 @@ def test_weighted_sum_computation_manual_computation():
     expected = pet_series_sum_scaled * total_decay / image_total_duration
 
     out = weighted_sum_computation(pet_series, frame_duration, half_life, frame_start, decay_correction)
-    np.testing.assert_allclose(out, expected)
\ No newline at end of file
+    np.testing.assert_allclose(out, expected)
+
+def test_weighted_series_sum_streams_frame_window(tmp_path):
+    # streamed sum over a frame window matches the in-memory computation on the same frames
+    rng = np.random.default_rng(1)
+    pet_series = rng.random((4, 3, 2, 6)).astype(np.float32)
+    image_path = str(tmp_path / 'pet.nii.gz')
+    nibabel.save(nibabel.Nifti1Image(pet_series, np.eye(4)), image_path)
+    frame_start = np.array([0.0, 10.0, 20.0, 40.0, 70.0, 110.0])
+    frame_duration = np.array([10.0, 10.0, 20.0, 30.0, 40.0, 50.0])
+    half_life = 100.0
+    decay_correction = np.exp(np.log(2.0) / half_life * (frame_start + frame_duration / 2))
+    with open(tmp_path / 'pet.json', 'w', encoding='utf-8') as meta_file:
+        json.dump({'FrameTimesStart': frame_start.tolist(),
+                   'FrameDuration': frame_duration.tolist(),
+                   'DecayCorrectionFactor': decay_correction.tolist()}, meta_file)
+
+    out = weighted_series_sum(input_image_path=image_path,
+                              out_image_path=None,
+                              half_life=half_life,
+                              start_time=20,
+                              end_time=70)
+    expected = weighted_sum_computation(pet_series[..., 2:4], frame_duration[2:4], half_life,
+                                        frame_start[2:4], decay_correction[2:4])
+    np.testing.assert_allclose(out, expected)
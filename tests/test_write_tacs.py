@@ -4,6 +4,7 @@ import builtins
 import types
 import pytest
 import pathlib
+import nibabel
 
 import petpal.preproc.regional_tac_extraction as rtx
 
@@ -14,12 +15,6 @@ class FakeLabelMapLoader:
     def label_map(self):
         return self._label_map
 
-class FakeImg:
-    def __init__(self, arr):
-        self._arr = arr
-    def numpy(self):
-        return self._arr
-
 class FakeScanTiming:
     def __init__(self):
         self.start_in_mins = [0.0, 1.0, 2.0]
@@ -37,27 +32,29 @@ def fake_to_tsv(self, filename):
 def patch_dependencies(monkeypatch):
     # Patch LabelMapLoader used in module
     monkeypatch.setattr(rtx, "LabelMapLoader", FakeLabelMapLoader)
-    # Patch ants.image_read to return dummy arrays (not used because apply_mask_4d is patched)
-    monkeypatch.setattr(rtx.ants, "image_read", lambda filename=None: FakeImg(np.zeros((2,2,2,3))))
     # Patch ScanTimingInfo.from_nifti
     monkeypatch.setattr(rtx.ScanTimingInfo, "from_nifti", lambda image_path=None: FakeScanTiming())
-    # combine_regions_as_mask returns the label passed through so apply_mask_4d can distinguish
-    monkeypatch.setattr(rtx, "combine_regions_as_mask", lambda segmentation_img, label: label)
     # Patch TimeActivityCurve.to_tsv to write simple TSV so tests can assert file creation
     monkeypatch.setattr(rtx.TimeActivityCurve, "to_tsv", fake_to_tsv)
     yield
 
-def test_write_tacs_one_tsv_per_region_writes_only_non_nan_region(tmp_path, monkeypatch):
-    # apply_mask_4d returns non-NaN voxels for label 1 and all-NaN voxels for label 2
-    def fake_apply_mask_4d(input_arr, mask_arr, verbose=False):
-        if mask_arr == 1:
-            return np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])  # mean is finite
-        else:
-            return np.array([[np.nan, np.nan, np.nan], [np.nan, np.nan, np.nan]])  # mean is nan
-    monkeypatch.setattr(rtx, "apply_mask_4d", fake_apply_mask_4d)
+@pytest.fixture
+def image_paths(tmp_path):
+    # Write small images: label 1 voxels have finite values and label 2 voxels are all NaN
+    seg_arr = np.array([[[1, 1], [2, 2]], [[1, 0], [2, 0]]], dtype=np.float32)
+    pet_arr = np.zeros((2, 2, 2, 3), dtype=np.float32)
+    pet_arr[seg_arr == 1] = [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0], [1.0, 2.0, 3.0]]
+    pet_arr[seg_arr == 2] = np.nan
+    pet_path = str(tmp_path / "in.nii")
+    seg_path = str(tmp_path / "seg.nii")
+    nibabel.save(nibabel.Nifti1Image(pet_arr, np.eye(4)), pet_path)
+    nibabel.save(nibabel.Nifti1Image(seg_arr, np.eye(4)), seg_path)
+    return pet_path, seg_path
 
-    wr = rtx.WriteRegionalTacs(input_image_path="in.nii", segmentation_path="seg.nii", label_map="dummy")
-    out_dir = tmp_path
+def test_write_tacs_one_tsv_per_region_writes_only_non_nan_region(tmp_path, image_paths):
+    pet_path, seg_path = image_paths
+    wr = rtx.WriteRegionalTacs(input_image_path=pet_path, segmentation_path=seg_path, label_map="dummy")
+    out_dir = tmp_path / "tacs"
     wr.write_tacs(out_tac_prefix="sub-01", out_tac_dir=str(out_dir), one_tsv_per_region=True)
     # Expect file for R1 only
     f_r1 = out_dir / "sub-01_seg-R1_tac.tsv"
@@ -68,18 +65,16 @@ def test_write_tacs_one_tsv_per_region_writes_only_non_nan_region(tmp_path, monk
     content = f_r1.read_text()
     assert "time\tactivity\tuncertainty" in content
     assert "0.5\t" in content  # time present
+    # Streamed TAC matches the masked voxels of the loaded image
+    streamed_tac = wr.extract_tac(region_mapping=1)
+    expected = rtx.voxel_average_w_uncertainty(rtx.apply_mask_4d(wr.pet_arr, wr.seg_arr == 1))
+    np.testing.assert_allclose(streamed_tac.activity, expected[0])
+    np.testing.assert_allclose(streamed_tac.uncertainty, expected[1])
 
-def test_write_tacs_multitac_writes_combined_file_and_skips_nan_regions(tmp_path, monkeypatch):
-    # same masking behavior as previous test
-    def fake_apply_mask_4d(input_arr, mask_arr, verbose=False):
-        if mask_arr == 1:
-            return np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
-        else:
-            return np.array([[np.nan, np.nan, np.nan], [np.nan, np.nan, np.nan]])
-    monkeypatch.setattr(rtx, "apply_mask_4d", fake_apply_mask_4d)
-
-    wr = rtx.WriteRegionalTacs(input_image_path="in.nii", segmentation_path="seg.nii", label_map="dummy")
-    out_dir = tmp_path
+def test_write_tacs_multitac_writes_combined_file_and_skips_nan_regions(tmp_path, image_paths):
+    pet_path, seg_path = image_paths
+    wr = rtx.WriteRegionalTacs(input_image_path=pet_path, segmentation_path=seg_path, label_map="dummy")
+    out_dir = tmp_path / "tacs"
     wr.write_tacs(out_tac_prefix="sub-01", out_tac_dir=str(out_dir), one_tsv_per_region=False)
     combined = out_dir / "sub-01_multitacs.tsv"
     assert combined.exists()
@@ -87,4 +82,17 @@ def test_write_tacs_multitac_writes_combined_file_and_skips_nan_regions(tmp_path
     # Should contain frame_start(min) and R1 column but not R2 (R2 was NaN and skipped)
     assert "frame_start(min)" in txt
     assert "R1" in txt
-    assert "R2" not in txt
\ No newline at end of file
+    assert "R2" not in txt
+
+
+def test_label_wise_tacs_match_masked_voxel_tacs():
+    rng = np.random.default_rng(7)
+    pet_arr = rng.uniform(0.0, 10.0, size=(6, 5, 4, 3)).astype(np.float32)
+    seg_arr = rng.integers(0, 5, size=(6, 5, 4)).astype(float)
+    label_stats = rtx.calc_label_wise_voxel_stats(input_arr=pet_arr, seg_arr=seg_arr)
+    for region_mapping in (1, [2, 4]):
+        region_mask = sum(seg_arr == label for label in np.atleast_1d(region_mapping))
+        expected = rtx.voxel_average_w_uncertainty(rtx.apply_mask_4d(pet_arr, region_mask))
+        calculated = label_stats.region_mean_and_std(region_mapping)
+        np.testing.assert_allclose(calculated, expected, rtol=1e-5)
+    assert np.isnan(label_stats.region_mean_and_std(9)[0]).all()